@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Data API Benchmark Suite
+قياس أداء واجهات البيانات
+
+Times every public DatabaseManager and CashManager method and the data-load
+functions of the views against a dataset from sample_data.py. The dataset
+is generated once per (preset, seed, end date) and cached; every run works
+on a fresh copy so write benchmarks do not drift the data. Prints JSON
+(optionally written to --output) so runs can be diffed against each other.
+
+Usage: python benchmarks/bench_api.py [--preset small|medium|large] [--repeat 20]
+                                      [--only db.get_all_products] [--output results.json]
+"""
+
+import argparse
+import json
+import logging
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from sample_data import PRESETS, generate_dataset
+from src.core.cash_manager import CashManager, CashTransaction
+from src.core.database import Customer, DatabaseManager, Product, Sale, SaleItem
+from src.core.expenses import Expense, ExpenseManager
+from src.core.purchasing import PurchasingManager, ReceiptLine, Supplier
+from src.utils.instrumentation import Histogram
+
+CACHE_DIR = Path(tempfile.gettempdir()) / "smartshop-bench"
+
+def _dataset(preset: str, seed: int, end_date: date) -> Path:
+    """Path of the cached dataset, generated on first use"""
+    path = CACHE_DIR / f"{preset}-seed{seed}-{end_date.isoformat()}.db"
+    if not path.exists():
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        partial = path.with_suffix(".partial")
+        generate_dataset(str(partial), seed=seed, end_date=end_date, verbose=False, **PRESETS[preset])
+        partial.replace(path)
+    return path
+
+def _rows(result) -> int:
+    if isinstance(result, (list, tuple, dict)):
+        return len(result)
+    return 1 if result else 0
+
+class Suite:
+    """Registry of named benchmark cases sharing one database copy"""
+
+    def __init__(self, db: DatabaseManager, end_date: date):
+        self.db = db
+        self.cash = CashManager(db)
+        self.end_date = end_date
+        self._serial = 0
+        self.cases = []
+        self._register_db_cases()
+        self._register_cash_cases()
+        self._register_purchasing_cases()
+        self._register_expense_cases()
+        self._register_view_cases()
+
+    def _next(self) -> int:
+        self._serial += 1
+        return self._serial
+
+    def add(self, name, func):
+        self.cases.append((name, func))
+
+    # DatabaseManager
+    def _register_db_cases(self):
+        db = self.db
+        product_id = db.execute_query("SELECT MIN(id) FROM products")[0][0]
+
+        def add_product():
+            n = self._next()
+            return db.add_product(Product(name=f"Bench {n}", brand="Bench", price=99.0, cost=70.0,
+                                          stock_quantity=10, min_stock=2, category="إكسسوارات",
+                                          barcode=f"BENCH{n:08d}"))
+
+        def update_product():
+            product = Product(id=product_id, name="Bench update", brand="Bench", price=101.0,
+                              cost=80.0, stock_quantity=50, min_stock=5, category="إكسسوارات",
+                              barcode=f"BENCHUPD{product_id}")
+            return db.update_product(product)
+
+        def delete_product():
+            n = self._next()
+            db.add_product(Product(name=f"Bench del {n}", price=1.0, barcode=f"BENCHDEL{n:08d}"))
+            new_id = db.execute_query("SELECT MAX(id) FROM products")[0][0]
+            return db.delete_product(new_id)
+
+        def add_customer():
+            n = self._next()
+            return db.add_customer(Customer(name=f"Bench {n}", phone=f"0100{n:07d}"))
+
+        def create_sale():
+            items = [SaleItem(product_id=product_id, product_name="Bench", quantity=1,
+                              unit_price=99.0, total_price=99.0)]
+            return db.create_sale(Sale(customer_name="bench", total_amount=99.0, final_amount=99.0), items)
+
+        # Each call returns one unit of the newest sale that still has something left to return
+        def create_return():
+            sale_id = db.execute_query("""
+            SELECT s.id FROM sales s
+            WHERE s.return_of IS NULL
+              AND (SELECT SUM(si.quantity) FROM sales r JOIN sale_items si ON si.sale_id = r.id
+                   WHERE r.id = s.id OR r.return_of = s.id) > 0
+            ORDER BY s.id DESC LIMIT 1
+            """)[0][0]
+            item = db.get_returnable_items(sale_id)[0]
+            return db.create_return(sale_id, [SaleItem(product_id=item.product_id, quantity=1)])
+
+        self.add("db.get_all_products", db.get_all_products)
+        self.add("db.search_products", lambda: db.search_products("Galaxy"))
+        self.add("db.get_products", db.get_products)
+        self.add("db.get_product_frame", db.get_product_frame)
+        self.add("db.get_all_customers", db.get_all_customers)
+        self.add("db.get_recent_sales", lambda: db.get_recent_sales(50))
+        self.add("db.get_dashboard_stats", db.get_dashboard_stats)
+        self.add("db.get_low_stock_products", db.get_low_stock_products)
+        self.add("db.count_low_stock_products", db.count_low_stock_products)
+        self.add("db.execute_query", lambda: db.execute_query("SELECT COUNT(*) FROM sales"))
+        self.add("db.add_product", add_product)
+        self.add("db.update_product", update_product)
+        self.add("db.delete_product", delete_product)
+        self.add("db.add_customer", add_customer)
+        self.add("db.create_sale", create_sale)
+        self.add("db.create_return", create_return)
+
+    # CashManager
+    def _register_cash_cases(self):
+        cash = self.cash
+        day = self.end_date.isoformat()
+        month_ago = (self.end_date - timedelta(days=30)).isoformat()
+
+        self.add("cash.add_cash_transaction", lambda: cash.add_cash_transaction(
+            CashTransaction(transaction_type="in", amount=10.0, to_method="cash",
+                            description="bench", created_by="bench")))
+        self.add("cash.record_sale_payment", lambda: cash.record_sale_payment(1, 10.0, "cash"))
+        self.add("cash.record_expense", lambda: cash.record_expense(5.0, "cash", "bench"))
+        self.add("cash.record_transfer", lambda: cash.record_transfer(5.0, "cash", "card", "bench"))
+        self.add("cash.get_cash_balance", lambda: cash.get_cash_balance("cash"))
+        self.add("cash.get_daily_transactions", lambda: cash.get_daily_transactions(day))
+        self.add("cash.get_payment_method_summary", cash.get_payment_method_summary)
+        self.add("cash.get_cash_flow_report", lambda: cash.get_cash_flow_report(month_ago, day))
+
+    # PurchasingManager
+    def _register_purchasing_cases(self):
+        purchasing = PurchasingManager(self.db)
+        supplier_id = purchasing.add_supplier(Supplier(name="Bench supplier"))
+        product_ids = [row[0] for row in self.db.execute_query("SELECT id FROM products ORDER BY id LIMIT 2000")]
+        shipment = [ReceiptLine(product_id, 5, 50.0) for product_id in product_ids]
+
+        self.add("purchasing.receive_goods", lambda: purchasing.receive_goods(supplier_id, shipment))
+        self.add("purchasing.create_purchase_order",
+                 lambda: purchasing.create_purchase_order(supplier_id, shipment[:100]))
+
+    # ExpenseManager
+    def _register_expense_cases(self):
+        expenses = ExpenseManager(self.db)
+        start = (self.end_date - timedelta(days=365)).isoformat()
+        end = (self.end_date + timedelta(days=1)).isoformat()
+
+        self.add("expenses.add_expense", lambda: expenses.add_expense(
+            Expense(category="Bench", description="bench", amount=5.0)))
+        self.add("expenses.get_category_totals", lambda: expenses.get_category_totals(start, end))
+
+    # Views
+    def _register_view_cases(self):
+        try:
+            from src.ui.views.customers import CustomersView
+            from src.ui.views.dashboard import DashboardView
+            from src.ui.views.products import ProductsView
+        except ImportError as e:
+            self.skipped_views = str(e)
+            return
+        self.skipped_views = None
+
+        # The loaders only touch self.db_manager, so no Tk root is needed
+        view = SimpleNamespace(db_manager=self.db)
+        self.add("view.dashboard.stats", self.db.get_dashboard_stats)
+        self.add("view.dashboard.monthly_sales", lambda: DashboardView._get_monthly_sales_data(view))
+        self.add("view.dashboard.top_products", lambda: DashboardView._get_top_products_data(view))
+        self.add("view.products.load", lambda: ProductsView._fetch_products(view, "", None))
+        self.add("view.customers.load", lambda: CustomersView._fetch_customers(view))
+
+def _time_case(func, repeat: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        func()
+
+    histogram = Histogram()
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        result = func()
+        histogram.record(time.perf_counter_ns() - start)
+
+    summary = {key: round(value, 3) for key, value in histogram.summary().items()}
+    summary["result_rows"] = _rows(result)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[3])
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--repeat", type=int, default=20, help="timed calls per case")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed calls per case")
+    parser.add_argument("--only", action="append", help="run only cases starting with this prefix")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    # Per-call INFO lines would dominate the write benchmarks
+    logging.getLogger().setLevel(logging.WARNING)
+
+    started = time.perf_counter()
+    source = _dataset(args.preset, args.seed, args.end_date)
+    generate_seconds = time.perf_counter() - started
+
+    results = {
+        "benchmark": "data_api",
+        "preset": args.preset,
+        "sizes": PRESETS[args.preset],
+        "seed": args.seed,
+        "end_date": args.end_date.isoformat(),
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "dataset_seconds": round(generate_seconds, 2),
+        "cases": {}
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp) / "bench.db"
+        shutil.copyfile(source, work)
+        db = DatabaseManager(str(work))
+        suite = Suite(db, args.end_date)
+
+        for name, func in suite.cases:
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            try:
+                results["cases"][name] = _time_case(func, args.repeat, args.warmup)
+            except Exception as e:
+                results["cases"][name] = {"error": f"{type(e).__name__}: {e}"}
+
+        if suite.skipped_views:
+            results["views_skipped"] = suite.skipped_views
+        db.close()
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Report Widget Construction Benchmark
+قياس زمن بناء صفوف التقارير
+
+Builds a report table with the same row layout as ReportsView (a row frame
+with four labels, fonts from ThemeManager.get_font_config) twice: once with
+a fresh CTkFont per call, as ThemeManager did before the font registry, and
+once with the shared registry fonts. Reports construction time and how many
+named Tk fonts exist afterwards. Needs a display (use xvfb-run on servers).
+
+Usage: python benchmarks/bench_fonts.py [--rows 500] [--repeat 3] [--output results.json]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tkinter.font as tkfont
+from pathlib import Path
+
+import customtkinter as ctk
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.core.settings import SettingsManager
+from src.core.theme import ThemeManager
+
+class PerCallFonts:
+    """Font factory behaving like ThemeManager before the registry"""
+
+    def __init__(self, theme_manager: ThemeManager):
+        self.theme_manager = theme_manager
+
+    def get_font_config(self, size: int = 12, weight: str = "normal") -> ctk.CTkFont:
+        return ctk.CTkFont(family=self.theme_manager.arabic_font_name, size=size, weight=weight)
+
+def build_report(parent, fonts, rows: int):
+    """Header plus rows laid out like ReportsView._generate_sales_data"""
+    table_frame = ctk.CTkFrame(parent)
+    table_frame.pack(fill="both", expand=True)
+
+    headers_frame = ctk.CTkFrame(table_frame)
+    headers_frame.pack(fill="x", padx=10, pady=(10, 0))
+    for i, header in enumerate(["المنتج", "الكمية المبيعة", "الإيرادات", "النسبة"]):
+        ctk.CTkLabel(headers_frame, text=header, font=fonts.get_font_config(12, "bold")).grid(row=0, column=i, padx=10)
+
+    for i in range(rows):
+        row_frame = ctk.CTkFrame(table_frame, fg_color="transparent")
+        row_frame.pack(fill="x", padx=10, pady=2)
+        ctk.CTkLabel(row_frame, text=f"Product {i}", font=fonts.get_font_config(11)).grid(row=0, column=0, padx=10)
+        ctk.CTkLabel(row_frame, text=str(i % 90), font=fonts.get_font_config(11)).grid(row=0, column=1, padx=10)
+        ctk.CTkLabel(row_frame, text=f"{i * 37:,} ج.م", font=fonts.get_font_config(11)).grid(row=0, column=2, padx=10)
+        ctk.CTkLabel(row_frame, text=f"{i % 100}.0%", font=fonts.get_font_config(11, "bold")).grid(row=0, column=3, padx=10)
+
+    return table_frame
+
+def run(root, fonts, rows: int) -> dict:
+    fonts_before = len(tkfont.names(root))
+    start = time.perf_counter()
+    frame = build_report(root, fonts, rows)
+    root.update_idletasks()
+    elapsed = time.perf_counter() - start
+    named_fonts = len(tkfont.names(root)) - fonts_before
+    frame.destroy()
+    root.update_idletasks()
+    return {"seconds": elapsed, "named_fonts_created": named_fonts}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[3])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    root = ctk.CTk()
+    root.withdraw()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = SettingsManager(str(Path(tmp) / "settings.json"))
+        theme_manager = ThemeManager(settings)
+        theme_manager.initialize_fonts()
+
+        scenarios = {"per_call_fonts": PerCallFonts(theme_manager), "font_registry": theme_manager}
+        results = {"benchmark": "report_widget_construction", "rows": args.rows, "scenarios": {}}
+
+        for name, fonts in scenarios.items():
+            runs = [run(root, fonts, args.rows) for _ in range(args.repeat)]
+            results["scenarios"][name] = {
+                "best_ms": round(min(r["seconds"] for r in runs) * 1000, 1),
+                "mean_ms": round(sum(r["seconds"] for r in runs) / len(runs) * 1000, 1),
+                "named_fonts_created": runs[0]["named_fonts_created"]
+            }
+
+        settings.flush()
+
+    root.destroy()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+
+if __name__ == "__main__":
+    main()
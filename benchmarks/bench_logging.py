@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Logging Overhead Benchmark
+قياس تكلفة التسجيل
+
+Times DatabaseManager.create_sale with logging disabled, with the old
+synchronous handler layout (per-module stream + file handlers on top of
+basicConfig's file + stream handlers) and with the queue pipeline from
+src.utils.logger. Besides the end-to-end cost per sale it reports how long
+the calling thread is blocked inside the per-sale log call itself, which is
+what the Tk thread feels. Scenarios are interleaved for every repeat and
+the median of the per-repeat means is reported with its range, since one
+run is dominated by commit (fsync) noise. Prints JSON results.
+
+Usage: python benchmarks/bench_logging.py [--sales 500] [--repeat 7] [--warmup 50] [--output results.json]
+"""
+
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.core.database import DatabaseManager, Product, Sale, SaleItem
+from src.utils import logger as app_logger
+
+def _reset_logging():
+    """Remove every handler installed by a previous scenario"""
+    app_logger.shutdown_logging()
+    for name in [None, "src.core.database"]:
+        log = logging.getLogger(name)
+        for handler in list(log.handlers):
+            log.removeHandler(handler)
+            handler.close()
+        log.setLevel(logging.NOTSET)
+    logging.getLogger().setLevel(logging.WARNING)
+
+def _setup_disabled(workdir: Path):
+    logging.getLogger().setLevel(logging.CRITICAL + 1)
+
+def _setup_legacy(workdir: Path):
+    """Handler layout before the queue pipeline (every line written 4 times)"""
+    formatter = logging.Formatter(app_logger.LOG_FORMAT, datefmt=app_logger.DATE_FORMAT)
+    devnull = open(os.devnull, "w", encoding="utf-8")
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    for handler in (logging.FileHandler(workdir / "root.log", encoding="utf-8"),
+                    logging.StreamHandler(devnull)):
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+
+    module_logger = logging.getLogger("src.core.database")
+    module_logger.setLevel(logging.INFO)
+    for handler in (logging.StreamHandler(devnull),
+                    logging.FileHandler(workdir / "module.log", encoding="utf-8")):
+        handler.setFormatter(formatter)
+        module_logger.addHandler(handler)
+
+def _setup_queue(workdir: Path):
+    app_logger.setup_logging(log_dir=str(workdir / "logs"), level=logging.INFO)
+
+SCENARIOS = [
+    ("disabled", _setup_disabled),
+    ("legacy_sync_handlers", _setup_legacy),
+    ("queue_pipeline", _setup_queue),
+]
+
+def _run_sales(db: DatabaseManager, product_id: int, count: int) -> float:
+    """Return mean seconds per create_sale call"""
+    items = [SaleItem(product_id=product_id, product_name="Bench", quantity=1,
+                      unit_price=10.0, total_price=10.0)]
+    sale = Sale(customer_name="bench", total_amount=10.0, final_amount=10.0)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        db.create_sale(sale, items)
+    return (time.perf_counter() - start) / max(1, count)
+
+def _log_call_latency(count: int) -> dict:
+    """Percentiles (us) of the caller-side cost of the per-sale INFO line"""
+    log = logging.getLogger("src.core.database")
+    samples = []
+    for sale_id in range(count):
+        start = time.perf_counter_ns()
+        log.info("Sale created: %s", sale_id)
+        samples.append(time.perf_counter_ns() - start)
+
+    samples.sort()
+    def pct(p):
+        return round(samples[min(len(samples) - 1, int(len(samples) * p))] / 1000, 2)
+    return {"p50_us": pct(0.50), "p95_us": pct(0.95), "p99_us": pct(0.99)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[3])
+    parser.add_argument("--sales", type=int, default=500, help="timed create_sale calls per scenario and repeat")
+    parser.add_argument("--repeat", type=int, default=7, help="timed runs per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="untimed create_sale calls before each run")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    results = {"benchmark": "logging_overhead_per_create_sale", "sales": args.sales,
+               "repeat": args.repeat, "warmup": args.warmup, "scenarios": {}}
+    means = {name: [] for name, _ in SCENARIOS}
+    log_calls = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        _reset_logging()
+        databases = {}
+        for name, _ in SCENARIOS:
+            db = DatabaseManager(str(workdir / f"{name}.db"))
+            db.add_product(Product(name="Bench", price=10.0, stock_quantity=10 ** 9, barcode=name))
+            databases[name] = (db, db.get_all_products()[0].id)
+
+        # Interleaved so drift (disk cache, CPU frequency) hits every scenario alike
+        for _ in range(max(1, args.repeat)):
+            for name, setup in SCENARIOS:
+                db, product_id = databases[name]
+                _reset_logging()
+                setup(workdir)
+                _run_sales(db, product_id, args.warmup)
+                means[name].append(_run_sales(db, product_id, args.sales) * 1e6)
+                _reset_logging()
+
+        for name, setup in SCENARIOS:
+            setup(workdir)
+            log_calls[name] = _log_call_latency(args.sales * 10)
+            _reset_logging()
+
+    baseline = statistics.median(means["disabled"])
+    for name, _ in SCENARIOS:
+        median = statistics.median(means[name])
+        results["scenarios"][name] = {
+            "mean_us_per_sale": round(median, 1),
+            "min_us_per_sale": round(min(means[name]), 1),
+            "max_us_per_sale": round(max(means[name]), 1),
+            "logging_overhead_us": round(median - baseline, 1),
+            "log_call": log_calls[name]
+        }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Row Model Loading Benchmark
+قياس تحميل نماذج البيانات
+
+Loads the whole active catalog three ways: the old path (sqlite3.Row rows
+turned into plain dataclasses with Product(**dict(row))), the slotted
+models built positionally from tuples (get_products) and the columnar
+ProductFrame the products view shows (get_product_frame). Reports wall
+time and the memory the result keeps (tracemalloc) for each. Prints JSON
+results.
+
+Usage: python benchmarks/bench_models.py [--products 200000] [--output results.json]
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import make_dataclass, fields
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from sample_data import generate_dataset
+from src.core.database import DatabaseManager
+from src.core.models import Product
+
+# Product as it was before the slotted models: a plain (dict-backed) dataclass
+DictProduct = make_dataclass("DictProduct", [(f.name, f.type, f.default) for f in fields(Product)])
+
+def _legacy_products(db: DatabaseManager):
+    with db.connect() as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM products WHERE status = 'active' ORDER BY name, id")
+        return [DictProduct(**dict(row)) for row in cursor.fetchall()]
+
+def _measure(func, repeat: int) -> dict:
+    func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+        del result
+
+    tracemalloc.start()
+    result = func()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "rows": len(result),
+        "best_ms": round(min(times) * 1000, 1),
+        "retained_mib": round(retained / 2 ** 20, 1),
+        "peak_mib": round(peak / 2 ** 20, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[3])
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3, help="timed loads per variant")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = {"benchmark": "row_models", "products": args.products, "cases": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "models.db")
+        generate_dataset(path, products=args.products, customers=100, sale_lines=100,
+                         cash_transactions=10, verbose=False)
+        db = DatabaseManager(path)
+
+        cases = [
+            ("legacy_row_dict", lambda: _legacy_products(db)),
+            ("slotted_models", db.get_products),
+            ("product_frame", db.get_product_frame)
+        ]
+        for name, func in cases:
+            results["cases"][name] = _measure(func, args.repeat)
+        db.close()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+
+if __name__ == "__main__":
+    main()
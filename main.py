@@ -9,7 +9,8 @@ Version 2.0
 
 import sys
 import os
-import logging
+import json
+import argparse
 from pathlib import Path
 import customtkinter as ctk
 
@@ -17,17 +18,13 @@ import customtkinter as ctk
 PROJECT_ROOT = Path(__file__).parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+from src.utils.logger import setup_logging, get_logger
+from src.utils.instrumentation import metrics
 
-logger = logging.getLogger(__name__)
+# Configure logging (queue-backed, single rotating file under logs/)
+setup_logging()
+
+logger = get_logger(__name__)
 
 def setup_application():
     """Setup application environment"""
@@ -54,11 +51,47 @@ def setup_application():
         return True
         
     except Exception as e:
-        logger.error(f"Error during application setup: {e}")
+        logger.error("Error during application setup: %s", e)
         return False
 
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Smart Mobile Shop Management System")
+    parser.add_argument(
+        "--metrics-dump",
+        nargs="?",
+        const="-",
+        metavar="PATH",
+        help="print span percentiles on exit, or write them as JSON to PATH"
+    )
+    parser.add_argument(
+        "--profile-sql",
+        nargs="?",
+        const=50.0,
+        type=float,
+        metavar="MS",
+        help="profile SQL statements; log those slower than MS (default 50) to logs/slow_queries.log"
+    )
+    args, _ = parser.parse_known_args()
+    return args
+
+def dump_metrics(target: str):
+    """Write collected metrics to stdout or a JSON file"""
+    try:
+        if target == "-":
+            print(metrics.report())
+        else:
+            Path(target).write_text(
+                json.dumps(metrics.snapshot(), indent=2, ensure_ascii=False),
+                encoding="utf-8"
+            )
+            logger.info("Metrics written to %s", target)
+    except Exception as e:
+        logger.error("Error dumping metrics: %s", e)
+
 def main():
     """Main application entry point"""
+    args = parse_args()
     try:
         logger.info("Starting Smart Mobile Shop Management System v2.0")
         
@@ -70,14 +103,17 @@ def main():
         # Import and start the main application
         from src.app import SmartShopApp
         
-        app = SmartShopApp()
+        app = SmartShopApp(profile_sql_ms=args.profile_sql)
         app.run()
         
         return 0
         
     except Exception as e:
-        logger.error(f"Critical error in main application: {e}")
+        logger.error("Critical error in main application: %s", e)
         return 1
+    finally:
+        if args.metrics_dump:
+            dump_metrics(args.metrics_dump)
 
 if __name__ == "__main__":
     exit_code = main()
@@ -1,228 +1,433 @@
-
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
 Sample Data Generator
 مولد البيانات التجريبية
+
+Deterministic synthetic dataset generator. The schema is created by
+DatabaseManager so generated databases always match the application; rows
+are then bulk loaded with executemany inside a single transaction while
+journaling and fsync are switched off. The same seed, sizes and end date
+always produce the same rows.
+
+Usage:
+    python sample_data.py                       # small demo data in data/database/shop.db
+    python sample_data.py --preset large --db /tmp/large.db
+    python sample_data.py --products 5000 --sale-lines 200000 --seed 7
 """
 
-import sqlite3
+import argparse
 import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+from itertools import count as count_from, islice
 from pathlib import Path
-from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, Optional
 
-def add_sample_data():
-    """Add sample data to the database"""
-    db_path = Path("data/database/shop.db")
-    
-    # Remove existing database to start fresh
-    if db_path.exists():
-        db_path.unlink()
-        print("Removed existing database")
-    
-    # Ensure directory exists
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    with sqlite3.connect(db_path) as conn:
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.core.database import DatabaseManager
+from src.utils.phone import normalize_phone
+
+DEFAULT_DB_PATH = "data/database/shop.db"
+
+# Row counts per dataset size
+PRESETS = {
+    "small": {"products": 200, "customers": 100, "sale_lines": 5_000, "cash_transactions": 2_000},
+    "medium": {"products": 20_000, "customers": 10_000, "sale_lines": 500_000, "cash_transactions": 200_000},
+    "large": {"products": 200_000, "customers": 100_000, "sale_lines": 5_000_000, "cash_transactions": 2_000_000},
+}
+
+BATCH_SIZE = 50_000
+
+BRANDS = {
+    "Apple": ["iPhone 15 Pro", "iPhone 15", "iPhone 14", "iPhone 13", "AirPods Pro", "iPad Air"],
+    "Samsung": ["Galaxy S24 Ultra", "Galaxy S24", "Galaxy A54", "Galaxy A34", "Galaxy Z Flip5", "Galaxy Buds2"],
+    "Huawei": ["P60 Pro", "Nova 11", "Mate 50", "FreeBuds 5"],
+    "Xiaomi": ["Redmi Note 13", "Xiaomi 13T", "Poco X6", "Power Bank 20000mAh"],
+    "OnePlus": ["OnePlus 11", "OnePlus Nord 3"],
+    "Oppo": ["Reno 10", "A78"],
+    "Anker": ["PowerPort 65W", "PowerCore 10000", "USB-C Cable"],
+    "JBL": ["Tune 230NC", "Flip 6", "Go 3"],
+    "Belkin": ["Screen Guard", "BoostCharge"],
+    "OtterBox": ["Defender", "Symmetry"],
+}
+
+# (category, price range, cost ratio)
+CATEGORIES = [
+    ("هواتف ذكية", (1500, 6000), 0.85),
+    ("إكسسوارات", (30, 600), 0.65),
+    ("سماعات", (150, 1500), 0.75),
+    ("شواحن", (50, 400), 0.6),
+    ("قطع غيار", (80, 900), 0.55),
+]
+
+FIRST_NAMES = ["أحمد", "محمد", "فاطمة", "نورا", "خالد", "سارة", "عبدالله", "ليلى", "عمر", "مريم",
+               "يوسف", "هدى", "علي", "منى", "حسن", "ريم", "إبراهيم", "دينا", "مصطفى", "آية"]
+LAST_NAMES = ["العلي", "سالم", "عبدالله", "أحمد", "السعيد", "محمود", "حسين", "إبراهيم", "الشريف", "عثمان"]
+CITIES = ["القاهرة", "الجيزة", "الإسكندرية", "المنصورة", "طنطا", "أسيوط", "الرياض", "جدة"]
+
+PAYMENT_METHODS = ["cash", "card", "bank_transfer", "vodafone_cash", "fawry"]
+PAYMENT_WEIGHTS = [60, 20, 8, 8, 4]
+
+def _batched(rows: Iterable, size: int = BATCH_SIZE) -> Iterator[list]:
+    """Split an iterable of rows into lists of at most size rows"""
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def _bulk_insert(cursor: sqlite3.Cursor, sql: str, rows: Iterable) -> int:
+    """executemany in fixed-size batches so huge generators stay flat in memory"""
+    count = 0
+    for batch in _batched(rows):
+        cursor.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+def _relax_pragmas(conn: sqlite3.Connection):
+    """Trade durability for load speed while the generator owns the file"""
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -262144")  # 256 MB
+    conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+    conn.execute("PRAGMA foreign_keys = OFF")
+
+def _restore_pragmas(conn: sqlite3.Connection):
+    """Back to the defaults the application runs with"""
+    conn.execute("PRAGMA locking_mode = NORMAL")
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.execute("PRAGMA synchronous = FULL")
+
+def _pin_default_timestamps(path: Path, stamp: str):
+    """Replace the CURRENT_TIMESTAMP defaults of seeded rows so reruns are byte-identical"""
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.execute("UPDATE payment_methods SET created_at = ?", (stamp,))
+            conn.execute("UPDATE categories SET created_at = ?", (stamp,))
+            conn.execute("UPDATE stock_snapshots SET taken_at = ?", (stamp,))
+    finally:
+        conn.close()
+
+class DatasetGenerator:
+    """Generates a reproducible dataset of the requested size"""
+
+    def __init__(self, seed: int = 42, end_date: Optional[date] = None, days: int = 365):
+        self.seed = seed
+        self.end_date = end_date or date.today()
+        self.days = max(1, days)
+        self.rng = random.Random(seed)
+
+        # Filled while generating products, reused by the sale generator
+        self._product_prices = []
+        self._product_costs = []
+        self._product_names = []
+        self._customer_names = []
+        self._customer_totals: Dict[int, float] = {}
+        self._daily_cash: Dict[str, list] = {}
+
+    # Products / customers
+    @property
+    def history_start(self) -> str:
+        start = self.end_date - timedelta(days=self.days - 1)
+        return f"{start.isoformat()} 00:00:00"
+
+    @property
+    def history_end(self) -> str:
+        return f"{self.end_date.isoformat()} 23:59:59"
+
+    def products(self, count: int) -> Iterator[tuple]:
+        rng = self.rng
+        created_at = self.history_start
+        brands = list(BRANDS.items())
+        for product_id in range(1, count + 1):
+            brand, models = brands[rng.randrange(len(brands))]
+            model = models[rng.randrange(len(models))]
+            category, (low, high), cost_ratio = CATEGORIES[rng.randrange(len(CATEGORIES))]
+            price = round(rng.uniform(low, high), 2)
+            cost = round(price * cost_ratio, 2)
+            name = f"{brand} {model} #{product_id}"
+            self._product_prices.append(price)
+            self._product_costs.append(cost)
+            self._product_names.append(name)
+            yield (
+                product_id, name, brand, model, price, cost,
+                rng.randint(0, 60), rng.randint(2, 10), category,
+                f"{category} - {brand} {model}", f"BC{self.seed:04d}{product_id:09d}",
+                created_at, created_at
+            )
+
+    def customers(self, count: int) -> Iterator[tuple]:
+        rng = self.rng
+        created_at = self.history_start
+        for customer_id in range(1, count + 1):
+            name = f"{FIRST_NAMES[rng.randrange(len(FIRST_NAMES))]} {LAST_NAMES[rng.randrange(len(LAST_NAMES))]}"
+            self._customer_names.append(name)
+            phone = f"01{rng.choice('0125')}{rng.randrange(10**8):08d}"
+            yield (
+                customer_id, f"C{customer_id:04d}", name, phone, normalize_phone(phone),
+                f"customer{customer_id}@example.com", CITIES[rng.randrange(len(CITIES))], "",
+                created_at, created_at
+            )
+
+    # Sales
+    def _timestamps(self, count: int) -> Iterator[str]:
+        """Ascending timestamps, count of them spread over the date range"""
+        start = datetime.combine(self.end_date - timedelta(days=self.days - 1), datetime.min.time())
+        span_seconds = self.days * 86400 - 1
+        step = span_seconds / max(1, count)
+        rng = self.rng
+        for index in count_from(0):
+            offset = int(index * step + rng.random() * step)
+            yield (start + timedelta(seconds=min(offset, span_seconds))).strftime("%Y-%m-%d %H:%M:%S")
+
+    def sales(self, sale_lines: int, customers: int, tax_rate: float = 0.14):
+        """Yield (sale_row, item_rows) until sale_lines items were produced"""
+        rng = self.rng
+        product_count = len(self._product_prices)
+        if not product_count:
+            return
+
+        # 1-4 lines per sale, 2.5 on average
+        remaining = sale_lines
+        item_id = 0
+        timestamps = self._timestamps(max(1, int(sale_lines / 2.5)))
+
+        for sale_id in count_from(1):
+            if remaining <= 0:
+                break
+            created_at = next(timestamps)
+            lines = min(remaining, rng.randint(1, 4))
+            remaining -= lines
+
+            items = []
+            total = 0.0
+            for _ in range(lines):
+                product_index = rng.randrange(product_count)
+                quantity = 1 if rng.random() < 0.8 else rng.randint(2, 3)
+                unit_price = self._product_prices[product_index]
+                line_total = round(unit_price * quantity, 2)
+                total += line_total
+                item_id += 1
+                items.append((item_id, sale_id, product_index + 1, self._product_names[product_index],
+                              quantity, unit_price, line_total, self._product_costs[product_index]))
+
+            total = round(total, 2)
+            discount = round(total * rng.choice((0, 0, 0, 0.05, 0.1)), 2)
+            tax = round((total - discount) * tax_rate, 2)
+            final = round(total - discount + tax, 2)
+            method = rng.choices(PAYMENT_METHODS, PAYMENT_WEIGHTS)[0]
+
+            customer_id = None
+            customer_name = ""
+            if customers and rng.random() < 0.7:
+                customer_id = rng.randint(1, customers)
+                customer_name = self._customer_names[customer_id - 1]
+                self._customer_totals[customer_id] = self._customer_totals.get(customer_id, 0.0) + final
+
+            yield (sale_id, customer_id, customer_name, total, discount, tax, final, method, "", created_at), items
+
+    # Cash
+    def cash_transactions(self, count: int, sale_count: int) -> Iterator[tuple]:
+        rng = self.rng
+        timestamps = self._timestamps(count)
+        for transaction_id, created_at in zip(range(1, count + 1), timestamps):
+            roll = rng.random()
+            if roll < 0.7:
+                kind, amount = "in", round(rng.uniform(50, 6000), 2)
+                from_method, to_method = None, rng.choices(PAYMENT_METHODS, PAYMENT_WEIGHTS)[0]
+                reference_id = rng.randint(1, sale_count) if sale_count else None
+                reference_type, description = "sale", "دفعة مبيعات"
+            elif roll < 0.9:
+                kind, amount = "out", round(rng.uniform(20, 2000), 2)
+                from_method, to_method = "cash", None
+                reference_id, reference_type, description = None, "expense", "مصروف"
+            else:
+                kind, amount = "transfer", round(rng.uniform(100, 5000), 2)
+                from_method, to_method = rng.sample(PAYMENT_METHODS, 2)
+                reference_id, reference_type, description = None, "transfer", "تحويل"
+
+            day = self._daily_cash.setdefault(created_at[:10], [0.0, 0.0, 0.0, 0.0])
+            if kind == "in":
+                day[0] += amount
+            elif kind == "out":
+                day[1] += amount
+            else:
+                if to_method == "cash":
+                    day[2] += amount
+                if from_method == "cash":
+                    day[3] += amount
+
+            yield (transaction_id, kind, amount, from_method, to_method, description,
+                   reference_id, reference_type, "generator", created_at)
+
+    def daily_cash_summary(self) -> Iterator[tuple]:
+        balance = 0.0
+        for day in sorted(self._daily_cash):
+            cash_in, cash_out, transfer_in, transfer_out = self._daily_cash[day]
+            closing = balance + cash_in - cash_out + transfer_in - transfer_out
+            yield (day, round(balance, 2), round(cash_in, 2), round(cash_out, 2),
+                   round(transfer_in, 2), round(transfer_out, 2), round(closing, 2),
+                   self.history_end, self.history_end)
+            balance = closing
+
+def generate_dataset(db_path: str = DEFAULT_DB_PATH,
+                     products: int = 200,
+                     customers: int = 100,
+                     sale_lines: int = 5_000,
+                     cash_transactions: int = 2_000,
+                     seed: int = 42,
+                     end_date: Optional[date] = None,
+                     days: int = 365,
+                     replace: bool = True,
+                     verbose: bool = True) -> Dict[str, int]:
+    """Create a fresh database at db_path filled with deterministic data"""
+    def say(message):
+        if verbose:
+            print(message)
+
+    path = Path(db_path)
+    if replace and path.exists():
+        path.unlink()
+        say("Removed existing database")
+
+    # Schema comes from the application itself
+    DatabaseManager(str(path)).close()
+
+    generator = DatasetGenerator(seed=seed, end_date=end_date, days=days)
+    counts = {}
+    started = time.perf_counter()
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        _relax_pragmas(conn)
         cursor = conn.cursor()
-        
-        # Create tables
-        print("Creating database tables...")
-        
-        # Products table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            brand TEXT,
-            model TEXT,
-            price REAL NOT NULL DEFAULT 0,
-            cost REAL NOT NULL DEFAULT 0,
-            stock_quantity INTEGER NOT NULL DEFAULT 0,
-            min_stock INTEGER DEFAULT 0,
-            category TEXT,
-            description TEXT,
-            barcode TEXT UNIQUE,
-            image_path TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-
-        # Customers table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS customers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            phone TEXT,
-            email TEXT,
-            address TEXT,
-            notes TEXT,
-            total_purchases REAL DEFAULT 0,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-
-        # Sales table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS sales (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            customer_id INTEGER,
-            customer_name TEXT,
-            total_amount REAL NOT NULL DEFAULT 0,
-            discount REAL DEFAULT 0,
-            tax REAL DEFAULT 0,
-            final_amount REAL NOT NULL DEFAULT 0,
-            payment_method TEXT DEFAULT 'cash',
-            notes TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (customer_id) REFERENCES customers (id)
-        )
-        """)
-
-        # Sale items table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS sale_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            sale_id INTEGER NOT NULL,
-            product_id INTEGER NOT NULL,
-            product_name TEXT NOT NULL,
-            quantity INTEGER NOT NULL,
-            unit_price REAL NOT NULL,
-            total_price REAL NOT NULL,
-            FOREIGN KEY (sale_id) REFERENCES sales (id),
-            FOREIGN KEY (product_id) REFERENCES products (id)
+        cursor.execute("BEGIN")
+
+        step = time.perf_counter()
+        counts["products"] = _bulk_insert(cursor, """
+            INSERT INTO products (id, name, brand, model, price, cost, stock_quantity,
+                                  min_stock, category, description, barcode, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, generator.products(products))
+        say(f"Added {counts['products']:,} products ({time.perf_counter() - step:.1f}s)")
+
+        step = time.perf_counter()
+        counts["customers"] = _bulk_insert(cursor, """
+            INSERT INTO customers (id, customer_code, name, phone, phone_normalized, email, address, notes,
+                                   created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, generator.customers(customers))
+        say(f"Added {counts['customers']:,} customers ({time.perf_counter() - step:.1f}s)")
+
+        step = time.perf_counter()
+        sale_sql = """
+            INSERT INTO sales (id, customer_id, customer_name, total_amount, discount, tax,
+                               final_amount, payment_method, notes, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        item_sql = """
+            INSERT INTO sale_items (id, sale_id, product_id, product_name, quantity, unit_price,
+                                    total_price, unit_cost)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        sale_rows, item_rows = [], []
+        counts["sales"] = counts["sale_items"] = 0
+        for sale, items in generator.sales(sale_lines, customers):
+            sale_rows.append(sale)
+            item_rows.extend(items)
+            if len(item_rows) >= BATCH_SIZE:
+                cursor.executemany(sale_sql, sale_rows)
+                cursor.executemany(item_sql, item_rows)
+                counts["sales"] += len(sale_rows)
+                counts["sale_items"] += len(item_rows)
+                sale_rows, item_rows = [], []
+        if sale_rows:
+            cursor.executemany(sale_sql, sale_rows)
+            cursor.executemany(item_sql, item_rows)
+            counts["sales"] += len(sale_rows)
+            counts["sale_items"] += len(item_rows)
+
+        cursor.executemany(
+            "UPDATE customers SET total_purchases = ? WHERE id = ?",
+            ((round(total, 2), customer_id) for customer_id, total in generator._customer_totals.items())
         )
-        """)
-
-        print("Tables created successfully")
-        
-        # Sample products
-        print("Adding sample products...")
-        products = [
-            ("iPhone 15 Pro", "Apple", "15 Pro", 4500.0, 4000.0, 15, 5, "هواتف ذكية", "هاتف أيفون 15 برو", "IP15PRO001"),
-            ("Galaxy S24 Ultra", "Samsung", "S24 Ultra", 4200.0, 3700.0, 12, 3, "هواتف ذكية", "هاتف جالكسي إس 24 ألترا", "GS24ULT001"),
-            ("iPhone 14", "Apple", "14", 3200.0, 2800.0, 20, 5, "هواتف ذكية", "هاتف أيفون 14", "IP14001"),
-            ("Galaxy A54", "Samsung", "A54", 1800.0, 1500.0, 25, 5, "هواتف ذكية", "هاتف جالكسي أي 54", "GA54001"),
-            ("شاحن سريع", "Anker", "PowerPort", 150.0, 100.0, 50, 10, "إكسسوارات", "شاحن سريع 65 واط", "ANK001"),
-            ("سماعات AirPods", "Apple", "Pro 2", 1200.0, 1000.0, 8, 3, "إكسسوارات", "سماعات أيربودز برو 2", "APR2001"),
-            ("كفر حماية", "OtterBox", "Defender", 200.0, 120.0, 30, 10, "إكسسوارات", "كفر حماية قوي", "OTB001"),
-            ("شاشة حماية", "Belkin", "Screen Guard", 80.0, 50.0, 100, 20, "إكسسوارات", "شاشة حماية زجاجية", "BLK001"),
-            ("باور بانك", "Xiaomi", "20000mAh", 180.0, 140.0, 35, 8, "إكسسوارات", "بطارية محمولة 20000 مللي أمبير", "XMI001"),
-            ("سماعات لاسلكية", "JBL", "Tune 230NC", 350.0, 280.0, 22, 5, "إكسسوارات", "سماعات لاسلكية مع إلغاء الضوضاء", "JBL001"),
-            ("Huawei P60 Pro", "Huawei", "P60 Pro", 3800.0, 3300.0, 10, 3, "هواتف ذكية", "هاتف هواوي بي 60 برو", "HWP60001"),
-            ("OnePlus 11", "OnePlus", "11", 2900.0, 2500.0, 18, 4, "هواتف ذكية", "هاتف ون بلس 11", "OP11001")
-        ]
-        
-        for product in products:
-            try:
-                cursor.execute("""
-                INSERT INTO products (name, brand, model, price, cost, stock_quantity, min_stock, category, description, barcode)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, product)
-            except sqlite3.IntegrityError:
-                pass  # Product already exists
-        
-        print(f"Added {len(products)} products")
-        
-        # Sample customers
-        print("Adding sample customers...")
-        customers = [
-            ("أحمد محمد العلي", "0501234567", "ahmed@email.com", "الرياض، حي النخيل", "عميل مميز"),
-            ("فاطمة سالم", "0509876543", "fatima@email.com", "جدة، حي الصفا", ""),
-            ("محمد عبدالله", "0551234567", "mohammed@email.com", "الدمام، حي الشاطئ", "يفضل التوصيل"),
-            ("نورا أحمد", "0558765432", "nora@email.com", "الطائف، حي السلامة", ""),
-            ("خالد السعيد", "0561234567", "khalid@email.com", "المدينة المنورة", "عميل منذ سنتين"),
-            ("سارة محمد", "0571234567", "sara@email.com", "أبها، حي المنصور", "تفضل الدفع الإلكتروني"),
-            ("عبدالعزيز أحمد", "0581234567", "abdulaziz@email.com", "القصيم، بريدة", ""),
-            ("ليلى عبدالله", "0591234567", "layla@email.com", "الخبر، حي الراكة", "عميلة جديدة")
-        ]
-        
-        for customer in customers:
-            try:
-                cursor.execute("""
-                INSERT INTO customers (name, phone, email, address, notes)
-                VALUES (?, ?, ?, ?, ?)
-                """, customer)
-            except:
-                pass
-        
-        print(f"Added {len(customers)} customers")
-        
-        # Sample sales (recent)
-        print("Adding sample sales...")
-        cursor.execute("SELECT id, name, price FROM products")
-        products_data = cursor.fetchall()
-        
-        cursor.execute("SELECT id, name FROM customers")
-        customers_data = cursor.fetchall()
-        
-        # Create some sales for today and past few days
-        total_sales = 0
-        for day_offset in range(7):  # Last 7 days
-            sale_date = datetime.now() - timedelta(days=day_offset)
-            daily_sales = random.randint(2, 8)  # 2-8 sales per day
-            
-            for _ in range(daily_sales):
-                if products_data and customers_data:
-                    customer = random.choice(customers_data)
-                    
-                    # Create sale
-                    total_amount = 0
-                    sale_items = []
-                    
-                    # Add 1-4 items to each sale
-                    num_items = random.randint(1, 4)
-                    selected_products = random.sample(products_data, min(num_items, len(products_data)))
-                    
-                    for product in selected_products:
-                        quantity = random.randint(1, 3)
-                        unit_price = product[2]
-                        item_total = unit_price * quantity
-                        total_amount += item_total
-                        sale_items.append((product[0], product[1], quantity, unit_price, item_total))
-                    
-                    discount = random.randint(0, int(total_amount * 0.1))  # Up to 10% discount
-                    tax = (total_amount - discount) * 0.15  # 15% tax
-                    final_amount = total_amount - discount + tax
-                    
-                    payment_methods = ['cash', 'card', 'transfer']
-                    payment_method = random.choice(payment_methods)
-                    
-                    # Insert sale
-                    cursor.execute("""
-                    INSERT INTO sales (customer_id, customer_name, total_amount, discount, tax, final_amount, payment_method, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (customer[0], customer[1], total_amount, discount, tax, final_amount, payment_method, sale_date.strftime('%Y-%m-%d %H:%M:%S')))
-                    
-                    sale_id = cursor.lastrowid
-                    total_sales += 1
-                    
-                    # Insert sale items
-                    for product_id, product_name, quantity, unit_price, item_total in sale_items:
-                        cursor.execute("""
-                        INSERT INTO sale_items (sale_id, product_id, product_name, quantity, unit_price, total_price)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                        """, (sale_id, product_id, product_name, quantity, unit_price, item_total))
-                        
-                        # Update product stock
-                        cursor.execute("""
-                        UPDATE products SET stock_quantity = stock_quantity - ?
-                        WHERE id = ?
-                        """, (quantity, product_id))
-                    
-                    # Update customer total purchases
-                    cursor.execute("""
-                    UPDATE customers SET total_purchases = total_purchases + ?
-                    WHERE id = ?
-                    """, (final_amount, customer[0]))
-        
-        print(f"Added {total_sales} sales with items")
-        
-        conn.commit()
-        print("Sample data added successfully!")
-        print(f"Database location: {db_path.absolute()}")
+        say(f"Added {counts['sales']:,} sales with {counts['sale_items']:,} lines "
+            f"({time.perf_counter() - step:.1f}s)")
+
+        step = time.perf_counter()
+        counts["cash_transactions"] = _bulk_insert(cursor, """
+            INSERT INTO cash_transactions (id, transaction_type, amount, from_method, to_method,
+                                           description, reference_id, reference_type, created_by, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, generator.cash_transactions(cash_transactions, counts["sales"]))
+        counts["daily_cash_summary"] = _bulk_insert(cursor, """
+            INSERT INTO daily_cash_summary (date, opening_balance, total_cash_in, total_cash_out,
+                                            total_transfers_in, total_transfers_out, closing_balance,
+                                            created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, generator.daily_cash_summary())
+        say(f"Added {counts['cash_transactions']:,} cash transactions ({time.perf_counter() - step:.1f}s)")
+
+        cursor.execute("COMMIT")
+        cursor.execute("ANALYZE")
+        _restore_pragmas(conn)
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    # Rows were loaded around checkout, so derived tables are built afterwards
+    step = time.perf_counter()
+    db_manager = DatabaseManager(str(path))
+    db_manager.rebuild_customer_stats()
+    db_manager.rebuild_product_daily_sales()
+    db_manager.rebuild_stock_ledger()
+    db_manager.close()
+    _pin_default_timestamps(path, generator.history_end)
+    say(f"Built customer stats, daily product sales and stock ledger ({time.perf_counter() - step:.1f}s)")
+
+    say(f"Dataset generated in {time.perf_counter() - started:.1f}s: {path.absolute()}")
+    return counts
+
+def add_sample_data():
+    """Add sample data to the database"""
+    generate_dataset(DEFAULT_DB_PATH, **PRESETS["small"])
+    print("Sample data added successfully!")
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic dataset")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="database file to (re)create")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--products", type=int)
+    parser.add_argument("--customers", type=int)
+    parser.add_argument("--sale-lines", type=int)
+    parser.add_argument("--cash-transactions", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=365, help="history length ending at --end-date")
+    parser.add_argument("--end-date", type=date.fromisoformat,
+                        help="last day of generated history (default: today); fix it for identical files")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = dict(PRESETS[args.preset])
+    for key in sizes:
+        value = getattr(args, key)
+        if value is not None:
+            sizes[key] = value
+
+    generate_dataset(args.db, seed=args.seed, end_date=args.end_date, days=args.days, **sizes)
 
 if __name__ == "__main__":
-    add_sample_data()
+    main()
@@ -9,24 +9,34 @@ Main Application Class
 import customtkinter as ctk
 from tkinter import messagebox
 import sys
+import threading
 from pathlib import Path
+from typing import Optional
 
 from src.core.database import DatabaseManager
+from src.core.receipts import PrintSpooler, ReceiptRenderer
+from src.core.report_engine import ReportEngine
 from src.core.settings import SettingsManager
+from src.core.stock_alerts import StockAlertEngine
 from src.core.theme import ThemeManager
 from src.ui.main_window import MainWindow
-from src.utils.logger import get_logger
+from src.utils.logger import get_logger, configure_from_settings
+from src.utils.instrumentation import metrics
 
 logger = get_logger(__name__)
 
 class SmartShopApp:
     """Main application class"""
     
-    def __init__(self):
+    def __init__(self, profile_sql_ms: Optional[float] = None):
         """Initialize the application"""
+        self.profile_sql_ms = profile_sql_ms
         self.db_manager = None
         self.settings_manager = None
         self.theme_manager = None
+        self.print_spooler = None
+        self.report_engine = None
+        self.stock_alerts = None
         self.main_window = None
         
         self._initialize_core_components()
@@ -36,18 +46,35 @@ class SmartShopApp:
         try:
             # Initialize settings manager
             self.settings_manager = SettingsManager()
+            configure_from_settings(self.settings_manager)
+            metrics.configure_from_settings(self.settings_manager)
             logger.info("Settings manager initialized")
             
             # Initialize database manager
-            self.db_manager = DatabaseManager()
+            if self.profile_sql_ms is not None:
+                self.db_manager = DatabaseManager(profile_queries=True, slow_query_ms=self.profile_sql_ms)
+            else:
+                self.db_manager = DatabaseManager()
             logger.info("Database manager initialized")
             
+            # Periodic stock snapshot keeps point-in-time inventory queries short
+            threading.Thread(target=self.db_manager.take_stock_snapshot_if_due, daemon=True).start()
+            
             # Initialize theme manager
             self.theme_manager = ThemeManager(self.settings_manager)
             logger.info("Theme manager initialized")
             
+            # Receipt printing runs on its own worker thread
+            self.print_spooler = PrintSpooler(ReceiptRenderer(self.settings_manager))
+            
+            # Reports are built on a worker and cached until the data changes
+            self.report_engine = ReportEngine(self.db_manager, self.settings_manager)
+            
+            # Low-stock alerts follow the stock changes of committed writes
+            self.stock_alerts = StockAlertEngine(self.db_manager, self.settings_manager)
+            
         except Exception as e:
-            logger.error(f"Error initializing core components: {e}")
+            logger.error("Error initializing core components: %s", e)
             raise
     
     def run(self):
@@ -57,14 +84,17 @@ class SmartShopApp:
             self.main_window = MainWindow(
                 db_manager=self.db_manager,
                 settings_manager=self.settings_manager,
-                theme_manager=self.theme_manager
+                theme_manager=self.theme_manager,
+                print_spooler=self.print_spooler,
+                report_engine=self.report_engine,
+                stock_alerts=self.stock_alerts
             )
             
             logger.info("Application started successfully")
             self.main_window.mainloop()
             
         except Exception as e:
-            logger.error(f"Error running application: {e}")
+            logger.error("Error running application: %s", e)
             messagebox.showerror(
                 "خطأ في التطبيق",
                 f"حدث خطأ في تشغيل التطبيق:\n{e}"
@@ -75,8 +105,17 @@ class SmartShopApp:
     def _cleanup(self):
         """Cleanup resources before closing"""
         try:
+            if self.settings_manager:
+                self.settings_manager.flush()
+            if self.print_spooler:
+                # Let queued receipts finish printing
+                self.print_spooler.stop()
+            if self.stock_alerts:
+                self.stock_alerts.close()
             if self.db_manager:
+                if self.db_manager.profiler is not None:
+                    logger.info("SQL profile:\n%s", self.db_manager.profiler.report())
                 self.db_manager.close()
             logger.info("Application cleanup completed")
         except Exception as e:
-            logger.error(f"Error during cleanup: {e}")
+            logger.error("Error during cleanup: %s", e)
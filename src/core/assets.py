@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Asset Cache
+ذاكرة الصور والأيقونات
+
+Icons and product images are decoded once and handed out as CTkImage
+objects kept in an LRU per (source, size). Product images are reduced to
+thumbnails on a worker thread and stored in data/images/.thumbs under the
+hash of the source file's content, so later runs load the small file only.
+Workers only decode; CTkImage objects are created on the Tk thread, and
+product images are keyed by the file's mtime so a replaced file is reloaded.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import customtkinter as ctk
+from PIL import Image, ImageOps
+
+from src.utils.logger import get_logger
+from src.utils.instrumentation import metrics
+
+logger = get_logger(__name__)
+
+Size = Tuple[int, int]
+
+class _LRU:
+    """Small thread-safe LRU mapping"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+class AssetCache:
+    """Decoded image and CTkImage cache with an on-disk thumbnail store"""
+
+    def __init__(self,
+                 icons_dir: str = "assets/icons",
+                 thumbs_dir: str = "data/images/.thumbs",
+                 max_images: int = 512,
+                 max_sources: int = 128,
+                 workers: int = 2):
+        self.icons_dir = Path(icons_dir)
+        self.thumbs_dir = Path(thumbs_dir)
+
+        self._images = _LRU(max_images)       # (path, size) or (path, mtime, size) -> CTkImage
+        self._thumbnails = _LRU(max_images)   # (path, mtime, size) -> decoded PIL thumbnail
+        self._sources = _LRU(max_sources)     # (path, mtime) -> decoded PIL image
+        self._placeholders: Dict[Size, ctk.CTkImage] = {}
+        self._pending: Dict[Tuple[str, int, Size], list] = {}
+        self._pending_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbs")
+
+    # Helpers
+    def placeholder(self, size: Size) -> ctk.CTkImage:
+        """Transparent image of the given size"""
+        image = self._placeholders.get(size)
+        if image is None:
+            blank = Image.new("RGBA", size, (0, 0, 0, 0))
+            image = ctk.CTkImage(light_image=blank, dark_image=blank, size=size)
+            self._placeholders[size] = image
+        return image
+
+    def _decode(self, path: Path) -> Optional[Image.Image]:
+        """Decode a source file once per modification time"""
+        try:
+            key = (str(path), path.stat().st_mtime_ns)
+        except OSError:
+            return None
+
+        image = self._sources.get(key)
+        if image is None:
+            with metrics.span("assets.decode"):
+                with Image.open(path) as opened:
+                    image = ImageOps.exif_transpose(opened)
+                    image.load()
+            self._sources.put(key, image)
+        return image
+
+    # Icons
+    def icon(self, name: str, size: Size = (24, 24)) -> ctk.CTkImage:
+        """CTkImage for assets/icons/<name> at size (transparent if missing)"""
+        path = self.icons_dir / name
+        key = (str(path), size)
+
+        image = self._images.get(key)
+        if image is not None:
+            return image
+
+        try:
+            source = self._decode(path)
+        except Exception as e:
+            logger.warning("Could not load icon %s: %s", name, e)
+            source = None
+
+        if source is None:
+            return self.placeholder(size)
+
+        image = ctk.CTkImage(light_image=source, dark_image=source, size=size)
+        self._images.put(key, image)
+        return image
+
+    # Product images
+    def _thumb_path(self, source: Path, size: Size) -> Path:
+        digest = hashlib.sha1(source.read_bytes()).hexdigest()
+        return self.thumbs_dir / f"{digest}_{size[0]}x{size[1]}.png"
+
+    def _make_thumbnail(self, source: Path, size: Size) -> Image.Image:
+        """Load the cached thumbnail or render and store it (worker thread)"""
+        thumb_path = self._thumb_path(source, size)
+        if thumb_path.exists():
+            with Image.open(thumb_path) as cached:
+                cached.load()
+                return cached.copy()
+
+        with metrics.span("assets.thumbnail"):
+            with Image.open(source) as opened:
+                # JPEG decoders can downscale while decoding
+                opened.draft("RGB", size)
+                image = ImageOps.exif_transpose(opened).convert("RGBA")
+            image.thumbnail(size, Image.LANCZOS)
+
+            self.thumbs_dir.mkdir(parents=True, exist_ok=True)
+            temp_path = thumb_path.with_suffix(".tmp")
+            image.save(temp_path, "PNG")
+            temp_path.replace(thumb_path)
+        return image
+
+    def product_image(self, image_path: str, size: Size,
+                      on_ready: Optional[Callable[[ctk.CTkImage], None]] = None,
+                      widget=None) -> ctk.CTkImage:
+        """Thumbnail for a product image (Tk thread)
+
+        Returns the cached CTkImage when available. Otherwise a placeholder is
+        returned and the thumbnail is decoded on a worker thread; the CTkImage
+        is then built on the Tk thread through widget.after and handed to
+        on_ready. Without a widget the thumbnail is only cached for the next call.
+        """
+        if not image_path:
+            return self.placeholder(size)
+
+        source = Path(image_path)
+        try:
+            key = (str(source), source.stat().st_mtime_ns, size)
+        except OSError:
+            return self.placeholder(size)
+
+        image = self._tk_image(key)
+        if image is not None:
+            return image
+
+        waiter = (on_ready, widget) if on_ready and widget is not None else None
+        with self._pending_lock:
+            waiters = self._pending.get(key)
+            if waiters is not None:
+                # Already being generated; just add the callback
+                if waiter:
+                    waiters.append(waiter)
+                return self.placeholder(size)
+            self._pending[key] = [waiter] if waiter else []
+
+        self._executor.submit(self._load_product_image, source, size, key)
+        return self.placeholder(size)
+
+    def _tk_image(self, key) -> Optional[ctk.CTkImage]:
+        """CTkImage for a decoded thumbnail, built on first use (Tk thread)"""
+        image = self._images.get(key)
+        if image is None:
+            thumbnail = self._thumbnails.get(key)
+            if thumbnail is None:
+                return None
+            image = ctk.CTkImage(light_image=thumbnail, dark_image=thumbnail, size=thumbnail.size)
+            self._images.put(key, image)
+        return image
+
+    def _load_product_image(self, source: Path, size: Size, key):
+        """Decode the thumbnail and schedule the waiters on the Tk thread (worker thread)"""
+        try:
+            self._thumbnails.put(key, self._make_thumbnail(source, size))
+            ready = True
+        except Exception as e:
+            logger.warning("Could not create thumbnail for %s: %s", source, e)
+            ready = False
+
+        with self._pending_lock:
+            waiters = self._pending.pop(key, [])
+
+        if not ready:
+            return
+
+        for on_ready, widget in waiters:
+            try:
+                widget.after(0, self._deliver, key, on_ready)
+            except Exception as e:
+                logger.warning("Thumbnail callback failed: %s", e)
+
+    def _deliver(self, key, on_ready: Callable[[ctk.CTkImage], None]):
+        image = self._tk_image(key)
+        if image is not None:
+            on_ready(image)
+
+    def clear(self):
+        """Drop all in-memory images (the disk cache is kept)"""
+        self._images.clear()
+        self._thumbnails.clear()
+        self._sources.clear()
+
+# Process-wide cache
+asset_cache = AssetCache()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shopping Cart
+سلة التسوق
+
+Cart lines keyed by product id, with running sums so that adding,
+changing or removing a line costs the same for a 3-line and a 100-line
+cart. Totals come from the pricing engine. Listeners are told which line
+changed so views can redraw just it.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional
+
+from src.core.pricing import PricingEngine, PricedItem, CartPrice, ZERO, to_decimal
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Cart events passed to listeners
+LINE_ADDED = "added"
+LINE_UPDATED = "updated"
+LINE_REMOVED = "removed"
+CART_CLEARED = "cleared"
+TOTALS_CHANGED = "totals"
+
+@dataclass
+class CartLine:
+    """One product in the cart"""
+    product_id: int
+    name: str
+    unit_price: Decimal
+    quantity: int = 1
+    stock: Optional[int] = None
+    category: str = ""
+    net: Decimal = ZERO  # after line discounts, maintained by Cart
+
+    @property
+    def total(self) -> Decimal:
+        return self.unit_price * self.quantity
+
+    def priced_item(self) -> PricedItem:
+        return PricedItem(self.product_id, self.unit_price, self.quantity, self.category)
+
+# Callback signature: (event, line) - line is None for cart-wide events
+CartListener = Callable[[str, Optional[CartLine]], None]
+
+class Cart:
+    """Cart model with running totals and change events"""
+
+    def __init__(self, pricing: Optional[PricingEngine] = None, discount_percent=None):
+        self.pricing = pricing or PricingEngine()
+        self._lines: "OrderedDict[int, CartLine]" = OrderedDict()
+        self._gross = ZERO
+        self._net_by_category: Dict[str, Decimal] = {}
+        self._item_count = 0
+        # None means the engine's default discount
+        self.discount_percent = discount_percent
+        self._listeners: List[CartListener] = []
+
+    # Events
+    def subscribe(self, listener: CartListener):
+        """Register a callback for cart changes"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: CartListener):
+        """Remove a previously registered callback"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, event: str, line: Optional[CartLine] = None):
+        for listener in list(self._listeners):
+            try:
+                listener(event, line)
+            except Exception as e:
+                logger.error("Error in cart listener: %s", e)
+
+    # Lines
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __iter__(self) -> Iterator[CartLine]:
+        return iter(self._lines.values())
+
+    def __contains__(self, product_id: int) -> bool:
+        return product_id in self._lines
+
+    def get(self, product_id: int) -> Optional[CartLine]:
+        return self._lines.get(product_id)
+
+    @property
+    def lines(self) -> List[CartLine]:
+        return list(self._lines.values())
+
+    def _account(self, line: CartLine, sign: int):
+        """Add (sign=1) or remove (sign=-1) a line's share of the running sums"""
+        if sign > 0:
+            line.net = self.pricing.line_net(line.priced_item())
+        self._gross += sign * line.total
+        self._item_count += sign * line.quantity
+        self._net_by_category[line.category] = self._net_by_category.get(line.category, ZERO) + sign * line.net
+
+    def add(self, product_id: int, name: str, unit_price,
+            quantity: int = 1, stock: Optional[int] = None, category: str = "") -> CartLine:
+        """Add a product, or raise the quantity of its existing line"""
+        line = self._lines.get(product_id)
+        if line is not None:
+            self.set_quantity(product_id, line.quantity + quantity)
+            return line
+
+        line = CartLine(product_id, name, to_decimal(unit_price), quantity, stock, category or "")
+        self._lines[product_id] = line
+        self._account(line, 1)
+        self._notify(LINE_ADDED, line)
+        self._notify(TOTALS_CHANGED)
+        return line
+
+    def set_quantity(self, product_id: int, quantity: int) -> bool:
+        """Change a line's quantity; zero or less removes the line"""
+        line = self._lines.get(product_id)
+        if line is None:
+            return False
+        if quantity <= 0:
+            return self.remove(product_id)
+        if quantity == line.quantity:
+            return True
+
+        self._account(line, -1)
+        line.quantity = quantity
+        self._account(line, 1)
+        self._notify(LINE_UPDATED, line)
+        self._notify(TOTALS_CHANGED)
+        return True
+
+    def increment(self, product_id: int, amount: int = 1) -> bool:
+        line = self._lines.get(product_id)
+        return line is not None and self.set_quantity(product_id, line.quantity + amount)
+
+    def decrement(self, product_id: int, amount: int = 1) -> bool:
+        """Lower a line's quantity, keeping at least one"""
+        line = self._lines.get(product_id)
+        if line is None or line.quantity - amount < 1:
+            return False
+        return self.set_quantity(product_id, line.quantity - amount)
+
+    def remove(self, product_id: int) -> bool:
+        line = self._lines.pop(product_id, None)
+        if line is None:
+            return False
+
+        self._account(line, -1)
+        self._notify(LINE_REMOVED, line)
+        self._notify(TOTALS_CHANGED)
+        return True
+
+    def clear(self):
+        self._lines.clear()
+        self._gross = ZERO
+        self._net_by_category.clear()
+        self._item_count = 0
+        self._notify(CART_CLEARED)
+        self._notify(TOTALS_CHANGED)
+
+    # Totals
+    def set_discount_percent(self, discount_percent):
+        if discount_percent != self.discount_percent:
+            self.discount_percent = discount_percent
+            self._notify(TOTALS_CHANGED)
+
+    def set_pricing(self, pricing: PricingEngine):
+        """Switch pricing rules (e.g. after a settings change) and re-derive line nets"""
+        self.pricing = pricing
+        self._gross = ZERO
+        self._net_by_category.clear()
+        self._item_count = 0
+        for line in self._lines.values():
+            self._account(line, 1)
+        self._notify(TOTALS_CHANGED)
+
+    @property
+    def item_count(self) -> int:
+        return self._item_count
+
+    def totals(self) -> Dict[str, Decimal]:
+        """Subtotal, discount, tax and total from the running sums"""
+        return self.pricing.price_summary(self._gross, self._net_by_category, self.discount_percent)
+
+    @property
+    def total(self) -> Decimal:
+        return self.totals()["total"]
+
+    def price(self) -> CartPrice:
+        """Per-line pricing of the whole cart (receipts, saving the sale)"""
+        return self.pricing.price_items((line.priced_item() for line in self), self.discount_percent)
@@ -12,10 +12,11 @@ from dataclasses import dataclass
 import sqlite3
 
 from src.utils.logger import get_logger
+from src.core.models import map_rows, select_list
 
 logger = get_logger(__name__)
 
-@dataclass
+@dataclass(slots=True)
 class CashTransaction:
     """Cash transaction data model"""
     id: Optional[int] = None
@@ -29,7 +30,7 @@ class CashTransaction:
     created_by: str = ""
     created_at: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class DailyCashSummary:
     """Daily cash summary data model"""
     id: Optional[int] = None
@@ -79,11 +80,11 @@ class CashManager:
             # Update daily summary
             self._update_daily_summary(date.today().isoformat())
             
-            logger.info(f"Cash transaction added: {transaction.transaction_type} - {transaction.amount}")
+            logger.info("Cash transaction added: %s - %s", transaction.transaction_type, transaction.amount)
             return True
             
         except Exception as e:
-            logger.error(f"Error adding cash transaction: {e}")
+            logger.error("Error adding cash transaction: %s", e)
             self.db_manager.connection.rollback()
             return False
 
@@ -154,7 +155,7 @@ class CashManager:
             return total_in - total_out
             
         except Exception as e:
-            logger.error(f"Error getting cash balance: {e}")
+            logger.error("Error getting cash balance: %s", e)
             return 0.0
 
     def get_daily_transactions(self, target_date: str = None) -> List[CashTransaction]:
@@ -164,34 +165,17 @@ class CashManager:
                 target_date = date.today().isoformat()
             
             cursor = self.db_manager.connection.cursor()
-            cursor.execute('''
-                SELECT id, transaction_type, amount, from_method, to_method, 
-                       description, reference_id, reference_type, created_by, created_at
+            cursor.execute(f'''
+                SELECT {select_list(CashTransaction)}
                 FROM cash_transactions 
                 WHERE DATE(created_at) = ?
                 ORDER BY created_at DESC
             ''', (target_date,))
             
-            transactions = []
-            for row in cursor.fetchall():
-                transaction = CashTransaction(
-                    id=row[0],
-                    transaction_type=row[1],
-                    amount=row[2],
-                    from_method=row[3],
-                    to_method=row[4],
-                    description=row[5],
-                    reference_id=row[6],
-                    reference_type=row[7],
-                    created_by=row[8],
-                    created_at=row[9]
-                )
-                transactions.append(transaction)
-            
-            return transactions
+            return map_rows(CashTransaction, cursor)
             
         except Exception as e:
-            logger.error(f"Error getting daily transactions: {e}")
+            logger.error("Error getting daily transactions: %s", e)
             return []
 
     def get_payment_method_summary(self) -> Dict[str, float]:
@@ -208,7 +192,7 @@ class CashManager:
             return summary
             
         except Exception as e:
-            logger.error(f"Error getting payment method summary: {e}")
+            logger.error("Error getting payment method summary: %s", e)
             return {}
 
     def _update_daily_summary(self, target_date: str):
@@ -260,7 +244,7 @@ class CashManager:
             self.db_manager.connection.commit()
             
         except Exception as e:
-            logger.error(f"Error updating daily summary: {e}")
+            logger.error("Error updating daily summary: %s", e)
             self.db_manager.connection.rollback()
 
     def get_cash_flow_report(self, start_date: str, end_date: str) -> Dict:
@@ -306,5 +290,5 @@ class CashManager:
             return report
             
         except Exception as e:
-            logger.error(f"Error getting cash flow report: {e}")
+            logger.error("Error getting cash flow report: %s", e)
             return {}
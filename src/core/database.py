@@ -7,87 +7,157 @@ Database Manager
 
 import sqlite3
 import json
+import threading
 from pathlib import Path
 from datetime import datetime, date
-from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass, asdict
+from typing import Callable, List, Dict, Any, Iterator, Optional, Tuple
 import uuid
 
 from src.utils.logger import get_logger
+from src.utils.phone import normalize_phone
+from src.utils.instrumentation import metrics
+from src.core.query_profiler import QueryProfiler, ProfilingConnection
+from src.core.models import (
+    Product, Category, Customer, Sale, SaleItem, StockChange, StockMovement, ProductFrame, map_row, map_rows,
+    PRODUCT_COLUMNS, CATEGORY_COLUMNS, CUSTOMER_COLUMNS, SALE_COLUMNS, SALE_ITEM_COLUMNS, STOCK_MOVEMENT_COLUMNS
+)
 
 logger = get_logger(__name__)
 
-@dataclass
-class Product:
-    """Product data model"""
-    id: Optional[int] = None
-    name: str = ""
-    brand: str = ""
-    model: str = ""
-    price: float = 0.0
-    cost: float = 0.0
-    stock_quantity: int = 0
-    min_stock: int = 0
-    category: str = ""
-    description: str = ""
-    barcode: str = ""
-    image_path: str = ""
-    created_at: Optional[str] = None
-    updated_at: Optional[str] = None
-
-@dataclass
-class Customer:
-    """Customer data model"""
-    id: Optional[int] = None
-    name: str = ""
-    phone: str = ""
-    email: str = ""
-    address: str = ""
-    notes: str = ""
-    total_purchases: float = 0.0
-    created_at: Optional[str] = None
-    updated_at: Optional[str] = None
-
-@dataclass
-class Sale:
-    """Sale data model"""
-    id: Optional[int] = None
-    customer_id: Optional[int] = None
-    customer_name: str = ""
-    total_amount: float = 0.0
-    discount: float = 0.0
-    tax: float = 0.0
-    final_amount: float = 0.0
-    payment_method: str = "cash"
-    notes: str = ""
-    created_at: Optional[str] = None
-
-@dataclass
-class SaleItem:
-    """Sale item data model"""
-    id: Optional[int] = None
-    sale_id: int = 0
-    product_id: int = 0
-    product_name: str = ""
-    quantity: int = 0
-    unit_price: float = 0.0
-    total_price: float = 0.0
+# Matches idx_products_low_stock; queries must use it verbatim for the index to apply
+LOW_STOCK_FILTER = "stock_quantity <= min_stock AND status = 'active'"
+
+# Stock movement types (stock_movements.movement_type)
+MOVEMENT_OPENING = "opening"
+MOVEMENT_SALE = "sale"
+MOVEMENT_PURCHASE = "purchase"
+MOVEMENT_RETURN = "return"
+MOVEMENT_ADJUSTMENT = "adjustment"
+
+# Days between the stock snapshots point-in-time queries start from
+SNAPSHOT_INTERVAL_DAYS = 7
+
+# Callback signature: (changes) for the products a committed write restocked or sold from
+StockListener = Callable[[List[StockChange]], None]
 
 class DatabaseManager:
     """Database manager for SQLite operations"""
 
-    def __init__(self, db_path: str = "data/database/shop.db"):
+    def __init__(self, db_path: str = "data/database/shop.db",
+                 profile_queries: bool = False,
+                 slow_query_ms: float = 50.0):
         """Initialize database manager"""
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
 
+        self.profiler: Optional[QueryProfiler] = None
+        self._connection: Optional[sqlite3.Connection] = None
+        self._stock_listeners: List[StockListener] = []
+        self._listeners_lock = threading.Lock()
+        if profile_queries:
+            self.enable_profiling(slow_query_ms)
+
         self._init_database()
-        logger.info(f"Database initialized: {self.db_path}")
+        logger.info("Database initialized: %s", self.db_path)
+
+    def connect(self, **kwargs) -> sqlite3.Connection:
+        """Open a connection with statement counting (and profiling) installed"""
+        profiler = self.profiler
+        if profiler is not None:
+            conn = sqlite3.connect(self.db_path, factory=ProfilingConnection, **kwargs)
+            conn.profiler = profiler
+            conn.set_trace_callback(profiler.trace)
+            return conn
+
+        conn = sqlite3.connect(self.db_path, **kwargs)
+        if metrics.enabled:
+            conn.set_trace_callback(metrics.count_query)
+        return conn
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Long-lived shared connection (CashManager, dashboard charts)"""
+        if self._connection is None:
+            self._connection = self.connect(check_same_thread=False)
+        return self._connection
+
+    def close(self):
+        """Close the shared connection"""
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception as e:
+                logger.error("Error closing database connection: %s", e)
+            self._connection = None
+
+    def data_version(self) -> Tuple[int, int]:
+        """Token that changes whenever anything is committed to the database
+
+        PRAGMA data_version on the shared connection moves with commits made
+        through other connections; total_changes covers the shared one.
+        """
+        try:
+            conn = self.connection
+            return conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes
+        except Exception as e:
+            logger.error("Error reading data version: %s", e)
+            return -1, -1
+
+    def enable_profiling(self, slow_query_ms: float = 50.0,
+                         slow_log_path: str = "logs/slow_queries.log"):
+        """Profile statements on connections opened from now on"""
+        if self.profiler is None:
+            self.profiler = QueryProfiler(slow_query_ms, slow_log_path)
+        else:
+            self.profiler.slow_query_ms = slow_query_ms
+        logger.info("SQL profiling enabled (slow query threshold %.1f ms)", slow_query_ms)
+
+    def disable_profiling(self):
+        """Stop profiling new connections; collected stats are discarded"""
+        self.profiler = None
+
+    def query_stats(self, sort_by: str = "total_ms", limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Per-statement stats (count, total/mean/max ms, rows), empty when profiling is off"""
+        if self.profiler is None:
+            return []
+        return self.profiler.stats(sort_by, limit)
+
+    def reset_query_stats(self):
+        """Clear collected query statistics"""
+        if self.profiler is not None:
+            self.profiler.reset()
+
+    # Stock change notifications
+    def subscribe_stock(self, listener: StockListener):
+        """Register a callback for committed stock changes"""
+        with self._listeners_lock:
+            if listener not in self._stock_listeners:
+                self._stock_listeners.append(listener)
+
+    def unsubscribe_stock(self, listener: StockListener):
+        """Remove a previously registered callback"""
+        with self._listeners_lock:
+            if listener in self._stock_listeners:
+                self._stock_listeners.remove(listener)
+
+    def notify_stock(self, changes: List[StockChange]):
+        """Tell listeners about stock changes (called after the commit, on the writing thread)"""
+        if not changes:
+            return
+
+        with self._listeners_lock:
+            listeners = list(self._stock_listeners)
+
+        for listener in listeners:
+            try:
+                listener(changes)
+            except Exception as e:
+                logger.error("Error in stock listener: %s", e)
 
     def _init_database(self):
         """Initialize database tables"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connect() as conn:
                 cursor = conn.cursor()
 
                 # Products table
@@ -193,7 +263,7 @@ class DatabaseManager:
                 # Expenses table - المصروفات
                 cursor.execute("""
                 CREATE TABLE IF NOT EXISTS expenses (
-                    id INTEGER PRIMARYKEY AUTOINCREMENT,
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
                     category TEXT NOT NULL,
                     description TEXT NOT NULL,
                     amount REAL NOT NULL,
@@ -239,161 +309,801 @@ class DatabaseManager:
                         VALUES (?, ?, ?, ?, ?)
                     """, method)
 
+                # Indexes for the POS catalog filters and name ordering
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_name ON products(name, id)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_category ON products(category, name)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_brand ON products(brand, name)")
+
+                # Indexes for date-range reports
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_created_at ON sales(created_at)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_sale_items_sale ON sale_items(sale_id)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_created_at ON expenses(created_at)")
+
+                self._migrate(cursor)
+
+                # Customer purchase history, newest first
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_customer ON sales(customer_id, created_at)")
 
                 conn.commit()
                 logger.info("Database tables created successfully")
 
         except Exception as e:
-            logger.error(f"Error initializing database: {e}")
+            logger.error("Error initializing database: %s", e)
             raise
 
+    @staticmethod
+    def _has_table(cursor, table: str) -> bool:
+        return cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone() is not None
+
+    def _add_missing_columns(self, cursor, table: str, columns: List[Tuple[str, str]]) -> List[str]:
+        """ALTER TABLE ADD COLUMN for each (name, definition) the table lacks"""
+        existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        added = []
+        for name, definition in columns:
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+                added.append(name)
+        if added:
+            logger.info("Added columns to %s: %s", table, ", ".join(added))
+        return added
+
+    def _migrate(self, cursor):
+        """Bring tables created by older versions up to the current schema"""
+        # Returns are sales rows with negative amounts that point at the sale they reverse
+        self._add_missing_columns(cursor, "sales", [("return_of", "INTEGER REFERENCES sales (id)")])
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_return_of ON sales(return_of) WHERE return_of IS NOT NULL")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cash_transactions_reference ON cash_transactions(reference_type, reference_id)")
+
+        # Sale lines keep the cost they were sold at; purchases re-average products.cost.
+        # Older lines get the current cost, the best value left for them
+        if self._add_missing_columns(cursor, "sale_items", [("unit_cost", "REAL")]):
+            cursor.execute("""
+            UPDATE sale_items SET unit_cost = (SELECT cost FROM products WHERE products.id = sale_items.product_id)
+            """)
+
+        added = self._add_missing_columns(cursor, "customers", [
+            ("customer_code", "TEXT"),
+            ("city", "TEXT"),
+            ("loyalty_points", "INTEGER DEFAULT 0"),
+            ("status", "TEXT DEFAULT 'active'")
+        ])
+        if "customer_code" in added:
+            cursor.execute("UPDATE customers SET customer_code = printf('C%04d', id) WHERE customer_code IS NULL")
+
+        # Categories are a table of their own; products.category keeps the
+        # name for display, filters and per-category tax
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            description TEXT,
+            status TEXT DEFAULT 'active',
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        self._add_missing_columns(cursor, "products", [
+            ("category_id", "INTEGER REFERENCES categories (id)"),
+            ("status", "TEXT DEFAULT 'active'")
+        ])
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_category_id ON products(category_id, name)")
+        self._link_product_categories(cursor)
+
+        # Per-customer totals kept up to date by checkout; built from sales once
+        stats_missing = not self._has_table(cursor, "customer_stats")
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS customer_stats (
+            customer_id INTEGER PRIMARY KEY,
+            visit_count INTEGER NOT NULL DEFAULT 0,
+            item_count INTEGER NOT NULL DEFAULT 0,
+            total_spent REAL NOT NULL DEFAULT 0,    -- final amounts, tax included
+            net_revenue REAL NOT NULL DEFAULT 0,    -- after discount, before tax
+            total_cost REAL NOT NULL DEFAULT 0,
+            first_purchase TEXT,
+            last_purchase TEXT,
+            FOREIGN KEY (customer_id) REFERENCES customers (id)
+        )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_customer_stats_spent ON customer_stats(total_spent)")
+        if stats_missing:
+            self._rebuild_customer_stats(cursor)
+
+        # Only the few products at or below their reorder level are indexed
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_products_low_stock ON products(stock_quantity) WHERE {LOW_STOCK_FILTER}")
+
+        # Units sold per product and day, kept up to date by checkout
+        daily_missing = not self._has_table(cursor, "product_daily_sales")
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS product_daily_sales (
+            product_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (product_id, day),
+            FOREIGN KEY (product_id) REFERENCES products (id)
+        ) WITHOUT ROWID
+        """)
+        if daily_missing:
+            self._rebuild_product_daily_sales(cursor)
+
+        # Every stock change as a signed movement, plus snapshots of the
+        # stock to start point-in-time queries from
+        ledger_missing = not self._has_table(cursor, "stock_movements")
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            movement_type TEXT NOT NULL, -- 'opening', 'sale', 'purchase', 'return', 'adjustment'
+            quantity INTEGER NOT NULL,   -- signed: + into stock, - out of stock
+            reference_id INTEGER,        -- sale, goods receipt or return id
+            note TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (product_id) REFERENCES products (id)
+        )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_product ON stock_movements(product_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_created_at ON stock_movements(created_at)")
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            taken_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            last_movement_id INTEGER NOT NULL -- movements up to this id are included
+        )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_snapshots_taken_at ON stock_snapshots(taken_at)")
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock_snapshot_items (
+            snapshot_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            PRIMARY KEY (snapshot_id, product_id),
+            FOREIGN KEY (snapshot_id) REFERENCES stock_snapshots (id)
+        ) WITHOUT ROWID
+        """)
+        if ledger_missing:
+            self._rebuild_stock_ledger(cursor)
+
+        # Purchasing: suppliers, purchase orders and goods receipts (see src/core/purchasing.py)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS suppliers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            phone TEXT,
+            email TEXT,
+            address TEXT,
+            notes TEXT,
+            status TEXT DEFAULT 'active',
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS purchase_orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            supplier_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'ordered', -- 'ordered', 'partial', 'received', 'cancelled'
+            total_cost REAL NOT NULL DEFAULT 0,
+            expected_date TEXT,
+            notes TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (supplier_id) REFERENCES suppliers (id)
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS purchase_order_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_cost REAL NOT NULL,
+            received_quantity INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (order_id) REFERENCES purchase_orders (id),
+            FOREIGN KEY (product_id) REFERENCES products (id)
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS goods_receipts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            supplier_id INTEGER NOT NULL,
+            order_id INTEGER,
+            reference TEXT,           -- supplier invoice / delivery note number
+            total_cost REAL NOT NULL DEFAULT 0,
+            line_count INTEGER NOT NULL DEFAULT 0,
+            notes TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (supplier_id) REFERENCES suppliers (id),
+            FOREIGN KEY (order_id) REFERENCES purchase_orders (id)
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS goods_receipt_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            receipt_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_cost REAL NOT NULL,
+            FOREIGN KEY (receipt_id) REFERENCES goods_receipts (id),
+            FOREIGN KEY (product_id) REFERENCES products (id)
+        )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_purchase_orders_supplier ON purchase_orders(supplier_id, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_purchase_orders_status ON purchase_orders(status, created_at)")
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_purchase_order_items_product ON purchase_order_items(order_id, product_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_goods_receipts_created_at ON goods_receipts(created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_goods_receipt_items_receipt ON goods_receipt_items(receipt_id)")
+
+        # Expenses post into cash_transactions (see src/core/expenses.py) and
+        # are summed per day and category for the financial report
+        self._repair_expenses_table(cursor)
+        self._add_missing_columns(cursor, "expenses", [
+            ("updated_at", "TEXT"),
+            ("cash_transaction_id", "INTEGER REFERENCES cash_transactions (id)")
+        ])
+        expense_daily_missing = not self._has_table(cursor, "expense_daily")
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS expense_daily (
+            day TEXT NOT NULL,
+            category TEXT NOT NULL,
+            amount REAL NOT NULL DEFAULT 0,
+            entries INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, category)
+        ) WITHOUT ROWID
+        """)
+        if expense_daily_missing:
+            self._rebuild_expense_daily(cursor)
+
+        # Phone lookups go through the normalized form (see src/utils/phone.py)
+        self._add_missing_columns(cursor, "customers", [("phone_normalized", "TEXT")])
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers(phone_normalized)")
+        self._normalize_customer_phones(cursor)
+
+    def _repair_expenses_table(self, cursor):
+        """Rebuild an expenses table whose id is not a rowid alias (no stable keys)"""
+        columns = {row[1]: (row[2].upper(), row[5]) for row in cursor.execute("PRAGMA table_info(expenses)")}
+        if columns.get("id") == ("INTEGER", 1):
+            return
+
+        # Old ids are kept when they were usable keys, otherwise rows are renumbered
+        count, distinct = cursor.execute("SELECT COUNT(*), COUNT(DISTINCT id) FROM expenses").fetchone()
+        keep_ids = count == distinct and not cursor.execute(
+            "SELECT 1 FROM expenses WHERE typeof(id) != 'integer'"
+        ).fetchone()
+        copied = [name for name in columns if name != "id"]
+
+        cursor.execute("ALTER TABLE expenses RENAME TO expenses_old")
+        cursor.execute("""
+        CREATE TABLE expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            description TEXT NOT NULL,
+            amount REAL NOT NULL,
+            payment_method TEXT DEFAULT 'cash',
+            supplier TEXT,
+            invoice_number TEXT,
+            notes TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        current = {row[1] for row in cursor.execute("PRAGMA table_info(expenses)")}
+        copied = [name for name in copied if name in current]
+        if keep_ids:
+            copied.insert(0, "id")
+        column_list = ", ".join(copied)
+        cursor.execute(f"INSERT INTO expenses ({column_list}) SELECT {column_list} FROM expenses_old ORDER BY rowid")
+        cursor.execute("DROP TABLE expenses_old")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_created_at ON expenses(created_at)")
+        logger.info("Rebuilt expenses table with an integer primary key (%d rows)", count)
+
+    def _link_product_categories(self, cursor):
+        """Create and link categories for products that only have a category name"""
+        cursor.execute("""
+        INSERT OR IGNORE INTO categories (name)
+        SELECT DISTINCT category FROM products
+        WHERE category_id IS NULL AND category IS NOT NULL AND category != ''
+        """)
+        cursor.execute("""
+        UPDATE products SET category_id = (SELECT id FROM categories WHERE categories.name = products.category)
+        WHERE category_id IS NULL AND category IS NOT NULL AND category != ''
+        """)
+        if cursor.rowcount > 0:
+            logger.info("Linked %d products to categories", cursor.rowcount)
+
+    def _normalize_customer_phones(self, cursor, batch_size: int = 5000):
+        """Fill phone_normalized for rows written without it (read through the index)"""
+        updated = 0
+        while True:
+            rows = cursor.execute("""
+            SELECT id, phone FROM customers WHERE phone_normalized IS NULL LIMIT ?
+            """, (batch_size,)).fetchall()
+            if not rows:
+                break
+            cursor.executemany("UPDATE customers SET phone_normalized = ? WHERE id = ?",
+                               [(normalize_phone(phone or ""), customer_id) for customer_id, phone in rows])
+            updated += len(rows)
+        if updated:
+            logger.info("Normalized %d customer phone numbers", updated)
+
     # Product operations
     def add_product(self, product: Product) -> bool:
         """Add new product"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connect() as conn:
                 cursor = conn.cursor()
 
+                category_id, category = self._resolve_category(cursor, product)
+
                 cursor.execute("""
                 INSERT INTO products (name, brand, model, price, cost, stock_quantity, 
-                                    min_stock, category, description, barcode, image_path)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                    min_stock, category, category_id, description, barcode,
+                                    image_path, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (product.name, product.brand, product.model, product.price,
                       product.cost, product.stock_quantity, product.min_stock,
-                      product.category, product.description, product.barcode,
-                      product.image_path))
+                      category, category_id, product.description, product.barcode or None,
+                      product.image_path, product.status))
+
+                if product.stock_quantity:
+                    self.record_movements(cursor, [(cursor.lastrowid, MOVEMENT_OPENING, product.stock_quantity, None, "")])
 
                 conn.commit()
-                logger.info(f"Product added: {product.name}")
+                logger.info("Product added: %s", product.name)
                 return True
 
         except sqlite3.IntegrityError as e:
-            logger.error(f"Product with barcode {product.barcode} already exists")
+            logger.error("Product with barcode %s already exists", product.barcode)
             return False
         except Exception as e:
-            logger.error(f"Error adding product: {e}")
+            logger.error("Error adding product: %s", e)
             return False
 
     def get_all_products(self) -> List[Product]:
         """Get all products"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.connect() as conn:
                 cursor = conn.cursor()
 
-                cursor.execute("SELECT * FROM products ORDER BY name")
-                rows = cursor.fetchall()
-
-                return [Product(**dict(row)) for row in rows]
+                cursor.execute(f"SELECT {PRODUCT_COLUMNS} FROM products ORDER BY name")
+                return map_rows(Product, cursor)
 
         except Exception as e:
-            logger.error(f"Error getting products: {e}")
+            logger.error("Error getting products: %s", e)
             return []
 
     def update_product(self, product: Product) -> bool:
         """Update product"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connect() as conn:
                 cursor = conn.cursor()
 
+                category_id, category = self._resolve_category(cursor, product)
+                before = cursor.execute("SELECT stock_quantity, min_stock, status FROM products WHERE id = ?",
+                                        (product.id,)).fetchone()
+
                 cursor.execute("""
                 UPDATE products SET name=?, brand=?, model=?, price=?, cost=?,
-                                  stock_quantity=?, min_stock=?, category=?,
-                                  description=?, barcode=?, image_path=?,
+                                  stock_quantity=?, min_stock=?, category=?, category_id=?,
+                                  description=?, barcode=?, image_path=?, status=?,
                                   updated_at=CURRENT_TIMESTAMP
                 WHERE id=?
                 """, (product.name, product.brand, product.model, product.price,
                       product.cost, product.stock_quantity, product.min_stock,
-                      product.category, product.description, product.barcode,
-                      product.image_path, product.id))
+                      category, category_id, product.description, product.barcode or None,
+                      product.image_path, product.status, product.id))
+
+                if before is not None and before[0] != product.stock_quantity:
+                    self.record_movements(cursor, [(product.id, MOVEMENT_ADJUSTMENT,
+                                                     product.stock_quantity - before[0], None, "تعديل المنتج")])
 
                 conn.commit()
-                logger.info(f"Product updated: {product.name}")
-                return cursor.rowcount > 0
+                logger.info("Product updated: %s", product.name)
+
+            if before is None:
+                return False
+            if before != (product.stock_quantity, product.min_stock, product.status):
+                self.notify_stock([StockChange(product.id, product.name, before[0], product.stock_quantity,
+                                                before[1] or 0, product.min_stock or 0, before[2], product.status)])
+            return True
 
         except Exception as e:
-            logger.error(f"Error updating product: {e}")
+            logger.error("Error updating product: %s", e)
             return False
 
     def delete_product(self, product_id: int) -> bool:
         """Delete product"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connect() as conn:
                 cursor = conn.cursor()
 
                 cursor.execute("DELETE FROM products WHERE id=?", (product_id,))
                 conn.commit()
 
-                logger.info(f"Product deleted: {product_id}")
+                logger.info("Product deleted: %s", product_id)
                 return cursor.rowcount > 0
 
         except Exception as e:
-            logger.error(f"Error deleting product: {e}")
+            logger.error("Error deleting product: %s", e)
             return False
 
     def search_products(self, search_term: str) -> List[Product]:
         """Search products by name, brand, or model"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.connect() as conn:
                 cursor = conn.cursor()
 
                 search_pattern = f"%{search_term}%"
-                cursor.execute("""
-                SELECT * FROM products 
+                cursor.execute(f"""
+                SELECT {PRODUCT_COLUMNS} FROM products
                 WHERE name LIKE ? OR brand LIKE ? OR model LIKE ?
                 ORDER BY name
                 """, (search_pattern, search_pattern, search_pattern))
 
-                rows = cursor.fetchall()
-                return [Product(**dict(row)) for row in rows]
+                return map_rows(Product, cursor)
+
+        except Exception as e:
+            logger.error("Error searching products: %s", e)
+            return []
+
+    @staticmethod
+    def _product_filter(search_term: str = "", category: Optional[str] = None,
+                        brand: Optional[str] = None, category_id: Optional[int] = None,
+                        status: Optional[str] = None) -> Tuple[str, List[Any]]:
+        """WHERE clause and parameters shared by the catalog queries"""
+        clauses, params = [], []
+        if category_id is not None:
+            clauses.append("category_id = ?")
+            params.append(category_id)
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if brand:
+            clauses.append("brand = ?")
+            params.append(brand)
+        if search_term:
+            pattern = f"%{search_term}%"
+            clauses.append("(name LIKE ? OR brand LIKE ? OR model LIKE ? OR barcode = ?)")
+            params.extend([pattern, pattern, pattern, search_term])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def count_products(self, search_term: str = "", category: Optional[str] = None,
+                       brand: Optional[str] = None, status: Optional[str] = "active") -> int:
+        """Number of products matching the catalog filters"""
+        try:
+            where, params = self._product_filter(search_term, category, brand, status=status)
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT COUNT(*) FROM products {where}", params)
+                return cursor.fetchone()[0]
+
+        except Exception as e:
+            logger.error("Error counting products: %s", e)
+            return 0
+
+    @metrics.timed("db.get_products_page")
+    def get_products_page(self, after: Optional[Tuple[str, int]], limit: int, search_term: str = "",
+                          category: Optional[str] = None, brand: Optional[str] = None,
+                          status: Optional[str] = "active") -> List[Product]:
+        """One page of the filtered catalog ordered by name
+
+        Keyset paging: after is the (name, id) of the previous page's last row
+        (None for the first page), so a page costs the same wherever it is.
+        """
+        try:
+            where, params = self._product_filter(search_term, category, brand, status=status)
+            if after is not None:
+                where = f"{where} AND (name, id) > (?, ?)" if where else "WHERE (name, id) > (?, ?)"
+                params.extend(after)
+            with self.connect() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute(f"""
+                SELECT {PRODUCT_COLUMNS} FROM products {where}
+                ORDER BY name, id
+                LIMIT ?
+                """, params + [limit])
+
+                return map_rows(Product, cursor)
+
+        except Exception as e:
+            logger.error("Error getting products page: %s", e)
+            return []
+
+    @metrics.timed("db.get_products")
+    def get_products(self, search_term: str = "", category_id: Optional[int] = None,
+                     status: Optional[str] = "active") -> List[Product]:
+        """Products matching the filters, by name; a category is read from its index"""
+        try:
+            where, params = self._product_filter(search_term, category_id=category_id, status=status)
+            with self.connect() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute(f"SELECT {PRODUCT_COLUMNS} FROM products {where} ORDER BY name, id", params)
+                return map_rows(Product, cursor)
+
+        except Exception as e:
+            logger.error("Error getting products: %s", e)
+            return []
+
+    @metrics.timed("db.get_product_frame")
+    def get_product_frame(self, search_term: str = "", category_id: Optional[int] = None,
+                          status: Optional[str] = "active") -> ProductFrame:
+        """The list columns of get_products, as a ProductFrame"""
+        try:
+            where, params = self._product_filter(search_term, category_id=category_id, status=status)
+            with self.connect() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute(f"SELECT {ProductFrame.COLUMNS} FROM products {where} ORDER BY name, id", params)
+                return ProductFrame.from_cursor(cursor)
+
+        except Exception as e:
+            logger.error("Error getting product frame: %s", e)
+            return ProductFrame()
+
+    def get_product(self, product_id: int) -> Optional[Product]:
+        """Get one product by id"""
+        try:
+            with self.connect() as conn:
+                cursor = conn.execute(f"SELECT {PRODUCT_COLUMNS} FROM products WHERE id = ?", (product_id,))
+                return map_row(Product, cursor)
+
+        except Exception as e:
+            logger.error("Error getting product %s: %s", product_id, e)
+            return None
+
+    def get_product_by_barcode(self, barcode: str) -> Optional[Product]:
+        """Product with the given barcode"""
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute(f"SELECT {PRODUCT_COLUMNS} FROM products WHERE barcode = ?", (barcode,))
+                return map_row(Product, cursor)
+
+        except Exception as e:
+            logger.error("Error getting product by barcode: %s", e)
+            return None
+
+    def get_product_categories(self) -> List[str]:
+        """Names of the active categories"""
+        return [category.name for category in self.get_categories()]
+
+    def get_product_brands(self) -> List[str]:
+        """Distinct product brands"""
+        rows = self.execute_query("""
+        SELECT DISTINCT brand FROM products
+        WHERE brand IS NOT NULL AND brand != ''
+        ORDER BY brand
+        """)
+        return [row[0] for row in rows]
+
+    # Category operations
+    def _resolve_category(self, cursor, product: Product) -> Tuple[Optional[int], str]:
+        """(category_id, name) for a product, creating the category for a new name"""
+        if product.category:
+            cursor.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (product.category,))
+            row = cursor.execute("SELECT id FROM categories WHERE name = ?", (product.category,)).fetchone()
+            return row[0], product.category
+        if product.category_id is not None:
+            row = cursor.execute("SELECT name FROM categories WHERE id = ?", (product.category_id,)).fetchone()
+            if row:
+                return product.category_id, row[0]
+        return None, ""
+
+    def get_categories(self, status: Optional[str] = "active") -> List[Category]:
+        """Categories with the given status (all when None), by name"""
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+
+                if status is None:
+                    cursor.execute(f"SELECT {CATEGORY_COLUMNS} FROM categories ORDER BY name")
+                else:
+                    cursor.execute(f"SELECT {CATEGORY_COLUMNS} FROM categories WHERE status = ? ORDER BY name",
+                                   (status,))
+
+                return map_rows(Category, cursor)
 
         except Exception as e:
-            logger.error(f"Error searching products: {e}")
+            logger.error("Error getting categories: %s", e)
             return []
 
+    def add_category(self, name: str, description: str = "") -> Optional[int]:
+        """Add a category; returns its id (also when it already existed)"""
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute("INSERT OR IGNORE INTO categories (name, description) VALUES (?, ?)",
+                               (name, description))
+                row = cursor.execute("SELECT id FROM categories WHERE name = ?", (name,)).fetchone()
+                conn.commit()
+                return row[0]
+
+        except Exception as e:
+            logger.error("Error adding category: %s", e)
+            return None
+
     # Customer operations
     def add_customer(self, customer: Customer) -> bool:
         """Add new customer"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connect() as conn:
                 cursor = conn.cursor()
 
                 cursor.execute("""
-                INSERT INTO customers (name, phone, email, address, notes)
-                VALUES (?, ?, ?, ?, ?)
-                """, (customer.name, customer.phone, customer.email,
-                      customer.address, customer.notes))
+                INSERT INTO customers (name, phone, phone_normalized, email, address, notes, city, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (customer.name, customer.phone, normalize_phone(customer.phone), customer.email,
+                      customer.address, customer.notes, customer.city, customer.status))
+
+                cursor.execute("""
+                UPDATE customers SET customer_code = printf('C%04d', id)
+                WHERE id = ? AND customer_code IS NULL
+                """, (cursor.lastrowid,))
 
                 conn.commit()
-                logger.info(f"Customer added: {customer.name}")
+                logger.info("Customer added: %s", customer.name)
                 return True
 
         except Exception as e:
-            logger.error(f"Error adding customer: {e}")
+            logger.error("Error adding customer: %s", e)
             return False
 
     def get_all_customers(self) -> List[Customer]:
         """Get all customers"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.connect() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute(f"SELECT {CUSTOMER_COLUMNS} FROM customers ORDER BY name")
+                return map_rows(Customer, cursor)
+
+        except Exception as e:
+            logger.error("Error getting customers: %s", e)
+            return []
+
+    def get_customers(self, status: Optional[str] = "active") -> List[Customer]:
+        """Customers with the given status (all when None), by name"""
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+
+                if status is None:
+                    cursor.execute(f"SELECT {CUSTOMER_COLUMNS} FROM customers ORDER BY name")
+                else:
+                    cursor.execute(f"SELECT {CUSTOMER_COLUMNS} FROM customers WHERE status = ? ORDER BY name",
+                                   (status,))
+
+                return map_rows(Customer, cursor)
+
+        except Exception as e:
+            logger.error("Error getting customers: %s", e)
+            return []
+
+    def get_customer(self, customer_id: int) -> Optional[Customer]:
+        """Get one customer by id"""
+        try:
+            with self.connect() as conn:
+                cursor = conn.execute(f"SELECT {CUSTOMER_COLUMNS} FROM customers WHERE id = ?", (customer_id,))
+                return map_row(Customer, cursor)
+
+        except Exception as e:
+            logger.error("Error getting customer %s: %s", customer_id, e)
+            return None
+
+    @metrics.timed("db.search_customers_by_phone")
+    def search_customers_by_phone(self, phone_prefix: str, limit: int = 20) -> List[Customer]:
+        """Active customers whose phone starts with the (partly typed) number"""
+        prefix = normalize_phone(phone_prefix)
+        if not prefix:
+            return []
+        try:
+            with self.connect() as conn:
                 cursor = conn.cursor()
 
-                cursor.execute("SELECT * FROM customers ORDER BY name")
-                rows = cursor.fetchall()
+                # Range scan on idx_customers_phone; ':' sorts right after '9'
+                cursor.execute(f"""
+                SELECT {CUSTOMER_COLUMNS} FROM customers
+                WHERE phone_normalized >= ? AND phone_normalized < ? AND status = 'active'
+                ORDER BY phone_normalized
+                LIMIT ?
+                """, (prefix, prefix + ":", limit))
+
+                return map_rows(Customer, cursor)
+
+        except Exception as e:
+            logger.error("Error searching customers by phone: %s", e)
+            return []
+
+    def find_customer_by_phone(self, phone: str) -> Optional[Customer]:
+        """Active customer with exactly this phone number, in any notation"""
+        normalized = normalize_phone(phone)
+        if not normalized:
+            return None
+        for customer in self.search_customers_by_phone(phone, limit=2):
+            if customer.phone_normalized == normalized:
+                return customer
+        return None
+
+    @metrics.timed("db.get_customer_summary")
+    def get_customer_summary(self, customer_id: int) -> Dict[str, Any]:
+        """Visits, spending, basket and margin of a customer from customer_stats"""
+        rows = self.execute_query("""
+        SELECT visit_count, item_count, total_spent, net_revenue, total_cost, first_purchase, last_purchase
+        FROM customer_stats
+        WHERE customer_id = ?
+        """, (customer_id,))
+        visits, items, spent, revenue, cost, first, last = rows[0] if rows else (0, 0, 0, 0, 0, None, None)
+        return {
+            'invoice_count': visits,
+            'item_count': items,
+            'total_spent': spent,
+            'average_basket': spent / visits if visits else 0,
+            'margin': revenue - cost,
+            'first_purchase': first,
+            'last_purchase': last
+        }
+
+    @metrics.timed("db.get_customer_history")
+    def get_customer_history(self, customer_id: int, limit: int = 50,
+                             before: Optional[Tuple[str, int]] = None) -> List[Tuple[Sale, List[SaleItem]]]:
+        """One page of a customer's sales with their items, newest first
+
+        before is the (created_at, id) of the last sale of the previous page;
+        pages are read from idx_sales_customer, so any page costs the same.
+        """
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
 
-                return [Customer(**dict(row)) for row in rows]
+                if before is None:
+                    cursor.execute(f"""
+                    SELECT {SALE_COLUMNS} FROM sales
+                    WHERE customer_id = ?
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT ?
+                    """, (customer_id, limit))
+                else:
+                    cursor.execute(f"""
+                    SELECT {SALE_COLUMNS} FROM sales
+                    WHERE customer_id = ? AND (created_at, id) < (?, ?)
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT ?
+                    """, (customer_id, before[0], before[1], limit))
+
+                sales = map_rows(Sale, cursor)
+                if not sales:
+                    return []
+
+                # Items of the whole page in one query
+                items: Dict[int, List[SaleItem]] = {sale.id: [] for sale in sales}
+                placeholders = ",".join("?" * len(sales))
+                cursor.execute(f"""
+                SELECT {SALE_ITEM_COLUMNS} FROM sale_items
+                WHERE sale_id IN ({placeholders})
+                ORDER BY sale_id, id
+                """, tuple(items))
+                for item in map_rows(SaleItem, cursor):
+                    items[item.sale_id].append(item)
+
+                return [(sale, items[sale.id]) for sale in sales]
 
         except Exception as e:
-            logger.error(f"Error getting customers: {e}")
+            logger.error("Error getting history of customer %s: %s", customer_id, e)
             return []
 
     # Sales operations
+    @metrics.timed("db.create_sale")
     def create_sale(self, sale: Sale, items: List[SaleItem]) -> Optional[int]:
         """Create new sale with items"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connect() as conn:
                 cursor = conn.cursor()
 
                 # Insert sale
@@ -406,73 +1116,681 @@ class DatabaseManager:
                       sale.payment_method, sale.notes))
 
                 sale_id = cursor.lastrowid
+                stock_changes = []
 
                 # Insert sale items and update stock
                 for item in items:
                     cursor.execute("""
                     INSERT INTO sale_items (sale_id, product_id, product_name,
-                                          quantity, unit_price, total_price)
-                    VALUES (?, ?, ?, ?, ?, ?)
+                                          quantity, unit_price, total_price, unit_cost)
+                    VALUES (?, ?, ?, ?, ?, ?, (SELECT cost FROM products WHERE id = ?))
                     """, (sale_id, item.product_id, item.product_name,
-                          item.quantity, item.unit_price, item.total_price))
+                          item.quantity, item.unit_price, item.total_price, item.product_id))
 
-                    # Update product stock
-                    cursor.execute("""
+                    # Update product stock; the new level comes back with the write
+                    row = cursor.execute("""
                     UPDATE products SET stock_quantity = stock_quantity - ?
                     WHERE id = ?
-                    """, (item.quantity, item.product_id))
+                    RETURNING name, stock_quantity, COALESCE(min_stock, 0), status
+                    """, (item.quantity, item.product_id)).fetchone()
+                    if row:
+                        name, stock, min_stock, status = row
+                        stock_changes.append(StockChange(item.product_id, name, stock + item.quantity,
+                                                         stock, min_stock, min_stock, status, status))
+
+                    self._add_product_daily_sales(cursor, item.product_id, item.quantity, item.total_price)
+
+                self.record_movements(cursor, [(item.product_id, MOVEMENT_SALE, -item.quantity, sale_id, "")
+                                                for item in items])
 
-                # Update customer total purchases
+                # Update customer total purchases and stats
                 if sale.customer_id:
                     cursor.execute("""
                     UPDATE customers SET total_purchases = total_purchases + ?
                     WHERE id = ?
                     """, (sale.final_amount, sale.customer_id))
 
+                    cost = cursor.execute("""
+                    SELECT COALESCE(SUM(quantity * unit_cost), 0) FROM sale_items WHERE sale_id = ?
+                    """, (sale_id,)).fetchone()[0]
+                    purchased_at = cursor.execute("SELECT created_at FROM sales WHERE id = ?", (sale_id,)).fetchone()[0]
+
+                    self._add_customer_stats(
+                        cursor, sale.customer_id,
+                        visits=1,
+                        items=sum(item.quantity for item in items),
+                        spent=sale.final_amount,
+                        revenue=sale.total_amount - sale.discount,
+                        cost=cost,
+                        purchased_at=purchased_at
+                    )
+
+                # The payment enters the cash ledger with the sale
+                self.post_cash(cursor, "in", sale.final_amount, sale.payment_method,
+                               f"Payment for sale #{sale_id}", sale_id, "sale", "system")
+
+                conn.commit()
+                logger.info("Sale created: %s", sale_id)
+
+            self.notify_stock(stock_changes)
+            return sale_id
+
+        except Exception as e:
+            logger.error("Error creating sale: %s", e)
+            return None
+
+    # Returns
+    def _returnable_items(self, cursor, sale_id: int) -> Dict[int, SaleItem]:
+        """product_id -> what is left to return of a sale (quantity, value, average price and cost)"""
+        cursor.execute("""
+        SELECT si.product_id, MIN(si.product_name), SUM(si.quantity), SUM(si.total_price),
+               SUM(si.quantity * si.unit_cost)
+        FROM sales s
+        JOIN sale_items si ON si.sale_id = s.id
+        WHERE s.id = ? OR s.return_of = ?
+        GROUP BY si.product_id
+        HAVING SUM(si.quantity) > 0
+        """, (sale_id, sale_id))
+        return {
+            product_id: SaleItem(None, sale_id, product_id, name, quantity, total / quantity, total,
+                                 cost / quantity if cost is not None else None)
+            for product_id, name, quantity, total, cost in cursor
+        }
+
+    def get_sale(self, sale_id: int) -> Optional[Sale]:
+        """Get one sale (or return) by id"""
+        try:
+            with self.connect() as conn:
+                return map_row(Sale, conn.execute(f"SELECT {SALE_COLUMNS} FROM sales WHERE id = ?", (sale_id,)))
+
+        except Exception as e:
+            logger.error("Error getting sale %s: %s", sale_id, e)
+            return None
+
+    def get_returnable_items(self, sale_id: int) -> List[SaleItem]:
+        """Items of a sale not returned yet, at the average price they were sold at"""
+        try:
+            with self.connect() as conn:
+                return list(self._returnable_items(conn.cursor(), sale_id).values())
+
+        except Exception as e:
+            logger.error("Error getting returnable items of sale %s: %s", sale_id, e)
+            return []
+
+    @metrics.timed("db.create_return")
+    def create_return(self, sale_id: int, items: List[SaleItem], refund_method: Optional[str] = None,
+                      reason: str = "", restock: bool = True) -> Optional[int]:
+        """Return items of a sale and refund them; returns the id of the return
+
+        items give the product_id and quantity returned; prices come from the
+        sale. The return is a sales row with negative amounts and return_of
+        set, with reversing sale_items, so sums over sales net it out. Stock
+        (unless restock is False), the stock ledger, the refund in the cash
+        ledger and every running total move by delta in one transaction.
+        """
+        try:
+            returned: Dict[int, int] = {}
+            for item in items:
+                if item.quantity <= 0:
+                    raise ValueError(f"Returned quantity must be positive: {item.quantity}")
+                returned[item.product_id] = returned.get(item.product_id, 0) + item.quantity
+            if not returned:
+                raise ValueError("Return has no items")
+
+            with self.connect() as conn:
+                cursor = conn.cursor()
+
+                sale = map_row(Sale, cursor.execute(f"SELECT {SALE_COLUMNS} FROM sales WHERE id = ?", (sale_id,)))
+                if sale is None or sale.return_of is not None:
+                    raise ValueError(f"Sale {sale_id} not found or is itself a return")
+                left = self._returnable_items(cursor, sale_id)
+                for product_id, quantity in returned.items():
+                    returnable = left[product_id].quantity if product_id in left else 0
+                    if quantity > returnable:
+                        raise ValueError(f"Only {returnable} of product {product_id} left to return")
+
+                # Line values at the sale's prices; the last units of a line take what is left of it
+                values = {
+                    product_id: left[product_id].total_price if quantity == left[product_id].quantity
+                    else round(left[product_id].total_price * quantity / left[product_id].quantity, 2)
+                    for product_id, quantity in returned.items()
+                }
+                gross = sum(values.values())
+
+                # Discount, tax and the amount paid are refunded in proportion;
+                # returning everything that is left refunds exactly what is left
+                total_left, discount_left, tax_left, final_left = cursor.execute("""
+                SELECT SUM(total_amount), SUM(discount), SUM(tax), SUM(final_amount)
+                FROM sales WHERE id = ? OR return_of = ?
+                """, (sale_id, sale_id)).fetchone()
+                if all(returned.get(product_id) == item.quantity for product_id, item in left.items()):
+                    discount, tax, refund = discount_left, tax_left, final_left
+                else:
+                    share = gross / total_left if total_left else 0.0
+                    discount, tax, refund = (round(discount_left * share, 2), round(tax_left * share, 2),
+                                             round(final_left * share, 2))
+                refund_method = refund_method or sale.payment_method
+
+                cursor.execute("""
+                INSERT INTO sales (customer_id, customer_name, total_amount, discount, tax,
+                                   final_amount, payment_method, notes, return_of)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (sale.customer_id, sale.customer_name, -gross, -discount, -tax, -refund,
+                      refund_method, reason, sale_id))
+                return_id = cursor.lastrowid
+
+                cursor.executemany("""
+                INSERT INTO sale_items (sale_id, product_id, product_name, quantity, unit_price, total_price, unit_cost)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [(return_id, product_id, left[product_id].product_name, -quantity,
+                       values[product_id] / quantity, -values[product_id], left[product_id].unit_cost)
+                      for product_id, quantity in returned.items()])
+
+                stock_changes = []
+                if restock:
+                    for product_id, quantity in returned.items():
+                        row = cursor.execute("""
+                        UPDATE products SET stock_quantity = stock_quantity + ?
+                        WHERE id = ?
+                        RETURNING name, stock_quantity, COALESCE(min_stock, 0), status
+                        """, (quantity, product_id)).fetchone()
+                        if row:
+                            name, stock, min_stock, status = row
+                            stock_changes.append(StockChange(product_id, name, stock - quantity,
+                                                             stock, min_stock, min_stock, status, status))
+                    self.record_movements(cursor, [(product_id, MOVEMENT_RETURN, quantity, return_id, reason)
+                                                    for product_id, quantity in returned.items()])
+
+                for product_id, quantity in returned.items():
+                    self._add_product_daily_sales(cursor, product_id, -quantity, -values[product_id])
+
+                if sale.customer_id:
+                    cursor.execute("""
+                    UPDATE customers SET total_purchases = total_purchases - ?
+                    WHERE id = ?
+                    """, (refund, sale.customer_id))
+
+                    # Reversed at the cost the units were sold at
+                    cost = cursor.execute("""
+                    SELECT COALESCE(SUM(quantity * unit_cost), 0) FROM sale_items WHERE sale_id = ?
+                    """, (return_id,)).fetchone()[0]
+
+                    self._add_customer_stats(
+                        cursor, sale.customer_id,
+                        items=-sum(returned.values()),
+                        spent=-refund,
+                        revenue=-(gross - discount),
+                        cost=cost
+                    )
+
+                # The refund reverses the sale's payment; sales made before
+                # checkout posted payments have nothing in the ledger to reverse
+                paid = cursor.execute("""
+                SELECT 1 FROM cash_transactions
+                WHERE reference_type = 'sale' AND reference_id = ? AND transaction_type = 'in'
+                LIMIT 1
+                """, (sale_id,)).fetchone()
+                if paid:
+                    self.post_cash(cursor, "out", refund, refund_method, f"Refund for sale #{sale_id}",
+                                   return_id, "return", "user")
+
+                conn.commit()
+                logger.info("Return %s created for sale %s: %s refunded", return_id, sale_id, refund)
+
+            self.notify_stock(stock_changes)
+            return return_id
+
+        except Exception as e:
+            logger.error("Error creating return for sale %s: %s", sale_id, e)
+            return None
+
+    # Stock ledger
+    def record_movements(self, cursor, movements: List[Tuple[int, str, int, Optional[int], str]]):
+        """Append (product_id, movement_type, signed quantity, reference_id, note) rows to the ledger"""
+        cursor.executemany("""
+        INSERT INTO stock_movements (product_id, movement_type, quantity, reference_id, note)
+        VALUES (?, ?, ?, ?, ?)
+        """, movements)
+
+    def _take_stock_snapshot(self, cursor) -> int:
+        """Snapshot every product's stock inside the caller's (write) transaction"""
+        cursor.execute("""
+        INSERT INTO stock_snapshots (last_movement_id)
+        VALUES ((SELECT COALESCE(MAX(id), 0) FROM stock_movements))
+        """)
+        snapshot_id = cursor.lastrowid
+        # Products without stock are left out; a missing product means zero
+        cursor.execute("""
+        INSERT INTO stock_snapshot_items (snapshot_id, product_id, quantity)
+        SELECT ?, id, stock_quantity FROM products WHERE stock_quantity != 0
+        """, (snapshot_id,))
+        return snapshot_id
+
+    def _rebuild_stock_ledger(self, cursor):
+        """Start the ledger over: sale movements from sale_items, then a snapshot of the current stock
+
+        Earlier purchases and edits were never recorded, so stock before the
+        first snapshot is derived from it and the sales since.
+        """
+        cursor.execute("DELETE FROM stock_snapshot_items")
+        cursor.execute("DELETE FROM stock_snapshots")
+        cursor.execute("DELETE FROM stock_movements")
+        cursor.execute(f"""
+        INSERT INTO stock_movements (product_id, movement_type, quantity, reference_id, created_at)
+        SELECT si.product_id,
+               CASE WHEN s.return_of IS NULL THEN '{MOVEMENT_SALE}' ELSE '{MOVEMENT_RETURN}' END,
+               -si.quantity, si.sale_id, s.created_at
+        FROM sale_items si
+        JOIN sales s ON s.id = si.sale_id
+        ORDER BY s.created_at, si.id
+        """)
+        logger.info("Stock ledger started with %d sale movements", cursor.rowcount)
+        self._take_stock_snapshot(cursor)
+
+    def rebuild_stock_ledger(self) -> bool:
+        """Restart the stock ledger from sales and the current stock (after bulk imports)"""
+        try:
+            with self.connect() as conn:
+                self._rebuild_stock_ledger(conn.cursor())
+                conn.commit()
+                return True
+
+        except Exception as e:
+            logger.error("Error rebuilding stock ledger: %s", e)
+            return False
+
+    def take_stock_snapshot(self) -> Optional[int]:
+        """Snapshot the stock of every product now"""
+        try:
+            with self.connect() as conn:
+                snapshot_id = self._take_stock_snapshot(conn.cursor())
                 conn.commit()
-                logger.info(f"Sale created: {sale_id}")
-                return sale_id
+                logger.info("Stock snapshot %s taken", snapshot_id)
+                return snapshot_id
 
         except Exception as e:
-            logger.error(f"Error creating sale: {e}")
+            logger.error("Error taking stock snapshot: %s", e)
             return None
 
+    def take_stock_snapshot_if_due(self, interval_days: int = SNAPSHOT_INTERVAL_DAYS) -> Optional[int]:
+        """Snapshot the stock when the last snapshot is older than interval_days"""
+        rows = self.execute_query("""
+        SELECT 1 FROM stock_snapshots WHERE taken_at > datetime('now', ?) LIMIT 1
+        """, (f"-{interval_days} days",))
+        return None if rows else self.take_stock_snapshot()
+
+    def adjust_stock(self, product_id: int, counted_quantity: int, note: str = "") -> bool:
+        """Set a product's stock to a counted quantity, recording the difference as an adjustment"""
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+
+                row = cursor.execute("""
+                SELECT name, stock_quantity, COALESCE(min_stock, 0), status FROM products WHERE id = ?
+                """, (product_id,)).fetchone()
+                if row is None:
+                    return False
+                name, stock, min_stock, status = row
+                if counted_quantity == stock:
+                    return True
+
+                cursor.execute("""
+                UPDATE products SET stock_quantity = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?
+                """, (counted_quantity, product_id))
+                self.record_movements(cursor, [(product_id, MOVEMENT_ADJUSTMENT, counted_quantity - stock, None, note)])
+
+                conn.commit()
+                logger.info("Stock of product %s adjusted: %d -> %d", product_id, stock, counted_quantity)
+
+            self.notify_stock([StockChange(product_id, name, stock, counted_quantity, min_stock, min_stock,
+                                           status, status)])
+            return True
+
+        except Exception as e:
+            logger.error("Error adjusting stock of product %s: %s", product_id, e)
+            return False
+
+    def get_stock_movements(self, product_id: int, limit: int = 100,
+                            before_id: Optional[int] = None) -> List[StockMovement]:
+        """One page of a product's movements, newest first; before_id is the last id of the previous page"""
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute(f"""
+                SELECT {STOCK_MOVEMENT_COLUMNS} FROM stock_movements
+                WHERE product_id = ? AND id < ?
+                ORDER BY id DESC
+                LIMIT ?
+                """, (product_id, before_id if before_id is not None else 2 ** 63 - 1, limit))
+
+                return map_rows(StockMovement, cursor)
+
+        except Exception as e:
+            logger.error("Error getting stock movements of product %s: %s", product_id, e)
+            return []
+
+    @metrics.timed("db.get_stock_on_hand")
+    def get_stock_on_hand(self, at: str, product_id: Optional[int] = None) -> Dict[int, int]:
+        """Stock per product at a moment ('YYYY-MM-DD HH:MM:SS', UTC like created_at)
+
+        Starts from the last snapshot taken by then and adds the movements
+        since, or, for moments before the first snapshot, takes the
+        movements in between off that one. Products at zero are left out.
+        """
+        product_filter = "" if product_id is None else "AND product_id = ?"
+        product_param = () if product_id is None else (product_id,)
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+
+                snapshot = cursor.execute("""
+                SELECT id, last_movement_id FROM stock_snapshots
+                WHERE taken_at <= ?
+                ORDER BY taken_at DESC, id DESC
+                LIMIT 1
+                """, (at,)).fetchone()
+                if snapshot is not None:
+                    sign, movements = 1, "id > ? AND created_at <= ?"
+                else:
+                    snapshot = cursor.execute("""
+                    SELECT id, last_movement_id FROM stock_snapshots ORDER BY taken_at, id LIMIT 1
+                    """).fetchone()
+                    sign, movements = -1, "id <= ? AND created_at > ?"
+                if snapshot is None:
+                    snapshot, sign, movements = (None, 0), 1, "id > ? AND created_at <= ?"
+
+                snapshot_id, last_movement_id = snapshot
+                stock = dict(cursor.execute(f"""
+                SELECT product_id, quantity FROM stock_snapshot_items
+                WHERE snapshot_id = ? {product_filter}
+                """, (snapshot_id,) + product_param))
+
+                for movement_product, delta in cursor.execute(f"""
+                SELECT product_id, SUM(quantity) FROM stock_movements
+                WHERE {movements} {product_filter}
+                GROUP BY product_id
+                """, (last_movement_id, at) + product_param):
+                    stock[movement_product] = stock.get(movement_product, 0) + sign * delta
+
+                return {key: quantity for key, quantity in stock.items() if quantity}
+
+        except Exception as e:
+            logger.error("Error getting stock on hand at %s: %s", at, e)
+            return {}
+
+    def get_stock_adjustments(self, start: str, end: str) -> List[Tuple[int, str, int, int]]:
+        """(product_id, name, units lost, units found) by manual adjustments in [start, end)"""
+        return self.execute_query(f"""
+        SELECT m.product_id, p.name,
+               -SUM(CASE WHEN m.quantity < 0 THEN m.quantity ELSE 0 END),
+               SUM(CASE WHEN m.quantity > 0 THEN m.quantity ELSE 0 END)
+        FROM stock_movements m
+        JOIN products p ON p.id = m.product_id
+        WHERE m.created_at >= ? AND m.created_at < ? AND m.movement_type = '{MOVEMENT_ADJUSTMENT}'
+        GROUP BY m.product_id
+        ORDER BY 3 DESC
+        """, (start, end))
+
+    # Product sales history
+    def _add_product_daily_sales(self, cursor, product_id: int, quantity: int, revenue: float,
+                                 day: Optional[str] = None):
+        """Add units sold to a product's row for the day (today by default), in the caller's transaction"""
+        cursor.execute("""
+        INSERT INTO product_daily_sales (product_id, day, quantity, revenue)
+        VALUES (?, COALESCE(?, date('now')), ?, ?)
+        ON CONFLICT (product_id, day) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            revenue = revenue + excluded.revenue
+        """, (product_id, day, quantity, revenue))
+
+    def _rebuild_product_daily_sales(self, cursor):
+        """Recompute units sold per product and day from sale_items"""
+        cursor.execute("DELETE FROM product_daily_sales")
+        cursor.execute("""
+        INSERT INTO product_daily_sales (product_id, day, quantity, revenue)
+        SELECT si.product_id, date(s.created_at), SUM(si.quantity), SUM(si.total_price)
+        FROM sale_items si
+        JOIN sales s ON s.id = si.sale_id
+        GROUP BY si.product_id, date(s.created_at)
+        """)
+
+    def rebuild_product_daily_sales(self) -> bool:
+        """Recompute the daily product sales (after bulk imports)"""
+        try:
+            with self.connect() as conn:
+                self._rebuild_product_daily_sales(conn.cursor())
+                conn.commit()
+                return True
+
+        except Exception as e:
+            logger.error("Error rebuilding product daily sales: %s", e)
+            return False
+
+    def get_units_sold(self, product_ids: List[int], days: int) -> Dict[int, int]:
+        """Units sold per product over the last days, from product_daily_sales"""
+        sold = {}
+        # Chunked to stay under SQLite's bound-parameter limit
+        for start in range(0, len(product_ids), 500):
+            chunk = tuple(product_ids[start:start + 500])
+            rows = self.execute_query(f"""
+            SELECT product_id, SUM(quantity)
+            FROM product_daily_sales
+            WHERE product_id IN ({",".join("?" * len(chunk))}) AND day > date('now', ?)
+            GROUP BY product_id
+            """, chunk + (f"-{days} days",))
+            sold.update(rows)
+        return sold
+
+    # Expense totals
+    def add_expense_daily(self, cursor, day: str, category: str, amount: float, entries: int):
+        """Add to a category's expense total for the day, in the caller's transaction"""
+        cursor.execute("""
+        INSERT INTO expense_daily (day, category, amount, entries)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (day, category) DO UPDATE SET
+            amount = amount + excluded.amount,
+            entries = entries + excluded.entries
+        """, (day, category, amount, entries))
+        if entries < 0:
+            cursor.execute("DELETE FROM expense_daily WHERE day = ? AND category = ? AND entries <= 0",
+                           (day, category))
+
+    def _rebuild_expense_daily(self, cursor):
+        """Recompute expense totals per day and category from expenses"""
+        cursor.execute("DELETE FROM expense_daily")
+        cursor.execute("""
+        INSERT INTO expense_daily (day, category, amount, entries)
+        SELECT date(created_at), category, SUM(amount), COUNT(*)
+        FROM expenses
+        GROUP BY date(created_at), category
+        """)
+
+    def rebuild_expense_daily(self) -> bool:
+        """Recompute the daily expense totals (after bulk imports)"""
+        try:
+            with self.connect() as conn:
+                self._rebuild_expense_daily(conn.cursor())
+                conn.commit()
+                return True
+
+        except Exception as e:
+            logger.error("Error rebuilding expense totals: %s", e)
+            return False
+
+    # Daily cash summary
+    def post_cash(self, cursor, transaction_type: str, amount: float, method: str, description: str,
+                  reference_id: Optional[int], reference_type: str, created_by: str,
+                  created_at: Optional[datetime] = None) -> int:
+        """Add an 'in' or 'out' cash_transactions row and its day's summary delta, in the caller's transaction
+
+        created_at back-dates the entry (defaults to now); returns the row id.
+        """
+        # Local time, like CashManager's entries and daily summary days
+        now = (created_at or datetime.now()).isoformat()
+        cursor.execute("""
+        INSERT INTO cash_transactions (transaction_type, amount, from_method, to_method, description,
+                                       reference_id, reference_type, created_by, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (transaction_type, amount,
+              method if transaction_type == "out" else None,
+              method if transaction_type == "in" else None,
+              description, reference_id, reference_type, created_by, now))
+        transaction_id = cursor.lastrowid
+        if transaction_type == "in":
+            self.add_daily_cash(cursor, now[:10], cash_in=amount)
+        else:
+            self.add_daily_cash(cursor, now[:10], cash_out=amount)
+        return transaction_id
+
+    def add_daily_cash(self, cursor, day: str, cash_in: float = 0.0, cash_out: float = 0.0,
+                       transfers_in: float = 0.0, transfers_out: float = 0.0):
+        """Add to a day's cash summary in the caller's transaction
+
+        A new day opens at the previous day's closing balance; the opening
+        and closing balances of every later day move by the same net amount.
+        """
+        net = cash_in - cash_out + transfers_in - transfers_out
+        cursor.execute("""
+        INSERT INTO daily_cash_summary (date, opening_balance, total_cash_in, total_cash_out,
+                                        total_transfers_in, total_transfers_out, closing_balance, updated_at)
+        VALUES (:day, :opening, :cash_in, :cash_out, :transfers_in, :transfers_out, :opening + :net, :now)
+        ON CONFLICT (date) DO UPDATE SET
+            total_cash_in = total_cash_in + excluded.total_cash_in,
+            total_cash_out = total_cash_out + excluded.total_cash_out,
+            total_transfers_in = total_transfers_in + excluded.total_transfers_in,
+            total_transfers_out = total_transfers_out + excluded.total_transfers_out,
+            closing_balance = closing_balance + :net,
+            updated_at = excluded.updated_at
+        """, {
+            "day": day,
+            "opening": (cursor.execute(
+                "SELECT closing_balance FROM daily_cash_summary WHERE date < ? ORDER BY date DESC LIMIT 1", (day,)
+            ).fetchone() or (0.0,))[0],
+            "cash_in": cash_in, "cash_out": cash_out,
+            "transfers_in": transfers_in, "transfers_out": transfers_out,
+            "net": net, "now": datetime.now().isoformat()
+        })
+        if net:
+            cursor.execute("""
+            UPDATE daily_cash_summary SET opening_balance = opening_balance + ?, closing_balance = closing_balance + ?
+            WHERE date > ?
+            """, (net, net, day))
+
+    # Customer stats
+    def _add_customer_stats(self, cursor, customer_id: int, visits: int = 0, items: int = 0,
+                            spent: float = 0.0, revenue: float = 0.0, cost: float = 0.0,
+                            purchased_at: Optional[str] = None):
+        """Add deltas to a customer's stats row inside the caller's transaction
+
+        Checkout adds a visit; refunds pass negative amounts and no date.
+        """
+        cursor.execute("""
+        INSERT INTO customer_stats (customer_id, visit_count, item_count, total_spent,
+                                    net_revenue, total_cost, first_purchase, last_purchase)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (customer_id) DO UPDATE SET
+            visit_count = visit_count + excluded.visit_count,
+            item_count = item_count + excluded.item_count,
+            total_spent = total_spent + excluded.total_spent,
+            net_revenue = net_revenue + excluded.net_revenue,
+            total_cost = total_cost + excluded.total_cost,
+            first_purchase = COALESCE(MIN(first_purchase, excluded.first_purchase), first_purchase, excluded.first_purchase),
+            last_purchase = COALESCE(MAX(last_purchase, excluded.last_purchase), last_purchase, excluded.last_purchase)
+        """, (customer_id, visits, items, spent, revenue, cost, purchased_at, purchased_at))
+
+    def _rebuild_customer_stats(self, cursor):
+        """Recompute every customer's stats from sales (one set-based pass)"""
+        cursor.execute("DELETE FROM customer_stats")
+        cursor.execute("""
+        WITH costs AS (
+            SELECT sale_id, SUM(quantity) AS items, SUM(quantity * unit_cost) AS cost
+            FROM sale_items
+            GROUP BY sale_id
+        )
+        INSERT INTO customer_stats (customer_id, visit_count, item_count, total_spent,
+                                    net_revenue, total_cost, first_purchase, last_purchase)
+        SELECT s.customer_id, COUNT(*) - COUNT(s.return_of), COALESCE(SUM(costs.items), 0),
+               SUM(s.final_amount), SUM(s.total_amount - s.discount), COALESCE(SUM(costs.cost), 0),
+               MIN(CASE WHEN s.return_of IS NULL THEN s.created_at END),
+               MAX(CASE WHEN s.return_of IS NULL THEN s.created_at END)
+        FROM sales s
+        LEFT JOIN costs ON costs.sale_id = s.id
+        WHERE s.customer_id IS NOT NULL
+        GROUP BY s.customer_id
+        """)
+
+    @metrics.timed("db.rebuild_customer_stats")
+    def rebuild_customer_stats(self) -> bool:
+        """Rebuild the customer_stats table, e.g. after bulk imports"""
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                self._rebuild_customer_stats(cursor)
+                conn.commit()
+                logger.info("Customer stats rebuilt for %d customers",
+                            cursor.execute("SELECT COUNT(*) FROM customer_stats").fetchone()[0])
+                return True
+
+        except Exception as e:
+            logger.error("Error rebuilding customer stats: %s", e)
+            return False
+
+    @metrics.timed("db.get_recent_sales")
     def get_recent_sales(self, limit: int = 50) -> List[Tuple[Sale, List[SaleItem]]]:
         """Get recent sales with items"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.connect() as conn:
                 cursor = conn.cursor()
 
                 # Get sales
-                cursor.execute("""
-                SELECT * FROM sales 
+                cursor.execute(f"""
+                SELECT {SALE_COLUMNS} FROM sales
                 ORDER BY created_at DESC LIMIT ?
                 """, (limit,))
 
-                sales_rows = cursor.fetchall()
+                sales = map_rows(Sale, cursor)
                 sales_with_items = []
 
-                for sale_row in sales_rows:
-                    sale = Sale(**dict(sale_row))
-
+                for sale in sales:
                     # Get items for this sale
-                    cursor.execute("""
-                    SELECT * FROM sale_items WHERE sale_id = ?
+                    cursor.execute(f"""
+                    SELECT {SALE_ITEM_COLUMNS} FROM sale_items WHERE sale_id = ?
                     """, (sale.id,))
 
-                    items_rows = cursor.fetchall()
-                    items = [SaleItem(**dict(item_row)) for item_row in items_rows]
+                    items = map_rows(SaleItem, cursor)
 
                     sales_with_items.append((sale, items))
 
                 return sales_with_items
 
         except Exception as e:
-            logger.error(f"Error getting recent sales: {e}")
+            logger.error("Error getting recent sales: %s", e)
             return []
 
     # Statistics
+    def get_monthly_sales(self, months: int = 6) -> List[Tuple[str, float]]:
+        """(month number 'MM', sales total) for the recent months, oldest first"""
+        return self.execute_query("""
+        SELECT strftime('%m', created_at) AS month, SUM(final_amount)
+        FROM sales
+        WHERE created_at >= date('now', ?)
+        GROUP BY strftime('%Y-%m', created_at)
+        ORDER BY MIN(created_at)
+        """, (f"-{months} months",))
+
+    def get_top_brands(self, limit: int = 5) -> List[Tuple[str, int]]:
+        """(brand, quantity sold) for the best selling brands"""
+        return self.execute_query("""
+        SELECT p.brand, SUM(si.quantity) AS total_quantity
+        FROM sale_items si
+        JOIN products p ON si.product_id = p.id
+        GROUP BY p.brand
+        ORDER BY total_quantity DESC
+        LIMIT ?
+        """, (limit,))
+
+    @metrics.timed("db.get_dashboard_stats")
     def get_dashboard_stats(self) -> Dict[str, Any]:
         """Get dashboard statistics"""
         try:
@@ -487,7 +1805,7 @@ class DatabaseManager:
                 'total_stock': 0
             }
 
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connect() as conn:
                 cursor = conn.cursor()
 
                 # Get total products
@@ -496,7 +1814,7 @@ class DatabaseManager:
                     result = cursor.fetchone()
                     stats['total_products'] = result[0] if result else 0
                 except Exception as e:
-                    logger.error(f"Error getting total products: {e}")
+                    logger.error("Error getting total products: %s", e)
 
                 # Get total customers
                 try:
@@ -504,13 +1822,13 @@ class DatabaseManager:
                     result = cursor.fetchone()
                     stats['total_customers'] = result[0] if result else 0
                 except Exception as e:
-                    logger.error(f"Error getting total customers: {e}")
+                    logger.error("Error getting total customers: %s", e)
 
                 # Today's sales
                 try:
                     today = datetime.now().strftime('%Y-%m-%d')
                     cursor.execute("""
-                        SELECT COUNT(*), COALESCE(SUM(final_amount), 0) 
+                        SELECT COUNT(*) - COUNT(return_of), COALESCE(SUM(final_amount), 0) 
                         FROM sales 
                         WHERE DATE(created_at) = ?
                     """, (today,))
@@ -519,15 +1837,15 @@ class DatabaseManager:
                         stats['today_sales'] = result[0] if result[0] else 0
                         stats['today_revenue'] = result[1] if result[1] else 0
                 except Exception as e:
-                    logger.error(f"Error getting today's sales: {e}")
+                    logger.error("Error getting today's sales: %s", e)
 
                 # Low stock products
                 try:
-                    cursor.execute("SELECT COUNT(*) FROM products WHERE stock_quantity <= min_stock")
+                    cursor.execute(f"SELECT COUNT(*) FROM products WHERE {LOW_STOCK_FILTER}")
                     result = cursor.fetchone()
                     stats['low_stock'] = result[0] if result else 0
                 except Exception as e:
-                    logger.error(f"Error getting low stock count: {e}")
+                    logger.error("Error getting low stock count: %s", e)
 
                 # Inventory stats
                 try:
@@ -543,12 +1861,12 @@ class DatabaseManager:
                         stats['inventory_value'] = result[2] if result[2] else 0
                         stats['total_stock'] = result[1] if result[1] else 0
                 except Exception as e:
-                    logger.error(f"Error getting inventory stats: {e}")
+                    logger.error("Error getting inventory stats: %s", e)
 
                 return stats
 
         except Exception as e:
-            logger.error(f"Error getting dashboard stats: {e}")
+            logger.error("Error getting dashboard stats: %s", e)
             return {
                 'total_products': 0,
                 'total_customers': 0,
@@ -559,34 +1877,60 @@ class DatabaseManager:
                 'total_stock': 0
             }
 
+    def count_low_stock_products(self) -> int:
+        """Number of active products at or below their reorder level"""
+        rows = self.execute_query(f"SELECT COUNT(*) FROM products WHERE {LOW_STOCK_FILTER}")
+        return rows[0][0] if rows else 0
+
+    @metrics.timed("db.get_low_stock_products")
     def get_low_stock_products(self) -> List[Product]:
-        """Get products with low stock"""
+        """Active products at or below their reorder level, lowest stock first"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.connect() as conn:
                 cursor = conn.cursor()
 
-                cursor.execute("""
-                SELECT * FROM products 
-                WHERE stock_quantity <= min_stock 
+                cursor.execute(f"""
+                SELECT {PRODUCT_COLUMNS} FROM products
+                WHERE {LOW_STOCK_FILTER}
                 ORDER BY stock_quantity ASC
                 """)
 
-                rows = cursor.fetchall()
-                return [Product(**dict(row)) for row in rows]
+                return map_rows(Product, cursor)
 
         except Exception as e:
-            logger.error(f"Error getting low stock products: {e}")
+            logger.error("Error getting low stock products: %s", e)
             return []
 
     # Helper method to execute queries, used internally by get_dashboard_stats
     def execute_query(self, query: str, params: Tuple = ()) -> List[Tuple]:
         """Execute a query and return results"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query, params)
                 return cursor.fetchall()
         except Exception as e:
-            logger.error(f"Error executing query: {e}")
-            return []
\ No newline at end of file
+            logger.error("Error executing query: %s", e)
+            return []
+
+    def fetch_all(self, query: str, params: Tuple = ()) -> List[Tuple]:
+        """Rows of a read query; unlike execute_query, errors reach the caller"""
+        conn = self.connect()
+        try:
+            return conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+    def iter_query(self, query: str, params: Tuple = (), batch_size: int = 1000) -> Iterator[Tuple]:
+        """Stream the rows of a query, fetching batch_size rows at a time"""
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
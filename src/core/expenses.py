@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Expenses
+المصروفات
+
+Shop expenses and their cash ledger entries. Adding, editing or deleting an
+expense writes the expense, its 'out' row in cash_transactions, the day's
+cash summary and the per-day category totals (expense_daily) in one
+transaction; the totals move by deltas, so the financial report sums a row
+per day and category instead of scanning expenses.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from src.core.models import map_row, map_rows, select_list
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# cash_transactions.reference_type of expense payments
+REFERENCE_EXPENSE = "expense"
+
+@dataclass(slots=True)
+class Expense:
+    """Expense data model"""
+    id: Optional[int] = None
+    category: str = ""
+    description: str = ""
+    amount: float = 0.0
+    payment_method: str = "cash"
+    supplier: str = ""
+    invoice_number: str = ""
+    notes: str = ""
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    cash_transaction_id: Optional[int] = None
+
+def _validate(expense: Expense):
+    if not expense.category or not expense.description:
+        raise ValueError("Expense needs a category and a description")
+    if expense.amount <= 0:
+        raise ValueError(f"Expense amount must be positive: {expense.amount}")
+
+class ExpenseManager:
+    """Manager for expenses and their cash ledger entries"""
+
+    def __init__(self, db_manager):
+        """Initialize expense manager"""
+        self.db_manager = db_manager
+        logger.info("Expense manager initialized")
+
+    def add_expense(self, expense: Expense) -> Optional[int]:
+        """Record an expense and pay it out of the cash ledger; returns its id"""
+        try:
+            _validate(expense)
+            # Local time; a given created_at back-dates the expense and its payment
+            paid_at = datetime.fromisoformat(expense.created_at) if expense.created_at else datetime.now()
+            created_at = paid_at.strftime("%Y-%m-%d %H:%M:%S")
+            day = created_at[:10]
+
+            with self.db_manager.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                INSERT INTO expenses (category, description, amount, payment_method, supplier,
+                                      invoice_number, notes, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (expense.category, expense.description, expense.amount, expense.payment_method,
+                      expense.supplier, expense.invoice_number, expense.notes, created_at, created_at))
+                expense_id = cursor.lastrowid
+
+                cash_transaction_id = self.db_manager.post_cash(
+                    cursor, "out", expense.amount, expense.payment_method, expense.description,
+                    expense_id, REFERENCE_EXPENSE, "user", created_at=paid_at
+                )
+                cursor.execute("UPDATE expenses SET cash_transaction_id = ? WHERE id = ?",
+                               (cash_transaction_id, expense_id))
+
+                self.db_manager.add_expense_daily(cursor, day, expense.category, expense.amount, 1)
+
+                conn.commit()
+                logger.info("Expense added: %s - %s", expense.category, expense.amount)
+                return expense_id
+
+        except Exception as e:
+            logger.error("Error adding expense: %s", e)
+            return None
+
+    def update_expense(self, expense: Expense) -> bool:
+        """Update an expense and its cash entry; its date stays as recorded"""
+        try:
+            _validate(expense)
+            with self.db_manager.connect() as conn:
+                cursor = conn.cursor()
+                old = cursor.execute("""
+                SELECT category, amount, created_at, cash_transaction_id FROM expenses WHERE id = ?
+                """, (expense.id,)).fetchone()
+                if old is None:
+                    logger.error("Expense %s not found", expense.id)
+                    return False
+                old_category, old_amount, created_at, cash_transaction_id = old
+                day = created_at[:10]
+
+                cursor.execute("""
+                UPDATE expenses SET
+                    category = ?, description = ?, amount = ?, payment_method = ?,
+                    supplier = ?, invoice_number = ?, notes = ?, updated_at = ?
+                WHERE id = ?
+                """, (expense.category, expense.description, expense.amount, expense.payment_method,
+                      expense.supplier, expense.invoice_number, expense.notes,
+                      datetime.now().strftime("%Y-%m-%d %H:%M:%S"), expense.id))
+
+                self.db_manager.add_expense_daily(cursor, day, old_category, -old_amount, -1)
+                self.db_manager.add_expense_daily(cursor, day, expense.category, expense.amount, 1)
+
+                # Expenses recorded before the ledger link have no cash entry to correct
+                if cash_transaction_id is not None:
+                    cursor.execute("""
+                    UPDATE cash_transactions SET amount = ?, from_method = ?, description = ?
+                    WHERE id = ?
+                    """, (expense.amount, expense.payment_method, expense.description, cash_transaction_id))
+                    self.db_manager.add_daily_cash(cursor, day, cash_out=expense.amount - old_amount)
+
+                conn.commit()
+                logger.info("Expense updated: %s", expense.id)
+                return True
+
+        except Exception as e:
+            logger.error("Error updating expense %s: %s", expense.id, e)
+            return False
+
+    def delete_expense(self, expense_id: int) -> bool:
+        """Delete an expense and take its payment back out of the cash ledger"""
+        try:
+            with self.db_manager.connect() as conn:
+                cursor = conn.cursor()
+                old = cursor.execute("""
+                DELETE FROM expenses WHERE id = ?
+                RETURNING category, amount, created_at, cash_transaction_id
+                """, (expense_id,)).fetchone()
+                if old is None:
+                    logger.error("Expense %s not found", expense_id)
+                    return False
+                category, amount, created_at, cash_transaction_id = old
+                day = created_at[:10]
+
+                self.db_manager.add_expense_daily(cursor, day, category, -amount, -1)
+                if cash_transaction_id is not None:
+                    cursor.execute("DELETE FROM cash_transactions WHERE id = ?", (cash_transaction_id,))
+                    self.db_manager.add_daily_cash(cursor, day, cash_out=-amount)
+
+                conn.commit()
+                logger.info("Expense deleted: %s", expense_id)
+                return True
+
+        except Exception as e:
+            logger.error("Error deleting expense %s: %s", expense_id, e)
+            return False
+
+    def get_expense(self, expense_id: int) -> Optional[Expense]:
+        """Get one expense by id"""
+        try:
+            with self.db_manager.connect() as conn:
+                cursor = conn.execute(f"SELECT {select_list(Expense)} FROM expenses WHERE id = ?",
+                                      (expense_id,))
+                return map_row(Expense, cursor)
+
+        except Exception as e:
+            logger.error("Error getting expense %s: %s", expense_id, e)
+            return None
+
+    def get_expenses(self, start: Optional[str] = None, end: Optional[str] = None,
+                     category: Optional[str] = None, limit: int = 200) -> List[Expense]:
+        """Newest expenses in [start, end), optionally of one category"""
+        try:
+            where, params = [], []
+            if start:
+                where.append("created_at >= ?")
+                params.append(start)
+            if end:
+                where.append("created_at < ?")
+                params.append(end)
+            if category:
+                where.append("category = ?")
+                params.append(category)
+
+            with self.db_manager.connect() as conn:
+                cursor = conn.execute(f"""
+                SELECT {select_list(Expense)} FROM expenses
+                {"WHERE " + " AND ".join(where) if where else ""}
+                ORDER BY created_at DESC, id DESC LIMIT ?
+                """, (*params, limit))
+                return map_rows(Expense, cursor)
+
+        except Exception as e:
+            logger.error("Error getting expenses: %s", e)
+            return []
+
+    def get_expense_categories(self) -> List[str]:
+        """Categories expenses have been recorded under"""
+        rows = self.db_manager.execute_query("SELECT DISTINCT category FROM expense_daily ORDER BY category")
+        return [row[0] for row in rows]
+
+    def get_category_totals(self, start: str, end: str) -> List[Tuple[str, float, int]]:
+        """(category, amount, entries) for the days in [start, end), largest first"""
+        return self.db_manager.execute_query("""
+        SELECT category, SUM(amount), SUM(entries)
+        FROM expense_daily
+        WHERE day >= ? AND day < ?
+        GROUP BY category
+        ORDER BY 2 DESC
+        """, (start, end))
+
+    def get_monthly_totals(self, start: str, end: str) -> List[Tuple[str, str, float]]:
+        """(month, category, amount) for the days in [start, end)"""
+        return self.db_manager.execute_query("""
+        SELECT substr(day, 1, 7) AS month, category, SUM(amount)
+        FROM expense_daily
+        WHERE day >= ? AND day < ?
+        GROUP BY month, category
+        ORDER BY month, 3 DESC
+        """, (start, end))
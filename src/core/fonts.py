@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Font Resolver
+محلل الخطوط
+
+Registers the fonts bundled in assets/fonts for this process only
+(fontconfig application fonts on Linux, FR_PRIVATE GDI fonts on Windows)
+and picks the Arabic body/header fonts. Enumerating installed families is
+slow, so the choice is cached on disk keyed by the fonts directory mtime;
+warm starts do not enumerate at all.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+
+# Installed fonts tried when no bundled font can be used
+PREFERRED_ARABIC_FONTS = [
+    "Cairo", "Amiri", "Scheherazade New", "Noto Sans Arabic",
+    "Traditional Arabic", "Arabic Typesetting", "Tahoma", "Segoe UI"
+]
+FALLBACK_FONT = "Tahoma"
+
+# Bundled files preferred for body text and headers
+BUNDLED_BODY_FONT = "Hayah.otf"
+BUNDLED_HEADER_FONT = "Shorooq.ttf"
+
+CACHE_VERSION = 1
+
+def read_family_name(path: Path) -> Optional[str]:
+    """Family name (name ID 1) from a TrueType/OpenType file's name table"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+
+        offset = 0
+        if data[:4] == b"ttcf":
+            # Font collection: use the first font
+            offset = struct.unpack(">I", data[12:16])[0]
+
+        num_tables = struct.unpack(">H", data[offset + 4:offset + 6])[0]
+        for i in range(num_tables):
+            entry = offset + 12 + 16 * i
+            tag, _, table_offset, _ = struct.unpack(">4sIII", data[entry:entry + 16])
+            if tag != b"name":
+                continue
+
+            _, count, string_offset = struct.unpack(">HHH", data[table_offset:table_offset + 6])
+            fallback = None
+            for j in range(count):
+                record = table_offset + 6 + 12 * j
+                platform_id, _, _, name_id, length, name_offset = struct.unpack(
+                    ">HHHHHH", data[record:record + 12]
+                )
+                if name_id != 1:
+                    continue
+                start = table_offset + string_offset + name_offset
+                raw = data[start:start + length]
+                if platform_id in (0, 3):
+                    return raw.decode("utf-16-be")
+                fallback = fallback or raw.decode("latin-1")
+            return fallback
+    except Exception as e:
+        logger.warning("Could not read font name from %s: %s", path, e)
+    return None
+
+class FontResolver:
+    """Registers bundled fonts and resolves the Arabic font names"""
+
+    def __init__(self, fonts_dir: str = "assets/fonts", cache_file: str = "data/font_cache.json"):
+        self.fonts_dir = Path(fonts_dir)
+        self.cache_file = Path(cache_file)
+        self.registered: List[Path] = []
+
+    # Registration
+    def _font_files(self) -> List[Path]:
+        if not self.fonts_dir.is_dir():
+            return []
+        return sorted(p for p in self.fonts_dir.iterdir() if p.suffix.lower() in FONT_EXTENSIONS)
+
+    def register_bundled_fonts(self) -> bool:
+        """Make assets/fonts visible to Tk for this process"""
+        files = self._font_files()
+        if not files:
+            return False
+
+        try:
+            if sys.platform == "win32":
+                return self._register_windows(files)
+            if sys.platform == "darwin":
+                return self._register_macos(files)
+            return self._register_fontconfig()
+        except Exception as e:
+            logger.warning("Could not register bundled fonts: %s", e)
+            return False
+
+    def _register_windows(self, files: List[Path]) -> bool:
+        from ctypes import wintypes
+
+        FR_PRIVATE = 0x10
+        gdi32 = ctypes.windll.gdi32
+        gdi32.AddFontResourceExW.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, wintypes.LPVOID]
+        for path in files:
+            if gdi32.AddFontResourceExW(str(path.resolve()), FR_PRIVATE, None):
+                self.registered.append(path)
+        logger.info("Registered %d bundled fonts (GDI private)", len(self.registered))
+        return bool(self.registered)
+
+    def _register_macos(self, files: List[Path]) -> bool:
+        core_text = ctypes.cdll.LoadLibrary(ctypes.util.find_library("CoreText"))
+        core_foundation = ctypes.cdll.LoadLibrary(ctypes.util.find_library("CoreFoundation"))
+
+        core_foundation.CFURLCreateFromFileSystemRepresentation.restype = ctypes.c_void_p
+        core_foundation.CFURLCreateFromFileSystemRepresentation.argtypes = [
+            ctypes.c_void_p, ctypes.c_char_p, ctypes.c_long, ctypes.c_bool
+        ]
+        core_foundation.CFRelease.argtypes = [ctypes.c_void_p]
+        core_text.CTFontManagerRegisterFontsForURL.argtypes = [ctypes.c_void_p, ctypes.c_uint32, ctypes.c_void_p]
+        core_text.CTFontManagerRegisterFontsForURL.restype = ctypes.c_bool
+
+        kCTFontManagerScopeProcess = 1
+        for path in files:
+            raw = os.fsencode(path.resolve())
+            url = core_foundation.CFURLCreateFromFileSystemRepresentation(None, raw, len(raw), False)
+            if not url:
+                continue
+            try:
+                if core_text.CTFontManagerRegisterFontsForURL(url, kCTFontManagerScopeProcess, None):
+                    self.registered.append(path)
+            finally:
+                core_foundation.CFRelease(url)
+        logger.info("Registered %d bundled fonts (CoreText process scope)", len(self.registered))
+        return bool(self.registered)
+
+    def _register_fontconfig(self) -> bool:
+        library = ctypes.util.find_library("fontconfig") or "libfontconfig.so.1"
+        fontconfig = ctypes.cdll.LoadLibrary(library)
+        fontconfig.FcConfigAppFontAddDir.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+        fontconfig.FcConfigAppFontAddDir.restype = ctypes.c_int
+
+        # NULL config = the current default config, which Tk's Xft backend uses
+        if not fontconfig.FcConfigAppFontAddDir(None, os.fsencode(self.fonts_dir.resolve())):
+            logger.warning("fontconfig did not accept %s", self.fonts_dir)
+            return False
+
+        self.registered = self._font_files()
+        logger.info("Registered %d bundled fonts (fontconfig application fonts)", len(self.registered))
+        return True
+
+    # Resolution
+    def _cache_key(self) -> Dict[str, object]:
+        try:
+            mtime = self.fonts_dir.stat().st_mtime_ns
+        except OSError:
+            mtime = 0
+        return {
+            "version": CACHE_VERSION,
+            "fonts_dir_mtime": mtime,
+            "platform": sys.platform,
+            # A choice made while the bundled fonts were usable is wrong without them
+            "bundled_registered": bool(self.registered)
+        }
+
+    def _load_cache(self, key: Dict[str, object]) -> Optional[Tuple[str, str]]:
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("key") == key:
+                return data["arabic_font"], data["header_font"]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Ignoring unreadable font cache: %s", e)
+        return None
+
+    def _save_cache(self, key: Dict[str, object], arabic_font: str, header_font: str):
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_file, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "arabic_font": arabic_font, "header_font": header_font}, f, indent=2)
+        except Exception as e:
+            logger.warning("Could not write font cache: %s", e)
+
+    def _bundled_family(self, file_name: str, families) -> Optional[str]:
+        path = self.fonts_dir / file_name
+        if not path.exists():
+            return None
+        family = read_family_name(path)
+        return family if family and family in families else None
+
+    def _choose(self, families) -> Tuple[str, str]:
+        arabic_font = self._bundled_family(BUNDLED_BODY_FONT, families)
+        if not arabic_font:
+            arabic_font = next((f for f in PREFERRED_ARABIC_FONTS if f in families), FALLBACK_FONT)
+
+        header_font = self._bundled_family(BUNDLED_HEADER_FONT, families) or arabic_font
+        return arabic_font, header_font
+
+    def resolve(self, root=None) -> Tuple[str, str]:
+        """(arabic_font, header_font), from the cache or one family enumeration"""
+        key = self._cache_key()
+        cached = self._load_cache(key)
+        if cached:
+            logger.info("Using cached font choice: %s / %s", *cached)
+            return cached
+
+        import tkinter.font as tkfont
+
+        families = set(tkfont.families(root))
+        arabic_font, header_font = self._choose(families)
+        self._save_cache(key, arabic_font, header_font)
+        return arabic_font, header_font
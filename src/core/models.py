@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Row Models
+نماذج البيانات
+
+Slotted dataclasses for the rows the data layer returns. Queries select a
+model's columns in field order (see select_list), so a cursor tuple becomes
+a model positionally - Product(*row) - without a sqlite3.Row or a dict per
+row. row_mapper precompiles the conversion for any other column order.
+ProductFrame holds a whole product list column by column for list views.
+"""
+
+from array import array
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from itertools import starmap
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+@dataclass(slots=True)
+class Product:
+    """Product data model"""
+    id: Optional[int] = None
+    name: str = ""
+    brand: str = ""
+    model: str = ""
+    price: float = 0.0
+    cost: float = 0.0
+    stock_quantity: int = 0
+    min_stock: int = 0
+    category: str = ""
+    description: str = ""
+    barcode: str = ""
+    image_path: str = ""
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    category_id: Optional[int] = None
+    status: str = "active"
+
+@dataclass(slots=True)
+class Category:
+    """Product category data model"""
+    id: Optional[int] = None
+    name: str = ""
+    description: str = ""
+    status: str = "active"
+    created_at: Optional[str] = None
+
+@dataclass(slots=True)
+class Customer:
+    """Customer data model"""
+    id: Optional[int] = None
+    name: str = ""
+    phone: str = ""
+    email: str = ""
+    address: str = ""
+    notes: str = ""
+    total_purchases: float = 0.0
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    customer_code: str = ""
+    city: str = ""
+    loyalty_points: int = 0
+    status: str = "active"
+    phone_normalized: str = ""
+
+@dataclass(slots=True)
+class Sale:
+    """Sale data model"""
+    id: Optional[int] = None
+    customer_id: Optional[int] = None
+    customer_name: str = ""
+    total_amount: float = 0.0
+    discount: float = 0.0
+    tax: float = 0.0
+    final_amount: float = 0.0
+    payment_method: str = "cash"
+    notes: str = ""
+    created_at: Optional[str] = None
+    return_of: Optional[int] = None  # set on returns: the sale they reverse
+
+@dataclass(slots=True)
+class SaleItem:
+    """Sale item data model"""
+    id: Optional[int] = None
+    sale_id: int = 0
+    product_id: int = 0
+    product_name: str = ""
+    quantity: int = 0
+    unit_price: float = 0.0
+    total_price: float = 0.0
+    unit_cost: Optional[float] = None  # product cost when sold
+
+@dataclass(slots=True)
+class StockChange:
+    """Stock, reorder level and status of a product before and after a write"""
+    product_id: int
+    name: str
+    stock_before: int
+    stock_after: int
+    min_stock_before: int
+    min_stock_after: int
+    status_before: str
+    status_after: str
+
+@dataclass(slots=True)
+class StockMovement:
+    """Stock movement ledger entry; quantity is signed (+in, -out)"""
+    id: Optional[int] = None
+    product_id: int = 0
+    movement_type: str = ""
+    quantity: int = 0
+    reference_id: Optional[int] = None
+    note: str = ""
+    created_at: Optional[str] = None
+
+# Column-order mapping
+@lru_cache(maxsize=None)
+def columns_of(model) -> Tuple[str, ...]:
+    """Field names of a model, in constructor order"""
+    return tuple(field.name for field in fields(model))
+
+@lru_cache(maxsize=None)
+def select_list(model, alias: str = "") -> str:
+    """SELECT column list matching the model's field order"""
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(prefix + name for name in columns_of(model))
+
+@lru_cache(maxsize=None)
+def row_mapper(model, columns: Tuple[str, ...]) -> Callable[[Sequence], Any]:
+    """Precompiled row -> model conversion for rows with the given columns"""
+    names = columns_of(model)
+    unknown = [column for column in columns if column not in names]
+    if unknown:
+        raise ValueError(f"{model.__name__} has no fields {', '.join(unknown)}")
+
+    if columns == names[:len(columns)]:
+        return lambda row: model(*row)
+    if len(columns) == len(names) and len(set(columns)) == len(names):
+        reorder = itemgetter(*(columns.index(name) for name in names))
+        return lambda row: model(*reorder(row))
+    return lambda row: model(**dict(zip(columns, row)))
+
+def map_rows(model, cursor) -> List[Any]:
+    """Models for the remaining rows of an executed cursor"""
+    columns = tuple(description[0] for description in cursor.description)
+    if columns == columns_of(model)[:len(columns)]:
+        return list(starmap(model, cursor))
+    return list(map(row_mapper(model, columns), cursor))
+
+def map_row(model, cursor) -> Optional[Any]:
+    """Model for the next row of an executed cursor, None when there is none"""
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return row_mapper(model, tuple(description[0] for description in cursor.description))(row)
+
+PRODUCT_COLUMNS = select_list(Product)
+CATEGORY_COLUMNS = select_list(Category)
+CUSTOMER_COLUMNS = select_list(Customer)
+SALE_COLUMNS = select_list(Sale)
+SALE_ITEM_COLUMNS = select_list(SaleItem)
+STOCK_MOVEMENT_COLUMNS = select_list(StockMovement)
+
+class ProductFrame:
+    """Product list kept as columns: typed arrays for numbers, shared strings for text"""
+
+    # SELECT list, in the order rows() yields
+    COLUMNS = "id, name, brand, category, price, stock_quantity, COALESCE(min_stock, 0), status"
+
+    __slots__ = ("ids", "names", "brands", "categories", "prices", "stock", "min_stock", "statuses")
+
+    def __init__(self):
+        self.ids = array("q")
+        self.names: List[str] = []
+        self.brands: List[Optional[str]] = []
+        self.categories: List[Optional[str]] = []
+        self.prices = array("d")
+        self.stock = array("q")
+        self.min_stock = array("q")
+        self.statuses: List[Optional[str]] = []
+
+    @classmethod
+    def from_cursor(cls, cursor, batch_size: int = 5000) -> "ProductFrame":
+        """Frame from a cursor executed with COLUMNS, read batch_size rows at a time"""
+        frame = cls()
+        # Brands, categories and statuses repeat; keep one string object per value
+        shared: Dict[Any, Any] = {}
+        share = shared.setdefault
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            ids, names, brands, categories, prices, stock, min_stock, statuses = zip(*rows)
+            frame.ids.extend(ids)
+            frame.names.extend(names)
+            frame.brands.extend(map(share, brands, brands))
+            frame.categories.extend(map(share, categories, categories))
+            frame.prices.extend(prices)
+            frame.stock.extend(stock)
+            frame.min_stock.extend(min_stock)
+            frame.statuses.extend(map(share, statuses, statuses))
+        return frame
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row(self, index: int) -> Tuple:
+        """(id, name, brand, category, price, stock, min_stock, status) at a position"""
+        return (self.ids[index], self.names[index], self.brands[index], self.categories[index],
+                self.prices[index], self.stock[index], self.min_stock[index], self.statuses[index])
+
+    def rows(self) -> Iterator[Tuple]:
+        """All rows as tuples, built as they are consumed"""
+        return zip(self.ids, self.names, self.brands, self.categories,
+                   self.prices, self.stock, self.min_stock, self.statuses)
+
+    def index_of(self, product_id: int) -> Optional[int]:
+        """Position of a product in the frame"""
+        try:
+            return self.ids.index(product_id)
+        except ValueError:
+            return None
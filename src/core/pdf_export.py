@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF Export
+تصدير PDF
+
+Multi-page PDF reports written with matplotlib's PdfPages. Tables are
+consumed from an iterator one page at a time and each page is written
+and cleared before the next is read, so memory stays flat however many
+rows a cursor yields. Every column of a page is drawn as one multi-line
+text object, which keeps long exports fast. Exports run as cancellable
+jobs.
+"""
+
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+from src.utils.logger import get_logger
+
+try:
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+except ImportError:
+    arabic_reshaper = None
+
+logger = get_logger(__name__)
+
+A4_PORTRAIT = (8.27, 11.69)   # inches
+PDF_FONT = "assets/fonts/Hayah.otf"
+
+def shape_arabic(text: str) -> str:
+    """Joined, visually ordered Arabic when the optional shaping packages are installed"""
+    if arabic_reshaper is None or not text:
+        return text
+    return get_display(arabic_reshaper.reshape(text))
+
+class ExportCancelled(Exception):
+    """Raised inside an export when its job was cancelled"""
+
+class ExportJob:
+    """Progress and cancellation of one export"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows_written = 0
+        self.pages = 0
+        self.error: Optional[str] = None
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise ExportCancelled()
+
+class PdfReportWriter:
+    """Writes a title/summary page and streamed tables to a PDF"""
+
+    def __init__(self, path: str, title: str, subtitle: str = "",
+                 dpi: int = 150, rows_per_page: int = 50,
+                 font_path: str = PDF_FONT, job: Optional[ExportJob] = None,
+                 on_page: Optional[Callable[[ExportJob], None]] = None):
+        from matplotlib.backends.backend_pdf import PdfPages
+        from matplotlib.font_manager import FontProperties
+
+        self.path = path
+        self.title = title
+        self.subtitle = subtitle
+        self.dpi = dpi
+        self.rows_per_page = rows_per_page
+        self.job = job or ExportJob(path)
+        self.on_page = on_page
+
+        if Path(font_path).exists():
+            self.font = FontProperties(fname=font_path, size=8)
+            self.heading_font = FontProperties(fname=font_path, size=14, weight="bold")
+        else:
+            self.font = FontProperties(size=8)
+            self.heading_font = FontProperties(size=14, weight="bold")
+
+        self._pdf = PdfPages(path, metadata={"Title": title})
+
+    # Pages
+    def _new_page(self, heading: str):
+        from matplotlib.figure import Figure
+
+        figure = Figure(figsize=A4_PORTRAIT, dpi=self.dpi)
+        figure.text(0.5, 0.965, shape_arabic(heading), fontproperties=self.heading_font, ha="center", va="top")
+        if self.subtitle:
+            figure.text(0.5, 0.94, shape_arabic(self.subtitle), fontproperties=self.font, ha="center", va="top")
+        figure.text(0.5, 0.02, str(self.job.pages + 1), fontproperties=self.font, ha="center", va="bottom")
+        return figure
+
+    def _save(self, figure):
+        self._pdf.savefig(figure)
+        figure.clear()
+        self.job.pages += 1
+        if self.on_page:
+            self.on_page(self.job)
+        self.job.check()
+
+    def add_summary(self, items: Sequence[Tuple[str, str]],
+                    chart: Optional[Callable[[object], None]] = None):
+        """Page with label/value pairs and an optional chart drawn on an Axes"""
+        self.job.check()
+        figure = self._new_page(self.title)
+
+        y = 0.89
+        for label, value in items:
+            figure.text(0.12, y, shape_arabic(label), fontproperties=self.font, ha="left", va="center")
+            figure.text(0.88, y, shape_arabic(value), fontproperties=self.font, ha="right", va="center")
+            y -= 0.03
+
+        if chart is not None:
+            # Drawn once, straight into the page at the export resolution
+            axes = figure.add_axes([0.12, 0.08, 0.76, max(0.2, y - 0.14)])
+            chart(axes)
+            for label in axes.get_xticklabels() + axes.get_yticklabels():
+                label.set_fontproperties(self.font)
+            axes.set_title(shape_arabic(axes.get_title()), fontproperties=self.font)
+
+        self._save(figure)
+
+    def add_table(self, title: str, headers: Sequence[str], rows: Iterable[Sequence],
+                  widths: Optional[Sequence[float]] = None, align: Optional[Sequence[str]] = None):
+        """Paginate rows; only one page of rows is held at a time"""
+        columns = len(headers)
+        widths = widths or [1.0 / columns] * columns
+        align = align or ["left"] + ["right"] * (columns - 1)
+
+        # Column anchors within the 0.06 .. 0.94 printable width
+        left = 0.06
+        anchors = []
+        for width, side in zip(widths, align):
+            span = 0.88 * width
+            anchors.append(left + span - 0.005 if side == "right" else left + 0.005)
+            left += span
+
+        page_rows: List[Sequence] = []
+
+        def flush():
+            figure = self._new_page(title)
+            for x, side, header in zip(anchors, align, headers):
+                figure.text(x, 0.91, shape_arabic(header), fontproperties=self.font,
+                            ha=side, va="top", weight="bold")
+            figure.add_artist(_rule(figure, 0.06, 0.94, 0.895))
+
+            for c, (x, side) in enumerate(zip(anchors, align)):
+                column = "\n".join(shape_arabic(str(row[c])) for row in page_rows)
+                figure.text(x, 0.885, column, fontproperties=self.font, ha=side, va="top", linespacing=1.55)
+
+            self.job.rows_written += len(page_rows)
+            page_rows.clear()
+            self._save(figure)
+
+        empty = True
+        for row in rows:
+            empty = False
+            page_rows.append(row)
+            if len(page_rows) == self.rows_per_page:
+                flush()
+        if page_rows or empty:
+            flush()
+
+    def close(self):
+        self._pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        if exc_type is not None:
+            # Do not leave a truncated file behind
+            try:
+                Path(self.path).unlink()
+            except OSError:
+                pass
+        return False
+
+def _rule(figure, x0: float, x1: float, y: float):
+    from matplotlib.lines import Line2D
+    return Line2D([x0, x1], [y, y], transform=figure.transFigure, linewidth=0.6, color="black")
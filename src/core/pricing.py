@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pricing Engine
+محرك التسعير والضرائب
+
+Line and cart totals in Decimal with one rounding rule, so checkout,
+receipts and reports produce the same numbers. Tax rates can differ per
+product category and discounts are expressed as policies: line policies
+(e.g. quantity discounts) are applied first, then the cart discount is
+spread over the lines before tax.
+"""
+
+from dataclasses import dataclass, field
+from decimal import (Decimal, ROUND_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP)
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+ZERO = Decimal("0")
+HUNDRED = Decimal("100")
+
+# Names accepted by the business.price_rounding setting
+ROUNDING_MODES = {
+    "half_up": ROUND_HALF_UP,
+    "half_even": ROUND_HALF_EVEN,
+    "down": ROUND_DOWN,
+    "up": ROUND_UP
+}
+
+def to_decimal(value) -> Decimal:
+    """Decimal from a float/int/str without binary float artifacts"""
+    if isinstance(value, Decimal):
+        return value
+    if value is None:
+        return ZERO
+    return Decimal(str(value))
+
+def to_percent(value) -> Decimal:
+    """Discount percentage clamped to 0-100"""
+    percent = to_decimal(value)
+    if percent < ZERO or percent > HUNDRED:
+        logger.warning("Discount percentage %s out of range, clamping to 0-100", value)
+        percent = min(max(percent, ZERO), HUNDRED)
+    return percent
+
+@dataclass
+class PricedItem:
+    """Input line for the engine"""
+    product_id: int
+    unit_price: Decimal
+    quantity: int
+    category: str = ""
+
+@dataclass
+class LinePrice:
+    """Priced line"""
+    product_id: int
+    quantity: int
+    unit_price: Decimal
+    gross: Decimal
+    line_discount: Decimal
+    cart_discount: Decimal
+    net: Decimal
+    tax_rate: Decimal
+    tax: Decimal
+    total: Decimal
+
+@dataclass
+class CartPrice:
+    """Priced cart"""
+    lines: List[LinePrice] = field(default_factory=list)
+    subtotal: Decimal = ZERO
+    discount: Decimal = ZERO
+    tax: Decimal = ZERO
+    total: Decimal = ZERO
+
+    def totals(self) -> Dict[str, Decimal]:
+        return {"subtotal": self.subtotal, "discount": self.discount, "tax": self.tax, "total": self.total}
+
+# Discount policies
+class DiscountPolicy:
+    """Base class; line policies return the discount for one line"""
+
+    def line_discount(self, item: PricedItem, gross: Decimal) -> Decimal:
+        return ZERO
+
+class QuantityDiscount(DiscountPolicy):
+    """Percentage off a line once its quantity reaches min_quantity"""
+
+    def __init__(self, min_quantity: int, percent, category: Optional[str] = None):
+        self.min_quantity = min_quantity
+        self.percent = to_percent(percent)
+        self.category = category
+
+    def line_discount(self, item: PricedItem, gross: Decimal) -> Decimal:
+        if item.quantity < self.min_quantity:
+            return ZERO
+        if self.category and item.category != self.category:
+            return ZERO
+        return gross * self.percent / HUNDRED
+
+class PricingEngine:
+    """Computes line and cart totals"""
+
+    def __init__(self,
+                 tax_rate=15.0,
+                 category_tax_rates: Optional[Dict[str, float]] = None,
+                 line_policies: Sequence[DiscountPolicy] = (),
+                 default_discount=0.0,
+                 rounding: str = "half_up",
+                 places: int = 2,
+                 currency_symbol: str = "ج.م"):
+        self.tax_rate = to_decimal(tax_rate)
+        self.category_tax_rates = {
+            category: to_decimal(rate) for category, rate in (category_tax_rates or {}).items()
+        }
+        self.line_policies = list(line_policies)
+        self.default_discount = to_percent(default_discount)
+        if rounding not in ROUNDING_MODES:
+            logger.warning("Unknown rounding mode %s, using half_up", rounding)
+            rounding = "half_up"
+        self.rounding = ROUNDING_MODES[rounding]
+        self.quantum = Decimal(1).scaleb(-places)
+        self.currency_symbol = currency_symbol
+
+    @classmethod
+    def from_settings(cls, settings_manager, **kwargs) -> "PricingEngine":
+        """Engine configured from the business settings"""
+        business = settings_manager.business
+        return cls(
+            tax_rate=business.tax_rate,
+            category_tax_rates=business.category_tax_rates,
+            default_discount=business.default_discount,
+            rounding=business.price_rounding,
+            currency_symbol=business.currency_symbol,
+            **kwargs
+        )
+
+    # Helpers
+    def money(self, value) -> Decimal:
+        """Round an amount to the currency precision"""
+        return to_decimal(value).quantize(self.quantum, rounding=self.rounding)
+
+    def format(self, value) -> str:
+        """Amount with the currency symbol, e.g. '12.50 ج.م'"""
+        return f"{self.money(value)} {self.currency_symbol}"
+
+    def tax_rate_for(self, category: str) -> Decimal:
+        return self.category_tax_rates.get(category or "", self.tax_rate)
+
+    def line_net(self, item: PricedItem) -> Decimal:
+        """Line amount after line discount policies (before cart discount and tax)"""
+        gross = item.unit_price * item.quantity
+        return gross - self._line_discount(item, gross)
+
+    def _cart_factor(self, discount_percent) -> Decimal:
+        """Cart discount as a fraction; None uses default_discount"""
+        if discount_percent is None:
+            return self.default_discount / HUNDRED
+        return to_percent(discount_percent) / HUNDRED
+
+    def _line_discount(self, item: PricedItem, gross: Decimal) -> Decimal:
+        # The best single line policy applies; policies do not stack
+        best = ZERO
+        for policy in self.line_policies:
+            best = max(best, policy.line_discount(item, gross))
+        return min(best, gross)
+
+    # Pricing
+    def price_items(self, items: Iterable[PricedItem], discount_percent=None) -> CartPrice:
+        """Price every line of a cart in one pass
+
+        discount_percent is the cart discount; None uses default_discount.
+        The cart discount is allocated to lines pro rata so each category is
+        taxed on its discounted amount.
+        """
+        cart_factor = self._cart_factor(discount_percent)
+
+        result = CartPrice()
+        subtotal = discount = tax = ZERO
+        for item in items:
+            gross = item.unit_price * item.quantity
+            line_discount = self._line_discount(item, gross)
+            cart_discount = (gross - line_discount) * cart_factor
+            net = gross - line_discount - cart_discount
+            rate = self.tax_rate_for(item.category)
+            line_tax = net * rate / HUNDRED
+
+            subtotal += gross
+            discount += line_discount + cart_discount
+            tax += line_tax
+
+            result.lines.append(LinePrice(
+                product_id=item.product_id,
+                quantity=item.quantity,
+                unit_price=self.money(item.unit_price),
+                gross=self.money(gross),
+                line_discount=self.money(line_discount),
+                cart_discount=self.money(cart_discount),
+                net=self.money(net),
+                tax_rate=rate,
+                tax=self.money(line_tax),
+                total=self.money(net + line_tax)
+            ))
+
+        # Totals are rounded once from the exact sums
+        result.subtotal = self.money(subtotal)
+        result.discount = self.money(discount)
+        result.tax = self.money(tax)
+        result.total = result.subtotal - result.discount + result.tax
+        return result
+
+    def price_summary(self, gross: Decimal, net_by_category: Dict[str, Decimal],
+                      discount_percent=None) -> Dict[str, Decimal]:
+        """Cart totals from running sums
+
+        gross is the sum of unit_price * quantity; net_by_category maps each
+        category to the sum of line_net over its lines. Gives the same totals
+        as price_items without visiting the lines.
+        """
+        cart_factor = self._cart_factor(discount_percent)
+
+        net_total = ZERO
+        tax = ZERO
+        for category, net in net_by_category.items():
+            discounted = net - net * cart_factor
+            net_total += discounted
+            tax += discounted * self.tax_rate_for(category) / HUNDRED
+
+        subtotal = self.money(gross)
+        discount = self.money(gross - net_total)
+        tax = self.money(tax)
+        return {"subtotal": subtotal, "discount": discount, "tax": tax, "total": subtotal - discount + tax}
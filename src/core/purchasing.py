@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Purchasing
+المشتريات
+
+Suppliers, purchase orders and goods receipts. Posting a receipt is one
+transaction of a handful of executemany statements however many lines it
+has: the receipt lines, every product's stock and weighted-average cost
+(computed by SQLite from the row's current values), the stock ledger
+movements and the order's received quantities.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.core.database import MOVEMENT_PURCHASE
+from src.core.models import StockChange, map_rows, select_list
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Purchase order statuses
+ORDER_OPEN = "ordered"
+ORDER_PARTIAL = "partial"
+ORDER_RECEIVED = "received"
+ORDER_CANCELLED = "cancelled"
+
+# Ids per IN (...) list, well under SQLite's bound-parameter limit
+_CHUNK = 500
+
+@dataclass(slots=True)
+class Supplier:
+    """Supplier data model"""
+    id: Optional[int] = None
+    name: str = ""
+    phone: str = ""
+    email: str = ""
+    address: str = ""
+    notes: str = ""
+    status: str = "active"
+    created_at: Optional[str] = None
+
+@dataclass(slots=True)
+class PurchaseOrder:
+    """Purchase order data model"""
+    id: Optional[int] = None
+    supplier_id: int = 0
+    status: str = ORDER_OPEN
+    total_cost: float = 0.0
+    expected_date: Optional[str] = None
+    notes: str = ""
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+@dataclass(slots=True)
+class PurchaseOrderItem:
+    """Purchase order line data model"""
+    id: Optional[int] = None
+    order_id: int = 0
+    product_id: int = 0
+    quantity: int = 0
+    unit_cost: float = 0.0
+    received_quantity: int = 0
+
+@dataclass(slots=True)
+class GoodsReceipt:
+    """Goods receipt data model"""
+    id: Optional[int] = None
+    supplier_id: int = 0
+    order_id: Optional[int] = None
+    reference: str = ""
+    total_cost: float = 0.0
+    line_count: int = 0
+    notes: str = ""
+    created_at: Optional[str] = None
+
+@dataclass(slots=True)
+class ReceiptLine:
+    """Units of a product ordered or received at a unit cost"""
+    product_id: int
+    quantity: int
+    unit_cost: float
+
+def merge_lines(lines: Iterable[ReceiptLine]) -> List[ReceiptLine]:
+    """One line per product, quantities summed and costs averaged by quantity"""
+    merged: Dict[int, ReceiptLine] = {}
+    for line in lines:
+        if line.quantity <= 0 or line.unit_cost < 0:
+            raise ValueError(f"Invalid line for product {line.product_id}: {line.quantity} x {line.unit_cost}")
+        current = merged.get(line.product_id)
+        if current is None:
+            merged[line.product_id] = ReceiptLine(line.product_id, line.quantity, line.unit_cost)
+        else:
+            quantity = current.quantity + line.quantity
+            current.unit_cost = (current.quantity * current.unit_cost + line.quantity * line.unit_cost) / quantity
+            current.quantity = quantity
+    return list(merged.values())
+
+class PurchasingManager:
+    """Manager for suppliers, purchase orders and goods receiving"""
+
+    def __init__(self, db_manager):
+        """Initialize purchasing manager"""
+        self.db_manager = db_manager
+        logger.info("Purchasing manager initialized")
+
+    # Suppliers
+    def add_supplier(self, supplier: Supplier) -> Optional[int]:
+        """Add a supplier; returns its id"""
+        try:
+            with self.db_manager.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                INSERT INTO suppliers (name, phone, email, address, notes, status)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """, (supplier.name, supplier.phone, supplier.email, supplier.address,
+                      supplier.notes, supplier.status))
+                conn.commit()
+                logger.info("Supplier added: %s", supplier.name)
+                return cursor.lastrowid
+
+        except Exception as e:
+            logger.error("Error adding supplier: %s", e)
+            return None
+
+    def get_suppliers(self, status: Optional[str] = "active") -> List[Supplier]:
+        """Suppliers with the given status (all when None), by name"""
+        try:
+            with self.db_manager.connect() as conn:
+                cursor = conn.cursor()
+                if status is None:
+                    cursor.execute(f"SELECT {select_list(Supplier)} FROM suppliers ORDER BY name")
+                else:
+                    cursor.execute(f"SELECT {select_list(Supplier)} FROM suppliers WHERE status = ? ORDER BY name",
+                                   (status,))
+                return map_rows(Supplier, cursor)
+
+        except Exception as e:
+            logger.error("Error getting suppliers: %s", e)
+            return []
+
+    # Purchase orders
+    def create_purchase_order(self, supplier_id: int, lines: Iterable[ReceiptLine],
+                              expected_date: Optional[str] = None, notes: str = "") -> Optional[int]:
+        """Create an open purchase order; returns its id"""
+        try:
+            lines = merge_lines(lines)
+            if not lines:
+                raise ValueError("Purchase order has no lines")
+
+            with self.db_manager.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                INSERT INTO purchase_orders (supplier_id, status, total_cost, expected_date, notes)
+                VALUES (?, ?, ?, ?, ?)
+                """, (supplier_id, ORDER_OPEN, sum(line.quantity * line.unit_cost for line in lines),
+                      expected_date, notes))
+                order_id = cursor.lastrowid
+
+                cursor.executemany("""
+                INSERT INTO purchase_order_items (order_id, product_id, quantity, unit_cost)
+                VALUES (?, ?, ?, ?)
+                """, [(order_id, line.product_id, line.quantity, line.unit_cost) for line in lines])
+
+                conn.commit()
+                logger.info("Purchase order created: %s (%d lines)", order_id, len(lines))
+                return order_id
+
+        except Exception as e:
+            logger.error("Error creating purchase order: %s", e)
+            return None
+
+    def get_purchase_orders(self, status: Optional[str] = None, limit: int = 100) -> List[PurchaseOrder]:
+        """Newest purchase orders, optionally with one status"""
+        try:
+            with self.db_manager.connect() as conn:
+                cursor = conn.cursor()
+                if status is None:
+                    cursor.execute(f"""
+                    SELECT {select_list(PurchaseOrder)} FROM purchase_orders
+                    ORDER BY created_at DESC, id DESC LIMIT ?
+                    """, (limit,))
+                else:
+                    cursor.execute(f"""
+                    SELECT {select_list(PurchaseOrder)} FROM purchase_orders
+                    WHERE status = ?
+                    ORDER BY created_at DESC, id DESC LIMIT ?
+                    """, (status, limit))
+                return map_rows(PurchaseOrder, cursor)
+
+        except Exception as e:
+            logger.error("Error getting purchase orders: %s", e)
+            return []
+
+    def get_purchase_order_items(self, order_id: int) -> List[PurchaseOrderItem]:
+        """Lines of a purchase order"""
+        try:
+            with self.db_manager.connect() as conn:
+                cursor = conn.execute(f"""
+                SELECT {select_list(PurchaseOrderItem)} FROM purchase_order_items
+                WHERE order_id = ? ORDER BY id
+                """, (order_id,))
+                return map_rows(PurchaseOrderItem, cursor)
+
+        except Exception as e:
+            logger.error("Error getting items of purchase order %s: %s", order_id, e)
+            return []
+
+    def cancel_purchase_order(self, order_id: int) -> bool:
+        """Cancel an order that is not fully received; received goods stay in stock"""
+        try:
+            with self.db_manager.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                UPDATE purchase_orders SET status = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status IN (?, ?)
+                """, (ORDER_CANCELLED, order_id, ORDER_OPEN, ORDER_PARTIAL))
+                conn.commit()
+                return cursor.rowcount > 0
+
+        except Exception as e:
+            logger.error("Error cancelling purchase order %s: %s", order_id, e)
+            return False
+
+    # Goods receiving
+    def receive_purchase_order(self, order_id: int, reference: str = "", notes: str = "") -> Optional[int]:
+        """Receive everything still outstanding on an order at the ordered costs"""
+        outstanding = [ReceiptLine(item.product_id, item.quantity - item.received_quantity, item.unit_cost)
+                       for item in self.get_purchase_order_items(order_id)
+                       if item.quantity > item.received_quantity]
+        if not outstanding:
+            logger.error("Purchase order %s has nothing outstanding", order_id)
+            return None
+        return self.receive_goods(None, outstanding, order_id=order_id, reference=reference, notes=notes)
+
+    def receive_goods(self, supplier_id: Optional[int], lines: Iterable[ReceiptLine],
+                      order_id: Optional[int] = None, reference: str = "", notes: str = "") -> Optional[int]:
+        """Post a goods receipt: stock, weighted-average cost, ledger and order progress in one transaction
+
+        supplier_id may be None when receiving against an order (the order's
+        supplier is used) and every line must then be on that order. Returns the
+        receipt id.
+        """
+        try:
+            lines = merge_lines(lines)
+            if not lines:
+                raise ValueError("Goods receipt has no lines")
+
+            with self.db_manager.connect() as conn:
+                cursor = conn.cursor()
+
+                if order_id is not None:
+                    order = cursor.execute("SELECT supplier_id, status FROM purchase_orders WHERE id = ?",
+                                           (order_id,)).fetchone()
+                    if order is None or order[1] not in (ORDER_OPEN, ORDER_PARTIAL):
+                        raise ValueError(f"Purchase order {order_id} is not open")
+                    supplier_id = supplier_id or order[0]
+                    ordered = {row[0] for row in cursor.execute(
+                        "SELECT product_id FROM purchase_order_items WHERE order_id = ?", (order_id,))}
+                    unordered = [line.product_id for line in lines if line.product_id not in ordered]
+                    if unordered:
+                        raise ValueError(f"Products not on purchase order {order_id}: {unordered[:10]}")
+                if supplier_id is None:
+                    raise ValueError("Goods receipt needs a supplier")
+
+                levels = self._stock_levels(cursor, [line.product_id for line in lines])
+                missing = [line.product_id for line in lines if line.product_id not in levels]
+                if missing:
+                    raise ValueError(f"Unknown products: {missing[:10]}")
+
+                cursor.execute("""
+                INSERT INTO goods_receipts (supplier_id, order_id, reference, total_cost, line_count, notes)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """, (supplier_id, order_id, reference, sum(line.quantity * line.unit_cost for line in lines),
+                      len(lines), notes))
+                receipt_id = cursor.lastrowid
+
+                cursor.executemany("""
+                INSERT INTO goods_receipt_items (receipt_id, product_id, quantity, unit_cost)
+                VALUES (?, ?, ?, ?)
+                """, [(receipt_id, line.product_id, line.quantity, line.unit_cost) for line in lines])
+
+                # New cost = value on hand plus value received over units after;
+                # SET expressions all see the row as it was before the update
+                cursor.executemany("""
+                UPDATE products SET
+                    cost = ROUND((MAX(stock_quantity, 0) * cost + :quantity * :unit_cost)
+                                 / (MAX(stock_quantity, 0) + :quantity), 2),
+                    stock_quantity = stock_quantity + :quantity,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = :product_id
+                """, [{"product_id": line.product_id, "quantity": line.quantity, "unit_cost": line.unit_cost}
+                      for line in lines])
+
+                self.db_manager.record_movements(cursor, [
+                    (line.product_id, MOVEMENT_PURCHASE, line.quantity, receipt_id, reference) for line in lines
+                ])
+
+                if order_id is not None:
+                    cursor.executemany("""
+                    UPDATE purchase_order_items SET received_quantity = received_quantity + ?
+                    WHERE order_id = ? AND product_id = ?
+                    """, [(line.quantity, order_id, line.product_id) for line in lines])
+                    cursor.execute("""
+                    UPDATE purchase_orders SET
+                        status = CASE WHEN EXISTS (
+                            SELECT 1 FROM purchase_order_items
+                            WHERE order_id = :order_id AND received_quantity < quantity
+                        ) THEN :partial ELSE :received END,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = :order_id
+                    """, {"order_id": order_id, "partial": ORDER_PARTIAL, "received": ORDER_RECEIVED})
+
+                conn.commit()
+                logger.info("Goods receipt %s posted: %d lines", receipt_id, len(lines))
+
+            self.db_manager.notify_stock([
+                StockChange(line.product_id, levels[line.product_id][0], levels[line.product_id][1],
+                            levels[line.product_id][1] + line.quantity,
+                            levels[line.product_id][2], levels[line.product_id][2],
+                            levels[line.product_id][3], levels[line.product_id][3])
+                for line in lines
+            ])
+            return receipt_id
+
+        except Exception as e:
+            logger.error("Error posting goods receipt: %s", e)
+            return None
+
+    @staticmethod
+    def _stock_levels(cursor, product_ids: List[int]) -> Dict[int, Tuple[str, int, int, str]]:
+        """product_id -> (name, stock, min_stock, status) before the receipt is applied"""
+        levels = {}
+        for start in range(0, len(product_ids), _CHUNK):
+            chunk = product_ids[start:start + _CHUNK]
+            cursor.execute(f"""
+            SELECT id, name, stock_quantity, COALESCE(min_stock, 0), status FROM products
+            WHERE id IN ({",".join("?" * len(chunk))})
+            """, chunk)
+            for product_id, name, stock, min_stock, status in cursor:
+                levels[product_id] = (name, stock, min_stock, status)
+        return levels
+
+    def get_goods_receipts(self, limit: int = 100) -> List[GoodsReceipt]:
+        """Newest goods receipts"""
+        try:
+            with self.db_manager.connect() as conn:
+                cursor = conn.execute(f"""
+                SELECT {select_list(GoodsReceipt)} FROM goods_receipts
+                ORDER BY created_at DESC, id DESC LIMIT ?
+                """, (limit,))
+                return map_rows(GoodsReceipt, cursor)
+
+        except Exception as e:
+            logger.error("Error getting goods receipts: %s", e)
+            return []
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQL Query Profiler
+محلل أداء الاستعلامات
+
+Opt-in statement profiler for DatabaseManager. Connections opened while
+profiling is enabled use ProfilingConnection/ProfilingCursor, which time
+execute and fetch calls and count returned rows. A trace callback sees
+every statement SQLite runs (including implicit BEGIN/COMMIT and the
+expanded text of parameterised statements). Statistics are aggregated
+per normalized SQL text; statements slower than the threshold are written
+to a slow-query log together with their EXPLAIN QUERY PLAN.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.utils.logger import get_logger
+from src.utils.instrumentation import metrics
+
+logger = get_logger(__name__)
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_SPACE_RE = re.compile(r"\s+")
+
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and replace literals so equal queries aggregate together"""
+    text = _COMMENT_RE.sub(" ", sql)
+    text = _STRING_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("IN (?)", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+@dataclass
+class QueryStat:
+    """Aggregated statistics for one normalized statement"""
+    sql: str
+    count: int = 0
+    total_ns: int = 0
+    max_ns: int = 0
+    rows: int = 0
+    slow_count: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sql": self.sql,
+            "count": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "mean_ms": (self.total_ns / self.count / 1e6) if self.count else 0.0,
+            "max_ms": self.max_ns / 1e6,
+            "rows": self.rows,
+            "slow_count": self.slow_count
+        }
+
+class _Execution:
+    """State of the statement a cursor is currently stepping through"""
+
+    __slots__ = ("stat", "sql", "params", "elapsed_ns", "rows", "done")
+
+    def __init__(self, stat: QueryStat, sql: str, params):
+        self.stat = stat
+        self.sql = sql
+        self.params = params
+        self.elapsed_ns = 0
+        self.rows = 0
+        self.done = False
+
+class QueryProfiler:
+    """Aggregates per-statement timings and writes the slow-query log"""
+
+    def __init__(self, slow_query_ms: float = 50.0, slow_log_path: str = "logs/slow_queries.log"):
+        self.slow_query_ms = slow_query_ms
+        self.slow_log_path = Path(slow_log_path) if slow_log_path else None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, QueryStat] = {}
+        self._local = threading.local()
+
+    # Aggregation
+    def _stat(self, sql: str) -> QueryStat:
+        key = normalize_sql(sql)
+        stat = self._stats.get(key)
+        if stat is None:
+            with self._lock:
+                stat = self._stats.setdefault(key, QueryStat(sql=key))
+        return stat
+
+    def begin(self, sql: str, params) -> _Execution:
+        """Start tracking a statement executed through a profiling cursor"""
+        stat = self._stat(sql)
+        with self._lock:
+            stat.count += 1
+        return _Execution(stat, sql, params)
+
+    def add(self, execution: _Execution, duration_ns: int, rows: int = 0):
+        """Add execute/fetch time and rows to a running statement"""
+        execution.elapsed_ns += duration_ns
+        execution.rows += rows
+        stat = execution.stat
+        with self._lock:
+            stat.total_ns += duration_ns
+            stat.rows += rows
+            if execution.elapsed_ns > stat.max_ns:
+                stat.max_ns = execution.elapsed_ns
+
+    def finish(self, execution: _Execution, conn: sqlite3.Connection):
+        """Statement is complete; log it if it was slow"""
+        if execution.done:
+            return
+        execution.done = True
+
+        if execution.elapsed_ns < self.slow_query_ms * 1e6:
+            return
+
+        with self._lock:
+            execution.stat.slow_count += 1
+        self._log_slow(execution, conn)
+
+    def record_untimed(self, sql: str):
+        """Count a statement seen only through the trace callback"""
+        stat = self._stat(sql)
+        with self._lock:
+            stat.count += 1
+
+    # Trace callback
+    @property
+    def in_cursor_call(self) -> bool:
+        return getattr(self._local, "depth", 0) > 0
+
+    def enter(self):
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+
+    def exit(self):
+        self._local.depth -= 1
+
+    def trace(self, statement: str):
+        """sqlite3 trace callback: remember the expanded SQL, count implicit statements"""
+        metrics.count_query(statement)
+        if getattr(self._local, "explaining", False):
+            return
+        self._local.last_statement = statement
+        if not self.in_cursor_call:
+            self.record_untimed(statement)
+
+    # Slow query log
+    def _explain(self, conn: sqlite3.Connection, sql: str, params) -> List[str]:
+        if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return []
+
+        self._local.explaining = True
+        try:
+            # Plain cursor so the plan query itself is not profiled
+            cursor = sqlite3.Cursor(conn)
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params or ())
+            return [row[-1] for row in cursor.fetchall()]
+        except Exception as e:
+            return [f"(explain failed: {e})"]
+        finally:
+            self._local.explaining = False
+
+    def _log_slow(self, execution: _Execution, conn: sqlite3.Connection):
+        plan = self._explain(conn, execution.sql, execution.params)
+        statement = getattr(self._local, "last_statement", None) or execution.sql
+        duration_ms = execution.elapsed_ns / 1e6
+
+        logger.warning("Slow query (%.1f ms, %d rows): %s", duration_ms, execution.rows,
+                       _SPACE_RE.sub(" ", statement).strip())
+
+        if not self.slow_log_path:
+            return
+
+        lines = [
+            f"# {datetime.now().isoformat(timespec='seconds')} "
+            f"duration_ms={duration_ms:.2f} rows={execution.rows}",
+            _SPACE_RE.sub(" ", statement).strip() + ";"
+        ]
+        lines.extend(f"--   {step}" for step in plan)
+
+        try:
+            with self._lock:
+                self.slow_log_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.slow_log_path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n\n")
+        except Exception as e:
+            logger.error("Error writing slow query log: %s", e)
+
+    # Reporting
+    def stats(self, sort_by: str = "total_ms", limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Aggregated statistics, most expensive first"""
+        with self._lock:
+            rows = [stat.to_dict() for stat in self._stats.values()]
+        rows.sort(key=lambda row: row.get(sort_by, 0), reverse=True)
+        return rows[:limit] if limit else rows
+
+    def report(self, limit: int = 20) -> str:
+        """Human readable table of the most expensive statements"""
+        lines = [f"{'count':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'rows':>8}  sql"]
+        for row in self.stats(limit=limit):
+            sql = row["sql"] if len(row["sql"]) <= 100 else row["sql"][:97] + "..."
+            lines.append(
+                f"{row['count']:>7} {row['total_ms']:>10.2f} {row['mean_ms']:>9.3f} "
+                f"{row['max_ms']:>9.2f} {row['rows']:>8}  {sql}"
+            )
+        return "\n".join(lines)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+class ProfilingCursor(sqlite3.Cursor):
+    """Cursor that times execute/fetch calls and counts rows"""
+
+    _execution: Optional[_Execution] = None
+
+    @property
+    def _profiler(self) -> QueryProfiler:
+        return self.connection.profiler
+
+    def _finish_current(self):
+        if self._execution is not None:
+            self._profiler.finish(self._execution, self.connection)
+            self._execution = None
+
+    def _timed(self, method, sql, params, *args):
+        profiler = self._profiler
+        self._finish_current()
+        execution = profiler.begin(sql, params)
+
+        profiler.enter()
+        start = time.perf_counter_ns()
+        try:
+            return method(self, sql, *args)
+        finally:
+            profiler.add(execution, time.perf_counter_ns() - start)
+            profiler.exit()
+            self._execution = execution
+            # No result set: the statement is already complete
+            if self.description is None:
+                self._finish_current()
+
+    def execute(self, sql, parameters=()):
+        return self._timed(sqlite3.Cursor.execute, sql, parameters, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        first = seq_of_parameters[0] if seq_of_parameters else ()
+        return self._timed(sqlite3.Cursor.executemany, sql, first, seq_of_parameters)
+
+    def _fetch(self, method, *args):
+        execution = self._execution
+        if execution is None:
+            return method(self, *args)
+
+        profiler = self._profiler
+        profiler.enter()
+        start = time.perf_counter_ns()
+        try:
+            result = method(self, *args)
+        finally:
+            profiler.exit()
+        duration = time.perf_counter_ns() - start
+
+        if isinstance(result, list):
+            rows = len(result)
+        else:
+            rows = 0 if result is None else 1
+        profiler.add(execution, duration, rows)
+        return result
+
+    def fetchone(self):
+        row = self._fetch(sqlite3.Cursor.fetchone)
+        if row is None:
+            self._finish_current()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._fetch(sqlite3.Cursor.fetchmany, size)
+        if len(rows) < size:
+            self._finish_current()
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(sqlite3.Cursor.fetchall)
+        self._finish_current()
+        return rows
+
+    def __next__(self):
+        row = self._fetch(sqlite3.Cursor.fetchone)
+        if row is None:
+            self._finish_current()
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._finish_current()
+        super().close()
+
+class ProfilingConnection(sqlite3.Connection):
+    """Connection whose cursors are profiled and whose commits are timed"""
+
+    profiler: QueryProfiler = None
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute* create their cursor in C, bypassing cursor();
+    # route them through a profiling cursor so they are timed like the rest
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        execution = self.profiler.begin("COMMIT", ())
+        self.profiler.enter()
+        start = time.perf_counter_ns()
+        try:
+            super().commit()
+        finally:
+            self.profiler.add(execution, time.perf_counter_ns() - start)
+            self.profiler.exit()
+            self.profiler.finish(execution, self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # The context manager commits from C without calling commit()
+        if exc_type is None and self.in_transaction:
+            self.commit()
+        return super().__exit__(exc_type, exc_value, traceback)
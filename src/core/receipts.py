@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Receipts
+الفواتير والطباعة
+
+The receipt template is compiled once into line descriptions. A sale is
+laid out against it and written as text, ESC/POS bytes and/or PDF by a
+background spooler, so checkout never waits for rendering or the printer.
+
+Template lines may start with style markers: "!" bold, "^" centered,
+">" right aligned. A tab splits a line into a left and a right column.
+Lines that are exactly {header}, {items} or {rule} expand to the shop
+header block, one item template per sale line, and a separator.
+"""
+
+import queue
+import string
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.core.pdf_export import PDF_FONT, shape_arabic
+from src.core.pricing import PricingEngine
+from src.utils.logger import get_logger
+from src.utils.instrumentation import metrics
+
+logger = get_logger(__name__)
+
+RECEIPT_TEMPLATE = """\
+{header}
+{rule}
+رقم الفاتورة:\t{invoice_no}
+التاريخ:\t{date}
+العميل:\t{customer}
+طريقة الدفع:\t{payment_method}
+{rule}
+{items}
+{rule}
+المجموع الفرعي:\t{subtotal}
+الخصم:\t{discount}
+الضريبة:\t{tax}
+!الإجمالي:\t{total}
+{rule}
+^{footer}"""
+
+ITEM_TEMPLATE = """\
+{name}
+  {quantity} × {unit_price}\t{total}"""
+
+RECEIPT_FORMATS = ("text", "escpos", "pdf")
+
+# ESC/POS "select character code table" numbers (Epson numbering)
+ESCPOS_CODEPAGES = {"cp437": 0, "cp850": 2, "cp720": 32, "cp864": 37, "cp1256": 50}
+
+@dataclass
+class ReceiptItem:
+    """One sold line as printed"""
+    name: str
+    quantity: int
+    unit_price: Decimal
+    total: Decimal
+
+@dataclass
+class ReceiptData:
+    """Everything printed on one receipt"""
+    invoice_no: str
+    created_at: datetime
+    customer: str
+    payment_method: str
+    items: List[ReceiptItem]
+    subtotal: Decimal
+    discount: Decimal
+    tax: Decimal
+    total: Decimal
+
+    @classmethod
+    def from_cart(cls, invoice_no, cart, customer: str, payment_method: str,
+                  created_at: Optional[datetime] = None) -> "ReceiptData":
+        """Receipt for a cart, priced by the cart's engine"""
+        priced = cart.price()
+        items = [
+            ReceiptItem(line.name, price.quantity, price.unit_price, price.gross)
+            for line, price in zip(cart, priced.lines)
+        ]
+        return cls(str(invoice_no), created_at or datetime.now(), customer, payment_method,
+                   items, priced.subtotal, priced.discount, priced.tax, priced.total)
+
+@dataclass
+class ReceiptLine:
+    """Laid-out receipt line"""
+    text: str
+    align: str = "left"
+    bold: bool = False
+
+@dataclass
+class _CompiledLine:
+    kind: str           # text, header, items or rule
+    align: str
+    bold: bool
+    parts: Tuple        # (literal, field, format_spec, conversion) from string.Formatter.parse
+
+class ReceiptTemplate:
+    """Receipt template parsed once and filled per sale"""
+
+    def __init__(self, template: str = RECEIPT_TEMPLATE, item_template: str = ITEM_TEMPLATE):
+        self.lines = self._compile(template)
+        self.item_lines = self._compile(item_template)
+
+    @staticmethod
+    def _compile(source: str) -> List[_CompiledLine]:
+        formatter = string.Formatter()
+        compiled = []
+        for raw in source.splitlines():
+            align, bold = "left", False
+            while raw[:1] in ("!", "^", ">"):
+                marker, raw = raw[0], raw[1:]
+                if marker == "!":
+                    bold = True
+                else:
+                    align = "center" if marker == "^" else "right"
+
+            stripped = raw.strip()
+            if stripped in ("{header}", "{items}", "{rule}"):
+                compiled.append(_CompiledLine(stripped[1:-1], align, bold, ()))
+            else:
+                compiled.append(_CompiledLine("text", align, bold, tuple(formatter.parse(raw))))
+        return compiled
+
+    @staticmethod
+    def _fill(parts: Tuple, values: Dict[str, Any]) -> str:
+        out = []
+        for literal, field_name, format_spec, _ in parts:
+            out.append(literal)
+            if field_name is not None:
+                value = values.get(field_name, "")
+                out.append(format(value, format_spec) if format_spec else str(value))
+        return "".join(out)
+
+    def render(self, values: Dict[str, Any], items: Sequence[Dict[str, Any]],
+               header: List[ReceiptLine], width: int) -> List[ReceiptLine]:
+        """Lay out one receipt"""
+        lines: List[ReceiptLine] = []
+        for line in self.lines:
+            if line.kind == "header":
+                lines.extend(header)
+            elif line.kind == "rule":
+                lines.append(ReceiptLine("-" * width))
+            elif line.kind == "items":
+                for item in items:
+                    for item_line in self.item_lines:
+                        lines.append(ReceiptLine(self._fill(item_line.parts, item), item_line.align, item_line.bold))
+            else:
+                lines.append(ReceiptLine(self._fill(line.parts, values), line.align, line.bold))
+        return lines
+
+# Output formats
+def layout_line(line: ReceiptLine, width: int) -> str:
+    """Fixed-width text for a receipt line"""
+    if "\t" in line.text:
+        left, right = line.text.split("\t", 1)
+        gap = width - len(left) - len(right)
+        return f"{left}{' ' * max(1, gap)}{right}"
+    if line.align == "center":
+        return line.text.center(width).rstrip()
+    if line.align == "right":
+        return line.text.rjust(width)
+    return line.text
+
+def render_text(lines: Sequence[ReceiptLine], width: int) -> str:
+    return "\n".join(layout_line(line, width) for line in lines) + "\n"
+
+def render_escpos(lines: Sequence[ReceiptLine], width: int, encoding: str = "cp864") -> bytes:
+    """ESC/POS byte stream: init, code page, lines with bold toggles, feed and cut"""
+    out = bytearray(b"\x1b@")
+    codepage = ESCPOS_CODEPAGES.get(encoding)
+    if codepage is not None:
+        out += b"\x1bt" + bytes([codepage])
+
+    for line in lines:
+        if line.bold:
+            out += b"\x1bE\x01"
+        out += layout_line(line, width).encode(encoding, errors="replace") + b"\n"
+        if line.bold:
+            out += b"\x1bE\x00"
+
+    # Feed past the cutter, then partial cut
+    out += b"\x1bd\x04\x1dV\x01"
+    return bytes(out)
+
+def render_pdf(lines: Sequence[ReceiptLine], path: Path, font_path: str = PDF_FONT):
+    """80 mm wide PDF receipt"""
+    from matplotlib.figure import Figure
+    from matplotlib.font_manager import FontProperties
+
+    line_height = 0.17   # inches
+    margin = 0.25
+    width_in = 3.15
+    height_in = 2 * margin + line_height * max(1, len(lines))
+
+    if Path(font_path).exists():
+        regular = FontProperties(fname=font_path, size=8)
+        bold = FontProperties(fname=font_path, size=9, weight="bold")
+    else:
+        regular = FontProperties(size=8)
+        bold = FontProperties(size=9, weight="bold")
+
+    figure = Figure(figsize=(width_in, height_in))
+    left_x, right_x = 0.06, 0.94
+    for i, line in enumerate(lines):
+        y = 1 - (margin + line_height * (i + 0.5)) / height_in
+        font = bold if line.bold else regular
+        if set(line.text) == {"-"}:
+            figure.add_artist(_rule(figure, left_x, right_x, y))
+        elif "\t" in line.text:
+            left, right = line.text.split("\t", 1)
+            figure.text(left_x, y, shape_arabic(left), fontproperties=font, ha="left", va="center")
+            figure.text(right_x, y, shape_arabic(right), fontproperties=font, ha="right", va="center")
+        else:
+            x, ha = {"center": (0.5, "center"), "right": (right_x, "right")}.get(line.align, (left_x, "left"))
+            figure.text(x, y, shape_arabic(line.text), fontproperties=font, ha=ha, va="center")
+
+    figure.savefig(path, format="pdf")
+
+def _rule(figure, x0: float, x1: float, y: float):
+    from matplotlib.lines import Line2D
+    return Line2D([x0, x1], [y, y], transform=figure.transFigure, linewidth=0.5, linestyle="--", color="black")
+
+class ReceiptRenderer:
+    """Lays out receipts with the compiled template and a cached shop header"""
+
+    def __init__(self, settings_manager, template: Optional[ReceiptTemplate] = None):
+        self.settings_manager = settings_manager
+        self.template = template or ReceiptTemplate()
+        self._lock = threading.Lock()
+        self._header: Optional[List[ReceiptLine]] = None
+        self._pricing: Optional[PricingEngine] = None
+        self.settings_manager.subscribe(self._on_settings_changed)
+
+    def _on_settings_changed(self, category, changes):
+        with self._lock:
+            if category in ("shop_info", "receipt"):
+                self._header = None
+            if category == "business":
+                self._pricing = None
+
+    @property
+    def width(self) -> int:
+        return int(self.settings_manager.receipt.width)
+
+    def header(self) -> List[ReceiptLine]:
+        """Shop header block, rebuilt only when shop info changes"""
+        with self._lock:
+            if self._header is None:
+                shop = self.settings_manager.shop_info
+                header = [ReceiptLine(shop.name, "center", True)]
+                for text in (shop.address, shop.phone, shop.email):
+                    if text:
+                        header.append(ReceiptLine(text, "center"))
+                if shop.tax_number:
+                    header.append(ReceiptLine(f"الرقم الضريبي: {shop.tax_number}", "center"))
+                self._header = header
+            return self._header
+
+    def pricing(self) -> PricingEngine:
+        with self._lock:
+            if self._pricing is None:
+                self._pricing = PricingEngine.from_settings(self.settings_manager)
+            return self._pricing
+
+    def layout(self, receipt: ReceiptData) -> List[ReceiptLine]:
+        money = self.pricing().format
+        values = {
+            "invoice_no": receipt.invoice_no,
+            "date": receipt.created_at.strftime("%Y-%m-%d %H:%M"),
+            "customer": receipt.customer,
+            "payment_method": receipt.payment_method,
+            "subtotal": money(receipt.subtotal),
+            "discount": money(receipt.discount),
+            "tax": money(receipt.tax),
+            "total": money(receipt.total),
+            "footer": self.settings_manager.receipt.footer
+        }
+        items = [
+            {"name": item.name, "quantity": item.quantity,
+             "unit_price": money(item.unit_price), "total": money(item.total)}
+            for item in receipt.items
+        ]
+        return self.template.render(values, items, self.header(), self.width)
+
+@dataclass
+class PrintJob:
+    """Queued receipt and what became of it"""
+    receipt: ReceiptData
+    formats: Tuple[str, ...]
+    on_done: Optional[Callable[["PrintJob"], None]] = None
+    widget: Any = None
+    outputs: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+class PrintSpooler:
+    """Renders and prints receipts on a background thread, in submission order"""
+
+    def __init__(self, renderer: ReceiptRenderer):
+        self.renderer = renderer
+        self._queue: "queue.Queue[Optional[PrintJob]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, receipt: ReceiptData, formats: Optional[Sequence[str]] = None,
+               on_done: Optional[Callable[[PrintJob], None]] = None, widget=None) -> PrintJob:
+        """Queue a receipt; returns immediately
+
+        on_done receives the finished job (through widget.after when a
+        widget is given, so the callback runs on the Tk thread).
+        """
+        if formats is None:
+            formats = self.renderer.settings_manager.receipt.formats
+        job = PrintJob(receipt, tuple(f for f in formats if f in RECEIPT_FORMATS), on_done, widget)
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="receipt-spooler", daemon=True)
+                self._thread.start()
+        self._queue.put(job)
+        return job
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._process(job)
+            finally:
+                self._queue.task_done()
+
+    def _process(self, job: PrintJob):
+        settings = self.renderer.settings_manager.receipt
+        try:
+            with metrics.span("receipts.print"):
+                lines = self.renderer.layout(job.receipt)
+                width = self.renderer.width
+                output_dir = Path(settings.output_dir)
+                output_dir.mkdir(parents=True, exist_ok=True)
+                stem = output_dir / f"receipt_{job.receipt.invoice_no}"
+
+                if "text" in job.formats:
+                    path = stem.with_suffix(".txt")
+                    path.write_text(render_text(lines, width), encoding="utf-8")
+                    job.outputs.append(str(path))
+
+                if "escpos" in job.formats or settings.printer_path:
+                    data = render_escpos(lines, width, settings.encoding)
+                    if "escpos" in job.formats:
+                        path = stem.with_suffix(".bin")
+                        path.write_bytes(data)
+                        job.outputs.append(str(path))
+                    if settings.printer_path:
+                        # Device nodes (/dev/usb/lp0, \\.\COM3) and spool files alike
+                        with open(settings.printer_path, "ab") as printer:
+                            printer.write(data)
+                        job.outputs.append(settings.printer_path)
+
+                if "pdf" in job.formats:
+                    path = stem.with_suffix(".pdf")
+                    render_pdf(lines, path)
+                    job.outputs.append(str(path))
+
+            logger.info("Receipt %s printed: %s", job.receipt.invoice_no, ", ".join(job.outputs))
+        except Exception as e:
+            job.error = str(e)
+            logger.error("Error printing receipt %s: %s", job.receipt.invoice_no, e)
+
+        if job.on_done:
+            try:
+                if job.widget is not None:
+                    job.widget.after(0, job.on_done, job)
+                else:
+                    job.on_done(job)
+            except Exception as e:
+                logger.warning("Receipt callback failed: %s", e)
+
+    def pending(self) -> int:
+        return self._queue.unfinished_tasks
+
+    def stop(self, timeout: float = 10.0):
+        """Finish queued jobs and stop the worker"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
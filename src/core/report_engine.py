@@ -0,0 +1,596 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Report Engine
+محرك التقارير
+
+Sales, product, customer, financial and inventory reports computed with
+set-based SQL over a date range. Results are cached per (report, range,
+data version), so reopening a report costs nothing until something is
+committed, and reports are built on a worker thread for the UI. Money
+figures are rounded by the pricing engine, so they match checkout.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.core.database import LOW_STOCK_FILTER
+from src.core.pdf_export import ExportCancelled, ExportJob, PdfReportWriter
+from src.core.pricing import PricingEngine, to_decimal
+from src.utils.logger import get_logger
+from src.utils.instrumentation import metrics
+
+logger = get_logger(__name__)
+
+# Period names offered by the reports view -> number of days
+PERIOD_DAYS = {
+    "اليوم": 1,
+    "أسبوع": 7,
+    "شهر": 30,
+    "3 أشهر": 90,
+    "6 أشهر": 180,
+    "سنة": 365
+}
+
+TOP_LIMIT = 10
+
+# RFM segments in display order -> label
+RFM_SEGMENTS = {
+    "champions": "الأبطال",
+    "loyal": "عملاء أوفياء",
+    "new": "عملاء جدد",
+    "attention": "يحتاجون اهتماماً",
+    "at_risk": "معرضون للفقد",
+    "lost": "مفقودون"
+}
+
+@dataclass(frozen=True)
+class DateRange:
+    """Half-open day range [start, end)"""
+    start: date
+    end: date
+
+    @classmethod
+    def last_days(cls, days: int, today: Optional[date] = None) -> "DateRange":
+        """The given number of days up to and including today"""
+        today = today or date.today()
+        return cls(today - timedelta(days=days - 1), today + timedelta(days=1))
+
+    @classmethod
+    def for_period(cls, period: str, today: Optional[date] = None) -> "DateRange":
+        return cls.last_days(PERIOD_DAYS.get(period, 30), today)
+
+    @property
+    def params(self) -> Tuple[str, str]:
+        """Bounds for comparisons against created_at text"""
+        return self.start.isoformat(), self.end.isoformat()
+
+    @property
+    def label(self) -> str:
+        return f"{self.start.isoformat()} - {(self.end - timedelta(days=1)).isoformat()}"
+
+@dataclass
+class ExportTable:
+    """Table section of an exported report"""
+    title: str
+    headers: Sequence[str]
+    rows: Iterable[Sequence]
+    widths: Optional[Sequence[float]] = None
+
+class ReportEngine:
+    """Builds and caches reports"""
+
+    def __init__(self, db_manager, settings_manager=None, max_cached: int = 32):
+        self.db_manager = db_manager
+        self.settings_manager = settings_manager
+        self.pricing = PricingEngine.from_settings(settings_manager) if settings_manager else PricingEngine()
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reports")
+        # Long exports must not hold up report windows
+        self._export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-export")
+
+        self.reports: Dict[str, Callable[[DateRange], Dict[str, Any]]] = {
+            "sales": self._sales_report,
+            "products": self._products_report,
+            "customers": self._customers_report,
+            "financial": self._financial_report,
+            "inventory": self._inventory_report
+        }
+
+        if settings_manager is not None:
+            settings_manager.subscribe(self._on_settings_changed)
+
+    def _on_settings_changed(self, category, changes):
+        """Rebuild the pricing engine; cached reports were rounded by the old one"""
+        if category != "business":
+            return
+        self.pricing = PricingEngine.from_settings(self.settings_manager)
+        self.clear_cache()
+
+    # Running
+    def run(self, name: str, date_range: DateRange) -> Dict[str, Any]:
+        """Report result, from the cache when nothing changed since it was built"""
+        if name not in self.reports:
+            raise KeyError(f"Unknown report: {name}")
+
+        version = self.db_manager.data_version()
+        key = (name, date_range, version)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                metrics.incr("reports.cache_hit")
+                return cached
+
+        with metrics.span(f"reports.{name}"):
+            result = self.reports[name](date_range)
+
+        if version[0] >= 0:
+            with self._lock:
+                self._cache[key] = result
+                while len(self._cache) > self.max_cached:
+                    self._cache.popitem(last=False)
+        return result
+
+    def submit(self, name: str, date_range: DateRange,
+               on_ready: Callable[[Dict[str, Any]], None],
+               on_error: Optional[Callable[[Exception], None]] = None,
+               widget=None) -> Future:
+        """Build a report on the worker thread
+
+        Callbacks go through widget.after when a widget is given, so they
+        run on the Tk thread.
+        """
+        def deliver(callback, value):
+            if callback is None:
+                return
+            try:
+                if widget is not None:
+                    widget.after(0, callback, value)
+                else:
+                    callback(value)
+            except Exception as e:
+                # The window may have been closed meanwhile
+                logger.warning("Report callback failed: %s", e)
+
+        def job():
+            try:
+                result = self.run(name, date_range)
+            except Exception as e:
+                logger.error("Error building %s report: %s", name, e)
+                deliver(on_error, e)
+                return None
+            deliver(on_ready, result)
+            return result
+
+        return self._executor.submit(job)
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _query(self, query: str, params: Tuple = ()):
+        # A failed query must fail the report, not cache it as zeros
+        return self.db_manager.fetch_all(query, params)
+
+    def _one(self, query: str, params: Tuple = ()):
+        rows = self._query(query, params)
+        return rows[0] if rows else None
+
+    # Reports
+    def _sales_report(self, date_range: DateRange) -> Dict[str, Any]:
+        params = date_range.params
+
+        total, invoices, average, largest = self._one("""
+        SELECT COALESCE(SUM(final_amount), 0), COUNT(*) - COUNT(return_of),
+               COALESCE(AVG(CASE WHEN return_of IS NULL THEN final_amount END), 0), COALESCE(MAX(final_amount), 0)
+        FROM sales
+        WHERE created_at >= ? AND created_at < ?
+        """, params) or (0, 0, 0, 0)
+
+        daily = self._query("""
+        SELECT date(created_at) AS day, SUM(final_amount), COUNT(*) - COUNT(return_of)
+        FROM sales
+        WHERE created_at >= ? AND created_at < ?
+        GROUP BY day
+        ORDER BY day
+        """, params)
+
+        top_products = self._query("""
+        SELECT si.product_name,
+               SUM(si.quantity) AS quantity,
+               SUM(si.total_price) AS revenue,
+               100.0 * SUM(si.total_price) / SUM(SUM(si.total_price)) OVER () AS share
+        FROM sale_items si
+        JOIN sales s ON s.id = si.sale_id
+        WHERE s.created_at >= ? AND s.created_at < ?
+        GROUP BY si.product_id
+        ORDER BY revenue DESC
+        LIMIT ?
+        """, params + (TOP_LIMIT,))
+
+        money = self.pricing.money
+        return {
+            "total_sales": money(total),
+            "invoice_count": invoices,
+            "average_invoice": money(average),
+            "largest_invoice": money(largest),
+            "daily": daily,
+            "top_products": top_products
+        }
+
+    def _products_report(self, date_range: DateRange) -> Dict[str, Any]:
+        total, low_stock = self._one(f"""
+        SELECT COUNT(*), COALESCE(SUM({LOW_STOCK_FILTER}), 0)
+        FROM products
+        """) or (0, 0)
+
+        sold = self._one("""
+        SELECT COUNT(DISTINCT si.product_id)
+        FROM sale_items si
+        JOIN sales s ON s.id = si.sale_id
+        WHERE s.created_at >= ? AND s.created_at < ? AND si.quantity > 0
+        """, date_range.params)
+
+        low_stock_items = self._query(f"""
+        SELECT name, stock_quantity, min_stock
+        FROM products
+        WHERE {LOW_STOCK_FILTER}
+        ORDER BY stock_quantity, name
+        LIMIT 20
+        """)
+
+        return {
+            "total_products": total,
+            "products_sold": sold[0] if sold else 0,
+            "low_stock_count": low_stock,
+            "low_stock_items": low_stock_items
+        }
+
+    def _customers_report(self, date_range: DateRange) -> Dict[str, Any]:
+        params = date_range.params
+
+        total, new = self._one("""
+        SELECT COUNT(*), COALESCE(SUM(created_at >= ? AND created_at < ?), 0)
+        FROM customers
+        """, params) or (0, 0)
+
+        active, spent = self._one("""
+        SELECT COUNT(DISTINCT customer_id), COALESCE(SUM(final_amount), 0)
+        FROM sales
+        WHERE customer_id IS NOT NULL AND created_at >= ? AND created_at < ?
+        """, params) or (0, 0)
+
+        # Lifetime figures come from customer_stats, not from sales
+        top_customers = self._query("""
+        SELECT c.name, top.visit_count, top.total_spent / top.visit_count, top.last_purchase, top.total_spent
+        FROM (
+            SELECT * FROM customer_stats
+            WHERE visit_count > 0
+            ORDER BY total_spent DESC
+            LIMIT ?
+        ) top
+        JOIN customers c ON c.id = top.customer_id
+        ORDER BY top.total_spent DESC
+        """, (TOP_LIMIT,))
+
+        # Recency, frequency and monetary quintiles (5 = best)
+        segments = dict((row[0], row[1:]) for row in self._query("""
+        WITH scored AS (
+            SELECT total_spent,
+                   NTILE(5) OVER (ORDER BY last_purchase) AS r,
+                   NTILE(5) OVER (ORDER BY visit_count) AS f,
+                   NTILE(5) OVER (ORDER BY total_spent) AS m
+            FROM customer_stats
+            WHERE visit_count > 0
+        )
+        SELECT CASE
+                   WHEN r >= 4 AND f >= 4 AND m >= 3 THEN 'champions'
+                   WHEN r <= 2 AND f >= 3 THEN 'at_risk'
+                   WHEN f >= 4 THEN 'loyal'
+                   WHEN r >= 4 AND f <= 2 THEN 'new'
+                   WHEN r <= 2 THEN 'lost'
+                   ELSE 'attention'
+               END AS segment,
+               COUNT(*), SUM(total_spent)
+        FROM scored
+        GROUP BY segment
+        """))
+        rfm = [(label,) + tuple(segments.get(key, (0, 0))) for key, label in RFM_SEGMENTS.items()]
+
+        return {
+            "total_customers": total,
+            "new_customers": new,
+            "active_customers": active,
+            "average_customer_value": self.pricing.money(to_decimal(spent) / active if active else 0),
+            "top_customers": top_customers,
+            "rfm": rfm
+        }
+
+    def _financial_report(self, date_range: DateRange) -> Dict[str, Any]:
+        params = date_range.params
+
+        monthly = self._query("""
+        WITH revenue AS (
+            SELECT strftime('%Y-%m', created_at) AS month, SUM(final_amount) AS amount
+            FROM sales
+            WHERE created_at >= ? AND created_at < ?
+            GROUP BY month
+        ),
+        goods AS (
+            SELECT strftime('%Y-%m', s.created_at) AS month, SUM(si.quantity * si.unit_cost) AS amount
+            FROM sale_items si
+            JOIN sales s ON s.id = si.sale_id
+            WHERE s.created_at >= ? AND s.created_at < ?
+            GROUP BY month
+        ),
+        spending AS (
+            SELECT substr(day, 1, 7) AS month, SUM(amount) AS amount
+            FROM expense_daily
+            WHERE day >= ? AND day < ?
+            GROUP BY month
+        ),
+        months AS (
+            SELECT month FROM revenue UNION SELECT month FROM spending
+        )
+        SELECT months.month,
+               COALESCE(revenue.amount, 0),
+               COALESCE(goods.amount, 0) + COALESCE(spending.amount, 0)
+        FROM months
+        LEFT JOIN revenue ON revenue.month = months.month
+        LEFT JOIN goods ON goods.month = months.month
+        LEFT JOIN spending ON spending.month = months.month
+        ORDER BY months.month
+        """, params * 3)
+
+        expense_categories = self._query("""
+        SELECT category, SUM(amount), SUM(entries)
+        FROM expense_daily
+        WHERE day >= ? AND day < ?
+        GROUP BY category
+        ORDER BY 2 DESC
+        """, params)
+
+        # Rounded per month so the totals add up to the rows shown
+        money = self.pricing.money
+        monthly = [(month, money(revenue), money(costs)) for month, revenue, costs in monthly]
+        monthly = [(month, revenue, costs, revenue - costs) for month, revenue, costs in monthly]
+        revenue = sum((row[1] for row in monthly), money(0))
+        costs = sum((row[2] for row in monthly), money(0))
+        profit = revenue - costs
+
+        return {
+            "revenue": revenue,
+            "costs": costs,
+            "profit": profit,
+            "margin": float(100 * profit / revenue) if revenue else 0.0,
+            "monthly": monthly,
+            "expense_categories": expense_categories
+        }
+
+    def _inventory_report(self, date_range: DateRange) -> Dict[str, Any]:
+        # Current stock; the range does not apply
+        row = self._one("""
+        SELECT COUNT(*),
+               COALESCE(SUM(stock_quantity * cost), 0),
+               COALESCE(AVG(price), 0),
+               COALESCE(SUM(stock_quantity > min_stock), 0),
+               COALESCE(SUM(stock_quantity > 0 AND stock_quantity <= min_stock), 0),
+               COALESCE(SUM(stock_quantity <= 0), 0)
+        FROM products
+        """) or (0, 0, 0, 0, 0, 0)
+
+        items, value, average_price, available, low, out = row
+        return {
+            "item_count": items,
+            "stock_value": self.pricing.money(value),
+            "average_price": self.pricing.money(average_price),
+            "available": available,
+            "low_stock": low,
+            "out_of_stock": out
+        }
+
+    # PDF export
+    def _stream(self, query: str, params: Tuple, formatter: Callable[[Tuple], Sequence]):
+        return (formatter(row) for row in self.db_manager.iter_query(query, params))
+
+    def _export_layout(self, name: str, date_range: DateRange, money: Callable[[Any], str]):
+        """Summary lines, chart and tables of a report's PDF"""
+        data = self.run(name, date_range)
+        params = date_range.params
+        chart = None
+        tables: List[ExportTable] = []
+
+        if name == "sales":
+            summary = [
+                ("إجمالي المبيعات", money(data["total_sales"])),
+                ("عدد الفواتير", f"{data['invoice_count']:,}"),
+                ("متوسط الفاتورة", money(data["average_invoice"])),
+                ("أعلى فاتورة", money(data["largest_invoice"]))
+            ]
+            daily = data["daily"]
+
+            def chart(axes):
+                axes.plot(range(len(daily)), [row[1] for row in daily], linewidth=1.5, color="#3B8ED0")
+                step = max(1, len(daily) // 8)
+                axes.set_xticks(range(0, len(daily), step))
+                axes.set_xticklabels([row[0] for row in daily][::step], rotation=30, ha="right")
+                axes.set_title("المبيعات اليومية")
+                axes.grid(True, alpha=0.3)
+
+            tables.append(ExportTable(
+                "تفاصيل المبيعات",
+                ["التاريخ", "الفاتورة", "المنتج", "الكمية", "السعر", "الإجمالي"],
+                self._stream("""
+                SELECT s.created_at, s.id, si.product_name, si.quantity, si.unit_price, si.total_price
+                FROM sales s
+                JOIN sale_items si ON si.sale_id = s.id
+                WHERE s.created_at >= ? AND s.created_at < ?
+                ORDER BY s.created_at, s.id, si.id
+                """, params, lambda r: (r[0][:16], r[1], r[2], r[3], money(r[4]), money(r[5]))),
+                [0.18, 0.1, 0.34, 0.08, 0.15, 0.15]
+            ))
+
+        elif name == "products":
+            summary = [
+                ("إجمالي المنتجات", f"{data['total_products']:,}"),
+                ("منتجات مباعة في الفترة", f"{data['products_sold']:,}"),
+                ("مخزون منخفض", f"{data['low_stock_count']:,}")
+            ]
+            tables.append(ExportTable(
+                "المنتجات",
+                ["المنتج", "الماركة", "الفئة", "المخزون", "المباع"],
+                self._stream("""
+                SELECT p.name, p.brand, p.category, p.stock_quantity, COALESCE(sold.quantity, 0)
+                FROM products p
+                LEFT JOIN (
+                    SELECT si.product_id, SUM(si.quantity) AS quantity
+                    FROM sale_items si
+                    JOIN sales s ON s.id = si.sale_id
+                    WHERE s.created_at >= ? AND s.created_at < ?
+                    GROUP BY si.product_id
+                ) sold ON sold.product_id = p.id
+                ORDER BY p.name
+                """, params, lambda r: (r[0], r[1] or "", r[2] or "", r[3], r[4])),
+                [0.4, 0.17, 0.17, 0.13, 0.13]
+            ))
+
+        elif name == "customers":
+            summary = [
+                ("إجمالي العملاء", f"{data['total_customers']:,}"),
+                ("عملاء جدد في الفترة", f"{data['new_customers']:,}"),
+                ("عملاء نشطون", f"{data['active_customers']:,}"),
+                ("متوسط قيمة العميل", money(data["average_customer_value"]))
+            ]
+            tables.append(ExportTable(
+                "مشتريات العملاء",
+                ["العميل", "الهاتف", "الفواتير", "المشتريات"],
+                self._stream("""
+                SELECT c.name, c.phone, COUNT(s.id) - COUNT(s.return_of), COALESCE(SUM(s.final_amount), 0) AS total
+                FROM customers c
+                LEFT JOIN sales s ON s.customer_id = c.id AND s.created_at >= ? AND s.created_at < ?
+                GROUP BY c.id
+                ORDER BY total DESC
+                """, params, lambda r: (r[0], r[1] or "", r[2], money(r[3]))),
+                [0.4, 0.2, 0.15, 0.25]
+            ))
+            tables.append(ExportTable(
+                "شرائح العملاء (RFM)",
+                ["الشريحة", "العملاء", "المشتريات"],
+                ((label, f"{count:,}", money(spent)) for label, count, spent in data["rfm"]),
+                [0.5, 0.2, 0.3]
+            ))
+
+        elif name == "financial":
+            summary = [
+                ("إجمالي الإيرادات", money(data["revenue"])),
+                ("التكاليف", money(data["costs"])),
+                ("صافي الربح", money(data["profit"])),
+                ("هامش الربح", f"{data['margin']:.1f}%")
+            ]
+            monthly = data["monthly"]
+
+            def chart(axes):
+                positions = range(len(monthly))
+                axes.bar([p - 0.2 for p in positions], [float(row[1]) for row in monthly], width=0.4, color="#27ae60")
+                axes.bar([p + 0.2 for p in positions], [float(row[2]) for row in monthly], width=0.4, color="#f39c12")
+                axes.set_xticks(list(positions))
+                axes.set_xticklabels([row[0] for row in monthly], rotation=30, ha="right")
+                axes.set_title("الإيرادات والتكاليف الشهرية")
+                axes.grid(True, axis="y", alpha=0.3)
+
+            tables.append(ExportTable(
+                "التفصيل الشهري",
+                ["الشهر", "الإيرادات", "التكاليف", "الربح"],
+                ((month, money(revenue), money(costs), money(profit)) for month, revenue, costs, profit in monthly)
+            ))
+            if data["expense_categories"]:
+                tables.append(ExportTable(
+                    "المصروفات حسب الفئة",
+                    ["الفئة", "المبلغ", "عدد القيود"],
+                    ((category, money(amount), f"{entries:,}") for category, amount, entries in data["expense_categories"]),
+                    [0.5, 0.3, 0.2]
+                ))
+
+        elif name == "inventory":
+            summary = [
+                ("قيمة المخزون الإجمالية", money(data["stock_value"])),
+                ("عدد الأصناف", f"{data['item_count']:,}"),
+                ("متوفر", f"{data['available']:,}"),
+                ("مخزون منخفض", f"{data['low_stock']:,}"),
+                ("نفد المخزون", f"{data['out_of_stock']:,}")
+            ]
+            tables.append(ExportTable(
+                "المخزون",
+                ["المنتج", "الفئة", "المخزون", "الحد الأدنى", "القيمة"],
+                self._stream("""
+                SELECT name, category, stock_quantity, min_stock, stock_quantity * cost
+                FROM products
+                ORDER BY name
+                """, (), lambda r: (r[0], r[1] or "", r[2], r[3], money(r[4]))),
+                [0.4, 0.17, 0.13, 0.13, 0.17]
+            ))
+
+        else:
+            raise KeyError(f"Unknown report: {name}")
+
+        return summary, chart, tables
+
+    def export_pdf(self, name: str, date_range: DateRange, path: str, title: str,
+                   money: Callable[[Any], str], job: Optional[ExportJob] = None,
+                   on_page: Optional[Callable[[ExportJob], None]] = None, dpi: int = 150) -> ExportJob:
+        """Write a report to PDF on the calling thread"""
+        job = job or ExportJob(path)
+        summary, chart, tables = self._export_layout(name, date_range, money)
+
+        with metrics.span(f"reports.export.{name}"):
+            with PdfReportWriter(path, title, date_range.label, dpi=dpi, job=job, on_page=on_page) as writer:
+                writer.add_summary(summary, chart)
+                for table in tables:
+                    writer.add_table(table.title, table.headers, table.rows, table.widths)
+
+        logger.info("Exported %s report to %s: %d rows, %d pages", name, path, job.rows_written, job.pages)
+        return job
+
+    def export_pdf_async(self, name: str, date_range: DateRange, path: str, title: str,
+                         money: Callable[[Any], str],
+                         on_done: Optional[Callable[[ExportJob], None]] = None,
+                         on_progress: Optional[Callable[[ExportJob], None]] = None,
+                         widget=None) -> ExportJob:
+        """Start an export on the export worker; cancel it with job.cancel()
+
+        on_done gets the job (job.error is set on failure, job.cancelled
+        after a cancel); callbacks go through widget.after when given.
+        """
+        job = ExportJob(path)
+
+        def deliver(callback):
+            if callback is None:
+                return
+            try:
+                if widget is not None:
+                    widget.after(0, callback, job)
+                else:
+                    callback(job)
+            except Exception as e:
+                logger.warning("Export callback failed: %s", e)
+
+        def run():
+            try:
+                self.export_pdf(name, date_range, path, title, money, job,
+                                on_page=lambda j: deliver(on_progress))
+            except ExportCancelled:
+                logger.info("Export of %s report cancelled", name)
+            except Exception as e:
+                job.error = str(e)
+                logger.error("Error exporting %s report: %s", name, e)
+            deliver(on_done)
+
+        self._export_executor.submit(run)
+        return job
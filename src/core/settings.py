@@ -6,9 +6,14 @@ Settings Manager
 """
 
 import json
+import os
+import tempfile
+import threading
+import time
+import atexit
 from pathlib import Path
-from typing import Any, Dict
-from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List
+from dataclasses import dataclass, asdict, field, fields
 from datetime import datetime
 
 from src.utils.logger import get_logger
@@ -41,14 +46,41 @@ class BusinessSettings:
     currency: str = "جنية"
     currency_symbol: str = "ج.م"
     tax_rate: float = 15.0
+    # Category -> tax rate (%) for categories taxed differently from tax_rate
+    category_tax_rates: Dict[str, float] = field(default_factory=dict)
     default_discount: float = 0.0
+    # Rounding of money amounts: half_up, half_even, down or up
+    price_rounding: str = "half_up"
     backup_interval_days: int = 7
     low_stock_alert: bool = True
 
+@dataclass
+class ReceiptSettings:
+    """Receipt printing settings"""
+    # Formats written for each sale: text, escpos, pdf
+    formats: List[str] = field(default_factory=lambda: ["text"])
+    output_dir: str = "data/receipts"
+    # Printer device or file the ESC/POS stream is written to (empty = none)
+    printer_path: str = ""
+    width: int = 42
+    encoding: str = "cp864"
+    footer: str = "شكراً لتسوقكم معنا"
+
+@dataclass
+class LoggingSettings:
+    """Logging settings"""
+    level: str = "INFO"
+    module_levels: Dict[str, str] = field(default_factory=dict)
+    # Span timings and query counters (diagnostics panel, --metrics-dump)
+    metrics_enabled: bool = True
+
+# Callback signature: (category, {key: new_value}) for the keys that changed
+SettingsListener = Callable[[str, Dict[str, Any]], None]
+
 class SettingsManager:
     """Settings management class"""
 
-    def __init__(self, settings_file: str = "data/settings.json"):
+    def __init__(self, settings_file: str = "data/settings.json", save_delay: float = 0.5):
         """Initialize settings manager"""
         self.settings_file = Path(settings_file)
         self.settings_file.parent.mkdir(parents=True, exist_ok=True)
@@ -57,8 +89,21 @@ class SettingsManager:
         self.shop_info = ShopInfo()
         self.display = DisplaySettings()
         self.business = BusinessSettings()
+        self.receipt = ReceiptSettings()
+        self.logging = LoggingSettings()
+
+        # Debounced background writer state
+        self.save_delay = save_delay
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._save_pending = threading.Condition(self._lock)
+        self._dirty = False
+        self._save_deadline = 0.0
+        self._writer_thread = None
+        self._listeners: List[SettingsListener] = []
 
         self._load_settings()
+        atexit.register(self.flush)
         logger.info("Settings manager initialized")
 
     def _load_settings(self):
@@ -89,54 +134,201 @@ class SettingsManager:
                         if hasattr(self.business, key):
                             setattr(self.business, key, value)
 
+                # Load receipt settings
+                if 'receipt' in data:
+                    receipt_data = data['receipt']
+                    for key, value in receipt_data.items():
+                        if hasattr(self.receipt, key):
+                            setattr(self.receipt, key, value)
+
+                # Load logging settings
+                if 'logging' in data:
+                    logging_data = data['logging']
+                    for key, value in logging_data.items():
+                        if hasattr(self.logging, key):
+                            setattr(self.logging, key, value)
+
                 logger.info("Settings loaded successfully")
             else:
                 # Create default settings file
-                self._save_settings()
+                self._write_settings()
                 logger.info("Created default settings file")
 
         except Exception as e:
-            logger.error(f"Error loading settings: {e}")
+            logger.error("Error loading settings: %s", e)
             # Use default settings
 
-    def _save_settings(self):
-        """Save settings to file"""
-        try:
-            settings_data = {
+    def _snapshot(self) -> Dict[str, Any]:
+        """Build the JSON document for the current settings"""
+        with self._lock:
+            return {
                 'shop_info': asdict(self.shop_info),
                 'display': asdict(self.display),
                 'business': asdict(self.business),
+                'receipt': asdict(self.receipt),
+                'logging': asdict(self.logging),
                 'last_updated': datetime.now().isoformat()
             }
 
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings_data, f, indent=2, ensure_ascii=False)
+    def _write_settings(self):
+        """Write settings to file atomically (temp file + fsync + os.replace)"""
+        with self._write_lock:
+            with self._lock:
+                settings_data = self._snapshot()
+                self._dirty = False
 
-            logger.info("Settings saved successfully")
+            tmp_path = None
+            try:
+                fd, tmp_path = tempfile.mkstemp(
+                    prefix=f".{self.settings_file.name}.",
+                    suffix=".tmp",
+                    dir=self.settings_file.parent
+                )
+                # mkstemp creates 0600 files; keep the existing file's mode
+                try:
+                    mode = self.settings_file.stat().st_mode & 0o777
+                except OSError:
+                    mode = 0o644
+                os.chmod(tmp_path, mode)
 
-        except Exception as e:
-            logger.error(f"Error saving settings: {e}")
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(settings_data, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                os.replace(tmp_path, self.settings_file)
+                tmp_path = None
+                self._fsync_directory()
+
+                logger.info("Settings saved successfully")
+
+            except Exception as e:
+                logger.error("Error saving settings: %s", e)
+                with self._lock:
+                    self._dirty = True
+            finally:
+                if tmp_path:
+                    try:
+                        os.unlink(tmp_path)
+                    except OSError:
+                        pass
+
+    def _fsync_directory(self):
+        """Persist the rename itself (no-op where directories can't be opened)"""
+        try:
+            dir_fd = os.open(self.settings_file.parent, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+
+    def _save_settings(self):
+        """Schedule a coalesced background save of the settings file"""
+        with self._lock:
+            self._dirty = True
+            self._save_deadline = time.monotonic() + self.save_delay
+
+            if self._writer_thread is None or not self._writer_thread.is_alive():
+                self._writer_thread = threading.Thread(
+                    target=self._writer_loop,
+                    name="settings-writer",
+                    daemon=True
+                )
+                self._writer_thread.start()
+
+            self._save_pending.notify()
+
+    def _writer_loop(self):
+        """Background writer: wait for the debounce window to settle, then write"""
+        while True:
+            with self._lock:
+                while not self._dirty:
+                    self._save_pending.wait()
+
+                # Every new update pushes the deadline forward
+                remaining = self._save_deadline - time.monotonic()
+                while self._dirty and remaining > 0:
+                    self._save_pending.wait(remaining)
+                    remaining = self._save_deadline - time.monotonic()
+
+                if not self._dirty:
+                    continue
+
+            self._write_settings()
+
+    def flush(self):
+        """Write any pending changes immediately"""
+        with self._lock:
+            if not self._dirty:
+                return
+        self._write_settings()
+
+    # Change notifications
+    def subscribe(self, listener: SettingsListener):
+        """Register a callback for setting changes"""
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def unsubscribe(self, listener: SettingsListener):
+        """Remove a previously registered callback"""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _notify(self, category: str, changes: Dict[str, Any]):
+        """Notify listeners about changed keys"""
+        if not changes:
+            return
+
+        with self._lock:
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(category, changes)
+            except Exception as e:
+                logger.error("Error in settings listener: %s", e)
+
+    def _apply_updates(self, target: Any, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply known keys to a settings section and return what changed"""
+        changes = {}
+        with self._lock:
+            for key, value in values.items():
+                if hasattr(target, key) and getattr(target, key) != value:
+                    setattr(target, key, value)
+                    changes[key] = value
+        return changes
+
+    def _commit_changes(self, category: str, changes: Dict[str, Any]):
+        """Schedule a save and notify listeners if anything changed"""
+        if changes:
+            self._save_settings()
+            self._notify(category, changes)
 
     def update_shop_info(self, **kwargs):
         """Update shop information"""
-        for key, value in kwargs.items():
-            if hasattr(self.shop_info, key):
-                setattr(self.shop_info, key, value)
-        self._save_settings()
+        self._commit_changes("shop_info", self._apply_updates(self.shop_info, kwargs))
 
     def update_display_settings(self, **kwargs):
         """Update display settings"""
-        for key, value in kwargs.items():
-            if hasattr(self.display, key):
-                setattr(self.display, key, value)
-        self._save_settings()
+        self._commit_changes("display", self._apply_updates(self.display, kwargs))
 
     def update_business_settings(self, **kwargs):
         """Update business settings"""
-        for key, value in kwargs.items():
-            if hasattr(self.business, key):
-                setattr(self.business, key, value)
-        self._save_settings()
+        self._commit_changes("business", self._apply_updates(self.business, kwargs))
+
+    def update_receipt_settings(self, **kwargs):
+        """Update receipt settings"""
+        self._commit_changes("receipt", self._apply_updates(self.receipt, kwargs))
+
+    def update_logging_settings(self, **kwargs):
+        """Update logging settings"""
+        self._commit_changes("logging", self._apply_updates(self.logging, kwargs))
 
     def get_setting(self, category: str, key: str, default: Any = None) -> Any:
         """Get specific setting value"""
@@ -147,6 +339,10 @@ class SettingsManager:
                 return getattr(self.display, key, default)
             elif category == "business":
                 return getattr(self.business, key, default)
+            elif category == "receipt":
+                return getattr(self.receipt, key, default)
+            elif category == "logging":
+                return getattr(self.logging, key, default)
             else:
                 return default
         except:
@@ -156,26 +352,35 @@ class SettingsManager:
         """Update a single setting (for backward compatibility)"""
         # Try to find the setting in different categories
         if hasattr(self.display, key):
-            setattr(self.display, key, value)
+            self.update_display_settings(**{key: value})
         elif hasattr(self.business, key):
-            setattr(self.business, key, value)
+            self.update_business_settings(**{key: value})
         elif hasattr(self.shop_info, key):
-            setattr(self.shop_info, key, value)
-
-        self._save_settings()
+            self.update_shop_info(**{key: value})
 
     def get_all_settings(self) -> Dict[str, Any]:
         """Get all settings as dictionary"""
         return {
             'shop_info': asdict(self.shop_info),
             'display': asdict(self.display),
-            'business': asdict(self.business)
+            'business': asdict(self.business),
+            'receipt': asdict(self.receipt),
+            'logging': asdict(self.logging)
         }
 
     def reset_to_defaults(self):
         """Reset all settings to defaults"""
-        self.shop_info = ShopInfo()
-        self.display = DisplaySettings()
-        self.business = BusinessSettings()
-        self._save_settings()
+        sections = (
+            ("shop_info", self.shop_info, ShopInfo()),
+            ("display", self.display, DisplaySettings()),
+            ("business", self.business, BusinessSettings()),
+            ("receipt", self.receipt, ReceiptSettings()),
+            ("logging", self.logging, LoggingSettings())
+        )
+
+        for category, target, defaults in sections:
+            values = {f.name: getattr(defaults, f.name) for f in fields(defaults)}
+            self._commit_changes(category, self._apply_updates(target, values))
+
+        self.flush()
         logger.info("Settings reset to defaults")
\ No newline at end of file
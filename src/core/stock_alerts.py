@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stock Alerts
+تنبيهات المخزون
+
+Low-stock alerts driven by the stock changes the database manager reports
+after each committed write. A product is alerted once, when it crosses into
+a lower stock level (low, then out of stock), and again only after it was
+restocked above its reorder level. Inactive products are not tracked, as in
+LOW_STOCK_FILTER: deactivating one clears its alert. Reorder quantities come from the sales
+velocity in product_daily_sales, read only when an alert is raised or
+suggestions are asked for - a sale that crosses nothing costs a comparison.
+"""
+
+import math
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from src.core.models import Product, StockChange
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Stock levels, from best to worst
+LEVEL_OK = "ok"
+LEVEL_LOW = "low"
+LEVEL_OUT = "out"
+_SEVERITY = {LEVEL_OK: 0, LEVEL_LOW: 1, LEVEL_OUT: 2}
+
+# Days of sales the velocity is averaged over
+VELOCITY_DAYS = 30
+# Days of sales a reorder should cover on top of the reorder level
+COVER_DAYS = 14
+
+def stock_level(stock: int, min_stock: int, status: str = "active") -> str:
+    """Level of a stock quantity against its reorder level; inactive products are always ok"""
+    if status != "active":
+        return LEVEL_OK
+    if stock <= 0:
+        return LEVEL_OUT
+    if stock <= (min_stock or 0):
+        return LEVEL_LOW
+    return LEVEL_OK
+
+def reorder_quantity(stock: int, min_stock: int, daily_sales: float, cover_days: int = COVER_DAYS) -> int:
+    """Units that bring stock back to the reorder level plus cover_days of sales"""
+    target = (min_stock or 0) + math.ceil(daily_sales * cover_days)
+    return max(target - stock, 0)
+
+@dataclass(slots=True)
+class StockAlert:
+    """A product that crossed into another stock level"""
+    product_id: int
+    name: str
+    level: str
+    previous_level: str
+    stock: int
+    min_stock: int
+    reorder_quantity: int = 0
+
+    @property
+    def raised(self) -> bool:
+        """True for a drop to low/out of stock, False for a recovery"""
+        return _SEVERITY[self.level] > _SEVERITY[self.previous_level]
+
+@dataclass(slots=True)
+class ReorderSuggestion:
+    """How much of a low-stock product to order"""
+    product_id: int
+    name: str
+    stock: int
+    min_stock: int
+    daily_sales: float
+    days_left: Optional[float]
+    quantity: int
+
+# Callback signature: (alerts) for the products whose level changed in one write
+AlertListener = Callable[[List[StockAlert]], None]
+
+class StockAlertEngine:
+    """Turns database stock changes into threshold-crossing alerts"""
+
+    def __init__(self, db_manager, settings_manager=None,
+                 velocity_days: int = VELOCITY_DAYS, cover_days: int = COVER_DAYS):
+        self.db_manager = db_manager
+        self.settings_manager = settings_manager
+        self.velocity_days = velocity_days
+        self.cover_days = cover_days
+        self._listeners: List[AlertListener] = []
+        self._lock = threading.Lock()
+
+        self.db_manager.subscribe_stock(self._on_stock_changed)
+        logger.info("Stock alert engine initialized")
+
+    def close(self):
+        """Stop listening to the database"""
+        self.db_manager.unsubscribe_stock(self._on_stock_changed)
+
+    @property
+    def enabled(self) -> bool:
+        """BusinessSettings.low_stock_alert (always on without settings)"""
+        return self.settings_manager is None or self.settings_manager.business.low_stock_alert
+
+    # Events
+    def subscribe(self, listener: AlertListener):
+        """Register a callback for stock alerts (called on the writing thread)"""
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def unsubscribe(self, listener: AlertListener):
+        """Remove a previously registered callback"""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _notify(self, alerts: List[StockAlert]):
+        with self._lock:
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(alerts)
+            except Exception as e:
+                logger.error("Error in stock alert listener: %s", e)
+
+    def _on_stock_changed(self, changes: List[StockChange]):
+        """Keep the changes that crossed a level and raise alerts for them"""
+        if not self.enabled:
+            return
+
+        alerts = []
+        for change in changes:
+            before = stock_level(change.stock_before, change.min_stock_before, change.status_before)
+            after = stock_level(change.stock_after, change.min_stock_after, change.status_after)
+            if before != after:
+                alerts.append(StockAlert(change.product_id, change.name, after, before,
+                                         change.stock_after, change.min_stock_after))
+        if not alerts:
+            return
+
+        raised = [alert for alert in alerts if alert.raised]
+        if raised:
+            sold = self.db_manager.get_units_sold([alert.product_id for alert in raised], self.velocity_days)
+            for alert in raised:
+                daily = sold.get(alert.product_id, 0) / self.velocity_days
+                alert.reorder_quantity = reorder_quantity(alert.stock, alert.min_stock, daily, self.cover_days)
+                logger.warning("Stock %s: %s (%d left, reorder %d)",
+                               alert.level, alert.name, alert.stock, alert.reorder_quantity)
+
+        self._notify(alerts)
+
+    # Queries
+    def low_stock_count(self) -> int:
+        """Active products at or below their reorder level"""
+        return self.db_manager.count_low_stock_products()
+
+    def reorder_suggestions(self, products: Optional[List[Product]] = None) -> List[ReorderSuggestion]:
+        """Reorder quantities for the low-stock products, those running out soonest first"""
+        if products is None:
+            products = self.db_manager.get_low_stock_products()
+        sold = self.db_manager.get_units_sold([product.id for product in products], self.velocity_days)
+
+        suggestions = []
+        for product in products:
+            daily = sold.get(product.id, 0) / self.velocity_days
+            suggestions.append(ReorderSuggestion(
+                product.id, product.name, product.stock_quantity, product.min_stock or 0, daily,
+                max(product.stock_quantity, 0) / daily if daily else None,
+                reorder_quantity(product.stock_quantity, product.min_stock, daily, self.cover_days)
+            ))
+
+        suggestions.sort(key=lambda s: (s.days_left is None, s.days_left or 0, -s.daily_sales))
+        return suggestions
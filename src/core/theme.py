@@ -6,16 +6,25 @@ Theme Manager
 """
 
 import customtkinter as ctk
-from typing import Dict, Any
-import tkinter.font as tkfont
+import weakref
+from typing import Dict, Any, Optional, Set, Tuple
 from pathlib import Path
-import os
-import platform
 
+from src.core.fonts import FontResolver
 from src.utils.logger import get_logger
+from src.utils.instrumentation import metrics
 
 logger = get_logger(__name__)
 
+# Logical font families handed out by the font registry
+FONT_ARABIC = "arabic"
+FONT_HEADER = "header"
+
+# Base size the per-call sizes are designed for; display.font_size shifts them
+BASE_FONT_SIZE = 12
+
+FontKey = Tuple[str, int, str]
+
 class ThemeManager:
     """Theme manager for consistent UI styling"""
 
@@ -27,6 +36,14 @@ class ThemeManager:
         self.arabic_font_name = "Tahoma"
         self.header_font_name = "Tahoma"
 
+        # Shared CTkFont objects keyed by (family, size, weight)
+        self._fonts: Dict[FontKey, ctk.CTkFont] = {}
+
+        # Theme token bindings: widget id -> (weak widget, {option: token}),
+        # plus a token -> widget ids index used to find what a switch touches
+        self._bindings: Dict[int, Tuple[weakref.ref, Dict[str, str]]] = {}
+        self._token_index: Dict[str, Set[int]] = {}
+
         # Color schemes
         self.themes = {
             "dark": {
@@ -38,8 +55,11 @@ class ThemeManager:
                 "accent": "#3B8ED0",
                 "accent_hover": "#2980b9",
                 "success": "#27ae60",
+                "success_hover": "#229954",
                 "warning": "#f39c12",
+                "warning_hover": "#d68910",
                 "danger": "#e74c3c",
+                "danger_hover": "#c0392b",
                 "border": "#4a4a4a",
                 "entry_bg": "#343638",
                 "button_bg": "#1f538d",
@@ -54,8 +74,11 @@ class ThemeManager:
                 "accent": "#3B8ED0",
                 "accent_hover": "#2980b9",
                 "success": "#27ae60",
+                "success_hover": "#229954",
                 "warning": "#f39c12",
+                "warning_hover": "#d68910",
                 "danger": "#e74c3c",
+                "danger_hover": "#c0392b",
                 "border": "#dee2e6",
                 "entry_bg": "#ffffff",
                 "button_bg": "#3b82f6",
@@ -67,88 +90,33 @@ class ThemeManager:
         self.current_theme = self.settings_manager.get_setting("display", "theme", "dark")
         
         self.apply_theme()
+        self.settings_manager.subscribe(self._on_settings_changed)
         logger.info("Theme manager initialized successfully")
 
+    def _on_settings_changed(self, category: str, changes: Dict[str, Any]):
+        """React to display setting changes without re-reading the settings file"""
+        if category == "display" and "theme" in changes:
+            self.apply_theme()
+        if category == "display" and "font_size" in changes:
+            self._refresh_fonts()
+
     def _setup_custom_fonts(self):
         """Setup custom Arabic fonts"""
-        # Font paths
-        fonts_dir = Path("assets/fonts")
-        hayah_path = fonts_dir / "Hayah.otf"
-        shorooq_path = fonts_dir / "Shorooq.ttf"
+        resolver = FontResolver()
+        resolver.register_bundled_fonts()
+        self.arabic_font_name, self.header_font_name = resolver.resolve()
 
-        try:
-            # Register fonts if files exist
-            if hayah_path.exists():
-                if platform.system() == "Windows":
-                    import ctypes
-                    from ctypes import wintypes
-                    gdi32 = ctypes.windll.gdi32
-                    gdi32.AddFontResourceW.argtypes = [wintypes.LPCWSTR]
-                    gdi32.AddFontResourceW(str(hayah_path))
-                    logger.info("Hayah font registered successfully")
-                else:
-                    # For Linux/Mac, font registration might require different steps
-                    # or simply ensuring the font is available in the system.
-                    # For now, we log that the path is available.
-                    logger.info("Hayah font path available (registration may differ on non-Windows)")
-
-            if shorooq_path.exists():
-                if platform.system() == "Windows":
-                    gdi32.AddFontResourceW(str(shorooq_path))
-                    logger.info("Shorooq font registered successfully")
-                else:
-                    logger.info("Shorooq font path available (registration may differ on non-Windows)")
-
-        except Exception as e:
-            logger.warning(f"Could not register custom fonts: {e}")
-            # Fallback to system fonts if registration fails
-            self.arabic_font_name = "Arial"
-            self.header_font_name = "Arial"
-        
-        # Set default font names, falling back if registration failed or files are missing
-        if self._is_font_registered("Hayah"):
-             self.arabic_font_name = "Hayah"
-        else:
-             self.arabic_font_name = self._find_best_arabic_font()
-
-        if self._is_font_registered("Shorooq"):
-            self.header_font_name = "Shorooq"
-        else:
-            self.header_font_name = self.arabic_font_name # Fallback header to general Arabic font
-
-
-        logger.info(f"Using general Arabic font: {self.arabic_font_name}")
-        logger.info(f"Using header Arabic font: {self.header_font_name}")
-
-    def _is_font_registered(self, font_name: str) -> bool:
-        """Check if a font is available in the system."""
-        try:
-            # Using tkinter.font to check for font families
-            font_families = tkfont.families()
-            return font_name in font_families
-        except Exception as e:
-            logger.warning(f"Error checking font availability for {font_name}: {e}")
-            return False
-
-    def _find_best_arabic_font(self) -> str:
-        """Find the best available Arabic font from a list of preferred fonts."""
-        arabic_fonts = [
-            "Cairo", "Amiri", "Scheherazade New", "Noto Sans Arabic",
-            "Traditional Arabic", "Arabic Typesetting", "Tahoma", "Segoe UI"
-        ]
-        available_fonts = tkfont.families()
-        for font in arabic_fonts:
-            if font in available_fonts:
-                return font
-        return "Tahoma"  # fallback
+        logger.info("Using general Arabic font: %s", self.arabic_font_name)
+        logger.info("Using header Arabic font: %s", self.header_font_name)
 
     def initialize_fonts(self):
         """Initialize fonts after main window is created"""
         try:
             self._setup_custom_fonts()
+            self._refresh_fonts()
             logger.info("Fonts initialized successfully")
         except Exception as e:
-            logger.warning(f"Failed to initialize custom fonts: {e}")
+            logger.warning("Failed to initialize custom fonts: %s", e)
             # Keep default fallback fonts
             pass
 
@@ -160,6 +128,7 @@ class ThemeManager:
 
     def apply_theme(self):
         """Apply current theme"""
+        previous_theme = self.current_theme
         theme_name = self.settings_manager.get_setting("display", "theme", "dark")
         if theme_name in self.themes:
             self.current_theme = theme_name
@@ -168,6 +137,11 @@ class ThemeManager:
 
         # Apply theme to CustomTkinter
         ctk.set_appearance_mode(self.current_theme)
+
+        if self._bindings and previous_theme != self.current_theme:
+            self._push_token_changes(self.themes.get(previous_theme, {}), self.get_colors())
+            return
+
         ctk.set_default_color_theme("blue")
         
         # Configure matplotlib for Arabic fonts
@@ -190,21 +164,109 @@ class ThemeManager:
         """Get current theme colors"""
         return self.themes.get(self.current_theme, self.themes["dark"])
 
+    def bind_tokens(self, widget, **options: Optional[str]):
+        """Make widget options follow theme color tokens, e.g. text_color="accent"
+
+        Passing None for an option drops its binding. Options are not applied
+        here; the widget is expected to be created with the current colors.
+        """
+        key = id(widget)
+        entry = self._bindings.get(key)
+        if entry is None or entry[0]() is not widget:
+            entry = (weakref.ref(widget, lambda ref, key=key: self._on_widget_collected(key, ref)), {})
+            self._bindings[key] = entry
+
+        bound = entry[1]
+        for option, token in options.items():
+            old_token = bound.pop(option, None)
+            if old_token is not None and old_token not in bound.values():
+                self._token_index.get(old_token, set()).discard(key)
+            if token is not None:
+                bound[option] = token
+                self._token_index.setdefault(token, set()).add(key)
+        return widget
+
+    def unbind_tokens(self, widget):
+        """Forget all token bindings of a widget"""
+        self._drop_binding(id(widget))
+
+    def _on_widget_collected(self, key: int, widget_ref: weakref.ref):
+        """Drop bindings of a widget that was garbage collected"""
+        entry = self._bindings.get(key)
+        # The id may already belong to a newer widget
+        if entry is not None and entry[0] is widget_ref:
+            self._drop_binding(key)
+
+    def _drop_binding(self, key: int):
+        entry = self._bindings.pop(key, None)
+        if entry:
+            for token in entry[1].values():
+                self._token_index.get(token, set()).discard(key)
+
+    def _push_token_changes(self, old_colors: Dict[str, str], new_colors: Dict[str, str]):
+        """Reconfigure bound widgets for the tokens whose color changed, one configure per widget"""
+        with metrics.span("ui.theme_switch"):
+            changed = {token for token, color in new_colors.items() if old_colors.get(token) != color}
+
+            widget_keys = set()
+            for token in changed:
+                widget_keys |= self._token_index.get(token, set())
+
+            updated = 0
+            for key in widget_keys:
+                widget_ref, bound = self._bindings[key]
+                widget = widget_ref()
+                options = {option: new_colors[token] for option, token in bound.items() if token in changed}
+                try:
+                    if widget is None or not widget.winfo_exists():
+                        raise LookupError
+                    widget.configure(**options)
+                    updated += 1
+                except Exception:
+                    # Widget was destroyed since it was bound
+                    self._drop_binding(key)
+
+        logger.info("Theme tokens changed: %d, widgets updated: %d", len(changed), updated)
+
+    def _family_name(self, family: str) -> str:
+        """Resolve a logical family to the installed font name"""
+        return self.header_font_name if family == FONT_HEADER else self.arabic_font_name
+
+    def _scaled_size(self, size: int) -> int:
+        """Apply the display.font_size offset to a requested size"""
+        try:
+            offset = int(self.settings_manager.display.font_size) - BASE_FONT_SIZE
+        except (AttributeError, TypeError, ValueError):
+            offset = 0
+        return max(6, size + offset)
+
+    def get_font(self, family: str = FONT_ARABIC, size: int = 12, weight: str = "normal") -> ctk.CTkFont:
+        """Shared font for (family, size, weight); created once, then reused"""
+        key = (family, size, weight)
+        font = self._fonts.get(key)
+        if font is None:
+            font = ctk.CTkFont(
+                family=self._family_name(family),
+                size=self._scaled_size(size),
+                weight=weight
+            )
+            self._fonts[key] = font
+        return font
+
+    def _refresh_fonts(self):
+        """Update every shared font in place; widgets using them follow automatically"""
+        for (family, size, weight), font in self._fonts.items():
+            font.configure(family=self._family_name(family), size=self._scaled_size(size))
+        if self._fonts:
+            logger.info("Updated %d shared fonts", len(self._fonts))
+
     def get_font_config(self, size: int = 12, weight: str = "normal") -> ctk.CTkFont:
         """Get font configuration for Arabic text"""
-        return ctk.CTkFont(
-            family=self.arabic_font_name,
-            size=size,
-            weight=weight
-        )
+        return self.get_font(FONT_ARABIC, size, weight)
 
     def get_header_font_config(self, size: int = 16, weight: str = "bold") -> ctk.CTkFont:
         """Get font configuration for Arabic headers"""
-        return ctk.CTkFont(
-            family=self.header_font_name,
-            size=size,
-            weight=weight
-        )
+        return self.get_font(FONT_HEADER, size, weight)
 
     def get_english_font_config(self, size: int = 12, weight: str = "normal") -> tuple:
         """Get font configuration for English text"""
@@ -213,9 +275,11 @@ class ThemeManager:
     def switch_theme(self, theme_name: str):
         """Switch to a different theme"""
         if theme_name in ["dark", "light"]:
-            self.settings_manager.update_setting("display", "theme", theme_name)
-            self.apply_theme()
-            logger.info(f"Switched to theme: {theme_name}")
+            # The settings change notification re-applies the theme
+            self.settings_manager.update_display_settings(theme=theme_name)
+            if self.current_theme != theme_name:
+                self.apply_theme()
+            logger.info("Switched to theme: %s", theme_name)
             return True
         return False
 
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Diagnostics Panel
+لوحة التشخيص
+"""
+
+import customtkinter as ctk
+
+from src.utils.instrumentation import metrics
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class DiagnosticsPanel(ctk.CTkToplevel):
+    """Hidden window showing span percentiles and query counters (Ctrl+Shift+D)"""
+
+    def __init__(self, parent, theme_manager, db_manager=None):
+        super().__init__(parent)
+
+        self.theme_manager = theme_manager
+        self.db_manager = db_manager
+
+        self.title("Diagnostics")
+        self.geometry("900x500")
+        self.transient(parent)
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.report_text = ctk.CTkTextbox(self, font=("Courier New", 12), wrap="none")
+        self.report_text.grid(row=0, column=0, columnspan=2, sticky="nsew", padx=10, pady=10)
+
+        refresh_btn = ctk.CTkButton(self, text="تحديث", width=100, command=self.refresh)
+        refresh_btn.grid(row=1, column=0, sticky="w", padx=10, pady=(0, 10))
+
+        reset_btn = ctk.CTkButton(self, text="تصفير", width=100, command=self._reset)
+        reset_btn.grid(row=1, column=1, sticky="e", padx=10, pady=(0, 10))
+
+        self.refresh()
+        logger.info("Diagnostics panel opened")
+
+    def refresh(self):
+        """Reload the metrics report"""
+        self.report_text.configure(state="normal")
+        self.report_text.delete("1.0", "end")
+        report = metrics.report()
+
+        profiler = getattr(self.db_manager, "profiler", None)
+        if profiler is not None:
+            report += "\n\nSQL profile\n" + profiler.report()
+
+        self.report_text.insert("1.0", report)
+        self.report_text.configure(state="disabled")
+
+    def _reset(self):
+        """Clear collected metrics"""
+        metrics.reset()
+        if self.db_manager is not None:
+            self.db_manager.reset_query_stats()
+        self.refresh()
@@ -6,6 +6,7 @@ Header Bar Component
 """
 
 import customtkinter as ctk
+from tkinter import ttk
 from datetime import datetime
 from typing import Optional
 import threading
@@ -18,11 +19,14 @@ logger = get_logger(__name__)
 class HeaderBar(ctk.CTkFrame):
     """Header bar component with shop info and controls"""
 
-    def __init__(self, parent, settings_manager, theme_manager):
+    def __init__(self, parent, settings_manager, theme_manager, stock_alerts=None):
         super().__init__(parent, height=80, corner_radius=0)
 
         self.settings_manager = settings_manager
         self.theme_manager = theme_manager
+        self.stock_alerts = stock_alerts
+        # Low-stock count, read once and then kept up to date from the alerts
+        self._low_stock_count = None
 
         # Configure grid
         self.grid_columnconfigure(1, weight=1)
@@ -34,6 +38,13 @@ class HeaderBar(ctk.CTkFrame):
         self._create_header()
         self._start_clock()
 
+        # Refresh the shop name when it is edited in the settings view
+        self.settings_manager.subscribe(self._on_settings_changed)
+
+        if self.stock_alerts is not None:
+            self.stock_alerts.subscribe(self._on_stock_alerts)
+            self._load_low_stock_count()
+
         logger.info("Header bar component initialized")
 
     def _create_header(self):
@@ -46,13 +57,14 @@ class HeaderBar(ctk.CTkFrame):
         left_frame = ctk.CTkFrame(self, fg_color="transparent")
         left_frame.grid(row=0, column=0, padx=20, pady=10, sticky="w")
 
-        shop_name = ctk.CTkLabel(
+        self.shop_name_label = ctk.CTkLabel(
             left_frame,
             text=self.settings_manager.shop_info.name,
             font=title_font,
             text_color=colors["accent"]
         )
-        shop_name.grid(row=0, column=0, sticky="w")
+        self.shop_name_label.grid(row=0, column=0, sticky="w")
+        self.theme_manager.bind_tokens(self.shop_name_label, text_color="accent")
 
         if self.settings_manager.shop_info.owner:
             owner_label = ctk.CTkLabel(
@@ -62,11 +74,23 @@ class HeaderBar(ctk.CTkFrame):
                 text_color=colors["text_secondary"]
             )
             owner_label.grid(row=1, column=0, sticky="w")
+            self.theme_manager.bind_tokens(owner_label, text_color="text_secondary")
 
-        # Center section - Search (placeholder)
+        # Center section - Low stock alerts
         center_frame = ctk.CTkFrame(self, fg_color="transparent")
         center_frame.grid(row=0, column=1, padx=20, pady=10, sticky="ew")
 
+        self.stock_alert_button = ctk.CTkButton(
+            center_frame,
+            text="",
+            font=font,
+            fg_color="transparent",
+            text_color=colors["warning"],
+            hover_color=colors["bg_secondary"],
+            command=self._show_reorder_suggestions
+        )
+        self.theme_manager.bind_tokens(self.stock_alert_button, text_color="warning", hover_color="bg_secondary")
+
         # Right section - Date/Time and controls
         right_frame = ctk.CTkFrame(self, fg_color="transparent")
         right_frame.grid(row=0, column=2, padx=20, pady=10, sticky="e")
@@ -79,6 +103,7 @@ class HeaderBar(ctk.CTkFrame):
             text_color=colors["text_primary"]
         )
         self.time_label.grid(row=0, column=0, padx=(0, 20))
+        self.theme_manager.bind_tokens(self.time_label, text_color="text_primary")
 
         self.date_label = ctk.CTkLabel(
             right_frame,
@@ -87,17 +112,23 @@ class HeaderBar(ctk.CTkFrame):
             text_color=colors["text_secondary"]
         )
         self.date_label.grid(row=1, column=0, padx=(0, 20))
+        self.theme_manager.bind_tokens(self.date_label, text_color="text_secondary")
 
         # Theme toggle button
-        theme_button = ctk.CTkButton(
+        self.theme_button = ctk.CTkButton(
             right_frame,
-            text="🌙" if self.theme_manager.get_colors() == self.theme_manager.themes["dark"] else "☀️",
+            text=self._theme_icon(self.theme_manager.current_theme),
             width=40,
             height=40,
             font=("Arial", 16),
             command=self._toggle_theme
         )
-        theme_button.grid(row=0, column=1, rowspan=2, padx=10)
+        self.theme_button.grid(row=0, column=1, rowspan=2, padx=10)
+
+    @staticmethod
+    def _theme_icon(theme_name: str) -> str:
+        """Icon shown on the theme toggle button"""
+        return "🌙" if theme_name == "dark" else "☀️"
 
     def _start_clock(self):
         """Start the clock update thread"""
@@ -130,7 +161,7 @@ class HeaderBar(ctk.CTkFrame):
                     time.sleep(1)
 
                 except Exception as e:
-                    logger.error(f"Error updating clock: {e}")
+                    logger.error("Error updating clock: %s", e)
                     time.sleep(5)
 
         clock_thread = threading.Thread(target=update_clock, daemon=True)
@@ -139,47 +170,115 @@ class HeaderBar(ctk.CTkFrame):
     def _toggle_theme(self):
         """Toggle between dark and light themes"""
         try:
-            current_theme = self.settings_manager.display.theme
-            new_theme = "light" if current_theme == "dark" else "dark"
-
-            # Update the settings first
-            self.settings_manager.update_display_settings(theme=new_theme)
-
-            # Switch theme using theme manager
-            if self.theme_manager.switch_theme(new_theme):
-                # Find and update theme button icon
-                for child in self.winfo_children():
-                    if isinstance(child, ctk.CTkFrame):
-                        for grandchild in child.winfo_children():
-                            if isinstance(grandchild, ctk.CTkButton) and hasattr(grandchild, '_command'):
-                                try:
-                                    if grandchild.cget("width") == 40:
-                                        new_icon = "🌙" if new_theme == "dark" else "☀️"
-                                        grandchild.configure(text=new_icon)
-                                        break
-                                except:
-                                    continue
-
-                # Request full app restart to apply theme properly
-                from tkinter import messagebox
-                messagebox.showinfo("تبديل المظهر", "تم تبديل المظهر بنجاح! قم بإعادة تشغيل التطبيق لتطبيق التغييرات بالكامل.")
-
-            logger.info(f"Theme toggled to: {new_theme}")
+            new_theme = "light" if self.theme_manager.current_theme == "dark" else "dark"
+
+            # Bound widgets are recolored by the theme manager; the icon
+            # follows through the settings notification
+            self.theme_manager.switch_theme(new_theme)
+
+            logger.info("Theme toggled to: %s", new_theme)
 
         except Exception as e:
-            logger.error(f"Error toggling theme: {e}")
+            logger.error("Error toggling theme: %s", e)
+
+    def _on_settings_changed(self, category, changes):
+        """Handle settings change notifications"""
+        if category == "shop_info" and "name" in changes:
+            self.update_shop_info()
+        if category == "display" and "theme" in changes:
+            self.theme_button.configure(text=self._theme_icon(changes["theme"]))
+
+    # Stock alerts
+    def _load_low_stock_count(self):
+        """Read the low-stock count off the Tk thread"""
+        def load():
+            count = self.stock_alerts.low_stock_count()
+            self.after(0, self._set_low_stock_count, count)
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def _set_low_stock_count(self, count):
+        self._low_stock_count = count
+        self._update_stock_alert(None)
+
+    def _on_stock_alerts(self, alerts):
+        """Alerts arrive on the thread that wrote the stock; no query runs here"""
+        # Every level other than ok is inside LOW_STOCK_FILTER
+        delta = sum((alert.level != "ok") - (alert.previous_level != "ok") for alert in alerts)
+        raised = [alert for alert in alerts if alert.raised]
+        self.after(0, self._apply_stock_alerts, delta, raised[-1] if raised else None)
+
+    def _apply_stock_alerts(self, delta, alert):
+        if self._low_stock_count is not None:
+            self._low_stock_count = max(self._low_stock_count + delta, 0)
+        self._update_stock_alert(alert)
+
+    def _update_stock_alert(self, alert):
+        """Show the newest alert, or the number of low-stock products"""
+        count = self._low_stock_count
+        try:
+            if alert is not None:
+                state = "نفد المخزون" if alert.level == "out" else f"متبقي {alert.stock}"
+                text = f"⚠️ {alert.name}: {state} - اطلب {alert.reorder_quantity}"
+            elif count:
+                text = f"⚠️ {count} منتج بمخزون منخفض"
+            else:
+                text = ""
+
+            self.stock_alert_button.configure(text=text)
+            if text:
+                self.stock_alert_button.grid(row=0, column=0)
+            else:
+                self.stock_alert_button.grid_remove()
+        except Exception as e:
+            logger.error("Error updating stock alert: %s", e)
+
+    def _show_reorder_suggestions(self):
+        """Window listing the low-stock products with reorder quantities"""
+        window = ctk.CTkToplevel(self)
+        window.title("اقتراحات إعادة الطلب")
+        window.geometry("640x420")
+        window.transient(self.winfo_toplevel())
+
+        columns = ("name", "stock", "min_stock", "daily", "days_left", "quantity")
+        tree = ttk.Treeview(window, columns=columns, show="headings")
+        tree.heading("name", text="المنتج")
+        tree.heading("stock", text="المخزون")
+        tree.heading("min_stock", text="حد الطلب")
+        tree.heading("daily", text="مبيعات يومية")
+        tree.heading("days_left", text="أيام متبقية")
+        tree.heading("quantity", text="الكمية المقترحة")
+        tree.column("name", width=200, anchor="w")
+        for column in columns[1:]:
+            tree.column(column, width=85, anchor="center")
+        tree.pack(expand=True, fill="both", padx=10, pady=10)
+
+        def fill(suggestions):
+            if not tree.winfo_exists():
+                return
+            for suggestion in suggestions:
+                days_left = "-" if suggestion.days_left is None else f"{suggestion.days_left:.1f}"
+                tree.insert("", "end", values=(
+                    suggestion.name, suggestion.stock, suggestion.min_stock,
+                    f"{suggestion.daily_sales:.2f}", days_left, suggestion.quantity
+                ))
+
+        def load():
+            suggestions = self.stock_alerts.reorder_suggestions()
+            self.after(0, fill, suggestions)
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def destroy(self):
+        """Unsubscribe from settings and alerts before destroying the widget"""
+        self.settings_manager.unsubscribe(self._on_settings_changed)
+        if self.stock_alerts is not None:
+            self.stock_alerts.unsubscribe(self._on_stock_alerts)
+        super().destroy()
 
     def update_shop_info(self):
         """Update shop information display"""
         try:
-            # Update shop name if changed
-            for child in self.winfo_children():
-                if isinstance(child, ctk.CTkFrame):
-                    for grandchild in child.winfo_children():
-                        if isinstance(grandchild, ctk.CTkLabel):
-                            # Update the first label (shop name)
-                            grandchild.configure(text=self.settings_manager.shop_info.name)
-                            break
-                    break
+            self.shop_name_label.configure(text=self.settings_manager.shop_info.name)
         except Exception as e:
-            logger.error(f"Error updating shop info: {e}")
\ No newline at end of file
+            logger.error("Error updating shop info: %s", e)
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Virtual Product Grid
+شبكة المنتجات الافتراضية
+
+Shows a catalog of any size with a fixed pool of card widgets: only the
+cards that fit in the viewport (plus one) exist, and scrolling rebinds
+them to other rows instead of creating widgets. Rows are read on demand
+in keyset pages (after the last (name, id) of the previous page) on a
+worker thread, delivered through after() and kept in a small page cache.
+"""
+
+import math
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import customtkinter as ctk
+
+from src.core.assets import asset_cache
+from src.utils.logger import get_logger
+from src.utils.instrumentation import metrics
+
+logger = get_logger(__name__)
+
+class VirtualProductGrid(ctk.CTkFrame):
+    """Scrollable product list backed by a recycled pool of cards"""
+
+    CARD_HEIGHT = 84
+    CARD_GAP = 6
+    PAGE_SIZE = 100
+    MAX_PAGES = 8
+    THUMB_SIZE = (56, 56)
+    WHEEL_STEP = 40
+
+    def __init__(self, parent, theme_manager,
+                 fetch_count: Callable[[Any], int],
+                 fetch_page: Callable[[Any, Optional[Tuple], int], List[Any]],
+                 on_add: Callable[[Any], None],
+                 currency: str = "ر.س",
+                 row_key: Callable[[Any], Tuple] = lambda row: (row.name, row.id),
+                 **kwargs):
+        super().__init__(parent, **kwargs)
+
+        self.theme_manager = theme_manager
+        self.fetch_count = fetch_count
+        self.fetch_page = fetch_page
+        self.on_add = on_add
+        self.currency = currency
+        self.row_key = row_key
+
+        self._query: Any = None
+        self._generation = 0
+        self._total = 0
+        self._scroll_px = 0
+        self._pages: "OrderedDict[int, List[Any]]" = OrderedDict()
+        self._boundaries: Dict[int, Tuple] = {}   # page -> key of its last row
+        self._loading = False
+        self._cards: List[ctk.CTkFrame] = []
+        self._render_pending = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="product-grid")
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        # Cards are placed inside the viewport, which clips them
+        self.viewport = ctk.CTkFrame(self, fg_color="transparent")
+        self.viewport.grid(row=0, column=0, sticky="nsew")
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.empty_label = ctk.CTkLabel(
+            self.viewport,
+            text="لا توجد منتجات مطابقة",
+            font=self.theme_manager.get_font_config(12)
+        )
+
+        self.viewport.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.viewport)
+
+    def destroy(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        super().destroy()
+
+    # Data
+    @property
+    def row_pitch(self) -> int:
+        return self.CARD_HEIGHT + self.CARD_GAP
+
+    def refresh(self, query: Any = None):
+        """Show the rows of another query (filters); count and pages are read on the worker"""
+        self._query = query
+        self._generation += 1
+        self._pages.clear()
+        self._boundaries.clear()
+        self._loading = False
+        self._total = 0
+        self._scroll_px = 0
+        for card in self._cards:
+            card.product = None
+        self._schedule_render()
+        self._submit(self._load_count, self._generation, query)
+
+    def _submit(self, job, *args):
+        try:
+            self._executor.submit(job, *args)
+        except RuntimeError:
+            # Executor already shut down with the widget
+            pass
+
+    def _deliver(self, callback, *args):
+        """Run callback on the Tk thread (worker side)"""
+        try:
+            self.after(0, callback, *args)
+        except Exception as e:
+            # The widget may have been destroyed meanwhile
+            logger.warning("Grid callback failed: %s", e)
+
+    def _load_count(self, generation: int, query: Any):
+        try:
+            total = max(0, int(self.fetch_count(query)))
+        except Exception as e:
+            logger.error("Error counting grid rows: %s", e)
+            total = 0
+        self._deliver(self._on_count, generation, total)
+
+    def _on_count(self, generation: int, total: int):
+        if generation != self._generation or not self.winfo_exists():
+            return
+        self._total = total
+        self._clamp_scroll()
+        self._schedule_render()
+
+    def _row(self, index: int) -> Optional[Any]:
+        """Row at index, or None while its page is being read"""
+        page_number, position = divmod(index, self.PAGE_SIZE)
+        page = self._pages.get(page_number)
+        if page is None:
+            self._request_page(page_number)
+            return None
+        self._pages.move_to_end(page_number)
+        return page[position] if position < len(page) else None
+
+    def _request_page(self, page_number: int):
+        """Read a page on the worker, walking from the nearest page whose last key is known
+
+        One read is in flight at a time; the render after it arrives asks for
+        whatever is visible by then, so a scrollbar drag does not queue reads.
+        """
+        if self._loading:
+            return
+        self._loading = True
+
+        start = page_number
+        while start > 0 and (start - 1) not in self._boundaries:
+            start -= 1
+        after = self._boundaries.get(start - 1)
+        self._submit(self._load_pages, self._generation, self._query, start, after, page_number)
+
+    def _load_pages(self, generation: int, query: Any, start: int, after: Optional[Tuple], target: int):
+        """Fetch pages start..target with keyset queries (worker thread)
+
+        Pages passed on the way only contribute their last key; the last
+        MAX_PAGES of them are kept as well.
+        """
+        boundaries = {}
+        pages = deque(maxlen=self.MAX_PAGES)
+        with metrics.span("ui.product_grid.fetch"):
+            for page_number in range(start, target + 1):
+                try:
+                    page = self.fetch_page(query, after, self.PAGE_SIZE)
+                except Exception as e:
+                    logger.error("Error loading grid page %d: %s", page_number, e)
+                    page = []
+                pages.append((page_number, page))
+                if len(page) < self.PAGE_SIZE:
+                    break
+                after = boundaries[page_number] = self.row_key(page[-1])
+        self._deliver(self._on_pages, generation, target, boundaries, list(pages))
+
+    def _on_pages(self, generation: int, target: int, boundaries: Dict[int, Tuple],
+                  pages: List[Tuple[int, List[Any]]]):
+        if generation != self._generation or not self.winfo_exists():
+            return
+        self._loading = False
+        self._boundaries.update(boundaries)
+        for page_number, page in pages:
+            self._pages[page_number] = page
+            self._pages.move_to_end(page_number)
+        # The rows ended early (catalog shrank since the count): nothing to read there
+        self._pages.setdefault(target, [])
+        while len(self._pages) > self.MAX_PAGES:
+            self._pages.popitem(last=False)
+        self._schedule_render()
+
+    # Pool
+    def _on_resize(self, event=None):
+        needed = math.ceil(self.viewport.winfo_height() / self.row_pitch) + 1
+        while len(self._cards) < needed:
+            self._cards.append(self._create_card())
+        self._clamp_scroll()
+        self._schedule_render()
+
+    def _create_card(self) -> ctk.CTkFrame:
+        """Create one reusable card; its content is set by _bind_card"""
+        colors = self.theme_manager.get_colors()
+
+        card = ctk.CTkFrame(self.viewport, height=self.CARD_HEIGHT)
+        card.grid_columnconfigure(1, weight=1)
+        card.grid_propagate(False)
+        card.product = None
+
+        card.image_label = ctk.CTkLabel(card, text="", width=self.THUMB_SIZE[0],
+                                        image=asset_cache.placeholder(self.THUMB_SIZE))
+        card.image_label.grid(row=0, column=0, rowspan=2, padx=(10, 0), pady=10)
+
+        card.name_label = ctk.CTkLabel(card, text="", anchor="w",
+                                       font=self.theme_manager.get_font_config(12, "bold"))
+        card.name_label.grid(row=0, column=1, sticky="ew", padx=10, pady=(10, 0))
+
+        card.details_label = ctk.CTkLabel(card, text="", anchor="w",
+                                          font=self.theme_manager.get_font_config(11),
+                                          text_color=colors["accent"])
+        card.details_label.grid(row=1, column=1, sticky="ew", padx=10, pady=(0, 10))
+        self.theme_manager.bind_tokens(card.details_label, text_color="accent")
+
+        card.add_button = ctk.CTkButton(card, text="إضافة", width=60, height=30,
+                                        font=self.theme_manager.get_font_config(11),
+                                        command=lambda c=card: self._on_card_add(c))
+        card.add_button.grid(row=0, column=2, rowspan=2, padx=10, pady=10)
+
+        for widget in (card, card.image_label, card.name_label, card.details_label):
+            self._bind_wheel(widget)
+        return card
+
+    def _bind_card(self, card: ctk.CTkFrame, product: Any):
+        """Point a card at another product (only changed cards are reconfigured)"""
+        if card.product is product:
+            return
+        card.product = product
+
+        card.name_label.configure(text=product.name)
+        card.details_label.configure(
+            text=f"{product.price:.2f} {self.currency}  •  المخزون: {product.stock_quantity}"
+        )
+        card.add_button.configure(state="normal" if product.stock_quantity > 0 else "disabled")
+
+        image = asset_cache.product_image(
+            product.image_path, self.THUMB_SIZE,
+            on_ready=lambda img, c=card, p=product: self._on_thumbnail(c, p, img),
+            widget=self
+        )
+        card.image_label.configure(image=image)
+
+    def _on_thumbnail(self, card: ctk.CTkFrame, product: Any, image):
+        # The card may show another product by the time the thumbnail is ready
+        if card.product is product and card.winfo_exists():
+            card.image_label.configure(image=image)
+
+    def _on_card_add(self, card: ctk.CTkFrame):
+        if card.product is not None:
+            self.on_add(card.product)
+
+    # Rendering
+    def _schedule_render(self):
+        """Coalesce scroll/resize events into one render per idle cycle"""
+        if not self._render_pending:
+            self._render_pending = True
+            self.after_idle(self._render)
+
+    def _render(self):
+        self._render_pending = False
+        if not self.winfo_exists():
+            return
+
+        with metrics.span("ui.product_grid.render"):
+            width = self.viewport.winfo_width()
+            first_index, offset = divmod(self._scroll_px, self.row_pitch)
+
+            for slot, card in enumerate(self._cards):
+                index = first_index + slot
+                product = self._row(index) if index < self._total else None
+                if product is None:
+                    card.place_forget()
+                    card.product = None
+                    continue
+                self._bind_card(card, product)
+                card.place(x=0, y=slot * self.row_pitch - offset, width=width)
+
+            if self._total:
+                self.empty_label.place_forget()
+            else:
+                self.empty_label.place(relx=0.5, rely=0.3, anchor="center")
+
+        self._update_scrollbar()
+
+    # Scrolling
+    def _content_height(self) -> int:
+        return self._total * self.row_pitch
+
+    def _max_scroll(self) -> int:
+        return max(0, self._content_height() - self.viewport.winfo_height())
+
+    def _clamp_scroll(self):
+        self._scroll_px = min(max(0, self._scroll_px), self._max_scroll())
+
+    def _update_scrollbar(self):
+        content = self._content_height()
+        if content <= 0:
+            self.scrollbar.set(0, 1)
+            return
+        first = self._scroll_px / content
+        last = (self._scroll_px + self.viewport.winfo_height()) / content
+        self.scrollbar.set(first, min(1.0, last))
+
+    def scroll_to(self, pixels: int):
+        """Scroll so that the given content offset is at the top"""
+        self._scroll_px = int(pixels)
+        self._clamp_scroll()
+        self._schedule_render()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * self._content_height())
+        elif action == "scroll":
+            step = self.viewport.winfo_height() if unit == "pages" else self.row_pitch
+            self.scroll_to(self._scroll_px + int(amount) * step)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_mousewheel)
+        widget.bind("<Button-4>", lambda e: self.scroll_to(self._scroll_px - self.WHEEL_STEP))
+        widget.bind("<Button-5>", lambda e: self.scroll_to(self._scroll_px + self.WHEEL_STEP))
+
+    def _on_mousewheel(self, event):
+        # Windows reports multiples of 120, macOS small deltas
+        delta = event.delta / 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll_to(self._scroll_px - int(delta * self.WHEEL_STEP))
@@ -7,9 +7,8 @@ Sidebar Component
 
 import customtkinter as ctk
 from typing import Callable
-from PIL import Image, ImageTk
-from pathlib import Path
 
+from src.core.assets import asset_cache
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -44,17 +43,7 @@ class Sidebar(ctk.CTkFrame):
 
     def _load_icon(self, icon_name: str, size: tuple = (24, 24)) -> ctk.CTkImage:
         """Load and resize icon"""
-        try:
-            icon_path = Path(f"assets/icons/{icon_name}")
-            if icon_path.exists():
-                image = Image.open(icon_path)
-                return ctk.CTkImage(light_image=image, dark_image=image, size=size)
-            else:
-                # Return empty image if icon not found
-                return ctk.CTkImage(Image.new('RGBA', size, (0, 0, 0, 0)), size=size)
-        except Exception as e:
-            logger.warning(f"Could not load icon {icon_name}: {e}")
-            return ctk.CTkImage(Image.new('RGBA', size, (0, 0, 0, 0)), size=size)
+        return asset_cache.icon(icon_name, size)
 
     def _create_navigation(self):
         """Create navigation buttons"""
@@ -69,6 +58,7 @@ class Sidebar(ctk.CTkFrame):
             text_color=colors["accent"]
         )
         title_label.grid(row=0, column=0, padx=20, pady=(20, 30), sticky="ew")
+        self.theme_manager.bind_tokens(title_label, text_color="accent")
 
         # Navigation buttons
         for i, (view_name, label, icon_name) in enumerate(self.nav_items, 1):
@@ -88,6 +78,7 @@ class Sidebar(ctk.CTkFrame):
                 command=lambda v=view_name: self._on_button_click(v)
             )
             button.grid(row=i, column=0, padx=10, pady=5, sticky="ew")
+            self.theme_manager.bind_tokens(button, text_color="text_secondary", hover_color="bg_tertiary")
 
             self.buttons[view_name] = button
 
@@ -103,45 +94,34 @@ class Sidebar(ctk.CTkFrame):
             text_color=colors["text_secondary"]
         )
         footer_label.grid(row=9, column=0, padx=20, pady=(10, 20))
+        self.theme_manager.bind_tokens(footer_label, text_color="text_secondary")
 
     def _on_button_click(self, view_name: str):
         """Handle button click"""
         self.on_view_change(view_name)
 
-    def set_active_button(self, view_name: str):
-        """Set active button styling"""
+    def _style_button(self, view_name: str, active: bool):
+        """Apply and bind active/inactive colors for one button"""
         colors = self.theme_manager.get_colors()
+        button = self.buttons[view_name]
 
-        # Reset all buttons
-        for button in self.buttons.values():
-            button.configure(
-                fg_color="transparent",
-                text_color=colors["text_secondary"]
-            )
+        if active:
+            tokens = {"fg_color": "accent", "text_color": "text_primary", "hover_color": "accent_hover"}
+            button.configure(**{option: colors[token] for option, token in tokens.items()})
+        else:
+            tokens = {"fg_color": None, "text_color": "text_secondary", "hover_color": "bg_tertiary"}
+            button.configure(fg_color="transparent", text_color=colors["text_secondary"],
+                             hover_color=colors["bg_tertiary"])
+        self.theme_manager.bind_tokens(button, **tokens)
 
-        # Set active button
-        if view_name in self.buttons:
-            self.buttons[view_name].configure(
-                fg_color=colors["accent"],
-                text_color=colors["text_primary"]
-            )
-            self.active_button = view_name
+    def set_active_button(self, view_name: str):
+        """Set active button styling"""
+        if view_name == self.active_button or view_name not in self.buttons:
+            return
 
-    def update_theme(self):
-        """Update theme colors"""
-        colors = self.theme_manager.get_colors()
+        # Only the previously active and the newly active buttons change
+        if self.active_button in self.buttons:
+            self._style_button(self.active_button, active=False)
 
-        # Update button colors
-        for view_name, button in self.buttons.items():
-            if view_name == self.active_button:
-                button.configure(
-                    fg_color=colors["accent"],
-                    text_color=colors["text_primary"],
-                    hover_color=colors["accent_hover"]
-                )
-            else:
-                button.configure(
-                    fg_color="transparent",
-                    text_color=colors["text_secondary"],
-                    hover_color=colors["bg_tertiary"]
-                )
\ No newline at end of file
+        self._style_button(view_name, active=True)
+        self.active_button = view_name
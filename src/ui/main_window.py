@@ -8,10 +8,12 @@ Main Application Window
 import customtkinter as ctk
 from tkinter import messagebox
 import sys
+import time
 from pathlib import Path
 
 from src.ui.components.sidebar import Sidebar
 from src.ui.components.header import HeaderBar
+from src.ui.components.diagnostics import DiagnosticsPanel
 from src.ui.views.dashboard import DashboardView
 from src.ui.views.products import ProductsView
 from src.ui.views.sales import SalesView
@@ -19,18 +21,23 @@ from src.ui.views.customers import CustomersView
 from src.ui.views.reports import ReportsView
 from src.ui.views.settings import SettingsView
 from src.utils.logger import get_logger
+from src.utils.instrumentation import metrics
 
 logger = get_logger(__name__)
 
 class MainWindow(ctk.CTk):
     """Main application window with modern UI"""
 
-    def __init__(self, db_manager, settings_manager, theme_manager):
+    def __init__(self, db_manager, settings_manager, theme_manager, print_spooler=None, report_engine=None,
+                 stock_alerts=None):
         super().__init__()
 
         self.db_manager = db_manager
         self.settings_manager = settings_manager
         self.theme_manager = theme_manager
+        self.print_spooler = print_spooler
+        self.report_engine = report_engine
+        self.stock_alerts = stock_alerts
 
         # Window configuration
         self.title(f"{self.settings_manager.shop_info.name} - Smart Mobile Shop v2.0")
@@ -62,6 +69,10 @@ class MainWindow(ctk.CTk):
         # Setup window close handler
         self.protocol("WM_DELETE_WINDOW", self._on_closing)
 
+        # Hidden diagnostics panel
+        self.diagnostics_panel = None
+        self.bind_all("<Control-Shift-D>", self._show_diagnostics)
+
         logger.info("Main window initialized")
 
     def _configure_fonts(self):
@@ -86,7 +97,8 @@ class MainWindow(ctk.CTk):
         self.header = HeaderBar(
             self,
             settings_manager=self.settings_manager,
-            theme_manager=self.theme_manager
+            theme_manager=self.theme_manager,
+            stock_alerts=self.stock_alerts
         )
         self.header.grid(row=0, column=0, columnspan=2, sticky="ew", padx=0, pady=0)
 
@@ -106,6 +118,8 @@ class MainWindow(ctk.CTk):
 
     def _switch_view(self, view_name: str):
         """Switch to a different view"""
+        start = time.perf_counter_ns()
+        metrics.begin_view(view_name)
         try:
             # Clear current view
             if self.current_view:
@@ -128,19 +142,24 @@ class MainWindow(ctk.CTk):
                 self.current_view = SalesView(
                     self.content_frame,
                     self.db_manager,
-                    self.theme_manager
+                    self.theme_manager,
+                    self.settings_manager,
+                    self.print_spooler
                 )
             elif view_name == "customers":
                 self.current_view = CustomersView(
                     self.content_frame,
                     self.db_manager,
-                    self.theme_manager
+                    self.theme_manager,
+                    self.settings_manager
                 )
             elif view_name == "reports":
                 self.current_view = ReportsView(
                     self.content_frame,
                     self.db_manager,
-                    self.theme_manager
+                    self.theme_manager,
+                    self.settings_manager,
+                    self.report_engine
                 )
             elif view_name == "settings":
                 self.current_view = SettingsView(
@@ -156,12 +175,22 @@ class MainWindow(ctk.CTk):
             # Update sidebar selection
             self.sidebar.set_active_button(view_name)
 
-            logger.info(f"Switched to view: {view_name}")
+            metrics.record(f"ui.switch_view.{view_name}", time.perf_counter_ns() - start)
+
+            logger.info("Switched to view: %s", view_name)
 
         except Exception as e:
-            logger.error(f"Error switching to view {view_name}: {e}")
+            logger.error("Error switching to view %s: %s", view_name, e)
             messagebox.showerror("خطأ", f"حدث خطأ في عرض الصفحة: {e}")
 
+    def _show_diagnostics(self, event=None):
+        """Open (or focus) the diagnostics panel"""
+        if self.diagnostics_panel is not None and self.diagnostics_panel.winfo_exists():
+            self.diagnostics_panel.refresh()
+            self.diagnostics_panel.focus()
+            return
+        self.diagnostics_panel = DiagnosticsPanel(self, self.theme_manager, self.db_manager)
+
     def _show_dashboard(self):
         """Show dashboard by default"""
         self._switch_view("dashboard")
@@ -173,5 +202,5 @@ class MainWindow(ctk.CTk):
                 logger.info("Application closing by user")
                 self.destroy()
         except Exception as e:
-            logger.error(f"Error during application closing: {e}")
+            logger.error("Error during application closing: %s", e)
             self.destroy()
\ No newline at end of file
@@ -9,25 +9,39 @@ Customers View
 import customtkinter as ctk
 from tkinter import messagebox, ttk
 import threading
+from dataclasses import asdict
 
+from src.core.pricing import PricingEngine
 from src.utils.logger import get_logger
+from src.utils.instrumentation import metrics
 
 logger = get_logger(__name__)
 
+# Sales per page in the customer details window
+HISTORY_PAGE_SIZE = 50
+
+# Pause after the last keystroke before searching
+SEARCH_DELAY_MS = 150
+
+# Rows shown for a phone number search
+PHONE_MATCHES = 100
+
 class CustomersView(ctk.CTkFrame):
     """Customers management view"""
     
-    def __init__(self, parent, db_manager, theme_manager):
+    def __init__(self, parent, db_manager, theme_manager, settings_manager):
         super().__init__(parent, fg_color="transparent")
         
         self.db_manager = db_manager
         self.theme_manager = theme_manager
+        self.pricing = PricingEngine.from_settings(settings_manager)
         
         # Configure grid
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=1)
         
         self.customers_data = []
+        self._search_job = None
         
         self._setup_ui()
         self._load_customers()
@@ -49,6 +63,7 @@ class CustomersView(ctk.CTkFrame):
             text_color=colors["accent"]
         )
         title_label.grid(row=0, column=0, padx=(0, 20))
+        self.theme_manager.bind_tokens(title_label, text_color="accent")
         
         # Search section
         search_frame = ctk.CTkFrame(header_frame, fg_color="transparent")
@@ -105,11 +120,12 @@ class CustomersView(ctk.CTkFrame):
             text="حذف",
             command=self._delete_selected_customer,
             fg_color=colors["danger"],
-            hover_color="#c0392b",
+            hover_color=colors["danger_hover"],
             width=100,
             font=self.theme_manager.get_font_config(12)
         )
         delete_btn.pack(side="left", padx=(0, 10))
+        self.theme_manager.bind_tokens(delete_btn, fg_color="danger", hover_color="danger_hover")
         
         # Customer details button
         details_btn = ctk.CTkButton(
@@ -176,85 +192,72 @@ class CustomersView(ctk.CTkFrame):
         # Bind double click
         self.customers_tree.bind("<Double-1>", self._on_customer_double_click)
     
+    def _fetch_customers(self):
+        """Query customers (runs on the loader thread)"""
+        return [asdict(customer) for customer in self.db_manager.get_customers()]
+
     def _load_customers(self):
         """Load customers data"""
         def load_data():
-            try:
-                # Try to load from database
-                customers = self.db_manager.execute_query("""
-                    SELECT id, customer_code, name, phone, email, city,
-                           total_purchases, loyalty_points
-                    FROM customers
-                    WHERE status = 'active'
-                    ORDER BY name
-                """)
-                
-                self.after(0, lambda: self._update_customers_display(customers))
-                
-            except Exception as e:
-                logger.error(f"Error loading customers: {e}")
-                # Load sample data
-                sample_customers = [
-                    {'id': 1, 'customer_code': 'C001', 'name': 'أحمد محمد', 'phone': '0501234567', 'email': 'ahmed@example.com', 'city': 'الرياض', 'total_purchases': 5600.0, 'loyalty_points': 56},
-                    {'id': 2, 'customer_code': 'C002', 'name': 'فاطمة علي', 'phone': '0509876543', 'email': 'fatima@example.com', 'city': 'جدة', 'total_purchases': 3200.0, 'loyalty_points': 32},
-                    {'id': 3, 'customer_code': 'C003', 'name': 'محمد خالد', 'phone': '0551122334', 'email': 'mohammad@example.com', 'city': 'الدمام', 'total_purchases': 8950.0, 'loyalty_points': 89},
-                    {'id': 4, 'customer_code': 'C004', 'name': 'نورا السعد', 'phone': '0554433221', 'email': 'nora@example.com', 'city': 'مكة', 'total_purchases': 1250.0, 'loyalty_points': 12},
-                    {'id': 5, 'customer_code': 'C005', 'name': 'عبدالله أحمد', 'phone': '0556677889', 'email': 'abdullah@example.com', 'city': 'المدينة', 'total_purchases': 4320.0, 'loyalty_points': 43}
-                ]
-                self.after(0, lambda: self._update_customers_display(sample_customers))
+            customers = self._fetch_customers()
+            self.after(0, lambda: self._update_customers_display(customers))
         
         threading.Thread(target=load_data, daemon=True).start()
     
+    @metrics.timed("ui.customers.tree_refill")
     def _update_customers_display(self, customers):
         """Update customers display"""
         try:
             self.customers_data = customers
-            
-            # Clear existing items
-            for item in self.customers_tree.get_children():
-                self.customers_tree.delete(item)
-            
-            # Insert customers
-            for customer in customers:
-                self.customers_tree.insert("", "end", values=(
-                    customer['id'],
-                    customer['customer_code'] or '',
-                    customer['name'],
-                    customer['phone'] or '',
-                    customer['email'] or '',
-                    customer['city'] or '',
-                    f"{customer['total_purchases']:.2f}",
-                    customer['loyalty_points']
-                ))
+            self._fill_tree(customers)
                 
         except Exception as e:
-            logger.error(f"Error updating customers display: {e}")
+            logger.error("Error updating customers display: %s", e)
     
-    def _on_search_change(self, *args):
-        """Handle search input change"""
-        search_term = self.search_var.get().lower()
-        
-        # Clear current items
+    def _fill_tree(self, customers):
+        """Replace the table rows"""
+        # Clear existing items
         for item in self.customers_tree.get_children():
             self.customers_tree.delete(item)
         
-        # Filter and display customers
-        for customer in self.customers_data:
-            if (search_term in customer['name'].lower() or 
-                search_term in (customer['phone'] or '').lower() or
-                search_term in (customer['email'] or '').lower() or
-                search_term in (customer['customer_code'] or '').lower()):
-                
-                self.customers_tree.insert("", "end", values=(
-                    customer['id'],
-                    customer['customer_code'] or '',
-                    customer['name'],
-                    customer['phone'] or '',
-                    customer['email'] or '',
-                    customer['city'] or '',
-                    f"{customer['total_purchases']:.2f}",
-                    customer['loyalty_points']
-                ))
+        # Insert customers
+        for customer in customers:
+            self.customers_tree.insert("", "end", values=(
+                customer['id'],
+                customer['customer_code'] or '',
+                customer['name'],
+                customer['phone'] or '',
+                customer['email'] or '',
+                customer['city'] or '',
+                f"{customer['total_purchases']:.2f}",
+                customer['loyalty_points']
+            ))
+    
+    def _on_search_change(self, *args):
+        """Filter customers, waiting for a pause in typing"""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DELAY_MS, self._apply_search)
+    
+    @metrics.timed("ui.customers.tree_filter")
+    def _apply_search(self):
+        """Phone numbers are looked up by index, other terms filter the loaded list"""
+        self._search_job = None
+        search_term = self.search_var.get().strip().lower()
+        
+        if not search_term:
+            customers = self.customers_data
+        elif all(ch.isdigit() or ch in "+- " for ch in search_term):
+            customers = [asdict(customer) for customer in self.db_manager.search_customers_by_phone(search_term, PHONE_MATCHES)]
+        else:
+            customers = [
+                customer for customer in self.customers_data
+                if (search_term in customer['name'].lower() or
+                    search_term in (customer['email'] or '').lower() or
+                    search_term in (customer['customer_code'] or '').lower())
+            ]
+        
+        self._fill_tree(customers)
     
     def _show_add_customer_dialog(self):
         """Show add customer dialog"""
@@ -286,6 +289,7 @@ class CustomersView(ctk.CTkFrame):
             text_color=colors["accent"]
         )
         title_label.pack(pady=20)
+        self.theme_manager.bind_tokens(title_label, text_color="accent")
         
         # Form frame
         form_frame = ctk.CTkScrollableFrame(dialog)
@@ -368,6 +372,7 @@ class CustomersView(ctk.CTkFrame):
             fg_color=colors["success"]
         )
         save_btn.pack(side="right", padx=(10, 0))
+        self.theme_manager.bind_tokens(save_btn, fg_color="success")
         
         # Cancel button
         cancel_btn = ctk.CTkButton(
@@ -421,12 +426,13 @@ class CustomersView(ctk.CTkFrame):
             return
         
         item = self.customers_tree.item(selection[0])
+        customer_id = item['values'][0]
         customer_name = item['values'][2]
         
         # Create details window
         details_window = ctk.CTkToplevel(self)
         details_window.title(f"تفاصيل العميل - {customer_name}")
-        details_window.geometry("600x500")
+        details_window.geometry("650x550")
         details_window.transient(self)
         
         # Customer info
@@ -435,7 +441,8 @@ class CustomersView(ctk.CTkFrame):
         
         ctk.CTkLabel(info_frame, text=f"اسم العميل: {customer_name}", font=self.theme_manager.get_font_config(14, "bold")).pack(anchor="w", padx=20, pady=5)
         ctk.CTkLabel(info_frame, text=f"الهاتف: {item['values'][3]}", font=self.theme_manager.get_font_config(12)).pack(anchor="w", padx=20, pady=5)
-        ctk.CTkLabel(info_frame, text=f"إجمالي المشتريات: {item['values'][6]} ر.س", font=self.theme_manager.get_font_config(12)).pack(anchor="w", padx=20, pady=5)
+        summary_label = ctk.CTkLabel(info_frame, text="إجمالي المشتريات: ...", font=self.theme_manager.get_font_config(12))
+        summary_label.pack(anchor="w", padx=20, pady=5)
         ctk.CTkLabel(info_frame, text=f"نقاط الولاء: {item['values'][7]}", font=self.theme_manager.get_font_config(12)).pack(anchor="w", padx=20, pady=(5, 15))
         
         # Purchase history
@@ -444,21 +451,57 @@ class CustomersView(ctk.CTkFrame):
         history_frame = ctk.CTkScrollableFrame(details_window)
         history_frame.pack(expand=True, fill="both", padx=20, pady=(0, 20))
         
-        # Sample purchase history
-        purchases = [
-            {"date": "2024-08-01", "items": "iPhone 15 Pro", "amount": 4500.0},
-            {"date": "2024-07-15", "items": "AirPods Pro", "amount": 950.0},
-            {"date": "2024-06-20", "items": "Phone Case", "amount": 150.0},
-        ]
-        
-        for purchase in purchases:
-            purchase_frame = ctk.CTkFrame(history_frame)
-            purchase_frame.pack(fill="x", pady=2)
-            purchase_frame.grid_columnconfigure(1, weight=1)
+        more_btn = ctk.CTkButton(
+            history_frame,
+            text="تحميل المزيد",
+            width=120,
+            font=self.theme_manager.get_font_config(11)
+        )
+        
+        def show_summary(summary):
+            if details_window.winfo_exists():
+                summary_label.configure(
+                    text=f"إجمالي المشتريات: {self.pricing.format(summary['total_spent'])} - عدد الفواتير: {summary['invoice_count']:,}"
+                         f" - متوسط السلة: {self.pricing.format(summary['average_basket'])}"
+                )
+        
+        def show_page(page, first):
+            if not details_window.winfo_exists():
+                return
+            more_btn.pack_forget()
             
-            ctk.CTkLabel(purchase_frame, text=purchase["date"], font=self.theme_manager.get_font_config(11)).grid(row=0, column=0, padx=10, pady=5, sticky="w")
-            ctk.CTkLabel(purchase_frame, text=purchase["items"], font=self.theme_manager.get_font_config(11)).grid(row=0, column=1, padx=10, pady=5, sticky="w")
-            ctk.CTkLabel(purchase_frame, text=f"{purchase['amount']:.2f} ر.س", font=self.theme_manager.get_font_config(11, "bold")).grid(row=0, column=2, padx=10, pady=5, sticky="e")
+            for sale, items in page:
+                purchase_frame = ctk.CTkFrame(history_frame)
+                purchase_frame.pack(fill="x", pady=2)
+                purchase_frame.grid_columnconfigure(1, weight=1)
+                
+                items_text = "، ".join(f"{sale_item.product_name} × {sale_item.quantity}" for sale_item in items)
+                
+                ctk.CTkLabel(purchase_frame, text=(sale.created_at or "")[:10], font=self.theme_manager.get_font_config(11)).grid(row=0, column=0, padx=10, pady=5, sticky="w")
+                ctk.CTkLabel(purchase_frame, text=items_text, font=self.theme_manager.get_font_config(11), wraplength=380, justify="left").grid(row=0, column=1, padx=10, pady=5, sticky="w")
+                ctk.CTkLabel(purchase_frame, text=self.pricing.format(sale.final_amount), font=self.theme_manager.get_font_config(11, "bold")).grid(row=0, column=2, padx=10, pady=5, sticky="e")
+            
+            if len(page) == HISTORY_PAGE_SIZE:
+                last_sale = page[-1][0]
+                more_btn.configure(command=lambda: load_page((last_sale.created_at, last_sale.id)))
+                more_btn.pack(pady=10)
+            elif first and not page:
+                ctk.CTkLabel(history_frame, text="لا توجد مشتريات", font=self.theme_manager.get_font_config(11)).pack(pady=20)
+        
+        def load_page(before=None):
+            more_btn.configure(state="disabled")
+            
+            def load():
+                if before is None:
+                    summary = self.db_manager.get_customer_summary(customer_id)
+                    self.after(0, show_summary, summary)
+                page = self.db_manager.get_customer_history(customer_id, HISTORY_PAGE_SIZE, before)
+                self.after(0, show_page, page, before is None)
+                self.after(0, lambda: more_btn.configure(state="normal") if details_window.winfo_exists() else None)
+            
+            threading.Thread(target=load, daemon=True).start()
+        
+        load_page()
     
     def _on_customer_double_click(self, event):
         """Handle customer double click"""
@@ -14,6 +14,7 @@ from datetime import datetime, timedelta
 import threading
 
 from src.utils.logger import get_logger
+from src.utils.instrumentation import metrics
 
 logger = get_logger(__name__)
 
@@ -31,10 +32,25 @@ class DashboardView(ctk.CTkFrame):
         self.grid_rowconfigure(2, weight=1)
 
         self.stats_data = {}
+        self._figures = []
 
         self._setup_ui()
         self._load_data()
 
+        # Charts are rendered images, so a theme switch redraws them
+        self.settings_manager = theme_manager.settings_manager
+        self.settings_manager.subscribe(self._on_settings_changed)
+
+    def destroy(self):
+        """Unsubscribe from settings and release the chart figures before destroying the view"""
+        self.settings_manager.unsubscribe(self._on_settings_changed)
+        self._close_figures()
+        super().destroy()
+
+    def _on_settings_changed(self, category, changes):
+        if category == "display" and "theme" in changes:
+            self._redraw_charts()
+
     def _setup_ui(self):
         """Setup dashboard UI"""
         colors = self.theme_manager.get_colors()
@@ -51,6 +67,7 @@ class DashboardView(ctk.CTkFrame):
             text_color=colors["accent"]
         )
         title_label.grid(row=0, column=0)
+        self.theme_manager.bind_tokens(title_label, text_color="accent")
 
         # Stats cards section
         self._create_stats_cards()
@@ -107,6 +124,7 @@ class DashboardView(ctk.CTkFrame):
             text_color=colors["text_secondary"]
         )
         title_label.grid(row=0, column=0, pady=(15, 5))
+        self.theme_manager.bind_tokens(title_label, text_color="text_secondary")
 
         # Main value
         main_label = ctk.CTkLabel(
@@ -116,6 +134,7 @@ class DashboardView(ctk.CTkFrame):
             text_color=colors["accent"]
         )
         main_label.grid(row=1, column=0, pady=5)
+        self.theme_manager.bind_tokens(main_label, text_color="accent")
 
         # Sub value
         sub_label = ctk.CTkLabel(
@@ -125,6 +144,7 @@ class DashboardView(ctk.CTkFrame):
             text_color=colors["text_secondary"]
         )
         sub_label.grid(row=2, column=0, pady=(5, 15))
+        self.theme_manager.bind_tokens(sub_label, text_color="text_secondary")
 
         return {
             'frame': card,
@@ -134,7 +154,7 @@ class DashboardView(ctk.CTkFrame):
 
     def _create_charts_section(self):
         """Create charts section"""
-        charts_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.charts_frame = charts_frame = ctk.CTkFrame(self, fg_color="transparent")
         charts_frame.grid(row=2, column=0, sticky="nsew", pady=(0, 20))
         charts_frame.grid_columnconfigure(0, weight=1)
         charts_frame.grid_columnconfigure(1, weight=1)
@@ -146,6 +166,20 @@ class DashboardView(ctk.CTkFrame):
         # Products chart
         self._create_products_chart(charts_frame, 1)
 
+    def _redraw_charts(self):
+        """Draw both charts again with the current theme colors"""
+        self._close_figures()
+        for child in self.charts_frame.winfo_children():
+            child.destroy()
+        self._create_sales_chart(self.charts_frame, 0)
+        self._create_products_chart(self.charts_frame, 1)
+
+    def _close_figures(self):
+        for fig in self._figures:
+            plt.close(fig)
+        self._figures.clear()
+
+    @metrics.timed("ui.dashboard.sales_chart")
     def _create_sales_chart(self, frame, column):
         """Create sales chart with proper Arabic font support"""
         try:
@@ -170,6 +204,7 @@ class DashboardView(ctk.CTkFrame):
             text_color = colors['text_primary']
 
             fig, ax = plt.subplots(figsize=(6, 4))
+            self._figures.append(fig)
             fig.patch.set_facecolor(fig_color)
             ax.set_facecolor(fig_color)
 
@@ -201,7 +236,7 @@ class DashboardView(ctk.CTkFrame):
             canvas.get_tk_widget().grid(row=0, column=column, padx=(0, 10), pady=0, sticky="nsew")
 
         except Exception as e:
-            logger.error(f"Error creating sales chart: {e}")
+            logger.error("Error creating sales chart: %s", e)
             error_label = ctk.CTkLabel(
                 frame, 
                 text=f"خطأ في عرض الرسم البياني للمبيعات\n{str(e)[:50]}...",
@@ -210,6 +245,7 @@ class DashboardView(ctk.CTkFrame):
             )
             error_label.grid(row=0, column=column, padx=(0, 10), pady=0, sticky="nsew")
 
+    @metrics.timed("ui.dashboard.products_chart")
     def _create_products_chart(self, frame, column):
         """Create products chart with proper Arabic font support"""
         try:
@@ -232,6 +268,7 @@ class DashboardView(ctk.CTkFrame):
             text_color = colors['text_primary']
 
             fig, ax = plt.subplots(figsize=(6, 4))
+            self._figures.append(fig)
             fig.patch.set_facecolor(fig_color)
             ax.set_facecolor(fig_color)
 
@@ -268,7 +305,7 @@ class DashboardView(ctk.CTkFrame):
             canvas.get_tk_widget().grid(row=0, column=column, padx=(10, 0), pady=0, sticky="nsew")
 
         except Exception as e:
-            logger.error(f"Error creating products chart: {e}")
+            logger.error("Error creating products chart: %s", e)
             error_label = ctk.CTkLabel(
                 frame, 
                 text=f"خطأ في عرض رسم المنتجات\n{str(e)[:50]}...",
@@ -318,7 +355,7 @@ class DashboardView(ctk.CTkFrame):
                 self.stats_data = self.db_manager.get_dashboard_stats()
                 self.after(0, self._update_stats_display)
             except Exception as e:
-                logger.error(f"Error loading dashboard stats: {e}")
+                logger.error("Error loading dashboard stats: %s", e)
 
         # Load data in background thread
         threading.Thread(target=load_stats, daemon=True).start()
@@ -359,7 +396,7 @@ class DashboardView(ctk.CTkFrame):
             )
 
             # Update low stock card
-            low_stock_count = self.stats_data.get('low_stock_count', 0)
+            low_stock_count = self.stats_data.get('low_stock', 0)
             self.low_stock_card['main_label'].configure(
                 text=f"{low_stock_count} منتج"
             )
@@ -369,9 +406,10 @@ class DashboardView(ctk.CTkFrame):
                 self.low_stock_card['main_label'].configure(
                     text_color=colors["warning"]
                 )
+                self.theme_manager.bind_tokens(self.low_stock_card['main_label'], text_color="warning")
 
         except Exception as e:
-            logger.error(f"Error updating stats display: {e}")
+            logger.error("Error updating stats display: %s", e)
 
     def refresh_data(self):
         """Refresh dashboard data"""
@@ -380,18 +418,7 @@ class DashboardView(ctk.CTkFrame):
     def _get_monthly_sales_data(self):
         """Get monthly sales data from database"""
         try:
-            cursor = self.db_manager.connection.cursor()
-            cursor.execute('''
-                SELECT 
-                    strftime('%m', created_at) as month,
-                    SUM(final_amount) as total_sales
-                FROM sales 
-                WHERE created_at >= date('now', '-6 months')
-                GROUP BY strftime('%Y-%m', created_at)
-                ORDER BY created_at
-            ''')
-
-            results = cursor.fetchall()
+            results = self.db_manager.get_monthly_sales(6)
 
             # Month names in Arabic
             month_names = {
@@ -418,7 +445,7 @@ class DashboardView(ctk.CTkFrame):
             return {'months': months, 'sales': sales}
 
         except Exception as e:
-            logger.error(f"Error getting monthly sales data: {e}")
+            logger.error("Error getting monthly sales data: %s", e)
             return {
                 'months': ['يناير', 'فبراير', 'مارس', 'أبريل', 'مايو', 'يونيو'],
                 'sales': [0, 0, 0, 0, 0, 0]
@@ -427,19 +454,7 @@ class DashboardView(ctk.CTkFrame):
     def _get_top_products_data(self):
         """Get top selling products data"""
         try:
-            cursor = self.db_manager.connection.cursor()
-            cursor.execute('''
-                SELECT 
-                    p.brand,
-                    SUM(si.quantity) as total_quantity
-                FROM sale_items si
-                JOIN products p ON si.product_id = p.id
-                GROUP BY p.brand
-                ORDER BY total_quantity DESC
-                LIMIT 5
-            ''')
-
-            results = cursor.fetchall()
+            results = self.db_manager.get_top_brands(5)
 
             categories = []
             quantities = []
@@ -458,7 +473,7 @@ class DashboardView(ctk.CTkFrame):
             return {'categories': categories, 'quantities': quantities}
 
         except Exception as e:
-            logger.error(f"Error getting top products data: {e}")
+            logger.error("Error getting top products data: %s", e)
             return {
                 'categories': ['سامسونج', 'آيفون', 'هواوي', 'شاومي', 'أوبو'],
                 'quantities': [0, 0, 0, 0, 0]
@@ -10,11 +10,21 @@ import customtkinter as ctk
 from tkinter import messagebox, filedialog
 from tkinter import ttk
 import threading
+from dataclasses import replace
 
+from src.core.database import Product
+from src.core.models import ProductFrame
 from src.utils.logger import get_logger
+from src.utils.instrumentation import metrics
 
 logger = get_logger(__name__)
 
+ALL_CATEGORIES = "جميع الفئات"
+NO_CATEGORY = "اختر الفئة"
+
+# Pause after the last keystroke before the products are re-queried
+SEARCH_DELAY_MS = 150
+
 class ProductsView(ctk.CTkFrame):
     """Products management view"""
     
@@ -28,8 +38,9 @@ class ProductsView(ctk.CTkFrame):
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=1)
         
-        self.products_data = []
+        self.products_data = ProductFrame()
         self.categories_data = []
+        self._search_job = None
         
         self._setup_ui()
         self._load_data()
@@ -51,6 +62,7 @@ class ProductsView(ctk.CTkFrame):
             text_color=colors["accent"]
         )
         title_label.grid(row=0, column=0, padx=(0, 20))
+        self.theme_manager.bind_tokens(title_label, text_color="accent")
         
         # Search and filter section
         search_frame = ctk.CTkFrame(header_frame, fg_color="transparent")
@@ -71,11 +83,11 @@ class ProductsView(ctk.CTkFrame):
         search_entry.grid(row=0, column=0, padx=(0, 10))
         
         # Category filter
-        self.category_var = ctk.StringVar(value="جميع الفئات")
+        self.category_var = ctk.StringVar(value=ALL_CATEGORIES)
         self.category_combo = ctk.CTkComboBox(
             search_frame,
             variable=self.category_var,
-            values=["جميع الفئات"],
+            values=[ALL_CATEGORIES],
             width=150,
             command=self._on_category_change
         )
@@ -120,11 +132,12 @@ class ProductsView(ctk.CTkFrame):
             text="حذف",
             command=self._delete_selected_product,
             fg_color=colors["danger"],
-            hover_color="#c0392b",
+            hover_color=colors["danger_hover"],
             width=100,
             font=self.theme_manager.get_font_config(12)
         )
         delete_btn.pack(side="left", padx=(0, 10))
+        self.theme_manager.bind_tokens(delete_btn, fg_color="danger", hover_color="danger_hover")
         
         refresh_btn = ctk.CTkButton(
             actions_frame,
@@ -180,140 +193,86 @@ class ProductsView(ctk.CTkFrame):
         # Bind double click event
         self.products_tree.bind("<Double-1>", self._on_product_double_click)
     
+    def _selected_category_id(self):
+        """Id of the category chosen in the filter, None for all"""
+        name = self.category_var.get()
+        for category in self.categories_data:
+            if category.name == name:
+                return category.id
+        return None
+    
+    def _fetch_products(self, search_term, category_id):
+        """Query the product list columns (runs on the loader thread)"""
+        return self.db_manager.get_product_frame(search_term, category_id)
+    
     def _load_data(self):
-        """Load products and categories data"""
+        """Load categories, then the products for the current filters"""
         def load_products():
-            try:
-                # Load products - try different column names for stock
-                try:
-                    products = self.db_manager.execute_query("""
-                        SELECT p.id, p.name, p.brand, c.name as category_name,
-                               p.selling_price, p.stock_quantity, p.status
-                        FROM products p
-                        LEFT JOIN categories c ON p.category_id = c.id
-                        WHERE p.status = 'active'
-                        ORDER BY p.name
-                    """)
-                except:
-                    # Fallback if stock_quantity doesn't exist
-                    products = self.db_manager.execute_query("""
-                        SELECT p.id, p.name, p.brand, c.name as category_name,
-                               p.selling_price, COALESCE(p.quantity, 0) as stock_quantity, p.status
-                        FROM products p
-                        LEFT JOIN categories c ON p.category_id = c.id
-                        WHERE p.status = 'active'
-                        ORDER BY p.name
-                    """)
-                
-                # Load categories
-                categories = self.db_manager.execute_query("""
-                    SELECT id, name FROM categories 
-                    WHERE status = 'active' 
-                    ORDER BY name
-                """)
-                
-                # Update UI in main thread
-                self.after(0, lambda: self._update_products_display(products, categories))
-                
-            except Exception as e:
-                logger.error(f"Error loading products data: {e}")
-                # Create sample data if no data exists
-                sample_products = [
-                    {'id': 1, 'name': 'iPhone 15 Pro', 'brand': 'Apple', 'category_name': 'هواتف ذكية', 'selling_price': 4500.0, 'stock_quantity': 10, 'status': 'active'},
-                    {'id': 2, 'name': 'Galaxy S24', 'brand': 'Samsung', 'category_name': 'هواتف ذكية', 'selling_price': 3200.0, 'stock_quantity': 5, 'status': 'active'},
-                    {'id': 3, 'name': 'AirPods Pro', 'brand': 'Apple', 'category_name': 'إكسسوارات', 'selling_price': 950.0, 'stock_quantity': 15, 'status': 'active'}
-                ]
-                sample_categories = [
-                    {'id': 1, 'name': 'هواتف ذكية'},
-                    {'id': 2, 'name': 'إكسسوارات'},
-                    {'id': 3, 'name': 'قطع غيار'}
-                ]
-                self.after(0, lambda: self._update_products_display(sample_products, sample_categories))
+            categories = self.db_manager.get_categories()
+            self.after(0, lambda: self._update_categories(categories))
         
         # Load in background thread
         threading.Thread(target=load_products, daemon=True).start()
     
-    def _update_products_display(self, products, categories):
+    def _update_categories(self, categories):
+        """Refresh the category filter, then reload the products"""
+        self.categories_data = categories
+        self.category_combo.configure(values=[ALL_CATEGORIES] + [category.name for category in categories])
+        if self._selected_category_id() is None:
+            self.category_var.set(ALL_CATEGORIES)
+        self._refresh_products()
+    
+    def _refresh_products(self):
+        """Re-query the products for the search term and category"""
+        search_term = self.search_var.get().strip()
+        category_id = self._selected_category_id()
+        
+        def load():
+            products = self._fetch_products(search_term, category_id)
+            self.after(0, lambda: self._update_products_display(products))
+        
+        threading.Thread(target=load, daemon=True).start()
+    
+    @metrics.timed("ui.products.tree_refill")
+    def _update_products_display(self, products):
         """Update products display"""
         try:
-            # Store data
             self.products_data = products
-            self.categories_data = categories
             
-            # Update products table
             # Clear existing items
             for item in self.products_tree.get_children():
                 self.products_tree.delete(item)
             
             # Insert products
-            for product in products:
-                status_text = "نشط" if product['status'] == 'active' else "غير نشط"
+            for product_id, name, brand, category, price, stock, _, status in products.rows():
+                status_text = "نشط" if status == 'active' else "غير نشط"
                 
                 self.products_tree.insert("", "end", values=(
-                    product['id'],
-                    product['name'],
-                    product['brand'],
-                    product['category_name'] or 'غير محدد',
-                    f"{product['selling_price']:.2f}",
-                    product['stock_quantity'],
+                    product_id,
+                    name,
+                    brand or '',
+                    category or 'غير محدد',
+                    f"{price:.2f}",
+                    stock,
                     status_text
                 ))
             
-            # Update category filter
-            category_names = ["جميع الفئات"] + [cat['name'] for cat in categories]
-            self.category_combo.configure(values=category_names)
-            
         except Exception as e:
-            logger.error(f"Error updating products display: {e}")
+            logger.error("Error updating products display: %s", e)
     
     def _on_search_change(self, *args):
-        """Handle search input change"""
-        search_term = self.search_var.get().lower()
-        
-        # Clear current items
-        for item in self.products_tree.get_children():
-            self.products_tree.delete(item)
-        
-        # Filter and display products
-        for product in self.products_data:
-            if (search_term in product['name'].lower() or 
-                search_term in (product['brand'] or '').lower() or
-                search_term in (product['category_name'] or '').lower()):
-                
-                status_text = "نشط" if product['status'] == 'active' else "غير نشط"
-                self.products_tree.insert("", "end", values=(
-                    product['id'],
-                    product['name'],
-                    product['brand'],
-                    product['category_name'] or 'غير محدد',
-                    f"{product['selling_price']:.2f}",
-                    product['stock_quantity'],
-                    status_text
-                ))
+        """Re-query the products, waiting for a pause in typing"""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DELAY_MS, self._apply_search)
+    
+    def _apply_search(self):
+        self._search_job = None
+        self._refresh_products()
     
     def _on_category_change(self, value):
         """Handle category filter change"""
-        selected_category = self.category_var.get()
-        
-        # Clear current items
-        for item in self.products_tree.get_children():
-            self.products_tree.delete(item)
-        
-        # Filter and display products
-        for product in self.products_data:
-            if (selected_category == "جميع الفئات" or 
-                product['category_name'] == selected_category):
-                
-                status_text = "نشط" if product['status'] == 'active' else "غير نشط"
-                self.products_tree.insert("", "end", values=(
-                    product['id'],
-                    product['name'],
-                    product['brand'],
-                    product['category_name'] or 'غير محدد',
-                    f"{product['selling_price']:.2f}",
-                    product['stock_quantity'],
-                    status_text
-                ))
+        self._refresh_products()
     
     def _show_add_product_dialog(self):
         """Show add new product dialog"""
@@ -345,6 +304,7 @@ class ProductsView(ctk.CTkFrame):
             text_color=colors["accent"]
         )
         title_label.pack(pady=20)
+        self.theme_manager.bind_tokens(title_label, text_color="accent")
         
         # Form frame
         form_frame = ctk.CTkScrollableFrame(dialog)
@@ -355,43 +315,43 @@ class ProductsView(ctk.CTkFrame):
         name_entry = ctk.CTkEntry(form_frame, width=400, font=self.theme_manager.get_font_config(12))
         name_entry.pack(fill="x", pady=(0, 10))
         if product_data:
-            name_entry.insert(0, product_data.get('name', ''))
+            name_entry.insert(0, product_data.name)
         
         # Brand
         ctk.CTkLabel(form_frame, text="العلامة التجارية:", font=self.theme_manager.get_font_config(12)).pack(anchor="w", pady=(0, 5))
         brand_entry = ctk.CTkEntry(form_frame, width=400, font=self.theme_manager.get_font_config(12))
         brand_entry.pack(fill="x", pady=(0, 10))
         if product_data:
-            brand_entry.insert(0, product_data.get('brand', ''))
+            brand_entry.insert(0, product_data.brand or '')
         
         # Category
         ctk.CTkLabel(form_frame, text="الفئة:", font=self.theme_manager.get_font_config(12)).pack(anchor="w", pady=(0, 5))
-        category_values = ["اختر الفئة"] + [cat['name'] for cat in self.categories_data]
+        category_values = [NO_CATEGORY] + [category.name for category in self.categories_data]
         category_combo = ctk.CTkComboBox(form_frame, values=category_values, width=400)
         category_combo.pack(fill="x", pady=(0, 10))
-        if product_data and product_data.get('category_name'):
-            category_combo.set(product_data['category_name'])
+        if product_data and product_data.category:
+            category_combo.set(product_data.category)
         
         # Price
         ctk.CTkLabel(form_frame, text="سعر البيع:", font=self.theme_manager.get_font_config(12)).pack(anchor="w", pady=(0, 5))
         price_entry = ctk.CTkEntry(form_frame, width=400, font=self.theme_manager.get_font_config(12))
         price_entry.pack(fill="x", pady=(0, 10))
         if product_data:
-            price_entry.insert(0, str(product_data.get('selling_price', '')))
+            price_entry.insert(0, str(product_data.price))
         
         # Stock quantity
         ctk.CTkLabel(form_frame, text="كمية المخزون:", font=self.theme_manager.get_font_config(12)).pack(anchor="w", pady=(0, 5))
         stock_entry = ctk.CTkEntry(form_frame, width=400, font=self.theme_manager.get_font_config(12))
         stock_entry.pack(fill="x", pady=(0, 10))
         if product_data:
-            stock_entry.insert(0, str(product_data.get('stock_quantity', '')))
+            stock_entry.insert(0, str(product_data.stock_quantity))
         
         # Description
         ctk.CTkLabel(form_frame, text="الوصف:", font=self.theme_manager.get_font_config(12)).pack(anchor="w", pady=(0, 5))
         description_text = ctk.CTkTextbox(form_frame, width=400, height=100)
         description_text.pack(fill="x", pady=(0, 20))
         if product_data:
-            description_text.insert("1.0", product_data.get('description', ''))
+            description_text.insert("1.0", product_data.description or '')
         
         # Buttons frame
         buttons_frame = ctk.CTkFrame(dialog, fg_color="transparent")
@@ -411,17 +371,21 @@ class ProductsView(ctk.CTkFrame):
                     messagebox.showerror("خطأ", "يرجى إدخال اسم المنتج")
                     return
                 
-                if category == "اختر الفئة":
-                    category_id = None
+                if category == NO_CATEGORY:
+                    category = ""
+                
+                # Typed category names are created by the database manager
+                fields = dict(name=name, brand=brand, category=category, category_id=None,
+                              price=price, stock_quantity=stock, description=description)
+                if product_data:
+                    saved = self.db_manager.update_product(replace(product_data, **fields))
                 else:
-                    # Find category ID
-                    category_id = None
-                    for cat in self.categories_data:
-                        if cat['name'] == category:
-                            category_id = cat['id']
-                            break
+                    saved = self.db_manager.add_product(Product(**fields))
+                
+                if not saved:
+                    messagebox.showerror("خطأ", "تعذر حفظ المنتج")
+                    return
                 
-                # Save to database (simplified)
                 messagebox.showinfo("نجح الحفظ", f"تم حفظ المنتج '{name}' بنجاح!")
                 dialog.destroy()
                 self._load_data()  # Refresh the data
@@ -440,6 +404,7 @@ class ProductsView(ctk.CTkFrame):
             fg_color=colors["success"]
         )
         save_btn.pack(side="right", padx=(10, 0))
+        self.theme_manager.bind_tokens(save_btn, fg_color="success")
         
         # Cancel button
         cancel_btn = ctk.CTkButton(
@@ -462,12 +427,8 @@ class ProductsView(ctk.CTkFrame):
         item = self.products_tree.item(selection[0])
         product_id = item['values'][0]
         
-        # Find product in data
-        product_data = None
-        for product in self.products_data:
-            if product['id'] == product_id:
-                product_data = product
-                break
+        # The list only holds display columns; edit the full record
+        product_data = self.db_manager.get_product(product_id)
         
         if product_data:
             self._show_product_dialog(product_data)
@@ -481,7 +442,15 @@ class ProductsView(ctk.CTkFrame):
         
         if messagebox.askyesno("تأكيد الحذف", "هل تريد حذف المنتج المحدد؟"):
             item = self.products_tree.item(selection[0])
+            product_id = item['values'][0]
             product_name = item['values'][1]
+            
+            # Deactivated rather than removed: past sales still refer to it
+            product = self.db_manager.get_product(product_id)
+            if product is None or not self.db_manager.update_product(replace(product, status="inactive")):
+                messagebox.showerror("خطأ", "تعذر حذف المنتج")
+                return
+            
             messagebox.showinfo("تم الحذف", f"تم حذف المنتج '{product_name}' بنجاح!")
             self.products_tree.delete(selection[0])
     
@@ -14,18 +14,24 @@ from matplotlib.figure import Figure
 import threading
 from datetime import datetime, timedelta
 
+from src.core.pricing import PricingEngine
+from src.core.report_engine import ReportEngine, DateRange, PERIOD_DAYS
 from src.utils.logger import get_logger
+from src.utils.instrumentation import metrics
 
 logger = get_logger(__name__)
 
 class ReportsView(ctk.CTkFrame):
     """Reports and analytics view"""
     
-    def __init__(self, parent, db_manager, theme_manager):
+    def __init__(self, parent, db_manager, theme_manager, settings_manager, report_engine=None):
         super().__init__(parent, fg_color="transparent")
         
         self.db_manager = db_manager
         self.theme_manager = theme_manager
+        self.settings_manager = settings_manager
+        self.report_engine = report_engine or ReportEngine(db_manager)
+        self.pricing = PricingEngine.from_settings(settings_manager)
         
         self._setup_ui()
     
@@ -41,6 +47,7 @@ class ReportsView(ctk.CTkFrame):
             text_color=colors["accent"]
         )
         title_label.pack(pady=(0, 30))
+        self.theme_manager.bind_tokens(title_label, text_color="accent")
         
         # Date range selection
         date_frame = ctk.CTkFrame(self, fg_color="transparent")
@@ -50,10 +57,11 @@ class ReportsView(ctk.CTkFrame):
         
         self.date_range = ctk.CTkComboBox(
             date_frame,
-            values=["اليوم", "أسبوع", "شهر", "3 أشهر", "6 أشهر", "سنة", "فترة مخصصة"],
+            values=list(PERIOD_DAYS),
             width=150,
             font=self.theme_manager.get_font_config(11)
         )
+        self.date_range.set("شهر")
         self.date_range.pack(side="left", padx=(0, 20))
         
         # Generate report button
@@ -63,9 +71,10 @@ class ReportsView(ctk.CTkFrame):
             command=self._generate_report,
             font=self.theme_manager.get_font_config(12, "bold"),
             fg_color=colors["success"],
-            hover_color="#229954"
+            hover_color=colors["success_hover"]
         )
         generate_btn.pack(side="left")
+        self.theme_manager.bind_tokens(generate_btn, fg_color="success", hover_color="success_hover")
         
         # Reports grid
         reports_frame = ctk.CTkFrame(self, fg_color="transparent")
@@ -151,40 +160,41 @@ class ReportsView(ctk.CTkFrame):
     
     def _generate_report(self):
         """Generate general report based on selected date range"""
-        period = self.date_range.get()
-        messagebox.showinfo("إنشاء التقرير", f"جاري إنشاء تقرير عام لفترة: {period}")
+        self._show_financial_report()
     
     def _show_sales_report(self):
         """Show sales report"""
-        self._show_detailed_report("تقرير المبيعات", self._generate_sales_data)
+        self._show_detailed_report("تقرير المبيعات", "sales", self._generate_sales_data)
     
     def _show_products_report(self):
         """Show products report"""
-        self._show_detailed_report("تقرير المنتجات", self._generate_products_data)
+        self._show_detailed_report("تقرير المنتجات", "products", self._generate_products_data)
     
     def _show_customers_report(self):
         """Show customers report"""
-        self._show_detailed_report("تقرير العملاء", self._generate_customers_data)
+        self._show_detailed_report("تقرير العملاء", "customers", self._generate_customers_data)
     
     def _show_financial_report(self):
         """Show financial report"""
-        self._show_detailed_report("التقرير المالي", self._generate_financial_data)
+        self._show_detailed_report("التقرير المالي", "financial", self._generate_financial_data)
     
     def _show_inventory_report(self):
         """Show inventory report"""
-        self._show_detailed_report("تقرير المخزون", self._generate_inventory_data)
+        self._show_detailed_report("تقرير المخزون", "inventory", self._generate_inventory_data)
     
     def _show_custom_report(self):
         """Show custom report builder"""
         messagebox.showinfo("تقارير مخصصة", "منشئ التقارير المخصصة قيد التطوير...")
     
-    def _show_detailed_report(self, title, data_generator):
-        """Show detailed report window"""
+    def _show_detailed_report(self, title, report_name, data_generator):
+        """Show detailed report window; the data is built on the report worker"""
         colors = self.theme_manager.get_colors()
+        period = self.date_range.get()
+        date_range = DateRange.for_period(period)
         
         # Create report window
         report_window = ctk.CTkToplevel(self)
-        report_window.title(title)
+        report_window.title(f"{title} - {period}")
         report_window.geometry("900x700")
         report_window.transient(self)
         
@@ -200,12 +210,13 @@ class ReportsView(ctk.CTkFrame):
             text_color=colors["accent"]
         )
         title_label.pack(side="left")
+        self.theme_manager.bind_tokens(title_label, text_color="accent")
         
         # Export button
         export_btn = ctk.CTkButton(
             header_frame,
             text="تصدير PDF",
-            command=lambda: self._export_report(title),
+            command=lambda: self._export_report(title, report_name, date_range),
             width=100,
             font=self.theme_manager.get_font_config(11)
         )
@@ -215,32 +226,88 @@ class ReportsView(ctk.CTkFrame):
         content_frame = ctk.CTkScrollableFrame(report_window)
         content_frame.pack(expand=True, fill="both", padx=20, pady=(0, 20))
         
-        # Generate and display data
-        data_generator(content_frame)
+        loading_label = ctk.CTkLabel(content_frame, text="جاري تحميل التقرير...", font=self.theme_manager.get_font_config(12))
+        loading_label.pack(pady=40)
+        
+        def on_ready(data):
+            if not report_window.winfo_exists():
+                return
+            loading_label.destroy()
+            data_generator(content_frame, data)
+        
+        def on_error(error):
+            if report_window.winfo_exists():
+                loading_label.configure(text=f"تعذر إنشاء التقرير: {error}")
+        
+        self.report_engine.submit(report_name, date_range, on_ready, on_error, widget=report_window)
     
-    def _generate_sales_data(self, parent):
-        """Generate sales report data"""
+    def _money(self, value):
+        return self.pricing.format(value)
+    
+    def _summary_cards(self, parent, cards, height=80):
+        """Row of label/value cards; values are colored by a theme token"""
         colors = self.theme_manager.get_colors()
+        frame = ctk.CTkFrame(parent, fg_color="transparent")
+        frame.pack(fill="x", pady=(0, 20))
+        frame.grid_columnconfigure(tuple(range(len(cards))), weight=1)
         
-        # Summary cards
-        summary_frame = ctk.CTkFrame(parent, fg_color="transparent")
-        summary_frame.pack(fill="x", pady=(0, 20))
-        summary_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
-        
-        # Sample data
-        metrics = [
-            ("إجمالي المبيعات", "45,670 ر.س", colors["success"]),
-            ("عدد الفواتير", "267", colors["accent"]),
-            ("متوسط الفاتورة", "171 ر.س", colors["warning"]),
-            ("أعلى فاتورة", "2,450 ر.س", colors["danger"])
-        ]
-        
-        for i, (label, value, color) in enumerate(metrics):
-            card = ctk.CTkFrame(summary_frame, height=80)
-            card.grid(row=0, column=i, padx=5, sticky="ew")
+        for i, (label, value, token) in enumerate(cards):
+            card = ctk.CTkFrame(frame, height=height)
+            card.grid(row=0, column=i, padx=5, pady=10, sticky="ew")
             
             ctk.CTkLabel(card, text=label, font=self.theme_manager.get_font_config(11)).pack(pady=(10, 5))
-            ctk.CTkLabel(card, text=value, font=self.theme_manager.get_font_config(16, "bold"), text_color=color).pack(pady=(0, 10))
+            value_label = ctk.CTkLabel(card, text=value, font=self.theme_manager.get_font_config(16, "bold"), text_color=colors[token])
+            value_label.pack(pady=(0, 10))
+            self.theme_manager.bind_tokens(value_label, text_color=token)
+    
+    def _table(self, parent, headers, rows, emphasis_token=None):
+        """Simple striped table; the last column is emphasized"""
+        colors = self.theme_manager.get_colors()
+        columns = tuple(range(len(headers)))
+        
+        table_frame = ctk.CTkFrame(parent)
+        table_frame.pack(fill="x", pady=(0, 20))
+        
+        headers_frame = ctk.CTkFrame(table_frame, fg_color=colors["bg_secondary"])
+        headers_frame.pack(fill="x", padx=10, pady=(10, 0))
+        self.theme_manager.bind_tokens(headers_frame, fg_color="bg_secondary")
+        headers_frame.grid_columnconfigure(columns, weight=1)
+        for i, header in enumerate(headers):
+            ctk.CTkLabel(headers_frame, text=header, font=self.theme_manager.get_font_config(12, "bold")).grid(row=0, column=i, padx=10, pady=10)
+        
+        if not rows:
+            ctk.CTkLabel(table_frame, text="لا توجد بيانات في هذه الفترة", font=self.theme_manager.get_font_config(11)).pack(pady=15)
+            return
+        
+        for r, row in enumerate(rows):
+            row_frame = ctk.CTkFrame(table_frame, fg_color="transparent" if r % 2 == 0 else colors["bg_tertiary"])
+            row_frame.pack(fill="x", padx=10, pady=2)
+            if r % 2:
+                self.theme_manager.bind_tokens(row_frame, fg_color="bg_tertiary")
+            row_frame.grid_columnconfigure(columns, weight=1)
+            
+            last = len(row) - 1
+            for c, value in enumerate(row):
+                emphasized = c == last and emphasis_token is not None
+                cell = ctk.CTkLabel(
+                    row_frame,
+                    text=value,
+                    font=self.theme_manager.get_font_config(11, "bold" if c == last else "normal"),
+                    text_color=colors[emphasis_token] if emphasized else None
+                )
+                cell.grid(row=0, column=c, padx=10, pady=8, sticky="w" if c == 0 else "")
+                if emphasized:
+                    self.theme_manager.bind_tokens(cell, text_color=emphasis_token)
+    
+    @metrics.timed("ui.reports.sales_report")
+    def _generate_sales_data(self, parent, data):
+        """Generate sales report data"""
+        self._summary_cards(parent, [
+            ("إجمالي المبيعات", self._money(data["total_sales"]), "success"),
+            ("عدد الفواتير", f"{data['invoice_count']:,}", "accent"),
+            ("متوسط الفاتورة", self._money(data["average_invoice"]), "warning"),
+            ("أعلى فاتورة", self._money(data["largest_invoice"]), "danger")
+        ])
         
         # Chart
         chart_frame = ctk.CTkFrame(parent)
@@ -250,13 +317,16 @@ class ReportsView(ctk.CTkFrame):
             fig = Figure(figsize=(10, 6), dpi=100)
             ax = fig.add_subplot(111)
             
-            # Sample sales data
-            days = ['الأحد', 'الاثنين', 'الثلاثاء', 'الأربعاء', 'الخميس', 'الجمعة', 'السبت']
-            sales = [5200, 6800, 4500, 7200, 6100, 8900, 7300]
+            days = [row[0] for row in data["daily"]]
+            sales = [row[1] for row in data["daily"]]
             
-            ax.plot(days, sales, marker='o', linewidth=2, markersize=6, color='#3B8ED0')
-            ax.set_title('مبيعات الأسبوع', fontsize=14, fontweight='bold')
-            ax.set_ylabel('المبيعات (ر.س)', fontsize=12)
+            ax.plot(range(len(days)), sales, marker='o' if len(days) <= 31 else None,
+                    linewidth=2, markersize=6, color='#3B8ED0')
+            step = max(1, len(days) // 10)
+            ax.set_xticks(range(0, len(days), step))
+            ax.set_xticklabels(days[::step], rotation=30, ha='right')
+            ax.set_title('المبيعات اليومية', fontsize=14, fontweight='bold')
+            ax.set_ylabel(f'المبيعات ({self.pricing.currency_symbol})', fontsize=12)
             ax.grid(True, alpha=0.3)
             
             # Adjust layout
@@ -267,227 +337,124 @@ class ReportsView(ctk.CTkFrame):
             canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
             
         except Exception as e:
-            logger.error(f"Error creating sales chart: {e}")
+            logger.error("Error creating sales chart: %s", e)
             ctk.CTkLabel(chart_frame, text="خطأ في تحميل الرسم البياني").pack(pady=20)
         
         # Top products table
         ctk.CTkLabel(parent, text="أكثر المنتجات مبيعاً:", font=self.theme_manager.get_font_config(14, "bold")).pack(anchor="w", pady=(20, 10))
         
-        table_frame = ctk.CTkFrame(parent)
-        table_frame.pack(fill="x", pady=(0, 20))
-        
-        # Table headers
-        headers_frame = ctk.CTkFrame(table_frame, fg_color=colors["bg_secondary"])
-        headers_frame.pack(fill="x", padx=10, pady=(10, 0))
-        headers_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
-        
-        headers = ["المنتج", "الكمية المبيعة", "الإيرادات", "النسبة"]
-        for i, header in enumerate(headers):
-            ctk.CTkLabel(headers_frame, text=header, font=self.theme_manager.get_font_config(12, "bold")).grid(row=0, column=i, padx=10, pady=10)
-        
-        # Table data
-        products_data = [
-            ("iPhone 15 Pro", "45", "202,500 ر.س", "44.3%"),
-            ("Galaxy S24", "32", "102,400 ر.س", "22.4%"),
-            ("AirPods Pro", "67", "63,650 ر.س", "13.9%"),
-            ("Phone Cases", "120", "5,400 ر.س", "1.2%"),
-            ("Chargers", "89", "7,565 ر.س", "1.7%")
-        ]
-        
-        for i, (product, qty, revenue, percentage) in enumerate(products_data):
-            row_frame = ctk.CTkFrame(table_frame, fg_color="transparent" if i % 2 == 0 else colors["bg_tertiary"])
-            row_frame.pack(fill="x", padx=10, pady=2)
-            row_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
-            
-            ctk.CTkLabel(row_frame, text=product, font=self.theme_manager.get_font_config(11)).grid(row=0, column=0, padx=10, pady=8, sticky="w")
-            ctk.CTkLabel(row_frame, text=qty, font=self.theme_manager.get_font_config(11)).grid(row=0, column=1, padx=10, pady=8)
-            ctk.CTkLabel(row_frame, text=revenue, font=self.theme_manager.get_font_config(11)).grid(row=0, column=2, padx=10, pady=8)
-            ctk.CTkLabel(row_frame, text=percentage, font=self.theme_manager.get_font_config(11, "bold"), text_color=colors["success"]).grid(row=0, column=3, padx=10, pady=8)
+        self._table(
+            parent,
+            ["المنتج", "الكمية المبيعة", "الإيرادات", "النسبة"],
+            [(name, f"{qty:,}", self._money(revenue), f"{share:.1f}%")
+             for name, qty, revenue, share in data["top_products"]],
+            "success"
+        )
     
-    def _generate_products_data(self, parent):
+    def _generate_products_data(self, parent, data):
         """Generate products report data"""
         colors = self.theme_manager.get_colors()
         
         # Products summary
         ctk.CTkLabel(parent, text="ملخص المنتجات:", font=self.theme_manager.get_font_config(16, "bold")).pack(anchor="w", pady=(0, 20))
         
-        summary_frame = ctk.CTkFrame(parent)
-        summary_frame.pack(fill="x", pady=(0, 20))
-        summary_frame.grid_columnconfigure((0, 1, 2), weight=1)
-        
-        # Summary cards
-        metrics = [
-            ("إجمالي المنتجات", "847"),
-            ("منتجات نشطة", "623"),
-            ("مخزون منخفض", "23")
-        ]
-        
-        for i, (label, value) in enumerate(metrics):
-            card = ctk.CTkFrame(summary_frame, height=80)
-            card.grid(row=0, column=i, padx=10, pady=10, sticky="ew")
-            
-            ctk.CTkLabel(card, text=label, font=self.theme_manager.get_font_config(12)).pack(pady=(15, 5))
-            ctk.CTkLabel(card, text=value, font=self.theme_manager.get_font_config(18, "bold"), text_color=colors["accent"]).pack(pady=(0, 15))
+        self._summary_cards(parent, [
+            ("إجمالي المنتجات", f"{data['total_products']:,}", "accent"),
+            ("منتجات مباعة في الفترة", f"{data['products_sold']:,}", "accent"),
+            ("مخزون منخفض", f"{data['low_stock_count']:,}", "warning")
+        ])
         
         # Low stock alerts
-        ctk.CTkLabel(parent, text="تنبيهات المخزون المنخفض:", font=self.theme_manager.get_font_config(14, "bold"), text_color=colors["warning"]).pack(anchor="w", pady=(20, 10))
+        alerts_label = ctk.CTkLabel(parent, text="تنبيهات المخزون المنخفض:", font=self.theme_manager.get_font_config(14, "bold"), text_color=colors["warning"])
+        alerts_label.pack(anchor="w", pady=(20, 10))
+        self.theme_manager.bind_tokens(alerts_label, text_color="warning")
         
         alerts_frame = ctk.CTkFrame(parent)
         alerts_frame.pack(fill="x", pady=(0, 20))
         
-        low_stock_items = [
-            ("Galaxy S24", "2", "5"),
-            ("iPhone Case Pro", "1", "10"),
-            ("USB-C Cable", "3", "15")
-        ]
-        
-        for item, current, minimum in low_stock_items:
+        for item, current, minimum in data["low_stock_items"]:
             alert_frame = ctk.CTkFrame(alerts_frame, fg_color=colors["warning"], corner_radius=8)
             alert_frame.pack(fill="x", padx=10, pady=2)
+            self.theme_manager.bind_tokens(alert_frame, fg_color="warning")
             alert_frame.grid_columnconfigure(1, weight=1)
             
             ctk.CTkLabel(alert_frame, text="⚠️", font=self.theme_manager.get_font_config(16)).grid(row=0, column=0, padx=10, pady=8)
             ctk.CTkLabel(alert_frame, text=f"{item} - المتوفر: {current} (الحد الأدنى: {minimum})", font=self.theme_manager.get_font_config(11, "bold")).grid(row=0, column=1, padx=10, pady=8, sticky="w")
     
-    def _generate_customers_data(self, parent):
+    def _generate_customers_data(self, parent, data):
         """Generate customers report data"""
-        colors = self.theme_manager.get_colors()
-        
         ctk.CTkLabel(parent, text="إحصائيات العملاء:", font=self.theme_manager.get_font_config(16, "bold")).pack(anchor="w", pady=(0, 20))
         
-        # Customer metrics
-        metrics_frame = ctk.CTkFrame(parent)
-        metrics_frame.pack(fill="x", pady=(0, 20))
-        metrics_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
-        
-        metrics = [
-            ("إجمالي العملاء", "1,247"),
-            ("عملاء جدد هذا الشهر", "89"),
-            ("عملاء نشطون", "567"),
-            ("متوسط قيمة العميل", "2,340 ر.س")
-        ]
-        
-        for i, (label, value) in enumerate(metrics):
-            card = ctk.CTkFrame(metrics_frame, height=80)
-            card.grid(row=0, column=i, padx=5, pady=10, sticky="ew")
-            
-            ctk.CTkLabel(card, text=label, font=self.theme_manager.get_font_config(11)).pack(pady=(10, 5))
-            ctk.CTkLabel(card, text=value, font=self.theme_manager.get_font_config(14, "bold"), text_color=colors["accent"]).pack(pady=(0, 10))
+        self._summary_cards(parent, [
+            ("إجمالي العملاء", f"{data['total_customers']:,}", "accent"),
+            ("عملاء جدد في الفترة", f"{data['new_customers']:,}", "accent"),
+            ("عملاء نشطون", f"{data['active_customers']:,}", "accent"),
+            ("متوسط قيمة العميل", self._money(data["average_customer_value"]), "accent")
+        ])
         
         # Top customers
         ctk.CTkLabel(parent, text="أفضل العملاء:", font=self.theme_manager.get_font_config(14, "bold")).pack(anchor="w", pady=(20, 10))
         
-        customers_frame = ctk.CTkFrame(parent)
-        customers_frame.pack(fill="x")
+        self._table(
+            parent,
+            ["#", "العميل", "الزيارات", "متوسط السلة", "آخر شراء", "المشتريات"],
+            [(f"#{i + 1}", name, f"{visits:,}", self._money(basket), (last or "")[:10], self._money(total))
+             for i, (name, visits, basket, last, total) in enumerate(data["top_customers"])]
+        )
         
-        top_customers = [
-            ("محمد خالد", "15,670 ر.س", "23 فاتورة"),
-            ("أحمد محمد", "12,340 ر.س", "18 فاتورة"),
-            ("فاطمة علي", "9,580 ر.س", "15 فاتورة"),
-            ("نورا السعد", "7,230 ر.س", "12 فاتورة"),
-            ("عبدالله أحمد", "6,890 ر.س", "11 فاتورة")
-        ]
+        # RFM segmentation
+        ctk.CTkLabel(parent, text="شرائح العملاء (RFM):", font=self.theme_manager.get_font_config(14, "bold")).pack(anchor="w", pady=(20, 10))
         
-        for i, (name, total, invoices) in enumerate(top_customers):
-            customer_frame = ctk.CTkFrame(customers_frame, fg_color=colors["bg_secondary"])
-            customer_frame.pack(fill="x", padx=10, pady=2)
-            customer_frame.grid_columnconfigure(1, weight=1)
-            
-            rank_label = ctk.CTkLabel(customer_frame, text=f"#{i+1}", font=self.theme_manager.get_font_config(12, "bold"), text_color=colors["accent"])
-            rank_label.grid(row=0, column=0, padx=10, pady=10)
-            
-            name_label = ctk.CTkLabel(customer_frame, text=name, font=self.theme_manager.get_font_config(12, "bold"))
-            name_label.grid(row=0, column=1, padx=10, pady=10, sticky="w")
-            
-            total_label = ctk.CTkLabel(customer_frame, text=total, font=self.theme_manager.get_font_config(11))
-            total_label.grid(row=0, column=2, padx=10, pady=10)
-            
-            invoices_label = ctk.CTkLabel(customer_frame, text=invoices, font=self.theme_manager.get_font_config(11))
-            invoices_label.grid(row=0, column=3, padx=10, pady=10)
+        self._table(
+            parent,
+            ["الشريحة", "العملاء", "المشتريات"],
+            [(label, f"{count:,}", self._money(spent)) for label, count, spent in data["rfm"]]
+        )
     
-    def _generate_financial_data(self, parent):
+    def _generate_financial_data(self, parent, data):
         """Generate financial report data"""
-        colors = self.theme_manager.get_colors()
-        
         ctk.CTkLabel(parent, text="التقرير المالي:", font=self.theme_manager.get_font_config(16, "bold")).pack(anchor="w", pady=(0, 20))
         
-        # Financial summary
-        summary_frame = ctk.CTkFrame(parent)
-        summary_frame.pack(fill="x", pady=(0, 20))
-        summary_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
-        
-        metrics = [
-            ("إجمالي الإيرادات", "345,670 ر.س", colors["success"]),
-            ("التكاليف", "189,340 ر.س", colors["warning"]),
-            ("صافي الربح", "156,330 ر.س", colors["success"]),
-            ("هامش الربح", "45.2%", colors["accent"])
-        ]
-        
-        for i, (label, value, color) in enumerate(metrics):
-            card = ctk.CTkFrame(summary_frame, height=100)
-            card.grid(row=0, column=i, padx=5, pady=10, sticky="ew")
-            
-            ctk.CTkLabel(card, text=label, font=self.theme_manager.get_font_config(12)).pack(pady=(15, 5))
-            ctk.CTkLabel(card, text=value, font=self.theme_manager.get_font_config(16, "bold"), text_color=color).pack(pady=(0, 15))
+        profit_token = "success" if data["profit"] >= 0 else "danger"
+        self._summary_cards(parent, [
+            ("إجمالي الإيرادات", self._money(data["revenue"]), "success"),
+            ("التكاليف", self._money(data["costs"]), "warning"),
+            ("صافي الربح", self._money(data["profit"]), profit_token),
+            ("هامش الربح", f"{data['margin']:.1f}%", "accent")
+        ], height=100)
         
         # Monthly breakdown
         ctk.CTkLabel(parent, text="التفصيل الشهري:", font=self.theme_manager.get_font_config(14, "bold")).pack(anchor="w", pady=(20, 10))
         
-        monthly_frame = ctk.CTkFrame(parent)
-        monthly_frame.pack(fill="x")
-        
-        months_data = [
-            ("يناير", "28,450", "15,670", "12,780"),
-            ("فبراير", "31,200", "17,340", "13,860"),
-            ("مارس", "35,670", "19,220", "16,450"),
-            ("أبريل", "29,880", "16,540", "13,340"),
-            ("مايو", "33,120", "18,890", "14,230"),
-            ("يونيو", "37,340", "20,120", "17,220")
-        ]
-        
-        # Headers
-        header_frame = ctk.CTkFrame(monthly_frame, fg_color=colors["bg_secondary"])
-        header_frame.pack(fill="x", padx=10, pady=(10, 0))
-        header_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
-        
-        headers = ["الشهر", "الإيرادات", "التكاليف", "الربح"]
-        for i, header in enumerate(headers):
-            ctk.CTkLabel(header_frame, text=header, font=self.theme_manager.get_font_config(12, "bold")).grid(row=0, column=i, padx=10, pady=10)
+        self._table(
+            parent,
+            ["الشهر", "الإيرادات", "التكاليف", "الربح"],
+            [(month, self._money(revenue), self._money(costs), self._money(profit))
+             for month, revenue, costs, profit in data["monthly"]],
+            "success"
+        )
         
-        # Data rows
-        for month, revenue, costs, profit in months_data:
-            row_frame = ctk.CTkFrame(monthly_frame, fg_color="transparent")
-            row_frame.pack(fill="x", padx=10, pady=2)
-            row_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
+        if data["expense_categories"]:
+            ctk.CTkLabel(parent, text="المصروفات حسب الفئة:", font=self.theme_manager.get_font_config(14, "bold")).pack(anchor="w", pady=(20, 10))
             
-            ctk.CTkLabel(row_frame, text=month, font=self.theme_manager.get_font_config(11)).grid(row=0, column=0, padx=10, pady=8, sticky="w")
-            ctk.CTkLabel(row_frame, text=f"{revenue} ر.س", font=self.theme_manager.get_font_config(11)).grid(row=0, column=1, padx=10, pady=8)
-            ctk.CTkLabel(row_frame, text=f"{costs} ر.س", font=self.theme_manager.get_font_config(11)).grid(row=0, column=2, padx=10, pady=8)
-            ctk.CTkLabel(row_frame, text=f"{profit} ر.س", font=self.theme_manager.get_font_config(11, "bold"), text_color=colors["success"]).grid(row=0, column=3, padx=10, pady=8)
+            self._table(
+                parent,
+                ["الفئة", "المبلغ", "عدد القيود"],
+                [(category, self._money(amount), f"{entries:,}") for category, amount, entries in data["expense_categories"]],
+                "warning"
+            )
     
-    def _generate_inventory_data(self, parent):
+    def _generate_inventory_data(self, parent, data):
         """Generate inventory report data"""
         colors = self.theme_manager.get_colors()
         
         ctk.CTkLabel(parent, text="تقرير المخزون:", font=self.theme_manager.get_font_config(16, "bold")).pack(anchor="w", pady=(0, 20))
         
-        # Inventory summary
-        summary_frame = ctk.CTkFrame(parent)
-        summary_frame.pack(fill="x", pady=(0, 20))
-        summary_frame.grid_columnconfigure((0, 1, 2), weight=1)
-        
-        metrics = [
-            ("قيمة المخزون الإجمالية", "567,890 ر.س"),
-            ("عدد الأصناف", "1,247"),
-            ("متوسط قيمة المنتج", "455 ر.س")
-        ]
-        
-        for i, (label, value) in enumerate(metrics):
-            card = ctk.CTkFrame(summary_frame, height=80)
-            card.grid(row=0, column=i, padx=10, pady=10, sticky="ew")
-            
-            ctk.CTkLabel(card, text=label, font=self.theme_manager.get_font_config(12)).pack(pady=(15, 5))
-            ctk.CTkLabel(card, text=value, font=self.theme_manager.get_font_config(16, "bold"), text_color=colors["accent"]).pack(pady=(0, 15))
+        self._summary_cards(parent, [
+            ("قيمة المخزون الإجمالية", self._money(data["stock_value"]), "accent"),
+            ("عدد الأصناف", f"{data['item_count']:,}", "accent"),
+            ("متوسط سعر المنتج", self._money(data["average_price"]), "accent")
+        ])
         
         # Inventory status
         ctk.CTkLabel(parent, text="حالة المخزون:", font=self.theme_manager.get_font_config(14, "bold")).pack(anchor="w", pady=(20, 10))
@@ -496,29 +463,65 @@ class ReportsView(ctk.CTkFrame):
         status_frame.pack(fill="x")
         
         status_data = [
-            ("متوفر", "823", colors["success"]),
-            ("مخزون منخفض", "67", colors["warning"]),
-            ("نفد المخزون", "23", colors["danger"]),
-            ("معطل", "45", colors["text_secondary"])
+            ("متوفر", data["available"], "success"),
+            ("مخزون منخفض", data["low_stock"], "warning"),
+            ("نفد المخزون", data["out_of_stock"], "danger")
         ]
         
-        for status, count, color in status_data:
+        for status, count, token in status_data:
             status_row = ctk.CTkFrame(status_frame, fg_color="transparent")
             status_row.pack(fill="x", padx=10, pady=2)
             status_row.grid_columnconfigure(1, weight=1)
             
-            ctk.CTkLabel(status_row, text="●", font=self.theme_manager.get_font_config(16), text_color=color).grid(row=0, column=0, padx=10, pady=8)
+            dot = ctk.CTkLabel(status_row, text="●", font=self.theme_manager.get_font_config(16), text_color=colors[token])
+            dot.grid(row=0, column=0, padx=10, pady=8)
+            self.theme_manager.bind_tokens(dot, text_color=token)
             ctk.CTkLabel(status_row, text=status, font=self.theme_manager.get_font_config(12)).grid(row=0, column=1, padx=10, pady=8, sticky="w")
-            ctk.CTkLabel(status_row, text=count, font=self.theme_manager.get_font_config(12, "bold")).grid(row=0, column=2, padx=10, pady=8)
+            ctk.CTkLabel(status_row, text=f"{count:,}", font=self.theme_manager.get_font_config(12, "bold")).grid(row=0, column=2, padx=10, pady=8)
     
-    def _export_report(self, report_title):
-        """Export report to PDF"""
+    def _export_report(self, report_title, report_name, date_range):
+        """Export report to PDF on the export worker, with progress and cancel"""
         file_path = filedialog.asksaveasfilename(
             title="حفظ التقرير",
             defaultextension=".pdf",
             filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")],
-            initialname=f"{report_title}_{datetime.now().strftime('%Y%m%d')}.pdf"
+            initialfile=f"{report_title}_{datetime.now().strftime('%Y%m%d')}.pdf"
         )
         
-        if file_path:
-            messagebox.showinfo("تصدير التقرير", f"تم تصدير التقرير إلى:\n{file_path}")
+        if not file_path:
+            return
+        
+        # Progress dialog
+        progress_window = ctk.CTkToplevel(self)
+        progress_window.title("تصدير التقرير")
+        progress_window.geometry("320x140")
+        progress_window.transient(self)
+        
+        progress_label = ctk.CTkLabel(progress_window, text="جاري التصدير...", font=self.theme_manager.get_font_config(12))
+        progress_label.pack(pady=(25, 15))
+        
+        def on_progress(job):
+            if progress_window.winfo_exists():
+                progress_label.configure(text=f"جاري التصدير... {job.rows_written:,} سطر - {job.pages} صفحة")
+        
+        def on_done(job):
+            if progress_window.winfo_exists():
+                progress_window.destroy()
+            if job.error:
+                messagebox.showerror("خطأ", f"فشل تصدير التقرير:\n{job.error}")
+            elif not job.cancelled:
+                messagebox.showinfo("تصدير التقرير", f"تم تصدير التقرير إلى:\n{file_path}")
+        
+        job = self.report_engine.export_pdf_async(
+            report_name, date_range, file_path, report_title, self._money,
+            on_done=on_done, on_progress=on_progress, widget=self
+        )
+        
+        cancel_btn = ctk.CTkButton(
+            progress_window,
+            text="إلغاء",
+            command=job.cancel,
+            width=100,
+            font=self.theme_manager.get_font_config(11)
+        )
+        cancel_btn.pack()
@@ -8,32 +8,86 @@ Sales View
 
 import customtkinter as ctk
 from tkinter import messagebox, ttk
-import threading
-from datetime import datetime
+from decimal import Decimal
 
+from src.core.database import Sale, SaleItem
+from src.core.pricing import PricingEngine, to_decimal
+from src.core.receipts import ReceiptData
+from src.core.cart import Cart, LINE_ADDED, LINE_UPDATED, LINE_REMOVED, CART_CLEARED, TOTALS_CHANGED
+from src.ui.components.product_grid import VirtualProductGrid
 from src.utils.logger import get_logger
+from src.utils.phone import normalize_phone
 
 logger = get_logger(__name__)
 
+ALL_CATEGORIES = "كل الفئات"
+ALL_BRANDS = "كل الماركات"
+WALK_IN_CUSTOMER = "عميل عادي"
+
+# Customers offered by the picker for a typed phone prefix
+CUSTOMER_MATCHES = 8
+
+# Payment combo labels -> sales.payment_method
+PAYMENT_METHODS = {
+    "نقد": "cash",
+    "بطاقة ائتمان": "card",
+    "تحويل بنكي": "bank_transfer"
+}
+
+# Pause after the last keystroke before the catalog is re-queried
+SEARCH_DELAY_MS = 150
+
 class SalesView(ctk.CTkFrame):
     """Sales management and POS view"""
     
-    def __init__(self, parent, db_manager, theme_manager):
+    def __init__(self, parent, db_manager, theme_manager, settings_manager, print_spooler=None):
         super().__init__(parent, fg_color="transparent")
         
         self.db_manager = db_manager
         self.theme_manager = theme_manager
+        self.settings_manager = settings_manager
+        self.print_spooler = print_spooler
+        
+        # Tax, discount and currency come from the business settings
+        self.pricing = PricingEngine.from_settings(settings_manager)
         
         # Configure grid
         self.grid_columnconfigure(0, weight=2)
         self.grid_columnconfigure(1, weight=1)
         self.grid_rowconfigure(0, weight=1)
         
-        # Cart items
-        self.cart_items = []
-        self.total_amount = 0.0
+        # Cart model; rows are created, updated and removed per line
+        self.cart = Cart(self.pricing)
+        self.cart_rows = {}
+        self.cart.subscribe(self._on_cart_changed)
+        
+        # Product filters
+        self.search_term = ""
+        self._search_job = None
+        
+        # Customer picker: combo label -> Customer for the current phone matches
+        self.selected_customer = None
+        self._customer_matches = {}
+        self._phone_job = None
         
         self._setup_ui()
+        self.settings_manager.subscribe(self._on_settings_changed)
+    
+    def destroy(self):
+        """Unsubscribe from settings before destroying the view"""
+        self.settings_manager.unsubscribe(self._on_settings_changed)
+        super().destroy()
+    
+    def _on_settings_changed(self, category, changes):
+        """Reprice the cart when the business settings change"""
+        if category != "business":
+            return
+        self.pricing = PricingEngine.from_settings(self.settings_manager)
+        self.tax_title_label.configure(text=self._tax_title())
+        self.cart.set_pricing(self.pricing)
+    
+    def _tax_title(self):
+        return f"الضريبة ({self.pricing.tax_rate.normalize():f}%):"
     
     def _setup_ui(self):
         """Setup sales view UI"""
@@ -43,7 +97,7 @@ class SalesView(ctk.CTkFrame):
         left_frame = ctk.CTkFrame(self, corner_radius=10)
         left_frame.grid(row=0, column=0, sticky="nsew", padx=(0, 10))
         left_frame.grid_columnconfigure(0, weight=1)
-        left_frame.grid_rowconfigure(2, weight=1)
+        left_frame.grid_rowconfigure(3, weight=1)
         
         # Header
         header_label = ctk.CTkLabel(
@@ -53,6 +107,7 @@ class SalesView(ctk.CTkFrame):
             text_color=colors["accent"]
         )
         header_label.grid(row=0, column=0, pady=20)
+        self.theme_manager.bind_tokens(header_label, text_color="accent")
         
         # Search section
         search_frame = ctk.CTkFrame(left_frame, fg_color="transparent")
@@ -91,12 +146,42 @@ class SalesView(ctk.CTkFrame):
         )
         products_label.grid(row=2, column=0, pady=(10, 5), sticky="w", padx=20)
         
-        # Products frame
-        self.products_frame = ctk.CTkScrollableFrame(left_frame, height=200)
-        self.products_frame.grid(row=3, column=0, sticky="ew", padx=20, pady=(0, 20))
+        # Category and brand filters
+        filters_frame = ctk.CTkFrame(search_frame, fg_color="transparent")
+        filters_frame.grid(row=2, column=0, columnspan=2, sticky="ew", pady=(10, 0))
         
-        # Load sample products
-        self._load_sample_products()
+        self.category_combo = ctk.CTkComboBox(
+            filters_frame,
+            values=[ALL_CATEGORIES] + self.db_manager.get_product_categories(),
+            width=180,
+            font=self.theme_manager.get_font_config(11),
+            command=self._on_filter_changed
+        )
+        self.category_combo.set(ALL_CATEGORIES)
+        self.category_combo.pack(side="left", padx=(0, 10))
+        
+        self.brand_combo = ctk.CTkComboBox(
+            filters_frame,
+            values=[ALL_BRANDS] + self.db_manager.get_product_brands(),
+            width=180,
+            font=self.theme_manager.get_font_config(11),
+            command=self._on_filter_changed
+        )
+        self.brand_combo.set(ALL_BRANDS)
+        self.brand_combo.pack(side="left")
+        
+        # Products grid (recycled cards, rows read from the database page by page)
+        self.product_grid = VirtualProductGrid(
+            left_frame,
+            self.theme_manager,
+            fetch_count=self._count_products,
+            fetch_page=self._fetch_products_page,
+            on_add=self._on_product_selected,
+            currency=self.pricing.currency_symbol,
+            height=260
+        )
+        self.product_grid.grid(row=3, column=0, sticky="nsew", padx=20, pady=(0, 20))
+        self._refresh_grid()
         
         # Cart section
         cart_label = ctk.CTkLabel(
@@ -132,17 +217,20 @@ class SalesView(ctk.CTkFrame):
         
         self.customer_combo = ctk.CTkComboBox(
             customer_frame,
-            values=["عميل عادي", "أحمد محمد - 0501234567", "فاطمة علي - 0509876543"],
+            values=[WALK_IN_CUSTOMER],
+            command=self._on_customer_selected,
             width=200,
             font=self.theme_manager.get_font_config(11)
         )
+        self.customer_combo.set(WALK_IN_CUSTOMER)
         self.customer_combo.grid(row=0, column=1, sticky="ew", padx=(10, 0), pady=5)
         
-        # Phone entry
+        # Phone entry; typing looks customers up by phone prefix
         ctk.CTkLabel(customer_frame, text="الهاتف:", font=self.theme_manager.get_font_config(12)).grid(row=1, column=0, sticky="w", pady=5)
         
         self.phone_entry = ctk.CTkEntry(customer_frame, placeholder_text="رقم الهاتف", font=self.theme_manager.get_font_config(12))
         self.phone_entry.grid(row=1, column=1, sticky="ew", padx=(10, 0), pady=5)
+        self.phone_entry.bind("<KeyRelease>", self._on_phone_changed)
         
         # Payment section
         payment_label = ctk.CTkLabel(
@@ -170,9 +258,9 @@ class SalesView(ctk.CTkFrame):
         # Discount
         ctk.CTkLabel(payment_frame, text="الخصم (%):", font=self.theme_manager.get_font_config(12)).grid(row=1, column=0, sticky="w", pady=5)
         
-        self.discount_entry = ctk.CTkEntry(payment_frame, placeholder_text="0", font=self.theme_manager.get_font_config(12))
+        self.discount_entry = ctk.CTkEntry(payment_frame, placeholder_text=f"{self.pricing.default_discount.normalize():f}", font=self.theme_manager.get_font_config(12))
         self.discount_entry.grid(row=1, column=1, sticky="ew", padx=(10, 0), pady=5)
-        self.discount_entry.bind("<KeyRelease>", self._update_total)
+        self.discount_entry.bind("<KeyRelease>", self._on_discount_changed)
         
         # Total section
         self.total_frame = ctk.CTkFrame(right_frame)
@@ -181,23 +269,25 @@ class SalesView(ctk.CTkFrame):
         
         # Subtotal
         ctk.CTkLabel(self.total_frame, text="المجموع الفرعي:", font=self.theme_manager.get_font_config(12)).grid(row=0, column=0, sticky="w", padx=10, pady=5)
-        self.subtotal_label = ctk.CTkLabel(self.total_frame, text="0.00 ر.س", font=self.theme_manager.get_font_config(12, "bold"))
+        self.subtotal_label = ctk.CTkLabel(self.total_frame, text=self.pricing.format(0), font=self.theme_manager.get_font_config(12, "bold"))
         self.subtotal_label.grid(row=0, column=1, sticky="e", padx=10, pady=5)
         
         # Discount amount
         ctk.CTkLabel(self.total_frame, text="قيمة الخصم:", font=self.theme_manager.get_font_config(12)).grid(row=1, column=0, sticky="w", padx=10, pady=5)
-        self.discount_label = ctk.CTkLabel(self.total_frame, text="0.00 ر.س", font=self.theme_manager.get_font_config(12))
+        self.discount_label = ctk.CTkLabel(self.total_frame, text=self.pricing.format(0), font=self.theme_manager.get_font_config(12))
         self.discount_label.grid(row=1, column=1, sticky="e", padx=10, pady=5)
         
         # Tax
-        ctk.CTkLabel(self.total_frame, text="الضريبة (15%):", font=self.theme_manager.get_font_config(12)).grid(row=2, column=0, sticky="w", padx=10, pady=5)
-        self.tax_label = ctk.CTkLabel(self.total_frame, text="0.00 ر.س", font=self.theme_manager.get_font_config(12))
+        self.tax_title_label = ctk.CTkLabel(self.total_frame, text=self._tax_title(), font=self.theme_manager.get_font_config(12))
+        self.tax_title_label.grid(row=2, column=0, sticky="w", padx=10, pady=5)
+        self.tax_label = ctk.CTkLabel(self.total_frame, text=self.pricing.format(0), font=self.theme_manager.get_font_config(12))
         self.tax_label.grid(row=2, column=1, sticky="e", padx=10, pady=5)
         
         # Total
         ctk.CTkLabel(self.total_frame, text="المجموع الكلي:", font=self.theme_manager.get_font_config(14, "bold")).grid(row=3, column=0, sticky="w", padx=10, pady=10)
-        self.total_label = ctk.CTkLabel(self.total_frame, text="0.00 ر.س", font=self.theme_manager.get_font_config(16, "bold"), text_color=colors["accent"])
+        self.total_label = ctk.CTkLabel(self.total_frame, text=self.pricing.format(0), font=self.theme_manager.get_font_config(16, "bold"), text_color=colors["accent"])
         self.total_label.grid(row=3, column=1, sticky="e", padx=10, pady=10)
+        self.theme_manager.bind_tokens(self.total_label, text_color="accent")
         
         # Action buttons
         buttons_frame = ctk.CTkFrame(right_frame, fg_color="transparent")
@@ -210,113 +300,103 @@ class SalesView(ctk.CTkFrame):
             font=self.theme_manager.get_font_config(14, "bold"),
             height=40,
             fg_color=colors["success"],
-            hover_color="#229954",
+            hover_color=colors["success_hover"],
             command=self._complete_sale
         )
         complete_btn.pack(fill="x", pady=(0, 10))
+        self.theme_manager.bind_tokens(complete_btn, fg_color="success", hover_color="success_hover")
         
         # Clear cart button
         clear_btn = ctk.CTkButton(
             buttons_frame,
             text="مسح السلة",
             fg_color=colors["warning"],
-            hover_color="#d68910",
+            hover_color=colors["warning_hover"],
             command=self._clear_cart,
             font=self.theme_manager.get_font_config(12)
         )
         clear_btn.pack(fill="x")
-    
-    def _load_sample_products(self):
-        """Load sample products"""
-        sample_products = [
-            {"name": "iPhone 15 Pro", "price": 4500.0, "stock": 10, "barcode": "123456789"},
-            {"name": "Galaxy S24", "price": 3200.0, "stock": 5, "barcode": "987654321"},
-            {"name": "AirPods Pro", "price": 950.0, "stock": 15, "barcode": "555666777"},
-            {"name": "Samsung Charger", "price": 85.0, "stock": 25, "barcode": "111222333"},
-            {"name": "Phone Case", "price": 45.0, "stock": 30, "barcode": "444555666"}
-        ]
-        
-        for product in sample_products:
-            self._create_product_card(product)
-    
-    def _create_product_card(self, product):
-        """Create a product card"""
-        colors = self.theme_manager.get_colors()
-        
-        card = ctk.CTkFrame(self.products_frame, height=80)
-        card.pack(fill="x", pady=5)
-        card.grid_columnconfigure(1, weight=1)
-        
-        # Product info
-        info_frame = ctk.CTkFrame(card, fg_color="transparent")
-        info_frame.grid(row=0, column=0, sticky="w", padx=10, pady=10)
-        
-        name_label = ctk.CTkLabel(
-            info_frame,
-            text=product["name"],
-            font=self.theme_manager.get_font_config(12, "bold")
-        )
-        name_label.pack(anchor="w")
-        
-        price_label = ctk.CTkLabel(
-            info_frame,
-            text=f"{product['price']:.2f} ر.س",
-            font=self.theme_manager.get_font_config(11),
-            text_color=colors["accent"]
-        )
-        price_label.pack(anchor="w")
+        self.theme_manager.bind_tokens(clear_btn, fg_color="warning", hover_color="warning_hover")
         
-        stock_label = ctk.CTkLabel(
-            info_frame,
-            text=f"المخزون: {product['stock']}",
-            font=self.theme_manager.get_font_config(10)
+        # Return items of an earlier sale
+        return_btn = ctk.CTkButton(
+            buttons_frame,
+            text="مرتجع",
+            fg_color=colors["danger"],
+            hover_color=colors["danger_hover"],
+            command=self._open_return_dialog,
+            font=self.theme_manager.get_font_config(12)
         )
-        stock_label.pack(anchor="w")
-        
-        # Add button
-        add_btn = ctk.CTkButton(
-            card,
-            text="إضافة",
-            width=60,
-            height=30,
-            command=lambda p=product: self._add_to_cart(p),
-            font=self.theme_manager.get_font_config(11)
+        return_btn.pack(fill="x", pady=(10, 0))
+        self.theme_manager.bind_tokens(return_btn, fg_color="danger", hover_color="danger_hover")
+    
+    def _current_filters(self):
+        """(search, category, brand) as used by the catalog queries"""
+        category = self.category_combo.get()
+        brand = self.brand_combo.get()
+        return (
+            self.search_term,
+            None if category == ALL_CATEGORIES else category,
+            None if brand == ALL_BRANDS else brand
         )
-        add_btn.grid(row=0, column=1, sticky="e", padx=10, pady=10)
+    
+    def _count_products(self, filters):
+        search, category, brand = filters
+        return self.db_manager.count_products(search, category, brand)
+    
+    def _fetch_products_page(self, filters, after, limit):
+        search, category, brand = filters
+        return self.db_manager.get_products_page(after, limit, search, category, brand)
+    
+    def _refresh_grid(self):
+        """Re-query the grid; the filters are read here because pages load on a worker thread"""
+        self.product_grid.refresh(self._current_filters())
+    
+    def _on_filter_changed(self, *args):
+        """Re-query the grid for the new category/brand"""
+        self._refresh_grid()
+    
+    @staticmethod
+    def _cart_product(product):
+        """Cart entry fields taken from a Product row"""
+        return {
+            "id": product.id,
+            "name": product.name,
+            "price": product.price,
+            "stock": product.stock_quantity,
+            "category": product.category
+        }
+    
+    def _on_product_selected(self, product):
+        """Add a product picked in the grid"""
+        self._add_to_cart(self._cart_product(product))
     
     def _add_to_cart(self, product):
         """Add product to cart"""
-        # Check if product already in cart
-        for item in self.cart_items:
-            if item['name'] == product['name']:
-                item['quantity'] += 1
-                item['total'] = item['quantity'] * item['price']
-                self._update_cart_display()
-                self._update_total()
-                return
-        
-        # Add new item to cart
-        cart_item = {
-            'name': product['name'],
-            'price': product['price'],
-            'quantity': 1,
-            'total': product['price']
-        }
-        self.cart_items.append(cart_item)
-        self._update_cart_display()
-        self._update_total()
+        self.cart.add(product['id'], product['name'], product['price'],
+                      stock=product.get('stock'), category=product.get('category') or "")
     
-    def _update_cart_display(self):
-        """Update cart display"""
-        # Clear current display
-        for widget in self.cart_frame.winfo_children():
-            widget.destroy()
-        
-        # Add cart items
-        for i, item in enumerate(self.cart_items):
-            self._create_cart_item_widget(item, i)
+    def _on_cart_changed(self, event, line):
+        """Apply one cart change to the display"""
+        if event == LINE_ADDED:
+            self.cart_rows[line.product_id] = self._create_cart_item_widget(line)
+        elif event == LINE_UPDATED:
+            row = self.cart_rows.get(line.product_id)
+            if row is not None:
+                row.qty_label.configure(text=str(line.quantity))
+                row.total_label.configure(text=self.pricing.format(line.total))
+        elif event == LINE_REMOVED:
+            row = self.cart_rows.pop(line.product_id, None)
+            if row is not None:
+                row.destroy()
+        elif event == CART_CLEARED:
+            for row in self.cart_rows.values():
+                row.destroy()
+            self.cart_rows.clear()
+        elif event == TOTALS_CHANGED:
+            self._update_total()
     
-    def _create_cart_item_widget(self, item, index):
+    def _create_cart_item_widget(self, line):
         """Create cart item widget"""
         colors = self.theme_manager.get_colors()
         
@@ -327,7 +407,7 @@ class SalesView(ctk.CTkFrame):
         # Product info
         info_label = ctk.CTkLabel(
             item_frame,
-            text=item['name'],
+            text=line.name,
             font=self.theme_manager.get_font_config(11, "bold")
         )
         info_label.grid(row=0, column=0, columnspan=3, sticky="w", padx=10, pady=(5, 0))
@@ -341,25 +421,25 @@ class SalesView(ctk.CTkFrame):
             text="-",
             width=25,
             height=25,
-            command=lambda i=index: self._decrease_quantity(i),
+            command=lambda pid=line.product_id: self.cart.decrement(pid),
             font=self.theme_manager.get_font_config(12, "bold")
         )
         minus_btn.pack(side="left")
         
-        qty_label = ctk.CTkLabel(
+        item_frame.qty_label = ctk.CTkLabel(
             qty_frame,
-            text=str(item['quantity']),
+            text=str(line.quantity),
             font=self.theme_manager.get_font_config(11),
             width=30
         )
-        qty_label.pack(side="left", padx=5)
+        item_frame.qty_label.pack(side="left", padx=5)
         
         plus_btn = ctk.CTkButton(
             qty_frame,
             text="+",
             width=25,
             height=25,
-            command=lambda i=index: self._increase_quantity(i),
+            command=lambda pid=line.product_id: self.cart.increment(pid),
             font=self.theme_manager.get_font_config(12, "bold")
         )
         plus_btn.pack(side="left")
@@ -367,18 +447,19 @@ class SalesView(ctk.CTkFrame):
         # Price and total
         price_label = ctk.CTkLabel(
             item_frame,
-            text=f"{item['price']:.2f} ر.س",
+            text=self.pricing.format(line.unit_price),
             font=self.theme_manager.get_font_config(10)
         )
         price_label.grid(row=1, column=1, padx=5, pady=5)
         
-        total_label = ctk.CTkLabel(
+        item_frame.total_label = ctk.CTkLabel(
             item_frame,
-            text=f"{item['total']:.2f} ر.س",
+            text=self.pricing.format(line.total),
             font=self.theme_manager.get_font_config(11, "bold"),
             text_color=colors["accent"]
         )
-        total_label.grid(row=1, column=2, sticky="e", padx=10, pady=5)
+        item_frame.total_label.grid(row=1, column=2, sticky="e", padx=10, pady=5)
+        self.theme_manager.bind_tokens(item_frame.total_label, text_color="accent")
         
         # Remove button
         remove_btn = ctk.CTkButton(
@@ -387,121 +468,268 @@ class SalesView(ctk.CTkFrame):
             width=25,
             height=25,
             fg_color=colors["danger"],
-            hover_color="#c0392b",
-            command=lambda i=index: self._remove_from_cart(i),
+            hover_color=colors["danger_hover"],
+            command=lambda pid=line.product_id: self.cart.remove(pid),
             font=self.theme_manager.get_font_config(14, "bold")
         )
         remove_btn.grid(row=0, column=3, rowspan=2, sticky="ne", padx=10, pady=5)
-    
-    def _increase_quantity(self, index):
-        """Increase item quantity"""
-        if index < len(self.cart_items):
-            self.cart_items[index]['quantity'] += 1
-            self.cart_items[index]['total'] = self.cart_items[index]['quantity'] * self.cart_items[index]['price']
-            self._update_cart_display()
-            self._update_total()
-    
-    def _decrease_quantity(self, index):
-        """Decrease item quantity"""
-        if index < len(self.cart_items) and self.cart_items[index]['quantity'] > 1:
-            self.cart_items[index]['quantity'] -= 1
-            self.cart_items[index]['total'] = self.cart_items[index]['quantity'] * self.cart_items[index]['price']
-            self._update_cart_display()
-            self._update_total()
-    
-    def _remove_from_cart(self, index):
-        """Remove item from cart"""
-        if index < len(self.cart_items):
-            self.cart_items.pop(index)
-            self._update_cart_display()
-            self._update_total()
-    
-    def _update_total(self, *args):
-        """Update total calculations"""
-        subtotal = sum(item['total'] for item in self.cart_items)
+        self.theme_manager.bind_tokens(remove_btn, fg_color="danger", hover_color="danger_hover")
         
-        # Calculate discount
+        return item_frame
+    
+    def _on_discount_changed(self, *args):
+        """Pass the discount entry to the cart (empty = default discount)"""
+        text = self.discount_entry.get().strip()
         try:
-            discount_percent = float(self.discount_entry.get() or 0)
-        except ValueError:
-            discount_percent = 0
-        
-        discount_amount = subtotal * (discount_percent / 100)
-        after_discount = subtotal - discount_amount
-        
-        # Calculate tax
-        tax_amount = after_discount * 0.15
-        total = after_discount + tax_amount
-        
-        # Update labels
-        self.subtotal_label.configure(text=f"{subtotal:.2f} ر.س")
-        self.discount_label.configure(text=f"{discount_amount:.2f} ر.س")
-        self.tax_label.configure(text=f"{tax_amount:.2f} ر.س")
-        self.total_label.configure(text=f"{total:.2f} ر.س")
-        
-        self.total_amount = total
+            discount_percent = to_decimal(text) if text else None
+        except ArithmeticError:
+            discount_percent = Decimal(0)
+        self.cart.set_discount_percent(discount_percent)
+    
+    def _update_total(self):
+        """Show the cart's running totals"""
+        totals = self.cart.totals()
+        
+        self.subtotal_label.configure(text=self.pricing.format(totals['subtotal']))
+        self.discount_label.configure(text=self.pricing.format(totals['discount']))
+        self.tax_label.configure(text=self.pricing.format(totals['tax']))
+        self.total_label.configure(text=self.pricing.format(totals['total']))
     
     def _on_barcode_enter(self, event):
         """Handle barcode entry"""
         barcode = self.barcode_entry.get().strip()
         if barcode:
-            # Simple barcode lookup (in real app, search in database)
-            sample_products = {
-                "123456789": {"name": "iPhone 15 Pro", "price": 4500.0, "stock": 10},
-                "987654321": {"name": "Galaxy S24", "price": 3200.0, "stock": 5},
-                "555666777": {"name": "AirPods Pro", "price": 950.0, "stock": 15},
-            }
+            product = self.db_manager.get_product_by_barcode(barcode)
             
-            if barcode in sample_products:
-                self._add_to_cart(sample_products[barcode])
-                messagebox.showinfo("تم العثور", f"تم إضافة {sample_products[barcode]['name']} للسلة")
+            if product:
+                self._add_to_cart(self._cart_product(product))
+                messagebox.showinfo("تم العثور", f"تم إضافة {product.name} للسلة")
             else:
                 messagebox.showwarning("غير موجود", f"لم يتم العثور على منتج بالباركود: {barcode}")
             
             self.barcode_entry.delete(0, "end")
     
     def _on_search_product(self, event):
-        """Handle product search"""
-        # This would filter the products list in a real implementation
-        pass
+        """Filter the products grid, waiting for a pause in typing"""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DELAY_MS, self._apply_search)
+    
+    def _apply_search(self):
+        self._search_job = None
+        search_term = self.search_entry.get().strip()
+        if search_term != self.search_term:
+            self.search_term = search_term
+            self._refresh_grid()
+    
+    def _on_phone_changed(self, event):
+        """Look customers up by phone, waiting for a pause in typing"""
+        if self._phone_job is not None:
+            self.after_cancel(self._phone_job)
+        self._phone_job = self.after(SEARCH_DELAY_MS, self._lookup_customer)
+    
+    def _lookup_customer(self):
+        """Offer the customers matching the typed phone prefix"""
+        self._phone_job = None
+        phone = self.phone_entry.get().strip()
+        matches = self.db_manager.search_customers_by_phone(phone, CUSTOMER_MATCHES)
+        
+        self._customer_matches = {f"{customer.name} - {customer.phone}": customer for customer in matches}
+        self.customer_combo.configure(values=[WALK_IN_CUSTOMER] + list(self._customer_matches))
+        
+        # A complete number picks its customer straight away
+        exact = [customer for customer in matches if customer.phone_normalized == normalize_phone(phone)]
+        if len(exact) == 1:
+            self._select_customer(exact[0])
+        elif self.selected_customer is not None and self.selected_customer not in matches:
+            self._select_customer(None)
+    
+    def _on_customer_selected(self, label):
+        self._select_customer(self._customer_matches.get(label))
+    
+    def _select_customer(self, customer):
+        self.selected_customer = customer
+        if customer is None:
+            self.customer_combo.set(WALK_IN_CUSTOMER)
+        else:
+            self.customer_combo.set(f"{customer.name} - {customer.phone}")
+    
+    def _reset_customer(self):
+        self.phone_entry.delete(0, "end")
+        self._customer_matches = {}
+        self.customer_combo.configure(values=[WALK_IN_CUSTOMER])
+        self._select_customer(None)
     
     def _complete_sale(self):
         """Complete the sale"""
-        if not self.cart_items:
+        if not self.cart:
             messagebox.showwarning("تحذير", "السلة فارغة! يرجى إضافة منتجات للبيع")
             return
         
-        if messagebox.askyesno("تأكيد البيع", f"هل تريد إتمام عملية البيع بمبلغ {self.total_amount:.2f} ر.س؟"):
-            # Here you would save the sale to database
-            customer = self.customer_combo.get()
-            payment_method = self.payment_combo.get()
-            
-            # Generate receipt
-            receipt_text = f"""
-فاتورة البيع
-التاريخ: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-العميل: {customer}
-طريقة الدفع: {payment_method}
-
-المنتجات:
-"""
-            for item in self.cart_items:
-                receipt_text += f"{item['name']} × {item['quantity']} = {item['total']:.2f} ر.س\n"
-            
-            receipt_text += f"\nالمجموع الإجمالي: {self.total_amount:.2f} ر.س"
-            
-            messagebox.showinfo("تم البيع بنجاح", "تم إتمام عملية البيع بنجاح!\nتم إنشاء الفاتورة.")
-            
-            # Clear cart
-            self._clear_cart()
+        if not messagebox.askyesno("تأكيد البيع", f"هل تريد إتمام عملية البيع بمبلغ {self.pricing.format(self.cart.total)}؟"):
+            return
+        
+        customer = self.selected_customer.name if self.selected_customer else WALK_IN_CUSTOMER
+        payment_label = self.payment_combo.get()
+        
+        sale_id = self._save_sale(customer, payment_label)
+        if sale_id is None:
+            messagebox.showerror("خطأ", "تعذر حفظ عملية البيع")
+            return
+        
+        # Rendering and printing happen on the spooler thread
+        if self.print_spooler is not None:
+            receipt = ReceiptData.from_cart(sale_id, self.cart, customer, payment_label)
+            self.print_spooler.submit(receipt, on_done=self._on_receipt_printed, widget=self)
+        
+        self.cart.clear()
+        self._reset_customer()
+        self._refresh_grid()
+        messagebox.showinfo("تم البيع بنجاح", "تم إتمام عملية البيع بنجاح!\nجاري طباعة الفاتورة.")
+    
+    def _save_sale(self, customer, payment_label):
+        """Store the cart as a sale; returns the sale id"""
+        priced = self.cart.price()
+        sale = Sale(
+            customer_id=self.selected_customer.id if self.selected_customer else None,
+            customer_name=customer,
+            total_amount=float(priced.subtotal),
+            discount=float(priced.discount),
+            tax=float(priced.tax),
+            final_amount=float(priced.total),
+            payment_method=PAYMENT_METHODS.get(payment_label, "cash")
+        )
+        items = [
+            SaleItem(
+                product_id=line.product_id,
+                product_name=line.name,
+                quantity=line.quantity,
+                unit_price=float(price.unit_price),
+                total_price=float(price.gross)
+            )
+            for line, price in zip(self.cart, priced.lines)
+        ]
+        return self.db_manager.create_sale(sale, items)
+    
+    def _on_receipt_printed(self, job):
+        """Report print failures (runs on the Tk thread)"""
+        if job.error:
+            messagebox.showerror("خطأ في الطباعة", f"تعذرت طباعة الفاتورة {job.receipt.invoice_no}:\n{job.error}")
     
     def _clear_cart(self):
         """Clear the shopping cart"""
-        if not self.cart_items:
+        if not self.cart:
             return
         
         if messagebox.askyesno("تأكيد المسح", "هل تريد مسح جميع المنتجات من السلة؟"):
-            self.cart_items.clear()
-            self._update_cart_display()
-            self._update_total()
+            self.cart.clear()
             messagebox.showinfo("تم المسح", "تم مسح السلة بنجاح!")
+    
+    def _open_return_dialog(self):
+        """Return items of an earlier sale and refund them"""
+        colors = self.theme_manager.get_colors()
+        
+        window = ctk.CTkToplevel(self)
+        window.title("مرتجع مبيعات")
+        window.geometry("560x520")
+        window.transient(self.winfo_toplevel())
+        
+        search_frame = ctk.CTkFrame(window, fg_color="transparent")
+        search_frame.pack(fill="x", padx=20, pady=(20, 10))
+        ctk.CTkLabel(search_frame, text="رقم الفاتورة:", font=self.theme_manager.get_font_config(12)).pack(side="left")
+        sale_entry = ctk.CTkEntry(search_frame, width=120, font=self.theme_manager.get_font_config(12))
+        sale_entry.pack(side="left", padx=10)
+        
+        items_frame = ctk.CTkScrollableFrame(window)
+        items_frame.pack(expand=True, fill="both", padx=20, pady=10)
+        items_frame.grid_columnconfigure(0, weight=1)
+        
+        reason_entry = ctk.CTkEntry(window, placeholder_text="سبب الإرجاع", font=self.theme_manager.get_font_config(12))
+        reason_entry.pack(fill="x", padx=20, pady=(0, 10))
+        
+        restock_var = ctk.BooleanVar(value=True)
+        ctk.CTkCheckBox(window, text="إعادة الأصناف إلى المخزون", variable=restock_var,
+                        font=self.theme_manager.get_font_config(12)).pack(anchor="w", padx=20)
+        
+        # The sale being returned and its (item, quantity entry) per product
+        state = {"sale": None, "lines": []}
+        
+        def load(event=None):
+            for widget in items_frame.winfo_children():
+                widget.destroy()
+            state["sale"], state["lines"] = None, []
+            
+            try:
+                sale_id = int(sale_entry.get().strip())
+            except ValueError:
+                messagebox.showwarning("تحذير", "يرجى إدخال رقم فاتورة صحيح", parent=window)
+                return
+            
+            sale = self.db_manager.get_sale(sale_id)
+            if sale is None or sale.return_of is not None:
+                messagebox.showwarning("غير موجود", f"لم يتم العثور على الفاتورة: {sale_id}", parent=window)
+                return
+            
+            items = self.db_manager.get_returnable_items(sale_id)
+            if not items:
+                messagebox.showinfo("لا يوجد", "تم إرجاع جميع أصناف هذه الفاتورة", parent=window)
+                return
+            
+            state["sale"] = sale
+            for row, item in enumerate(items):
+                ctk.CTkLabel(items_frame, text=item.product_name, anchor="w",
+                             font=self.theme_manager.get_font_config(12)).grid(row=row, column=0, sticky="ew", pady=3)
+                ctk.CTkLabel(items_frame, text=f"{item.quantity} × {self.pricing.format(item.unit_price)}",
+                             font=self.theme_manager.get_font_config(11)).grid(row=row, column=1, padx=10, pady=3)
+                entry = ctk.CTkEntry(items_frame, width=60, placeholder_text="0", font=self.theme_manager.get_font_config(12))
+                entry.grid(row=row, column=2, pady=3)
+                state["lines"].append((item, entry))
+        
+        def submit():
+            sale = state["sale"]
+            if sale is None:
+                return
+            
+            returned = []
+            for item, entry in state["lines"]:
+                text = entry.get().strip()
+                if not text:
+                    continue
+                quantity = int(text) if text.isdigit() else -1
+                if not 0 <= quantity <= item.quantity:
+                    messagebox.showwarning("تحذير", f"كمية غير صحيحة للمنتج {item.product_name}", parent=window)
+                    return
+                if quantity:
+                    returned.append(SaleItem(product_id=item.product_id, product_name=item.product_name, quantity=quantity))
+            
+            if not returned:
+                messagebox.showwarning("تحذير", "يرجى إدخال الكميات المرتجعة", parent=window)
+                return
+            
+            count = sum(item.quantity for item in returned)
+            if not messagebox.askyesno("تأكيد الإرجاع", f"هل تريد إرجاع {count} صنف من الفاتورة {sale.id}؟", parent=window):
+                return
+            
+            return_id = self.db_manager.create_return(sale.id, returned, reason=reason_entry.get().strip(),
+                                                      restock=restock_var.get())
+            if return_id is None:
+                messagebox.showerror("خطأ", "تعذر حفظ المرتجع", parent=window)
+                return
+            
+            self._refresh_grid()
+            window.destroy()
+            
+            refund = self.db_manager.get_sale(return_id)
+            if refund is None:
+                messagebox.showerror("خطأ", f"تم تسجيل المرتجع رقم {return_id} لكن تعذر قراءة مبلغه")
+                return
+            messagebox.showinfo("تم الإرجاع", f"تم تسجيل المرتجع وإعادة مبلغ {self.pricing.format(-refund.final_amount)}")
+        
+        sale_entry.bind("<Return>", load)
+        ctk.CTkButton(search_frame, text="بحث", width=80, command=load,
+                      font=self.theme_manager.get_font_config(12)).pack(side="left")
+        submit_btn = ctk.CTkButton(window, text="إرجاع واسترداد المبلغ", height=40, fg_color=colors["danger"],
+                                   hover_color=colors["danger_hover"], command=submit,
+                                   font=self.theme_manager.get_font_config(14, "bold"))
+        submit_btn.pack(fill="x", padx=20, pady=20)
+        self.theme_manager.bind_tokens(submit_btn, fg_color="danger", hover_color="danger_hover")
@@ -468,7 +468,7 @@ class SettingsView(ctk.CTkFrame):
             self.backup_interval_var.set(str(self.settings_manager.business.backup_interval_days))
 
         except Exception as e:
-            logger.error(f"Error loading settings: {e}")
+            logger.error("Error loading settings: %s", e)
 
     def _on_theme_change(self, value):
         """Handle theme change"""
@@ -521,7 +521,7 @@ class SettingsView(ctk.CTkFrame):
             logger.info("Settings saved successfully")
 
         except Exception as e:
-            logger.error(f"Error saving settings: {e}")
+            logger.error("Error saving settings: %s", e)
             messagebox.showerror("خطأ", f"حدث خطأ في حفظ الإعدادات: {e}")
 
     def _create_backup(self):
@@ -540,10 +540,10 @@ class SettingsView(ctk.CTkFrame):
             shutil.copy2("data/database/shop.db", backup_file)
             
             messagebox.showinfo("نجح", f"تم إنشاء النسخة الاحتياطية بنجاح!\n{backup_file}")
-            logger.info(f"Backup created: {backup_file}")
+            logger.info("Backup created: %s", backup_file)
             
         except Exception as e:
-            logger.error(f"Error creating backup: {e}")
+            logger.error("Error creating backup: %s", e)
             messagebox.showerror("خطأ", f"حدث خطأ في إنشاء النسخة الاحتياطية: {e}")
 
     def _restore_backup(self):
@@ -559,10 +559,10 @@ class SettingsView(ctk.CTkFrame):
                     import shutil
                     shutil.copy2(file_path, "data/database/shop.db")
                     messagebox.showinfo("نجح", "تم استعادة النسخة الاحتياطية بنجاح!")
-                    logger.info(f"Backup restored from: {file_path}")
+                    logger.info("Backup restored from: %s", file_path)
                     
         except Exception as e:
-            logger.error(f"Error restoring backup: {e}")
+            logger.error("Error restoring backup: %s", e)
             messagebox.showerror("خطأ", f"حدث خطأ في استعادة النسخة الاحتياطية: {e}")
 
     def _export_data(self):
@@ -577,10 +577,10 @@ class SettingsView(ctk.CTkFrame):
             if file_path:
                 # Implementation for data export would go here
                 messagebox.showinfo("نجح", f"تم تصدير البيانات بنجاح!\n{file_path}")
-                logger.info(f"Data exported to: {file_path}")
+                logger.info("Data exported to: %s", file_path)
                 
         except Exception as e:
-            logger.error(f"Error exporting data: {e}")
+            logger.error("Error exporting data: %s", e)
             messagebox.showerror("خطأ", f"حدث خطأ في تصدير البيانات: {e}")
 
     def _import_data(self):
@@ -595,8 +595,8 @@ class SettingsView(ctk.CTkFrame):
                 if messagebox.askyesno("تأكيد", "هل أنت متأكد من استيراد البيانات؟"):
                     # Implementation for data import would go here
                     messagebox.showinfo("نجح", f"تم استيراد البيانات بنجاح!\n{file_path}")
-                    logger.info(f"Data imported from: {file_path}")
+                    logger.info("Data imported from: %s", file_path)
                     
         except Exception as e:
-            logger.error(f"Error importing data: {e}")
+            logger.error("Error importing data: %s", e)
             messagebox.showerror("خطأ", f"حدث خطأ في استيراد البيانات: {e}")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instrumentation Utility
+أداة قياس الأداء
+
+Span timers (context manager / decorator) backed by perf_counter_ns
+histograms, plus simple counters. Everything is kept in memory and can be
+read through metrics.snapshot() / metrics.report(). Recording can be
+switched off with LoggingSettings.metrics_enabled.
+"""
+
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+class Histogram:
+    """Duration histogram over a bounded window of recent samples (not thread-safe; Metrics locks)"""
+
+    __slots__ = ("count", "total_ns", "max_ns", "_samples")
+
+    def __init__(self, window: int = 4096):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self._samples = deque(maxlen=window)
+
+    def record(self, duration_ns: int):
+        """Add one duration sample"""
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+        self._samples.append(duration_ns)
+
+    def summary(self) -> Dict[str, float]:
+        """Summary in milliseconds"""
+        samples = sorted(self._samples)
+
+        def pct(fraction):
+            if not samples:
+                return 0.0
+            index = min(len(samples) - 1, int(round(fraction * (len(samples) - 1))))
+            return samples[index] / 1e6
+
+        return {
+            "count": self.count,
+            "mean_ms": (self.total_ns / self.count / 1e6) if self.count else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": self.max_ns / 1e6
+        }
+
+class Metrics:
+    """Registry of span histograms and counters"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, int] = {}
+        # Name of the view currently on screen; DB queries are attributed to it
+        self.scope: Optional[str] = None
+
+    def configure_from_settings(self, settings_manager):
+        """Follow LoggingSettings.metrics_enabled"""
+        def apply(category=None, changes=None):
+            if category in (None, "logging"):
+                self.enabled = settings_manager.logging.metrics_enabled
+
+        apply()
+        settings_manager.subscribe(apply)
+
+    def _record(self, name: str, duration_ns: int):
+        # Spans are recorded from the Tk, report and spooler threads
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.record(duration_ns)
+
+    def record(self, name: str, duration_ns: int):
+        """Record a duration for a span name"""
+        if self.enabled:
+            self._record(name, duration_ns)
+
+    @contextmanager
+    def span(self, name: str):
+        """Time the enclosed block"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self._record(name, time.perf_counter_ns() - start)
+
+    def timed(self, name: Optional[str] = None) -> Callable:
+        """Decorator that times every call of the wrapped function"""
+        def decorator(func):
+            span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._record(span_name, time.perf_counter_ns() - start)
+            return wrapper
+        return decorator
+
+    def incr(self, name: str, amount: int = 1):
+        """Increment a counter"""
+        if self.enabled:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + amount
+
+    def count_query(self, statement: str = None):
+        """Count one executed SQL statement (total and for the current view)"""
+        if not self.enabled:
+            return
+        scope = self.scope
+        with self._lock:
+            self._counters["db.queries"] = self._counters.get("db.queries", 0) + 1
+            if scope:
+                key = f"view.{scope}.db_queries"
+                self._counters[key] = self._counters.get(key, 0) + 1
+
+    def begin_view(self, view_name: str):
+        """Mark a view load; following DB queries are attributed to it"""
+        self.scope = view_name
+        self.incr(f"view.{view_name}.loads")
+
+    def counter(self, name: str) -> int:
+        """Current value of a counter"""
+        return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All spans and counters as plain data"""
+        with self._lock:
+            spans = {name: hist.summary() for name, hist in sorted(self._histograms.items())}
+            counters = dict(self._counters)
+
+        views = {}
+        for key, value in counters.items():
+            if key.startswith("view.") and key.endswith(".loads") and value:
+                view_name = key[len("view."):-len(".loads")]
+                queries = counters.get(f"view.{view_name}.db_queries", 0)
+                views[view_name] = {
+                    "loads": value,
+                    "db_queries": queries,
+                    "db_queries_per_load": queries / value
+                }
+
+        return {
+            "spans": spans,
+            "counters": dict(sorted(counters.items())),
+            "views": views
+        }
+
+    def report(self) -> str:
+        """Human readable table of spans and per-view query counts"""
+        data = self.snapshot()
+        lines = [f"{'span':<40} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        for name, s in data["spans"].items():
+            lines.append(
+                f"{name:<40} {s['count']:>7} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} "
+                f"{s['p99_ms']:>9.2f} {s['max_ms']:>9.2f}"
+            )
+
+        if data["views"]:
+            lines.append("")
+            lines.append(f"{'view':<40} {'loads':>7} {'queries':>9} {'q/load':>9}")
+            for name, v in sorted(data["views"].items()):
+                lines.append(f"{name:<40} {v['loads']:>7} {v['db_queries']:>9} {v['db_queries_per_load']:>9.1f}")
+
+        lines.append("")
+        lines.append(f"db.queries total: {data['counters'].get('db.queries', 0)}")
+        return "\n".join(lines)
+
+    def reset(self):
+        """Clear all recorded data"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+# Process-wide registry
+metrics = Metrics()
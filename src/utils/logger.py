@@ -1,82 +1,214 @@
-
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-Logging Utility
-أداة التسجيل
+Logger Utility
+أداة السجلات
+
+All application loggers propagate to the root logger, which owns a single
+QueueHandler. A listener thread drains the queue into one rotating file,
+so log calls on the Tk thread only enqueue a record. The listener wakes at
+most every FLUSH_INTERVAL seconds and writes what has queued up with one
+write and one flush, instead of competing with the caller for the GIL on
+every record.
 """
 
+import atexit
+import copy
 import logging
+import logging.handlers
+import queue
 import sys
+import threading
 from pathlib import Path
-from typing import Optional
-
-def get_logger(name: str, level: int = logging.INFO) -> logging.Logger:
-    """Get configured logger instance"""
-    
-    # Create logger
-    logger = logging.getLogger(name)
-    
-    # Skip if already configured
-    if logger.handlers:
-        return logger
-    
-    logger.setLevel(level)
-    
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # Create console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
-    # Create file handler
+from typing import Dict, List, Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Seconds the listener lets records collect before writing them
+FLUSH_INTERVAL = 0.25
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+_module_levels: Dict[str, int] = {}
+
+class _AsyncQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves formatting to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Merge %-style args now, leave timestamp/format work to the listener"""
+        # The default implementation runs the full formatter on the calling
+        # thread. Only the message/args merge has to happen here, because
+        # the args may be mutated after the call returns.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+class _BatchFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotating file handler that writes a batch of records at once"""
+
+    def handle_batch(self, records: List[logging.LogRecord]):
+        """Format, then one rollover check, one write and one flush for the batch"""
+        records = [record for record in records if record.levelno >= self.level and self.filter(record)]
+        if not records:
+            return
+        try:
+            text = "".join(self.format(record) + self.terminator for record in records)
+            with self.lock:
+                if self.stream is None:
+                    self.stream = self._open()
+                # Sizes are compared as characters, like RotatingFileHandler
+                if self.maxBytes > 0 and self.stream.tell() + len(text) >= self.maxBytes:
+                    self.doRollover()
+                self.stream.write(text)
+                self.stream.flush()
+        except Exception:
+            self.handleError(records[0])
+
+class _BatchQueueListener(logging.handlers.QueueListener):
+    """Queue listener that handles records in batches"""
+
+    def __init__(self, log_queue, *handlers, flush_interval: float = FLUSH_INTERVAL,
+                 respect_handler_level: bool = False):
+        super().__init__(log_queue, *handlers, respect_handler_level=respect_handler_level)
+        self.flush_interval = flush_interval
+        self._stopping = threading.Event()
+
+    def _monitor(self):
+        """Block for a record, let more collect, then handle everything queued"""
+        while True:
+            batch = [self.dequeue(True)]
+            if batch[0] is not self._sentinel:
+                self._stopping.wait(self.flush_interval)
+            while batch[-1] is not self._sentinel:
+                try:
+                    batch.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+
+            stop = batch[-1] is self._sentinel
+            if stop:
+                batch.pop()
+            if batch:
+                self.handle_batch(batch)
+            if stop:
+                break
+
+    def handle_batch(self, records: List[logging.LogRecord]):
+        for handler in self.handlers:
+            if self.respect_handler_level:
+                wanted = [record for record in records if record.levelno >= handler.level]
+            else:
+                wanted = records
+            if isinstance(handler, _BatchFileHandler):
+                handler.handle_batch(wanted)
+            else:
+                for record in wanted:
+                    handler.handle(record)
+
+    def stop(self):
+        """Write what is queued and stop without waiting out the flush interval"""
+        self._stopping.set()
+        super().stop()
+
+def _parse_level(level, default: int = logging.INFO) -> int:
+    """Convert 'INFO' / 20 style values to a logging level"""
+    if isinstance(level, int):
+        return level
+    if isinstance(level, str):
+        value = logging.getLevelName(level.strip().upper())
+        if isinstance(value, int):
+            return value
+    return default
+
+def setup_logging(log_dir: str = "logs",
+                  level=logging.INFO,
+                  max_bytes: int = 5 * 1024 * 1024,
+                  backup_count: int = 5,
+                  console: bool = False) -> logging.Logger:
+    """Install the queue-based logging pipeline on the root logger"""
+    global _listener, _queue_handler
+
+    root = logging.getLogger()
+    root.setLevel(_parse_level(level))
+
+    if _listener is not None:
+        return root
+
+    formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+    sinks = []
+
     try:
-        logs_dir = Path("logs")
-        logs_dir.mkdir(exist_ok=True)
-        
-        file_handler = logging.FileHandler(
-            logs_dir / "app.log",
+        logs_path = Path(log_dir)
+        logs_path.mkdir(parents=True, exist_ok=True)
+
+        file_handler = _BatchFileHandler(
+            logs_path / "app.log",
+            maxBytes=max_bytes,
+            backupCount=backup_count,
             encoding='utf-8'
         )
-        file_handler.setLevel(level)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        sinks.append(file_handler)
     except Exception as e:
-        logger.warning(f"Could not create file handler: {e}")
-    
-    return logger
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-Logger Utility
-أداة السجلات
-"""
+        print(f"Could not create log file handler: {e}", file=sys.stderr)
 
-import logging
-import os
-from pathlib import Path
+    if console or not sinks:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+        sinks.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = _AsyncQueueHandler(log_queue)
+
+    # Replace anything a library or basicConfig may have installed
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+
+    _listener = _BatchQueueListener(log_queue, *sinks, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    return root
+
+def set_module_levels(levels: Dict[str, object]):
+    """Apply per-module levels, e.g. {'src.core.database': 'WARNING'}"""
+    # Modules dropped from the mapping go back to inheriting the root level
+    for name in set(_module_levels) - set(levels):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    _module_levels.clear()
+
+    for name, level in levels.items():
+        parsed = _parse_level(level, logging.NOTSET)
+        logging.getLogger(name).setLevel(parsed)
+        _module_levels[name] = parsed
+
+def configure_from_settings(settings_manager):
+    """Apply logging levels from settings and follow later changes"""
+    def apply(category=None, changes=None):
+        if category not in (None, "logging"):
+            return
+        logging_settings = settings_manager.logging
+        logging.getLogger().setLevel(_parse_level(logging_settings.level))
+        set_module_levels(logging_settings.module_levels or {})
+
+    apply()
+    settings_manager.subscribe(apply)
 
-def setup_logger():
-    """Setup main application logger"""
-    # Create logs directory
-    Path("logs").mkdir(exist_ok=True)
-    
-    # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('logs/app.log', encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
+def shutdown_logging():
+    """Write queued records and stop the listener thread"""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
 
 def get_logger(name: str) -> logging.Logger:
-    """Get logger instance"""
+    """Get logger instance (handlers live on the root logger only)"""
     return logging.getLogger(name)
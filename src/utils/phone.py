@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Phone Utility
+أداة أرقام الهواتف
+
+Phone numbers reduced to one comparable form: digits only (Arabic-Indic
+digits included), without the international prefix and the leading trunk
+zero. "+20 102 480 4490", "00201024804490" and "01024804490" all become
+"1024804490", and a partly typed number normalizes to a prefix of it.
+"""
+
+DEFAULT_COUNTRY_CODE = "20"
+
+# National numbers are at most this long including the trunk zero
+NATIONAL_LENGTH = 11
+
+# Arabic-Indic and Eastern Arabic-Indic digits -> ASCII
+_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹", "01234567890123456789")
+
+def normalize_phone(phone: str, country_code: str = DEFAULT_COUNTRY_CODE) -> str:
+    """Digits of a phone number without country prefix or trunk zero"""
+    if not phone:
+        return ""
+
+    text = phone.strip().translate(_DIGITS)
+    digits = "".join(ch for ch in text if ch.isdigit())
+
+    if digits.startswith("00"):
+        digits = digits[2:]
+        international = True
+    else:
+        international = text.startswith("+") or len(digits) > NATIONAL_LENGTH
+
+    if international and country_code and digits.startswith(country_code):
+        digits = digits[len(country_code):]
+
+    if digits.startswith("0"):
+        digits = digits[1:]
+    return digits